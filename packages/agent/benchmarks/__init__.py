@@ -0,0 +1,5 @@
+"""ベンチマーク パッケージ
+
+ローカルで実行するマイクロベンチマーク。外部サービスにはアクセスしない。
+実行例: python -m benchmarks.bench_http_client
+"""
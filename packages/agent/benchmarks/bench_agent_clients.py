@@ -0,0 +1,118 @@
+"""ADKエージェントのクライアント生成コストのベンチマーク
+
+1ターン（identify_motif → search_memory_by_motif → search_recent_memories →
+analyze_dessin_image（Memory Bank保存を含む））を、生成コストを模擬したスタブクライアントで
+実行し、1ターンあたりのクライアント生成回数と所要時間を比較する。
+
+- per_call: ツール呼び出しごとにクライアントを生成（従来の動作）
+- shared: プロセス内で共有したクライアントを再利用
+
+実行例:
+    python -m benchmarks.bench_agent_clients --turns 50 --setup-ms 20
+"""
+
+import argparse
+import logging
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+
+from dessin_coaching_agent import clients, memory_tools, tools
+from dessin_coaching_agent.config import settings
+from dessin_coaching_agent.models import (
+    DessinAnalysis,
+    LineQualityAnalysis,
+    MotifIdentification,
+    ProportionAnalysis,
+    TextureAnalysis,
+    ToneAnalysis,
+)
+
+USER_ID = "bench-user"
+IMAGE_URL = "https://storage.googleapis.com/bucket/uploads/bench.jpg"
+
+MOTIF_JSON = MotifIdentification(primary_motif="りんご", tags=["りんご", "静物"]).model_dump_json()
+ANALYSIS_JSON = DessinAnalysis(
+    proportion=ProportionAnalysis(
+        shape_accuracy="良好", ratio_balance="適切", contour_quality="安定", score=75.0
+    ),
+    tone=ToneAnalysis(
+        value_range="5段階", light_consistency="一貫", three_dimensionality="良好", score=70.0
+    ),
+    texture=TextureAnalysis(material_expression="基本的", touch_variety="限定的", score=65.0),
+    line_quality=LineQualityAnalysis(
+        stroke_quality="安定", pressure_control="適切", hatching="基本的", score=72.0
+    ),
+    overall_score=70.5,
+    strengths=["陰影"],
+    improvements=["質感"],
+    tags=["りんご"],
+).model_dump_json()
+
+
+class _Counter:
+    constructed = 0
+
+
+def _stub_client_class(setup_seconds: float) -> type:
+    """生成時に認証情報の探索・トランスポート初期化相当の待ちが入るスタブ"""
+
+    class StubClient:
+        def __init__(self, *_args: object, **_kwargs: object) -> None:
+            _Counter.constructed += 1
+            time.sleep(setup_seconds)
+            self.models = SimpleNamespace(generate_content=self._generate_content)
+            self.agent_engines = SimpleNamespace(
+                memories=SimpleNamespace(retrieve=lambda **_: [], generate=lambda **_: None)
+            )
+
+        @staticmethod
+        def _generate_content(**kwargs: object) -> SimpleNamespace:
+            schema = getattr(kwargs.get("config"), "response_schema", None)
+            text = MOTIF_JSON if schema is MotifIdentification else ANALYSIS_JSON
+            return SimpleNamespace(text=text)
+
+    return StubClient
+
+
+def _turn(between_calls: Callable[[], None]) -> None:
+    """エージェント1ターン分のツール呼び出し"""
+    motif = tools.identify_motif(IMAGE_URL)
+    between_calls()
+    memory_tools.search_memory_by_motif(str(motif["primary_motif"]), USER_ID)
+    between_calls()
+    memory_tools.search_recent_memories(USER_ID)
+    between_calls()
+    # analyze_dessin_image内でMemory Bank保存も行う
+    result = tools.analyze_dessin_image(IMAGE_URL, user_id=USER_ID, session_id="bench")
+    if result["status"] != "success":
+        raise RuntimeError(result)
+
+
+def main(turns: int, setup_ms: float) -> None:
+    logging.disable(logging.CRITICAL)
+    settings.agent_engine_id = "bench-engine"
+    stub = _stub_client_class(setup_ms / 1000)
+    clients.genai.Client = stub  # type: ignore[misc]
+    clients.VertexClient = stub  # type: ignore[misc]
+
+    for name, between_calls in (("per_call", clients.reset_clients), ("shared", lambda: None)):
+        clients.reset_clients()
+        _Counter.constructed = 0
+        started_at = time.perf_counter()
+        for _ in range(turns):
+            between_calls()
+            _turn(between_calls)
+        elapsed = time.perf_counter() - started_at
+        print(
+            f"{name:>8}: {elapsed / turns * 1000:7.2f} ms/turn, "
+            f"clients/turn={_Counter.constructed / turns:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--setup-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    main(args.turns, args.setup_ms)
@@ -0,0 +1,169 @@
+"""Agent Engineのイベントストリーム解析のベンチマーク
+
+記録済みのイベントストリーム（指定がなければ典型的なレビュー1件分を生成）を解析し、
+1ストリームあたりの解析時間（中央値）を比較する。
+
+- legacy: 全イベントを解析し、テキストごとに正規表現4種を試す（従来実装）
+- current: 最終結果になり得るイベントのみを1回の走査で解析し、有効な分析結果を得たら以降を読み飛ばす
+
+記録済みストリームは1行1イベントのJSONLファイルで指定する（async_stream_queryの出力をそのまま保存したもの）。
+
+実行例:
+    python -m benchmarks.bench_agent_response_parse --runs 200
+    python -m benchmarks.bench_agent_response_parse --events stream1.jsonl --events stream2.jsonl
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from src.services.agent_engine_service import AgentEngineService
+
+ANALYSIS: dict[str, object] = {
+    "proportion": {
+        "shape_accuracy": "輪郭は概ね正確だが、右側の楕円がやや歪んでいる" * 3,
+        "ratio_balance": "高さと幅の比率は適切",
+        "contour_quality": "線の強弱で前後関係を表現できている",
+        "score": 75.0,
+    },
+    "tone": {
+        "value_range": "5段階の明暗が確認できる",
+        "light_consistency": "光源は左上で一貫している",
+        "three_dimensionality": "球体の立体感が出ている",
+        "score": 70.0,
+    },
+    "texture": {
+        "material_expression": "表面の質感は基本的な表現",
+        "touch_variety": "タッチの種類は限定的",
+        "score": 65.0,
+    },
+    "line_quality": {
+        "stroke_quality": "ストロークは安定している",
+        "pressure_control": "筆圧の調整は適切",
+        "hatching": "ハッチングの方向が揃っている",
+        "score": 72.0,
+    },
+    "overall_score": 70.5,
+    "strengths": ["陰影の段階が豊か", "輪郭線が安定"],
+    "improvements": ["反射光の表現", "接地面の影"],
+    "tags": ["りんご", "球体", "静物"],
+}
+
+
+def _sample_stream() -> list[dict[str, object]]:
+    """モチーフ特定 → 分析 → 要約文のストリーミングを含む典型的なイベント列"""
+
+    def model(parts: list[dict[str, object]], partial: bool = False) -> dict[str, object]:
+        return {"content": {"parts": parts, "role": "model"}, "partial": partial}
+
+    def tool(name: str, response: dict[str, object]) -> dict[str, object]:
+        part = {"function_response": {"name": name, "response": response}}
+        return {"content": {"parts": [part], "role": "user"}}
+
+    summary = "今回のデッサンは陰影の段階が豊かで、球体の立体感がよく表現されています。" * 4
+    events = [
+        model([{"function_call": {"name": "identify_motif", "args": {}}}]),
+        tool("identify_motif", {"status": "success", "motif": "りんご"}),
+        model([{"function_call": {"name": "analyze_dessin_image", "args": {}}}]),
+        tool("analyze_dessin_image", {"status": "success", "analysis": ANALYSIS}),
+    ]
+    # 要約文のストリーミング（部分テキスト）と最終テキスト
+    events += [model([{"text": summary[: i * 20]}], partial=True) for i in range(1, 12)]
+    events.append(model([{"text": f"{summary}\n```json\n{json.dumps(ANALYSIS)}\n```"}]))
+    return events
+
+
+def _legacy_extract(text: str) -> dict[str, object] | None:
+    patterns = [
+        r"```json\s*\n([\s\S]*?)\n```",
+        r"```\s*\n([\s\S]*?)\n```",
+        r"```json\s*([\s\S]*?)```",
+        r"```([\s\S]*?)```",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            text = match.group(1).strip()
+            break
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            return result
+    except json.JSONDecodeError:
+        pass
+    return None
+
+
+def _legacy_parse(event: dict[str, object]) -> dict[str, object] | None:
+    content = event.get("content")
+    if isinstance(content, dict) and isinstance(content.get("parts"), list):
+        parts = content["parts"]
+        if parts and isinstance(parts[0], dict):
+            if isinstance(parts[0].get("text"), str):
+                return _legacy_extract(parts[0]["text"])
+            func_resp = parts[0].get("function_response")
+            if isinstance(func_resp, dict) and isinstance(func_resp.get("response"), dict):
+                return func_resp["response"]
+    return None
+
+
+def _legacy(stream: list[dict[str, object]]) -> dict[str, object] | None:
+    final_response = None
+    for event in stream:
+        parsed = _legacy_parse(event)
+        if parsed:
+            final_response = parsed
+    return final_response
+
+
+def _current(stream: list[dict[str, object]]) -> dict[str, object] | None:
+    service = AgentEngineService()
+    final_response = None
+    validated = None
+    for event in stream:
+        if validated is not None:
+            continue
+        parsed = service._parse_agent_response(event)
+        if parsed:
+            final_response = parsed
+            validated = service._validate_analysis(parsed)
+    return final_response
+
+
+def _measure(parser: Callable[[list[dict[str, object]]], object], stream: list, runs: int) -> float:
+    samples: list[float] = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        parser(stream)
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples)
+
+
+def main(paths: list[Path], runs: int) -> None:
+    if paths:
+        streams = [
+            (path.name, [json.loads(line) for line in path.read_text().splitlines() if line])
+            for path in paths
+        ]
+    else:
+        streams = [("sample_review", _sample_stream())]
+
+    for name, stream in streams:
+        legacy = _measure(_legacy, stream, runs)
+        current = _measure(_current, stream, runs)
+        print(
+            f"{name}: events={len(stream)}  legacy={legacy * 1e6:8.1f} us  "
+            f"current={current * 1e6:8.1f} us  ({legacy / current:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=Path, action="append", default=[])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    main(args.events, args.runs)
@@ -0,0 +1,86 @@
+"""Firestoreバックエンドの同時実行ベンチマーク
+
+インメモリFirestoreフェイクにRPCごとの擬似レイテンシを与え、1ワーカー（1イベントループ）が
+捌けるリクエスト数/秒を比較する。
+
+- blocking: 同期クライアント相当（レイテンシ中イベントループをブロック）
+- async: 非同期クライアント相当（レイテンシ中に他のリクエストを処理）
+
+実行例:
+    python -m benchmarks.bench_firestore_backend --requests 500 --concurrency 50 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+import structlog
+from fastapi import FastAPI
+
+from src.api.reviews import router as reviews_router
+from src.config import settings
+from src.services import rank_service, task_service
+from src.services.rank_service import RankService
+from src.services.task_service import TaskService
+from tests.fake_firestore import FakeAsyncFirestore
+
+USER_ID = "bench-user"
+IMAGE_URL = "https://storage.googleapis.com/bucket/uploads/bench.jpg"
+
+
+async def _run(
+    blocking: bool, requests: int, concurrency: int, latency: float
+) -> tuple[float, int]:
+    """GET /reviews/{id} と GET /reviews を混在させて実行し、req/sを返す"""
+    db = FakeAsyncFirestore()
+    task_service._task_service = TaskService(db=db)  # type: ignore[arg-type]
+    rank_service._rank_service = RankService(db=db)  # type: ignore[arg-type]
+    task_ids = [
+        (await task_service._task_service.create_task(USER_ID, IMAGE_URL)).task_id
+        for _ in range(20)
+    ]
+    # 投入後にレイテンシを有効化
+    db.latency_seconds = latency
+    db.blocking = blocking
+
+    app = FastAPI()
+    app.include_router(reviews_router)
+    transport = httpx.ASGITransport(app=app)
+    headers = {"X-User-ID": USER_ID}
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            path = "/reviews?limit=20" if i % 4 == 0 else f"/reviews/{task_ids[i % len(task_ids)]}"
+            async with semaphore:
+                response = await client.get(path, headers=headers)
+            if response.status_code != 200:
+                errors += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started_at
+
+    return requests / elapsed, errors
+
+
+async def main(requests: int, concurrency: int, latency_ms: float) -> None:
+    settings.auth_enabled = False
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    for name, blocking in (("blocking", True), ("async", False)):
+        rps, errors = await _run(blocking, requests, concurrency, latency_ms / 1000)
+        print(f"{name:>8}: {rps:8.1f} req/s (errors={errors})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency_ms))
@@ -0,0 +1,157 @@
+"""Cloud Functionsのリクエスト処理方式（コールド相当 / ウォーム）のベンチマーク
+
+画像系Cloud Functionsのエントリーポイントと同じ流れ（クライアント取得 → HTTP取得 → 応答）を
+スタブで再現し、1リクエストあたりの所要時間（中央値・p95）を比較する。
+
+- cold: リクエストごとにイベントループ・クライアント・HTTPセッションを作り直す（従来実装）
+- warm: 常駐イベントループ・lru_cacheのクライアント・共有HTTPセッションを再利用する
+
+クライアント生成コスト（認証情報の読み込み・API探索など）は ``--client-init-ms`` で模擬する。
+HTTP取得はローカルのスタブサーバーに対して行う（TLSなしのため接続確立コストは実環境より小さい）。
+
+実行例:
+    python -m benchmarks.bench_function_warm_start --requests 50 --client-init-ms 150
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from collections.abc import Callable, Coroutine
+from functools import lru_cache
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+IMAGE_BYTES = bytes(range(256)) * 1024  # 256KB
+
+
+class StubClient:
+    """生成コストを持つスタブクライアント（genai.Client / storage.Client 相当）"""
+
+    init_seconds = 0.0
+
+    def __init__(self) -> None:
+        time.sleep(self.init_seconds)
+
+
+async def _fetch(session: aiohttp.ClientSession, url: str) -> int:
+    async with session.get(url) as response:
+        return len(await response.read())
+
+
+def _cold_request(url: str) -> None:
+    """リクエストごとにループ・クライアント・セッションを作り直す"""
+
+    async def process() -> None:
+        async with aiohttp.ClientSession() as session:
+            await _fetch(session, url)
+
+    StubClient()
+    StubClient()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(process())
+    loop.close()
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_session: aiohttp.ClientSession | None = None
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def _run_async[T](coro: Coroutine[Any, Any, T]) -> T:
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
+@lru_cache(maxsize=1)
+def _get_genai_client() -> StubClient:
+    return StubClient()
+
+
+@lru_cache(maxsize=1)
+def _get_storage_client() -> StubClient:
+    return StubClient()
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession()
+    return _session
+
+
+def _warm_request(url: str) -> None:
+    """常駐ループ・キャッシュ済みクライアント・共有セッションを再利用する"""
+
+    async def process() -> None:
+        await _fetch(_get_session(), url)
+
+    _get_genai_client()
+    _get_storage_client()
+    _run_async(process())
+
+
+def _measure(handler: Callable[[str], None], url: str, requests: int) -> tuple[float, list[float]]:
+    """初回リクエストの所要時間と、2回目以降の所要時間を返す"""
+    samples: list[float] = []
+    for _ in range(requests):
+        started_at = time.perf_counter()
+        handler(url)
+        samples.append(time.perf_counter() - started_at)
+    return samples[0], samples[1:]
+
+
+def _report(name: str, first: float, samples: list[float]) -> None:
+    p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) >= 2 else samples[0]
+    print(
+        f"{name:<6} first={first * 1000:8.1f} ms  "
+        f"median={statistics.median(samples) * 1000:8.1f} ms  p95={p95 * 1000:8.1f} ms"
+    )
+
+
+def main(requests: int, client_init_ms: float) -> None:
+    StubClient.init_seconds = client_init_ms / 1000
+
+    async def handler(_request: web.Request) -> web.Response:
+        return web.Response(body=IMAGE_BYTES, content_type="image/jpeg")
+
+    # スタブサーバーはCloud Functionsのループとは別のスレッド・ループで動かす
+    server_loop = asyncio.new_event_loop()
+    threading.Thread(target=server_loop.run_forever, daemon=True).start()
+    app = web.Application()
+    app.router.add_get("/image.jpg", handler)
+    server = TestServer(app, loop=server_loop)
+    asyncio.run_coroutine_threadsafe(server.start_server(), server_loop).result()
+    url = str(server.make_url("/image.jpg"))
+
+    try:
+        print(f"requests={requests} client_init={client_init_ms:.0f} ms")
+        _report("cold", *_measure(_cold_request, url, requests))
+        _report("warm", *_measure(_warm_request, url, requests))
+    finally:
+        if _session is not None:
+            _run_async(_session.close())
+        asyncio.run_coroutine_threadsafe(server.close(), server_loop).result()
+        server_loop.call_soon_threadsafe(server_loop.stop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--client-init-ms", type=float, default=150.0)
+    args = parser.parse_args()
+    main(args.requests, args.client_init_ms)
@@ -0,0 +1,80 @@
+"""HTTPクライアントのベンチマーク
+
+ローカルのスタブHTTPサーバーに対して、呼び出しごとにセッションを作成する方式と
+共有プール付きセッションを使う方式の呼び出しオーバーヘッド（p50/p95）を比較する。
+
+実行例:
+    python -m benchmarks.bench_http_client --calls 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services import http_client
+
+
+async def _handler(_request: web.Request) -> web.Response:
+    return web.json_response({"annotated_image_url": "https://storage.googleapis.com/b/a.png"})
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * q))
+    return ordered[index]
+
+
+async def _per_call_session(url: str, calls: int) -> list[float]:
+    """従来方式: 呼び出しごとにClientSessionを作成"""
+    samples: list[float] = []
+    for _ in range(calls):
+        started_at = time.perf_counter()
+        async with aiohttp.ClientSession() as session, session.post(url, json={}) as response:
+            await response.json()
+        samples.append(time.perf_counter() - started_at)
+    return samples
+
+
+async def _shared_session(url: str, calls: int) -> list[float]:
+    """共有プール付きセッションを使用"""
+    samples: list[float] = []
+    session = await http_client.start_http_client()
+    try:
+        for _ in range(calls):
+            started_at = time.perf_counter()
+            async with session.post(url, json={}) as response:
+                await response.json()
+            samples.append(time.perf_counter() - started_at)
+    finally:
+        await http_client.close_http_client()
+    return samples
+
+
+async def main(calls: int) -> None:
+    app = web.Application()
+    app.router.add_post("/", _handler)
+    server = TestServer(app)
+    await server.start_server()
+    url = str(server.make_url("/"))
+    try:
+        for name, runner in (("per_call_session", _per_call_session), ("shared_session", _shared_session)):
+            samples = await runner(url, calls)
+            print(
+                f"{name:>18}: p50={_percentile(samples, 0.5) * 1000:.3f}ms "
+                f"p95={_percentile(samples, 0.95) * 1000:.3f}ms "
+                f"mean={statistics.mean(samples) * 1000:.3f}ms"
+            )
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
@@ -0,0 +1,111 @@
+"""画像ダウンロードのバッファリング方式のベンチマーク
+
+ローカルのスタブHTTPサーバーから1MB〜10MBの画像を取得し、受信データの組み立て方式ごとに
+プロセスCPU時間（中央値、サーバー側の送信処理を含む）と受信時のピークメモリを比較する。
+
+- concat: 8KBチャンクを ``data += chunk`` で連結（Cloud Functionsの従来実装）
+- join: チャンクをリストに溜めて最後に ``b"".join``
+- fetch_image_bytes: Content-Lengthで事前確保したbytearrayに書き込みmemoryviewを返す
+
+実行例:
+    python -m benchmarks.bench_image_fetch --runs 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services.image_fetcher import fetch_image_bytes
+
+SIZES_MB = (1, 2, 5, 10)
+MAX_BYTES = 16 * 1024 * 1024
+
+Fetcher = Callable[[aiohttp.ClientSession, str], Awaitable[object]]
+
+
+async def _concat(session: aiohttp.ClientSession, url: str) -> bytes:
+    async with session.get(url) as response:
+        data = b""
+        async for chunk in response.content.iter_chunked(8192):
+            data += chunk
+            if len(data) > MAX_BYTES:
+                raise ValueError("too large")
+    return data
+
+
+async def _join(session: aiohttp.ClientSession, url: str) -> bytes:
+    async with session.get(url) as response:
+        chunks: list[bytes] = []
+        size = 0
+        async for chunk in response.content.iter_chunked(8192):
+            size += len(chunk)
+            if size > MAX_BYTES:
+                raise ValueError("too large")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _preallocated(session: aiohttp.ClientSession, url: str) -> memoryview:
+    return await fetch_image_bytes(url, MAX_BYTES, session=session)
+
+
+async def _measure(fetcher: Fetcher, session: aiohttp.ClientSession, url: str, runs: int) -> float:
+    samples: list[float] = []
+    for _ in range(runs):
+        started_at = time.process_time()
+        await fetcher(session, url)
+        samples.append(time.process_time() - started_at)
+    return statistics.median(samples)
+
+
+async def _peak_memory(fetcher: Fetcher, session: aiohttp.ClientSession, url: str) -> int:
+    tracemalloc.start()
+    try:
+        await fetcher(session, url)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def main(runs: int) -> None:
+    bodies = {size: bytes(range(256)) * (size * 4096) for size in SIZES_MB}
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(body=bodies[int(request.match_info["size"])])
+
+    app = web.Application()
+    app.router.add_get("/{size}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    fetchers: dict[str, Fetcher] = {
+        "concat": _concat,
+        "join": _join,
+        "fetch_image_bytes": _preallocated,
+    }
+    try:
+        async with aiohttp.ClientSession() as session:
+            print(f"{'size':>6} " + " ".join(f"{name:>26}" for name in fetchers))
+            for size in SIZES_MB:
+                url = str(server.make_url(f"/{size}"))
+                cells = []
+                for fetcher in fetchers.values():
+                    cpu = await _measure(fetcher, session, url, runs)
+                    peak = await _peak_memory(fetcher, session, url)
+                    cells.append(f"{cpu * 1000:8.1f} ms / {peak / 2**20:5.1f} MiB peak")
+                print(f"{size:>4}MB " + " ".join(f"{cell:>26}" for cell in cells))
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
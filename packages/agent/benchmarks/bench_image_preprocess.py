@@ -0,0 +1,108 @@
+"""ステージ別画像前処理のベンチマーク
+
+スマートフォンで撮影したデッサン相当のサンプル画像（指定がなければ生成）に対して、
+ステージ別の前処理（縮小・メタデータ除去・グレースケール化・再エンコード）を行い、
+送信バイト数（base64）・推定画像トークン・処理時間を前処理なしの場合と比較する。
+
+推定画像トークンは768px四方のタイル1枚あたり258トークン（長辺384px以下は1枚）として
+概算する（モデルの実際の課金トークンとは異なる場合がある）。
+
+実行例:
+    python -m benchmarks.bench_image_preprocess --runs 5
+    python -m benchmarks.bench_image_preprocess --image drawing1.jpg --image drawing2.jpg
+"""
+
+import argparse
+import base64
+import math
+import random
+import statistics
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import ExifTags, Image, ImageDraw, ImageFilter
+
+from src.config import settings
+from src.services.review_image import ImageProfile, normalize_image, preprocess_image, stage_profile
+
+TOKENS_PER_TILE = 258
+TILE_SIZE = 768
+
+
+def _sample_photo(width: int, height: int, seed: int) -> bytes:
+    """紙の地色・ノイズ・鉛筆線を含む撮影画像相当のJPEG（EXIF付き）を生成"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (232, 226, 214))
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1 = x0 + rng.randint(-width // 4, width // 4)
+        y1 = y0 + rng.randint(-height // 4, height // 4)
+        tone = rng.randint(40, 140)
+        draw.line((x0, y0, x1, y1), fill=(tone, tone - 2, tone - 6), width=rng.randint(2, 8))
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    image = Image.blend(image, noise, 0.12).filter(ImageFilter.GaussianBlur(1))
+
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "bench-phone"
+    exif[ExifTags.Base.Orientation] = 1
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+def _estimated_tokens(data: bytes) -> int:
+    with Image.open(BytesIO(data)) as image:
+        width, height = image.size
+    if max(width, height) <= TILE_SIZE // 2:
+        return TOKENS_PER_TILE
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE) * TOKENS_PER_TILE
+
+
+def _b64_size(data: bytes) -> int:
+    return len(base64.b64encode(data))
+
+
+def _bench_profile(name: str, data: bytes, profile: ImageProfile | None, runs: int) -> None:
+    samples: list[float] = []
+    output = data
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        if profile is not None:
+            output, _, _ = preprocess_image(data, profile)
+        samples.append(time.perf_counter() - started_at)
+    saved = 1 - _b64_size(output) / _b64_size(data)
+    print(
+        f"  {name:<14} payload={_b64_size(output) / 1024:9.1f} KiB "
+        f"(-{saved:6.1%})  tokens~{_estimated_tokens(output):6d}  "
+        f"time={statistics.median(samples) * 1000:7.1f} ms"
+    )
+
+
+def main(images: list[Path], runs: int) -> None:
+    if images:
+        samples = [(path.name, path.read_bytes()) for path in images]
+    else:
+        samples = [
+            ("photo_4032x3024", _sample_photo(4032, 3024, seed=1)),
+            ("photo_3000x4000", _sample_photo(3000, 4000, seed=2)),
+            ("scan_1600x1200", _sample_photo(1600, 1200, seed=3)),
+        ]
+
+    for name, original in samples:
+        normalized, *_ = normalize_image(original, settings.review_image_max_dimension)
+        print(f"{name}: original={len(original) / 1024:.1f} KiB")
+        _bench_profile("no_preprocess", normalized, None, runs)
+        for stage in ("annotation", "example_image"):
+            _bench_profile(stage, normalized, stage_profile(stage), runs)
+        # モチーフ特定相当のサムネイル（ADKツールはmedia_resolution=LOWで同等の効果を得る）
+        _bench_profile("thumbnail_512", normalized, ImageProfile(max_dimension=512), runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--image", type=Path, action="append", default=[])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    main(args.image, args.runs)
@@ -0,0 +1,107 @@
+"""Memory Bank保存方式のベンチマーク
+
+遅延を持つフェイクのMemory Bank（memories.generate 相当）に対して、分析ツールが
+結果を返すまでの保存部分の所要時間を、同期保存とバックグラウンド保存（MemoryWriter）で比較する。
+
+- sync: save_analysis_to_memory の完了を待ってから返す（従来実装）
+- async: スプールへの書き出し後に返し、保存はワーカーで行う
+
+実行例:
+    python -m benchmarks.bench_memory_write --reviews 20 --latency-ms 800
+"""
+
+import argparse
+import datetime
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from dessin_coaching_agent.memory_writer import MemoryWriter
+from dessin_coaching_agent.models import (
+    DessinAnalysis,
+    LineQualityAnalysis,
+    ProportionAnalysis,
+    TextureAnalysis,
+    ToneAnalysis,
+)
+
+ANALYSIS = DessinAnalysis(
+    proportion=ProportionAnalysis(
+        shape_accuracy="良好", ratio_balance="適切", contour_quality="安定", score=75.0
+    ),
+    tone=ToneAnalysis(
+        value_range="5段階", light_consistency="一貫", three_dimensionality="良好", score=70.0
+    ),
+    texture=TextureAnalysis(material_expression="基本的", touch_variety="限定的", score=65.0),
+    line_quality=LineQualityAnalysis(
+        stroke_quality="安定", pressure_control="適切", hatching="基本的", score=72.0
+    ),
+    overall_score=70.5,
+    strengths=["陰影"],
+    improvements=["質感"],
+    tags=["りんご"],
+)
+
+
+class FakeMemoryBank:
+    """memories.generate の往復時間を模擬する保存関数"""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.saved = 0
+
+    def save(
+        self,
+        _analysis: DessinAnalysis,
+        _user_id: str,
+        _session_id: str = "",
+        _submitted_at: datetime.datetime | None = None,
+    ) -> bool:
+        time.sleep(self.latency)
+        self.saved += 1
+        return True
+
+
+def _report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name:<6} median={statistics.median(samples) * 1000:8.2f} ms  "
+        f"max={max(samples) * 1000:8.2f} ms"
+    )
+
+
+def main(reviews: int, latency_ms: float) -> None:
+    # 審査の間隔（ワーカーが前の保存を終えている状態を再現）
+    interval = latency_ms / 1000 * 1.5
+
+    bank = FakeMemoryBank(latency_ms / 1000)
+    sync_samples: list[float] = []
+    for i in range(reviews):
+        started_at = time.perf_counter()
+        bank.save(ANALYSIS, "user-1", f"review-{i}")
+        sync_samples.append(time.perf_counter() - started_at)
+
+    bank = FakeMemoryBank(latency_ms / 1000)
+    async_samples: list[float] = []
+    with tempfile.TemporaryDirectory() as spool_dir:
+        writer = MemoryWriter(Path(spool_dir), save=bank.save)
+        for i in range(reviews):
+            started_at = time.perf_counter()
+            writer.submit(ANALYSIS, "user-1", f"review-{i}")
+            async_samples.append(time.perf_counter() - started_at)
+            time.sleep(interval)
+        writer.flush(timeout=latency_ms / 1000 * reviews)
+
+    print(f"reviews={reviews} memory_bank_latency={latency_ms:.0f} ms")
+    _report("sync", sync_samples)
+    _report("async", async_samples)
+    removed = statistics.median(sync_samples) - statistics.median(async_samples)
+    print(f"latency removed per review: {removed * 1000:.1f} ms (saved={bank.saved}/{reviews})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    args = parser.parse_args()
+    main(args.reviews, args.latency_ms)
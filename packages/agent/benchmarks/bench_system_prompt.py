@@ -0,0 +1,68 @@
+"""分析用システムプロンプトのベンチマーク
+
+1件の分析リクエストで組み立てる（送信する）システムプロンプトについて、
+生成時間と送信する文字数を比較する。
+
+- rebuild: 固定部分を毎回生成する（従来実装）
+- memoized: ランク区分ごとに生成済みの固定部分を再利用する
+- cached: コンテキストキャッシュ使用時に送信する提出ごとの部分のみ
+
+実行例:
+    python -m benchmarks.bench_system_prompt --runs 2000
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from dessin_coaching_agent import prompts
+from dessin_coaching_agent.prompts import (
+    build_submission_prompt,
+    get_dessin_analysis_system_prompt,
+)
+
+RANKS = ["10級", "7級", "5級", "1級", "初段", "師範"]
+MEMORIES: list[dict[str, object]] = [
+    {
+        "fact": "陰影の段階が豊かで、球体の立体感がよく表現されている。" * 5,
+        "metadata": {"motif": "りんご", "overall_score": 70.5},
+    }
+] * 5
+
+
+def _rebuild(rank_label: str) -> str:
+    prompts._build_static_prompt.cache_clear()
+    return get_dessin_analysis_system_prompt(rank_label, MEMORIES)
+
+
+def _memoized(rank_label: str) -> str:
+    return get_dessin_analysis_system_prompt(rank_label, MEMORIES)
+
+
+def _cached(rank_label: str) -> str:
+    return build_submission_prompt(rank_label, MEMORIES)
+
+
+def _measure(build: Callable[[str], str], runs: int) -> tuple[float, int]:
+    samples: list[float] = []
+    chars = 0
+    for i in range(runs):
+        rank_label = RANKS[i % len(RANKS)]
+        started_at = time.perf_counter()
+        chars = len(build(rank_label))
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples), chars
+
+
+def main(runs: int) -> None:
+    for name, build in (("rebuild", _rebuild), ("memoized", _memoized), ("cached", _cached)):
+        elapsed, chars = _measure(build, runs)
+        print(f"{name:<9} median={elapsed * 1e6:8.1f} us  prompt_chars={chars:6d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.runs)
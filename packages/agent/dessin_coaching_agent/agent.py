@@ -7,14 +7,15 @@ Memory Bank統合により成長トラッキング機能をサポート。
 
 import logging
 
-from google.adk.agents import Agent
+from google.adk.agents import Agent, BaseAgent
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
 from .config import settings
 from .custom_gemini import GlobalGemini
 from .memory_tools import search_memory_by_motif, search_recent_memories
+from .pipeline import DirectAnalysisAgent
 from .prompts import get_dessin_analysis_system_prompt
-from .tools import analyze_dessin_image, identify_motif
+from .tools import analyze_dessin_image, identify_motif, run_in_thread
 
 # logging 設定（Agent Engine の stdout に出力）
 if not logging.getLogger().handlers:
@@ -30,17 +31,26 @@ gemini_model = GlobalGemini(model=settings.gemini_model)
 # Memory Bankからユーザーの過去メモリを自動プリロードするツール
 preload_memory_tool = PreloadMemoryTool()
 
-# ルートエージェント定義
-root_agent = Agent(
+# LLMエージェント定義
+# 同期ツールはスレッドで実行し、イベントループ（他のセッションのLLM呼び出し）を止めない
+coaching_agent = Agent(
     name="dessin_coaching_agent",
     model=gemini_model,
     description="鉛筆デッサンを分析し、改善フィードバックを提供するコーチングエージェント",
     instruction=get_dessin_analysis_system_prompt(rank_label=None),
     tools=[
-        identify_motif,
-        analyze_dessin_image,
+        run_in_thread(identify_motif),
+        run_in_thread(analyze_dessin_image),
         preload_memory_tool,
-        search_memory_by_motif,
-        search_recent_memories,
+        run_in_thread(search_memory_by_motif),
+        run_in_thread(search_recent_memories),
     ],
 )
+
+# ルートエージェント定義（ANALYSIS_PIPELINE_MODE=direct でLLMのツール選択を省略）
+root_agent: BaseAgent = coaching_agent
+if settings.analysis_pipeline_mode == "direct":
+    root_agent = DirectAnalysisAgent(
+        name="dessin_coaching_agent",
+        description="鉛筆デッサンを固定のワークフローで分析するエージェント",
+    )
@@ -7,8 +7,9 @@ Vertex AI Agent Engine Memory Bankへのメモリ保存を担当。
 import datetime
 import logging
 
-from vertexai import Client, types
+from vertexai import types
 
+from .clients import get_vertex_client
 from .config import settings
 from .models import DessinAnalysis
 
@@ -19,6 +20,7 @@ def save_analysis_to_memory(
     analysis: DessinAnalysis,
     user_id: str,
     session_id: str = "",
+    submitted_at: datetime.datetime | None = None,
 ) -> bool:
     """分析結果をメタデータ付きでMemory Bankに保存
 
@@ -26,6 +28,7 @@ def save_analysis_to_memory(
         analysis: デッサン分析結果
         user_id: ユーザーID（スコープキー）
         session_id: セッションID（レビューID、スコープキー）
+        submitted_at: 提出日時（省略時は現在時刻。再送時は初回の日時を渡す）
 
     Returns:
         保存成功時True、失敗時False
@@ -45,10 +48,10 @@ def save_analysis_to_memory(
     )
 
     try:
-        client = Client()
+        client = get_vertex_client()
 
         # メタデータを構築
-        metadata = _build_memory_metadata(analysis)
+        metadata = _build_memory_metadata(analysis, submitted_at)
 
         # factを構築
         fact = _build_memory_fact(analysis)
@@ -109,7 +112,10 @@ def save_analysis_to_memory(
         return False
 
 
-def _build_memory_metadata(analysis: DessinAnalysis) -> dict[str, types.MemoryMetadataValue]:
+def _build_memory_metadata(
+    analysis: DessinAnalysis,
+    submitted_at: datetime.datetime | None = None,
+) -> dict[str, types.MemoryMetadataValue]:
     """分析結果からメタデータを構築"""
     metadata: dict[str, types.MemoryMetadataValue] = {
         "motif": types.MemoryMetadataValue(
@@ -131,7 +137,7 @@ def _build_memory_metadata(analysis: DessinAnalysis) -> dict[str, types.MemoryMe
             double_value=analysis.line_quality.score
         ),
         "submitted_at": types.MemoryMetadataValue(
-            timestamp_value=datetime.datetime.now(datetime.UTC)
+            timestamp_value=submitted_at or datetime.datetime.now(datetime.UTC)
         ),
     }
 
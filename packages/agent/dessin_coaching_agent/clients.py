@@ -0,0 +1,35 @@
+"""Gemini / Vertex AI クライアントの共有
+
+ツール呼び出しごとにクライアントを生成すると、認証情報の探索とHTTPトランスポートの
+初期化が毎回発生する（1ターンで4〜5回）。プロセス（エージェントコンテナ）内で
+初回利用時に1度だけ生成し、以降は同じインスタンスを再利用する。
+"""
+
+from functools import lru_cache
+
+from google import genai
+from vertexai import Client as VertexClient
+
+from .config import settings
+
+
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """Gemini呼び出し用クライアントを取得（プロセス内で共有）"""
+    return genai.Client(
+        vertexai=True,
+        project=settings.gcp_project_id,
+        location=settings.gemini_location,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_vertex_client() -> VertexClient:
+    """Memory Bank操作用のVertex AIクライアントを取得（プロセス内で共有）"""
+    return VertexClient()
+
+
+def reset_clients() -> None:
+    """共有クライアントを破棄（設定変更時・テスト用）"""
+    get_genai_client.cache_clear()
+    get_vertex_client.cache_clear()
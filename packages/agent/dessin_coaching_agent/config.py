@@ -4,6 +4,7 @@
 """
 
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -40,6 +41,34 @@ class Settings(BaseSettings):
     gemini_location: str = "global"  # モデル用ロケーション（gemini-3-*はglobalのみ）
     gemini_max_output_tokens: int = 32000
     gemini_temperature: float = 1.0
+    # モチーフ特定は概要が分かれば十分なため低解像度（サムネイル相当）で入力する
+    # 環境変数: MOTIF_MEDIA_RESOLUTION（空文字でモデルの既定値）
+    motif_media_resolution: str = "MEDIA_RESOLUTION_LOW"
+    # 分析用システムプロンプトの固定部分をコンテキストキャッシュとして登録する
+    # 環境変数: GEMINI_CONTEXT_CACHE, GEMINI_CONTEXT_CACHE_TTL_SECONDS
+    gemini_context_cache: bool = False
+    gemini_context_cache_ttl_seconds: int = 3600
+    # モデル呼び出しの予算（プロセス内のLLM呼び出し・ツール呼び出しで共有）
+    # 環境変数: GEMINI_MAX_CONCURRENT, GEMINI_REQUESTS_PER_MINUTE（0で無制限）,
+    #          GEMINI_THROTTLE_COOLDOWN_SECONDS（429を受けた際に送信を控える秒数）
+    gemini_max_concurrent: int = 4
+    gemini_requests_per_minute: float = 0.0
+    gemini_throttle_cooldown_seconds: float = 5.0
+
+    # 分析パイプライン
+    # agent: LLMがワークフローに従ってツールを呼び出す
+    # direct: LLMを介さず固定順序でツールを実行する（モチーフ識別と直近メモリ取得は並行）
+    # 環境変数: ANALYSIS_PIPELINE_MODE
+    analysis_pipeline_mode: Literal["agent", "direct"] = "agent"
+
+    # Memory Bankへの保存
+    # 環境変数: MEMORY_WRITE_ASYNC（trueで分析結果を返した後にバックグラウンドで保存）
+    memory_write_async: bool = False
+    # 未保存の依頼の書き出し先（空文字で一時ディレクトリ配下）
+    memory_spool_dir: str = ""
+    memory_write_max_attempts: int = 5
+    # プロセス終了時に未処理分の保存を待つ秒数
+    memory_write_flush_timeout_seconds: float = 5.0
 
     # Agent Engine設定（Memory Bank用）
     # 環境変数: AGENT_ENGINE_ID, AGENT_ENGINE_REGION
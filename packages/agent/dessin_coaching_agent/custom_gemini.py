@@ -5,16 +5,21 @@ Agent Engineはus-central1などの特定リージョンにデプロイされる
 モデル呼び出し時はglobalリージョンを使用するようにオーバーライド。
 
 429 RESOURCE_EXHAUSTEDエラーに対するリトライ設定を含む。
+呼び出しはツール内のGemini呼び出しと同じModelGovernorの予算を使い、
+429を受けた場合はモデル単位のクールダウンとして他の呼び出しにも共有する。
 参考: https://google.github.io/adk-docs/agents/models/#error-code-429-resource_exhausted
 """
 
 import os
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import contextmanager
 from functools import cached_property
 
-from google.adk.models import Gemini
+from google.adk.models import Gemini, LlmRequest, LlmResponse
 from google.genai import Client, types
 
 from .config import settings
+from .model_governor import ModelGovernor, get_model_governor, is_resource_exhausted
 
 # 429エラー対応: 3回リトライ、指数バックオフ（初期1秒、最大30秒）
 RETRY_OPTIONS = types.HttpRetryOptions(
@@ -54,3 +59,55 @@ class GlobalGemini(Gemini):
                 retry_options=self.retry_options,
             ),
         )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """モデルの予算が空くまで待ってから呼び出す
+
+        ADKはレスポンスの処理中（yield中）にツールを実行し、ツールも同じモデルの
+        予算を使うため、枠を確保したままyieldすると同時セッション数が上限に達した際に
+        互いの枠を待ってデッドロックする。そのため枠はyieldの前に必ず解放する。
+
+        - 非ストリーミング: レスポンスを受け取るまで枠を確保し、解放してから返す
+        - ストリーミング: 最初のチャンクを受け取るまで枠を確保し、解放後は残りのチャンクを
+          届いた順にそのまま返す。2つ目以降のチャンクの受信中は同時実行数に数えない
+
+        Args:
+            llm_request: リクエスト
+            stream: ストリーミング呼び出しかどうか
+
+        Yields:
+            モデルのレスポンス
+        """
+        governor = get_model_governor()
+        generator = super().generate_content_async(llm_request, stream)
+        buffered: list[LlmResponse] = []
+        try:
+            async with governor.acquire_async(self.model):
+                with _report_throttled(governor, self.model):
+                    async for response in generator:
+                        buffered.append(response)
+                        if stream:
+                            break
+
+            for response in buffered:
+                yield response
+
+            if stream:
+                with _report_throttled(governor, self.model):
+                    async for response in generator:
+                        yield response
+        finally:
+            await generator.aclose()
+
+
+@contextmanager
+def _report_throttled(governor: ModelGovernor, model: str) -> Iterator[None]:
+    """429を受けた場合にモデル単位のクールダウンとして通知する"""
+    try:
+        yield
+    except Exception as e:
+        if is_resource_exhausted(e):
+            governor.report_throttled(model)
+        raise
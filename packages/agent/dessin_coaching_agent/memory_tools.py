@@ -4,11 +4,11 @@ ADKエージェントが使用するModチーフフィルタ付きメモリ検
 Vertex AI Client APIを使用してメタデータフィルタリングを実装。
 """
 
+import asyncio
 import datetime
 import logging
 
-from vertexai import Client
-
+from .clients import get_vertex_client
 from .config import settings
 
 logger = logging.getLogger(__name__)
@@ -50,7 +50,7 @@ def search_memory_by_motif(
         return []
 
     try:
-        client = Client()
+        client = get_vertex_client()
 
         engine_name = (
             f"projects/{settings.gcp_project_id}"
@@ -125,7 +125,7 @@ def search_recent_memories(
         return []
 
     try:
-        client = Client()
+        client = get_vertex_client()
 
         engine_name = (
             f"projects/{settings.gcp_project_id}"
@@ -133,10 +133,11 @@ def search_recent_memories(
             f"/reasoningEngines/{settings.agent_engine_id}"
         )
 
-        # スコープベースで全メモリを取得
+        # スコープベースで取得（件数をページサイズとして渡し、必要な分だけ取得する）
         results = client.agent_engines.memories.retrieve(
             name=engine_name,
             scope={"user_id": user_id},
+            simple_retrieval_params={"page_size": limit},
         )
 
         memories: list[MemoryEntry] = []
@@ -168,6 +169,125 @@ def search_recent_memories(
         return []
 
 
+def _engine_name() -> str:
+    """Memory BankのAgent Engineリソース名"""
+    return (
+        f"projects/{settings.gcp_project_id}"
+        f"/locations/{settings.agent_engine_region}"
+        f"/reasoningEngines/{settings.agent_engine_id}"
+    )
+
+
+async def _retrieve_async(
+    user_id: str,
+    limit: int,
+    motif: str | None = None,
+) -> list[MemoryEntry]:
+    """Memory Bankから非同期で最大limit件のメモリを取得
+
+    limitをページサイズとして渡し、limit件に達した時点で以降のページを取得しない。
+    """
+    client = get_vertex_client()
+    config = None
+    if motif:
+        config = {
+            "filter_groups": [{"filters": [{"key": "motif", "value": {"string_value": motif}}]}]
+        }
+    pager = await client.aio.agent_engines.memories.retrieve(
+        name=_engine_name(),
+        scope={"user_id": user_id},
+        simple_retrieval_params={"page_size": limit},
+        config=config,
+    )
+
+    memories: list[MemoryEntry] = []
+    async for retrieved in pager:
+        memory = retrieved.memory
+        memories.append({
+            "fact": memory.fact,
+            "metadata": _extract_metadata(memory.metadata) if memory.metadata else {},
+        })
+        if len(memories) >= limit:
+            break
+    return memories
+
+
+async def search_memory_by_motif_async(
+    motif: str,
+    user_id: str,
+    limit: int = 5,
+) -> list[MemoryEntry]:
+    """モチーフでフィルタしたメモリを非同期で取得（search_memory_by_motifの非同期版）"""
+    if not settings.agent_engine_id or not motif:
+        return []
+    try:
+        memories = await _retrieve_async(user_id, limit, motif=motif)
+    except Exception as e:
+        logger.exception("メモリ検索エラー: %s", e)
+        return []
+    logger.info(
+        "モチーフ別メモリ検索完了: user=%s, motif=%s, count=%d",
+        user_id,
+        motif,
+        len(memories),
+    )
+    return memories
+
+
+async def search_recent_memories_async(
+    user_id: str,
+    limit: int = 5,
+) -> list[MemoryEntry]:
+    """直近のメモリを非同期で取得（search_recent_memoriesの非同期版）"""
+    if not settings.agent_engine_id:
+        return []
+    try:
+        memories = await _retrieve_async(user_id, limit)
+    except Exception as e:
+        logger.exception("直近メモリ取得エラー: %s", e)
+        return []
+    logger.info("全履歴メモリ取得完了: user=%s, count=%d", user_id, len(memories))
+    return memories
+
+
+def merge_memories(*groups: list[MemoryEntry], limit: int = 5) -> list[MemoryEntry]:
+    """複数の検索結果を優先順に結合し、同じ内容（fact）のメモリを除いてlimit件に絞る"""
+    merged: list[MemoryEntry] = []
+    seen: set[str] = set()
+    for group in groups:
+        for entry in group:
+            fact = str(entry.get("fact", ""))
+            if fact in seen:
+                continue
+            seen.add(fact)
+            merged.append(entry)
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+async def search_past_memories(
+    user_id: str,
+    motif: str,
+    limit: int = 5,
+) -> list[MemoryEntry]:
+    """モチーフ別メモリと直近メモリを並行して取得し、モチーフ別を優先して結合
+
+    Args:
+        user_id: ユーザーID
+        motif: モチーフ名（空文字の場合は直近メモリのみ）
+        limit: 取得する最大件数
+
+    Returns:
+        過去のメモリリスト（モチーフ別 → 直近の順、重複なし）
+    """
+    by_motif, recent = await asyncio.gather(
+        search_memory_by_motif_async(motif, user_id, limit),
+        search_recent_memories_async(user_id, limit),
+    )
+    return merge_memories(by_motif, recent, limit=limit)
+
+
 def _extract_metadata(
     metadata: dict[str, object],
 ) -> dict[str, str | float | bool]:
@@ -0,0 +1,195 @@
+"""Memory Bankへの非同期保存
+
+analyze_dessin_image がMemory Bankへの保存（memories.generate の往復）を待たずに
+分析結果を返せるよう、保存をバックグラウンドのワーカースレッドで行う。
+
+- 保存依頼はまずスプールディレクトリにJSONファイルとして書き出してからキューに積む
+- ワーカーは指数バックオフで再試行し、成功したらファイルを削除する
+- 再試行の上限に達した依頼・プロセス終了時に未処理だった依頼はファイルが残り、
+  次回起動時（初回の保存依頼時）に再度キューに積まれる
+
+これにより少なくとも1回の保存（at-least-once）を保証する。再送時は初回の提出日時を
+メタデータに使うため、Memory Bank側ではメタデータが一致するメモリとして統合される。
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+
+from pydantic import BaseModel, ValidationError
+
+from .callbacks import save_analysis_to_memory
+from .config import settings
+from .models import DessinAnalysis
+
+logger = logging.getLogger(__name__)
+
+SaveFunction = Callable[[DessinAnalysis, str, str, datetime.datetime | None], bool]
+
+
+class PendingMemory(BaseModel):
+    """未保存のメモリ（スプールファイルの内容）"""
+
+    id: str
+    analysis: DessinAnalysis
+    user_id: str
+    session_id: str
+    submitted_at: datetime.datetime
+
+
+class MemoryWriter:
+    """Memory Bankへの保存を行うバックグラウンドワーカー"""
+
+    def __init__(
+        self,
+        spool_dir: Path,
+        save: SaveFunction = save_analysis_to_memory,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ) -> None:
+        """ワーカーを初期化（スレッドは初回の保存依頼時に起動）
+
+        Args:
+            spool_dir: 未保存の依頼を書き出すディレクトリ
+            save: 1件を保存する関数（成功時True）
+            max_attempts: 1回の起動中に試行する最大回数
+            base_delay: 再試行の初回待機秒数（以降は2倍ずつ増加）
+            max_delay: 再試行の最大待機秒数
+        """
+        self._spool_dir = spool_dir
+        self._save = save
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._queue: queue.Queue[PendingMemory] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(
+        self,
+        analysis: DessinAnalysis,
+        user_id: str,
+        session_id: str = "",
+    ) -> str:
+        """保存を依頼（スプールへの書き出し後に返る）
+
+        Returns:
+            依頼ID
+        """
+        pending = PendingMemory(
+            id=uuid.uuid4().hex,
+            analysis=analysis,
+            user_id=user_id,
+            session_id=session_id,
+            submitted_at=datetime.datetime.now(datetime.UTC),
+        )
+        # 起動時の復元（スプールの読み込み）と今回の書き出しが重複しないよう先に起動する
+        self._ensure_started()
+        self._write_spool(pending)
+        self._queue.put(pending)
+        return pending.id
+
+    def flush(self, timeout: float) -> bool:
+        """キューが空になるまで待つ
+
+        Returns:
+            タイムアウトまでにすべて処理できた場合True
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_started(self) -> None:
+        """ワーカーを起動し、前回の未処理分をキューに積む"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            recovered = self._recover()
+            self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+            self._thread.start()
+        if recovered:
+            logger.info("memory_writer_recovered: count=%d", recovered)
+
+    def _recover(self) -> int:
+        """スプールに残っている依頼をキューに積む"""
+        count = 0
+        for path in sorted(self._spool_dir.glob("*.json")):
+            try:
+                pending = PendingMemory.model_validate_json(path.read_bytes())
+            except (OSError, ValidationError) as e:
+                logger.warning("memory_spool_unreadable: path=%s, error=%s", path, e)
+                continue
+            self._queue.put(pending)
+            count += 1
+        return count
+
+    def _run(self) -> None:
+        while True:
+            pending = self._queue.get()
+            try:
+                self._process(pending)
+            except Exception as e:
+                logger.exception("memory_writer_error: id=%s, error=%s", pending.id, e)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, pending: PendingMemory) -> None:
+        delay = self._base_delay
+        for attempt in range(1, self._max_attempts + 1):
+            if self._save(
+                pending.analysis, pending.user_id, pending.session_id, pending.submitted_at
+            ):
+                self._spool_path(pending.id).unlink(missing_ok=True)
+                return
+            if attempt < self._max_attempts:
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_delay)
+        # スプールファイルは残し、次回起動時に再送する
+        logger.error(
+            "memory_write_gave_up: id=%s, user=%s, attempts=%d",
+            pending.id,
+            pending.user_id,
+            self._max_attempts,
+        )
+
+    def _spool_path(self, pending_id: str) -> Path:
+        return self._spool_dir / f"{pending_id}.json"
+
+    def _write_spool(self, pending: PendingMemory) -> None:
+        """一時ファイルに書いてからリネームする（書きかけのファイルを残さない）"""
+        self._spool_dir.mkdir(parents=True, exist_ok=True)
+        path = self._spool_path(pending.id)
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(pending.model_dump_json().encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=1)
+def get_memory_writer() -> MemoryWriter:
+    """MemoryWriterのシングルトンインスタンスを取得"""
+    spool_dir = settings.memory_spool_dir or os.path.join(
+        tempfile.gettempdir(), "dessin_memory_spool"
+    )
+    writer = MemoryWriter(
+        Path(spool_dir),
+        max_attempts=settings.memory_write_max_attempts,
+    )
+    # プロセス終了時は未処理分の保存を少しだけ待つ（残りはスプールから次回再送）
+    atexit.register(writer.flush, settings.memory_write_flush_timeout_seconds)
+    return writer
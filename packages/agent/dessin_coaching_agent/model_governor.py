@@ -0,0 +1,169 @@
+"""Geminiモデル呼び出しの同時実行制御（エージェントプロセス内で共有）
+
+エージェントのLLM呼び出し（GlobalGemini）と、ツール内のGemini呼び出し
+（identify_motif / analyze_dessin_image）は同じモデルのクォータを消費する。
+同時に複数のセッションを処理すると、それぞれが個別に呼び出し・リトライするため
+429 RESOURCE_EXHAUSTEDが連鎖しやすい。
+
+ModelGovernor はモデルごとに1つの予算を持ち、呼び出し元は予算が空くまで待つ。
+
+- 同時実行数の上限（max_concurrent）
+- 1分あたりのリクエスト数の上限（requests_per_minute、トークンバケット。0で無制限）
+- 429を受けた場合はモデル単位でクールダウンし、その間は新たに送信しない
+
+ツールはスレッドから同期的に呼び出されるため、スレッドセーフな実装とし、
+非同期の呼び出し元（GlobalGemini）向けにポーリングで待つ acquire_async を用意する。
+同期版の acquire はスレッドをブロックするため、イベントループのスレッドからは呼び出さない
+（ADKに登録するツールは tools.run_in_thread でスレッド実行に変換する）。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+
+from google.genai import errors
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# acquire_async で予算の空きを確認する間隔の上限（秒）
+_ASYNC_POLL_INTERVAL = 0.05
+
+
+class _ModelState:
+    def __init__(self, max_concurrent: int, requests_per_minute: float, now: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+        self.in_flight = 0
+        self.tokens = float(max_concurrent)
+        self.refilled_at = now
+        self.blocked_until = 0.0
+
+    def try_acquire(self, now: float) -> float | None:
+        """予算を確保できれば0を、できなければ次に確認するまでの秒数（不明な場合None）を返す"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= self.max_concurrent:
+            return None
+
+        rate = self.requests_per_minute / 60.0
+        if rate > 0:
+            capacity = max(float(self.max_concurrent), 1.0)
+            self.tokens = min(capacity, self.tokens + (now - self.refilled_at) * rate)
+            self.refilled_at = now
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / rate
+            self.tokens -= 1.0
+
+        self.in_flight += 1
+        return 0.0
+
+
+class ModelGovernor:
+    """モデルごとの予算に従って呼び出しを待たせるスケジューラー（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        requests_per_minute: float = 0.0,
+        throttle_cooldown_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            max_concurrent: モデルごとの同時実行数の上限
+            requests_per_minute: モデルごとの1分あたりのリクエスト数の上限（0で無制限）
+            throttle_cooldown_seconds: 429を受けた際に送信を控える秒数
+            clock: 現在時刻（秒）を返す関数
+        """
+        self._max_concurrent = max_concurrent
+        self._requests_per_minute = requests_per_minute
+        self._throttle_cooldown_seconds = throttle_cooldown_seconds
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._states: dict[str, _ModelState] = {}
+
+    @contextmanager
+    def acquire(self, model: str) -> Iterator[float]:
+        """予算が空くまで待ってから、ブロックの間だけ実行枠を確保する（同期版）
+
+        Yields:
+            待ち時間（秒）
+        """
+        started_at = self._clock()
+        with self._condition:
+            while (wait := self._state(model).try_acquire(self._clock())) != 0.0:
+                self._condition.wait(timeout=wait)
+        waited = self._log_wait(model, started_at)
+        try:
+            yield waited
+        finally:
+            self._release(model)
+
+    @asynccontextmanager
+    async def acquire_async(self, model: str) -> AsyncIterator[float]:
+        """予算が空くまで待ってから、ブロックの間だけ実行枠を確保する（非同期版）
+
+        Yields:
+            待ち時間（秒）
+        """
+        started_at = self._clock()
+        while True:
+            with self._condition:
+                wait = self._state(model).try_acquire(self._clock())
+            if wait == 0.0:
+                break
+            await asyncio.sleep(min(wait or _ASYNC_POLL_INTERVAL, _ASYNC_POLL_INTERVAL))
+        waited = self._log_wait(model, started_at)
+        try:
+            yield waited
+        finally:
+            self._release(model)
+
+    def report_throttled(self, model: str, retry_after: float | None = None) -> None:
+        """429を受けたことを通知し、モデル単位でクールダウンする"""
+        cooldown = retry_after if retry_after is not None else self._throttle_cooldown_seconds
+        with self._condition:
+            state = self._state(model)
+            state.blocked_until = max(state.blocked_until, self._clock() + cooldown)
+        logger.warning("model_governor_throttled: model=%s, cooldown=%.1fs", model, cooldown)
+
+    def _release(self, model: str) -> None:
+        with self._condition:
+            self._states[model].in_flight -= 1
+            # 条件変数は全モデルで共有しているため、別モデルの待機者だけを起こして
+            # 通知が失われないよう全員を起こす
+            self._condition.notify_all()
+
+    def _log_wait(self, model: str, started_at: float) -> float:
+        waited = self._clock() - started_at
+        if waited >= 1.0:
+            logger.info("model_governor_waited: model=%s, wait=%.3fs", model, waited)
+        return waited
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._states.get(model)
+        if state is None:
+            state = _ModelState(self._max_concurrent, self._requests_per_minute, self._clock())
+            self._states[model] = state
+        return state
+
+
+def is_resource_exhausted(error: Exception) -> bool:
+    """Gemini APIの429 RESOURCE_EXHAUSTEDかどうか"""
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+@lru_cache(maxsize=1)
+def get_model_governor() -> ModelGovernor:
+    """ModelGovernorを取得（プロセス内で共有）"""
+    return ModelGovernor(
+        max_concurrent=settings.gemini_max_concurrent,
+        requests_per_minute=settings.gemini_requests_per_minute,
+        throttle_cooldown_seconds=settings.gemini_throttle_cooldown_seconds,
+    )
@@ -15,6 +15,15 @@ class MotifIdentification(BaseModel):
     )
 
 
+class AnalysisRequest(BaseModel):
+    """分析リクエスト（ユーザーメッセージから抽出）"""
+
+    image_url: str = Field(..., description="分析対象の画像URL")
+    rank_label: str = Field(default="10級", description="ユーザーの現在のランク")
+    user_id: str = Field(default="", description="ユーザーID（メモリのスコープキー）")
+    session_id: str = Field(default="", description="セッションID（レビューID）")
+
+
 class Rank(IntEnum):
     """デッサンスキルランク (1-15)"""
     KYU_10 = 1
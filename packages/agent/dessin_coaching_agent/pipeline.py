@@ -0,0 +1,153 @@
+"""直接分析パイプライン
+
+ルートエージェント（LLMエージェント）は、ツールを呼ぶかどうかをLLMのターンで判断するため、
+1件の審査でツール内部のGemini呼び出し（モチーフ識別・分析）に加えて、
+ツール選択と最終応答のLLM呼び出しが順番に発生する。
+
+DirectAnalysisAgent はプロンプトに記載したワークフローと同じ手順を、
+LLMを介さずに固定の順序で実行する:
+
+1. モチーフ識別と直近メモリの取得を並行実行
+2. モチーフ別メモリを検索し、直近メモリと結合（モチーフ別を優先・重複除去）
+3. 過去メモリ付きでデッサン分析（Memory Bankへの保存を含む）
+
+モデル呼び出しはモチーフ識別と分析の2回のみ。分析結果は analyze_dessin_image の
+function_response イベントとして返すため、呼び出し側（バックエンド・Cloud Functions）の
+レスポンス解析は変わらない。
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types
+
+from .memory_tools import (
+    MemoryEntry,
+    merge_memories,
+    search_memory_by_motif_async,
+    search_recent_memories_async,
+)
+from .models import AnalysisRequest
+from .tools import analyze_dessin_image, identify_motif
+
+logger = logging.getLogger(__name__)
+
+# 分析に渡す過去メモリの件数（プロンプトに含めるのは最大5件）
+PAST_MEMORY_LIMIT = 5
+
+# ユーザーメッセージの各行（"画像URL: ..." など）
+_MESSAGE_FIELD = re.compile(
+    r"^\s*(画像URL|ユーザーランク|ユーザーID|セッションID)\s*[:：]\s*(.*?)\s*$", re.M
+)
+_FIELD_NAMES = {
+    "画像URL": "image_url",
+    "ユーザーランク": "rank_label",
+    "ユーザーID": "user_id",
+    "セッションID": "session_id",
+}
+
+
+def parse_analysis_request(text: str) -> AnalysisRequest | None:
+    """ユーザーメッセージから分析リクエストを取り出す
+
+    Args:
+        text: ユーザーメッセージ（"画像URL: ..." などの行を含む）
+
+    Returns:
+        分析リクエスト（画像URLがない場合はNone）
+    """
+    fields = {_FIELD_NAMES[key]: value for key, value in _MESSAGE_FIELD.findall(text) if value}
+    if "image_url" not in fields:
+        return None
+    return AnalysisRequest.model_validate(fields)
+
+
+async def run_direct_analysis(request: AnalysisRequest) -> dict[str, object]:
+    """固定順序でツールを実行し、analyze_dessin_image の結果を返す
+
+    モチーフ識別・分析ツールは同期関数（ブロッキングI/O）のため、スレッドで実行する。
+    """
+    started_at = time.perf_counter()
+    recent_task: asyncio.Task[list[MemoryEntry]] | None = None
+    if request.user_id:
+        recent_task = asyncio.create_task(
+            search_recent_memories_async(request.user_id, PAST_MEMORY_LIMIT)
+        )
+
+    motif = await asyncio.to_thread(identify_motif, request.image_url)
+    primary_motif = (
+        str(motif.get("primary_motif") or "") if motif.get("status") == "success" else ""
+    )
+
+    memories: list[MemoryEntry] = []
+    if recent_task is not None:
+        by_motif = await search_memory_by_motif_async(
+            primary_motif, request.user_id, PAST_MEMORY_LIMIT
+        )
+        memories = merge_memories(by_motif, await recent_task, limit=PAST_MEMORY_LIMIT)
+
+    logger.info(
+        "direct_analysis_context_ready: motif=%s, memories=%d, elapsed=%.2fs",
+        primary_motif,
+        len(memories),
+        time.perf_counter() - started_at,
+    )
+    return await asyncio.to_thread(
+        analyze_dessin_image,
+        image_url=request.image_url,
+        rank_label=request.rank_label,
+        user_id=request.user_id,
+        session_id=request.session_id,
+        past_memories=[dict(memory) for memory in memories],
+    )
+
+
+class DirectAnalysisAgent(BaseAgent):
+    """LLMによるツール選択を行わずに分析ワークフローを実行するエージェント"""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        text = ""
+        if ctx.user_content and ctx.user_content.parts:
+            text = "\n".join(part.text for part in ctx.user_content.parts if part.text)
+
+        request = parse_analysis_request(text)
+        if request is None:
+            result: dict[str, object] = {
+                "status": "error",
+                "error_message": "メッセージに画像URLが含まれていません",
+            }
+        else:
+            if not request.user_id and ctx.session.user_id:
+                request = request.model_copy(update={"user_id": ctx.session.user_id})
+            result = await run_direct_analysis(request)
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            name=analyze_dessin_image.__name__,
+                            response=result,
+                        )
+                    )
+                ],
+            ),
+        )
+
+        summary = result.get("summary") or result.get("error_message") or ""
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=str(summary))]),
+        )
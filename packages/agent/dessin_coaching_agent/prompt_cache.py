@@ -0,0 +1,171 @@
+"""システムプロンプトのコンテキストキャッシュ
+
+分析用システムプロンプトの固定部分（数千トークン）は、ランク区分が同じであれば
+すべての審査で同一になる。Geminiのコンテキストキャッシュ（cached content）として登録し、
+分析リクエストでは提出ごとの部分（現在のランク・過去メモリ）のみを送ることで、
+入力トークンの課金と最初のトークンまでの時間を減らす。
+
+- キャッシュは（ランク区分, プロンプトバージョン）ごとに作成し、TTLが切れる前に延長する
+- 作成・延長に失敗した場合はNoneを返し、呼び出し側は通常のsystem_instructionで分析する
+  （失敗後しばらくは再作成を試みない）
+- 作成・延長のAPI呼び出しはロックの外で行う。同じキーを別のスレッドが作成・延長中の場合は
+  完了を待たず、有効な既存キャッシュ（なければNone）を返す
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Protocol
+
+from google.genai import types
+from pydantic import BaseModel
+
+from .clients import get_genai_client
+from .config import settings
+from .prompts import get_prompt_key, get_static_system_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class CachesAPI(Protocol):
+    """cached content の作成・更新API（genai.Client.caches 互換）"""
+
+    def create(
+        self, *, model: str, config: types.CreateCachedContentConfig
+    ) -> types.CachedContent: ...
+
+    def update(
+        self, *, name: str, config: types.UpdateCachedContentConfig
+    ) -> types.CachedContent: ...
+
+
+class CachedPrompt(BaseModel):
+    """登録済みのキャッシュ"""
+
+    name: str
+    expires_at: float
+
+
+class PromptCacheManager:
+    """システムプロンプトの固定部分をコンテキストキャッシュとして管理"""
+
+    def __init__(
+        self,
+        caches: CachesAPI,
+        model: str,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: float = 300.0,
+        retry_after_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            caches: cached content のAPI（テストではフェイクに差し替える）
+            model: 分析に使うモデル（キャッシュはモデルごとに作成される）
+            ttl_seconds: キャッシュのTTL
+            refresh_margin_seconds: 期限のこの秒数前から延長する
+            retry_after_seconds: 作成に失敗した後、再作成を試みるまでの秒数
+            clock: 現在時刻（秒）を返す関数
+        """
+        self._caches = caches
+        self._model = model
+        self._ttl_seconds = ttl_seconds
+        self._refresh_margin_seconds = refresh_margin_seconds
+        self._retry_after_seconds = retry_after_seconds
+        self._clock = clock
+        self._entries: dict[tuple[str | None, str], CachedPrompt] = {}
+        self._retry_at: dict[tuple[str | None, str], float] = {}
+        self._refreshing: set[tuple[str | None, str]] = set()
+        self._lock = threading.Lock()
+
+    def get_cached_content(self, rank_label: str | None) -> str | None:
+        """ランクに対応するキャッシュ名を取得（未作成・期限間近の場合は作成・延長する）
+
+        Returns:
+            cached content のリソース名（利用できない場合はNone）
+        """
+        key = get_prompt_key(rank_label)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at - self._refresh_margin_seconds:
+                return entry.name
+            valid = entry is not None and now < entry.expires_at
+            if key in self._refreshing:
+                # 他のスレッドが作成・延長中: 期限内の既存キャッシュがあればそれを使う
+                return entry.name if entry is not None and valid else None
+            if now < self._retry_at.get(key, 0.0):
+                return None
+            self._refreshing.add(key)
+
+        # API呼び出しの間はロックを保持しない（他のランク区分・スレッドを待たせない）
+        name = None
+        try:
+            if entry is not None and valid:
+                name = self._extend(entry.name)
+            if name is None:
+                name = self._create(rank_label, key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+                if name is None:
+                    self._entries.pop(key, None)
+                    self._retry_at[key] = now + self._retry_after_seconds
+                else:
+                    self._entries[key] = CachedPrompt(
+                        name=name, expires_at=now + self._ttl_seconds
+                    )
+        return name
+
+    def _ttl(self) -> str:
+        return f"{self._ttl_seconds}s"
+
+    def _extend(self, name: str) -> str | None:
+        try:
+            self._caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=self._ttl()))
+        except Exception as e:
+            logger.warning("prompt_cache_extend_failed: name=%s, error=%s", name, e)
+            return None
+        return name
+
+    def _create(self, rank_label: str | None, key: tuple[str | None, str]) -> str | None:
+        rank_category, prompt_version = key
+        system_prompt = get_static_system_prompt(rank_label)
+        digest = hashlib.sha256(system_prompt.encode()).hexdigest()[:12]
+        try:
+            cached = self._caches.create(
+                model=self._model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"dessin-analysis-v{prompt_version}-{digest}",
+                    system_instruction=system_prompt,
+                    ttl=self._ttl(),
+                ),
+            )
+        except Exception as e:
+            logger.warning(
+                "prompt_cache_create_failed: category=%s, version=%s, error=%s",
+                rank_category,
+                prompt_version,
+                e,
+            )
+            return None
+        logger.info(
+            "prompt_cache_created: category=%s, version=%s, name=%s",
+            rank_category,
+            prompt_version,
+            cached.name,
+        )
+        return cached.name
+
+
+@lru_cache(maxsize=1)
+def get_prompt_cache() -> PromptCacheManager:
+    """PromptCacheManagerのシングルトンインスタンスを取得"""
+    return PromptCacheManager(
+        get_genai_client().caches,
+        settings.gemini_model,
+        ttl_seconds=settings.gemini_context_cache_ttl_seconds,
+    )
@@ -1,5 +1,16 @@
-"""コーチング用プロンプト定義"""
+"""コーチング用プロンプト定義
 
+分析用システムプロンプトは、ランク区分ごとに固定の部分（評価基準・出力形式・ワークフロー）と
+提出ごとに変わる部分（現在のランク・過去メモリ）に分けて組み立てる。
+固定部分はランク区分とプロンプトバージョンの組ごとに1度だけ生成して再利用し、
+Geminiのコンテキストキャッシュ（prompt_cache.py）にもそのまま登録できるよう先頭に置く。
+"""
+
+from functools import lru_cache
+
+# プロンプトのバージョン（プロンプト内容を変更した場合は更新する）
+# コンテキストキャッシュのキーに含め、古いプロンプトのキャッシュを使わないようにする
+PROMPT_VERSION = "2"
 
 
 def get_dessin_analysis_system_prompt(
@@ -15,17 +26,60 @@ def get_dessin_analysis_system_prompt(
     Returns:
         ランク情報と過去メモリを含むシステムプロンプト
     """
-    past_memories_section = _build_past_memories_section(past_memories)
+    return get_static_system_prompt(rank_label) + build_submission_prompt(
+        rank_label, past_memories
+    )
+
+
+def get_prompt_key(rank_label: str | None) -> tuple[str | None, str]:
+    """固定部分のキー（ランク区分, プロンプトバージョン）を取得
+
+    rank_label=Noneの場合はエージェントレベルの汎用プロンプトを表すNoneを区分とする。
+    """
+    rank_category = _get_rank_category(rank_label) if rank_label is not None else None
+    return rank_category, PROMPT_VERSION
+
+
+def get_static_system_prompt(rank_label: str | None) -> str:
+    """システムプロンプトの固定部分を取得（ランク区分ごとに生成済みのものを再利用）"""
+    rank_category, _ = get_prompt_key(rank_label)
+    return _build_static_prompt(rank_category)
+
+
+def build_submission_prompt(
+    rank_label: str | None,
+    past_memories: list[dict[str, object]] | None,
+) -> str:
+    """システムプロンプトの提出ごとの部分（現在のランク・過去メモリ）を生成
 
-    # rank_label=Noneの場合は、エージェントレベルの汎用プロンプト
+    Args:
+        rank_label: ユーザーの現在のランクラベル（Noneの場合はランク行を含めない）
+        past_memories: 過去のデッサン分析結果のリスト
+
+    Returns:
+        固定部分の末尾に追加するセクションの文字列
+    """
+    rank_line = f"\n**現在のランク: {rank_label}**\n" if rank_label is not None else ""
+    return f"""
+## 今回の提出者
+{rank_line}{_build_past_memories_section(past_memories)}"""
+
+
+@lru_cache(maxsize=8)
+def _build_static_prompt(rank_category: str | None) -> str:
+    """システムプロンプトの固定部分を生成
+
+    Args:
+        rank_category: ランク区分（Noneの場合はユーザーメッセージからランクを読み取る汎用版）
+    """
+    # rank_category=Noneの場合は、エージェントレベルの汎用プロンプト
     # ランク情報はユーザーメッセージから取得する
-    if rank_label is not None:
-        rank_category = _get_rank_category(rank_label)
+    if rank_category is not None:
         rank_focus = _get_rank_focus_instruction(rank_category)
-        rank_section = f"""## 重要: ユーザーの現在のランク
-**現在のランク: {rank_label}**
+        rank_section = f"""## 重要: ユーザーのランク
+**ランク区分: {rank_category}**
 
-このユーザーは{rank_category}レベルのスキルを持っています。
+このユーザーは{rank_category}レベルのスキルを持っています（現在のランクは末尾の「今回の提出者」を参照）。
 評価の際は、このランクに適した基準と期待値を考慮してください。
 {rank_focus}"""
     else:
@@ -192,7 +246,9 @@ def get_dessin_analysis_system_prompt(
 - 初心者には基礎的な要素を重視し、上級者には高度な要素も評価する
 
 ## 成長トラッキング（5つ目の採点項目）
-{past_memories_section}
+
+過去データ（過去メモリ）は末尾の「今回の提出者」に記載しています。
+
 ### 成長スコアの評価基準
 
 **過去メモリがある場合（2回目以降）:**
@@ -3,8 +3,11 @@
 ADKエージェントが使用するツール関数を定義。
 """
 
+import asyncio
+import functools
 import logging
 import re
+from collections.abc import Awaitable, Callable
 
 from google import genai
 from google.adk.tools import ToolContext
@@ -12,11 +15,16 @@ from google.genai import types
 from pydantic import ValidationError
 
 from .callbacks import save_analysis_to_memory
+from .clients import get_genai_client
 from .config import settings
 from .memory_tools import MemoryEntry, search_memory_by_motif, search_recent_memories
+from .memory_writer import get_memory_writer
+from .model_governor import get_model_governor, is_resource_exhausted
 from .models import DessinAnalysis, MotifIdentification, Rank
+from .prompt_cache import get_prompt_cache
 from .prompts import (
     DESSIN_ANALYSIS_USER_PROMPT,
+    build_submission_prompt,
     get_dessin_analysis_system_prompt,
 )
 
@@ -28,6 +36,21 @@ class ImageProcessingError(Exception):
     pass
 
 
+def run_in_thread[**P, R](func: Callable[P, R]) -> Callable[P, Awaitable[R]]:
+    """同期ツールをスレッドで実行する非同期ツールに変換する
+
+    ADKは同期関数のツールをイベントループのスレッドで直接呼び出すため、
+    ツール内のブロッキングI/O（Gemini・Memory Bank呼び出し、ModelGovernorの待機）が
+    他のセッションの処理を止める。名前・引数・docstringは元の関数を引き継ぐ。
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return wrapper
+
+
 def _convert_to_gcs_uri(url: str) -> str:
     """HTTPS URLをGCS URI形式に変換
 
@@ -48,6 +71,29 @@ def _convert_to_gcs_uri(url: str) -> str:
     return url
 
 
+def _generate_content(
+    client: genai.Client,
+    contents: list[types.Content],
+    config: types.GenerateContentConfig,
+) -> types.GenerateContentResponse:
+    """モデルの予算が空くまで待ってからGeminiを呼び出す（429はクールダウンとして共有）
+
+    予算の待機はスレッドをブロックするため、イベントループのスレッドからは呼び出さない。
+    """
+    governor = get_model_governor()
+    with governor.acquire(settings.gemini_model):
+        try:
+            return client.models.generate_content(
+                model=settings.gemini_model,
+                contents=contents,
+                config=config,
+            )
+        except Exception as e:
+            if is_resource_exhausted(e):
+                governor.report_throttled(settings.gemini_model)
+            raise
+
+
 def _validate_image_url(url: str) -> str:
     """画像URLを検証"""
     if not url:
@@ -135,12 +181,8 @@ def identify_motif(
         gcs_uri = _convert_to_gcs_uri(validated_url)
         logger.info("identify_motif: gcs_uri=%s", gcs_uri[:100])
 
-        # Gemini クライアント初期化
-        client = genai.Client(
-            vertexai=True,
-            project=settings.gcp_project_id,
-            location=settings.gemini_location,
-        )
+        # Gemini クライアント取得（プロセス内で共有）
+        client = get_genai_client()
 
         # MIMEタイプを判定
         mime_type = "image/jpeg"
@@ -156,8 +198,8 @@ def identify_motif(
 
         # 軽量な分析リクエスト
         logger.info("identify_motif: sending request to model=%s", settings.gemini_model)
-        response = client.models.generate_content(
-            model=settings.gemini_model,
+        response = _generate_content(
+            client,
             contents=[
                 types.Content(
                     role="user",
@@ -170,6 +212,7 @@ def identify_motif(
             config=types.GenerateContentConfig(
                 response_mime_type="application/json",
                 response_schema=MotifIdentification,
+                media_resolution=settings.motif_media_resolution or None,
             ),
         )
 
@@ -297,12 +340,8 @@ def analyze_dessin_image(
         # GCS URIに変換
         gcs_uri = _convert_to_gcs_uri(validated_url)
 
-        # Gemini クライアント初期化
-        client = genai.Client(
-            vertexai=True,
-            project=settings.gcp_project_id,
-            location=settings.gemini_location,
-        )
+        # Gemini クライアント取得（プロセス内で共有）
+        client = get_genai_client()
 
         # MIMEタイプを判定
         mime_type = "image/jpeg"
@@ -326,24 +365,33 @@ def analyze_dessin_image(
         )
 
         # プロンプト生成（過去メモリを含める）
-        system_prompt = get_dessin_analysis_system_prompt(rank_label, past_memories)
-        user_prompt = DESSIN_ANALYSIS_USER_PROMPT
+        user_parts = [types.Part.from_text(text=DESSIN_ANALYSIS_USER_PROMPT), image_part]
+        system_prompt: str | None = None
+        cached_content = (
+            get_prompt_cache().get_cached_content(rank_label)
+            if settings.gemini_context_cache
+            else None
+        )
+        if cached_content:
+            # 固定部分はキャッシュ済みのため、提出ごとの部分（ランク・過去メモリ）のみを送る
+            # （cached content 使用時は system_instruction を指定できない）
+            submission_prompt = build_submission_prompt(rank_label, past_memories)
+            user_parts.insert(0, types.Part.from_text(text=submission_prompt))
+        else:
+            system_prompt = get_dessin_analysis_system_prompt(rank_label, past_memories)
 
         # 分析リクエスト
-        logger.info("gemini_request_start: model=%s", settings.gemini_model)
-        response = client.models.generate_content(
-            model=settings.gemini_model,
-            contents=[
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=user_prompt),
-                        image_part,
-                    ],
-                ),
-            ],
+        logger.info(
+            "gemini_request_start: model=%s, cached_content=%s",
+            settings.gemini_model,
+            cached_content,
+        )
+        response = _generate_content(
+            client,
+            contents=[types.Content(role="user", parts=user_parts)],
             config=types.GenerateContentConfig(
                 system_instruction=system_prompt,
+                cached_content=cached_content,
                 max_output_tokens=settings.gemini_max_output_tokens,
                 temperature=settings.gemini_temperature,
                 response_mime_type="application/json",
@@ -395,7 +443,15 @@ def analyze_dessin_image(
         summary = _create_summary(analysis)
 
         # Memory Bankに保存
-        if effective_user_id:
+        if effective_user_id and settings.memory_write_async:
+            # 保存の完了を待たずに分析結果を返す（バックグラウンドで再試行付きで保存）
+            get_memory_writer().submit(analysis, effective_user_id, session_id)
+            logger.info(
+                "分析結果のMemory Bank保存を依頼: user=%s, session=%s",
+                effective_user_id,
+                session_id,
+            )
+        elif effective_user_id:
             saved = save_analysis_to_memory(analysis, effective_user_id, session_id)
             if saved:
                 logger.info(
@@ -4,15 +4,24 @@
 認証済みユーザーのみアクセス可能。
 """
 
+import asyncio
 import contextlib
+import time
+from datetime import datetime, timedelta
+from typing import Literal
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import status as status_module
+from google.api_core.exceptions import AlreadyExists
 
 from src.auth import AuthenticatedUser, get_current_user
+from src.config import settings
+from src.exceptions import InvalidCursorError
 from src.models.task import (
     CreateReviewRequest,
     ReviewListResponse,
+    ReviewTask,
     ReviewTaskResponse,
     TaskStatus,
 )
@@ -21,73 +30,111 @@ from src.services.annotation_service import get_annotation_service
 from src.services.feedback_service import get_feedback_service
 from src.services.image_generation_service import get_image_generation_service
 from src.services.rank_service import get_rank_service
-from src.services.task_service import get_task_service
+from src.services.review_cache import get_review_cache, hash_image, make_cache_key
+from src.services.review_image import ReviewImage, load_review_image
+from src.services.review_pipeline import run_image_stages
+from src.services.review_worker_pool import get_review_worker_pool
+from src.services.stage_metrics import get_stage_metrics
+from src.services.task_service import TaskStateUpdater, get_task_service
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
 
-async def process_review_task(task_id: str, user_id: str, image_url: str) -> None:
+async def _load_review_image(task_id: str, image_url: str) -> ReviewImage | None:
+    """元画像を取得・正規化（失敗時はNoneを返し、各ステージがURLから取得する）"""
+    try:
+        with get_stage_metrics().stage("image_load", task_id):
+            return await load_review_image(image_url)
+    except Exception as e:
+        logger.warning("review_image_load_failed", task_id=task_id, error=str(e))
+        return None
+
+
+async def process_review_task(
+    task_id: str,
+    user_id: str,
+    image_url: str,
+    rank_at_review: str | None = None,
+) -> None:
     """バックグラウンドでレビュータスクを処理
 
     Args:
         task_id: タスクID
         user_id: ユーザーID（ランク更新用）
         image_url: 分析対象の画像URL
+        rank_at_review: 審査作成時のランクラベル（指定時はランクを再読み込みしない）
     """
     logger.info("process_review_task_started", task_id=task_id)
     service = get_task_service()
+    metrics = get_stage_metrics()
+    started = time.perf_counter()
+    outcome = "error"
+    # 中間更新はアップデーターでマージし、ステージ境界でのみ書き込む
+    updater: TaskStateUpdater | None = None
+    # 元画像は分析と並行して1度だけ取得し、画像生成ステージで共有する
+    image_task: asyncio.Task[ReviewImage | None] | None = None
+    if settings.review_image_inline_enabled:
+        image_task = asyncio.create_task(_load_review_image(task_id, image_url))
 
     try:
         # ステータスをprocessingに更新
-        service.update_task_status(task_id, TaskStatus.PROCESSING)
+        with metrics.stage("task_start", task_id):
+            updater = await service.begin_update(task_id)
+            await updater.update_status(TaskStatus.PROCESSING, flush=True)
 
         # ランク取得（分析前に現在のランクを取得してプロンプトに反映）
+        # 審査作成時のスナップショットがあればそれを使用する
         from src.models.rank import Rank
-        current_rank_label = Rank.KYU_10.label
-        try:
-            rank_service = get_rank_service()
-            user_rank_info = rank_service.get_user_rank(user_id)
-            if user_rank_info:
-                current_rank_label = user_rank_info.current_rank.label
-        except Exception as e:
-            logger.warn("rank_fetch_failed", user_id=user_id, error=str(e))
+        current_rank_label = rank_at_review or Rank.KYU_10.label
+        if rank_at_review is None:
+            with metrics.stage("rank_fetch", task_id):
+                try:
+                    rank_service = get_rank_service()
+                    user_rank_info = await rank_service.get_user_rank(user_id)
+                    if user_rank_info:
+                        current_rank_label = user_rank_info.current_rank.label
+                except Exception as e:
+                    logger.warn("rank_fetch_failed", user_id=user_id, error=str(e))
 
         # Agent Engine経由でデッサン分析を実行
         agent_engine_service = get_agent_engine_service()
-        result = await agent_engine_service.run_coaching_agent(
-            image_url=image_url,
-            rank_label=current_rank_label,
-            user_id=user_id,
-            session_id=task_id,  # レビューIDをセッションIDとして渡す
-        )
+        with metrics.stage("agent_engine", task_id):
+            result = await agent_engine_service.run_coaching_agent(
+                image_url=image_url,
+                rank_label=current_rank_label,
+                user_id=user_id,
+                session_id=task_id,  # レビューIDをセッションIDとして渡す
+            )
 
         if result.get("status") == "success":
-            analysis = result.get("analysis", {})
-            # 成功時：結果をFirestoreに保存
-            service.update_task_status(
-                task_id,
+            # 分析結果を先に検証し、以降は型付きの値だけを書き込む
+            from src.models.feedback import DessinAnalysis
+            dessin_analysis = DessinAnalysis.model_validate(result.get("analysis", {}))
+            # 成功時：結果をマージ（フィードバック生成後にまとめて書き込む）
+            await updater.update_status(
                 TaskStatus.PROCESSING,
-                feedback=analysis,
-                score=analysis.get("overall_score"),
-                tags=analysis.get("tags"),
+                feedback=dessin_analysis.model_dump(),
+                score=dessin_analysis.overall_score,
+                tags=dessin_analysis.tags,
             )
             logger.info(
                 "process_review_task_completed",
                 task_id=task_id,
-                score=analysis.get("overall_score"),
+                score=dessin_analysis.overall_score,
             )
 
             # ランク更新
             user_rank = None
             try:
                 rank_service = get_rank_service()
-                user_rank = rank_service.update_user_rank(
-                    user_id=user_id,
-                    score=analysis.get("overall_score"),
-                    task_id=task_id
-                )
+                with metrics.stage("rank_update", task_id):
+                    user_rank = await rank_service.update_user_rank(
+                        user_id=user_id,
+                        score=dessin_analysis.overall_score,
+                        task_id=task_id
+                    )
             except Exception as e:
                 # ランク更新失敗してもタスク自体は成功とする
                 logger.error("rank_update_failed", task_id=task_id, error=str(e))
@@ -98,100 +145,57 @@ async def process_review_task(task_id: str, user_id: str, image_url: str) -> Non
                 user_rank = UserRank(
                     user_id=user_id,
                     current_rank=Rank.KYU_10,
-                    current_score=analysis.get("overall_score"),
+                    current_score=dessin_analysis.overall_score,
+                    total_submissions=0,
                     rank_changed=False,
                 )
 
             # フィードバック生成 (Markdown含む)
             feedback_service = get_feedback_service()
-            # DessinAnalysisオブジェクトに変換（辞書から）
-            from src.models.feedback import DessinAnalysis
-            dessin_analysis = DessinAnalysis(**analysis)
-
-            feedback_response = feedback_service.generate_feedback(
-                analysis=dessin_analysis,
-                rank=user_rank.current_rank
-            )
-
-            feedback_data = dessin_analysis.model_dump()
-            feedback_data["summary"] = feedback_response.summary
-            feedback_data["detailed_feedback"] = feedback_response.detailed_feedback
-
-            # 中間結果を保存（フィードバックまで完了）
-            service.update_task_status(
-                task_id,
-                TaskStatus.PROCESSING,
-                feedback=feedback_data,
-                score=dessin_analysis.overall_score,
-                tags=dessin_analysis.tags,
-                rank_changed=user_rank.rank_changed,
-            )
-
-            # アノテーション画像生成（Cloud Function呼び出し）
-            annotated_image_url: str | None = None
-            try:
-                logger.info("annotation_generation_request_started", task_id=task_id)
-                annotation_service = get_annotation_service()
-                annotated_image_url = await annotation_service.generate_annotated_image(
-                    task_id=task_id,
-                    original_image_url=image_url,
+            with metrics.stage("feedback", task_id):
+                feedback_response = feedback_service.generate_feedback(
                     analysis=dessin_analysis,
-                    user_rank=user_rank,
-                    motif_tags=dessin_analysis.tags,
-                )
-                if annotated_image_url:
-                    logger.info("annotation_generation_completed", task_id=task_id, annotated_image_url=annotated_image_url)
-                else:
-                    logger.warning("annotation_generation_returned_none", task_id=task_id)
-            except Exception as e:
-                logger.error(
-                    "annotation_generation_request_failed",
-                    task_id=task_id,
-                    error=str(e),
+                    rank=user_rank.current_rank
                 )
-                # アノテーション生成が失敗しても、お手本画像生成は続行（オリジナル画像のみで）
 
-            # お手本画像生成（Cloud Function呼び出し）
-            try:
-                logger.info(
-                    "example_image_generation_request_started",
-                    task_id=task_id,
-                    has_annotated_image=bool(annotated_image_url),
-                )
-                image_generation_service = get_image_generation_service()
-
-                await image_generation_service.generate_example_image(
-                    task_id=task_id,
-                    user_id=user_id,
-                    original_image_url=image_url,
-                    analysis=dessin_analysis,
-                    motif_tags=dessin_analysis.tags,
-                    annotated_image_url=annotated_image_url,
-                )
+                feedback_data = dessin_analysis.model_dump()
+                feedback_data["summary"] = feedback_response.summary
+                feedback_data["detailed_feedback"] = feedback_response.detailed_feedback
 
-                logger.info("example_image_generation_request_completed", task_id=task_id)
-                # Cloud Functionからの完了通知待ちのため、ここではステータスを更新しない
-
-            except Exception as e:
-                logger.error("example_image_generation_request_failed",
-                           task_id=task_id,
-                           error=str(e))
-                # 画像生成リクエスト失敗時は、画像なしでタスク完了とする
-                service.update_task_status(
-                    task_id,
-                    TaskStatus.COMPLETED,
+            # 中間結果を保存（フィードバックまで完了）
+            with metrics.stage("feedback_save", task_id):
+                await updater.update_status(
+                    TaskStatus.PROCESSING,
                     feedback=feedback_data,
                     score=dessin_analysis.overall_score,
                     tags=dessin_analysis.tags,
                     rank_changed=user_rank.rank_changed,
+                    flush=True,
                 )
+
+            # アノテーション画像・お手本画像生成（Cloud Function呼び出し）
+            # お手本画像はCloud Functionからの完了通知待ちのため、成功時はステータスを更新しない
+            review_image = await image_task if image_task is not None else None
+            image_stages = await run_image_stages(
+                task_id=task_id,
+                user_id=user_id,
+                image_url=image_url,
+                analysis=dessin_analysis,
+                user_rank=user_rank,
+                image=review_image,
+            )
+
+            if image_stages.example_image_error is not None:
+                # 画像生成リクエスト失敗時は、画像なしでタスク完了とする
+                await updater.update_status(TaskStatus.COMPLETED, flush=True)
+            outcome = "ok"
         else:
             # 失敗時：エラーステータスに更新
-            error_message = result.get("error_message", "分析に失敗しました")
-            service.update_task_status(
-                task_id,
+            error_message = str(result.get("error_message") or "分析に失敗しました")
+            await updater.update_status(
                 TaskStatus.FAILED,
                 error_message=error_message,
+                flush=True,
             )
             logger.error(
                 "process_review_task_failed",
@@ -201,11 +205,196 @@ async def process_review_task(task_id: str, user_id: str, image_url: str) -> Non
     except Exception as e:
         logger.error("process_review_task_error", task_id=task_id, error=str(e))
         with contextlib.suppress(Exception):
-            service.update_task_status(
-                task_id,
-                TaskStatus.FAILED,
-                error_message=str(e),
+            if updater is not None:
+                await updater.update_status(TaskStatus.FAILED, error_message=str(e), flush=True)
+            else:
+                await service.update_task_status(
+                    task_id,
+                    TaskStatus.FAILED,
+                    error_message=str(e),
+                )
+    finally:
+        if image_task is not None and not image_task.done():
+            image_task.cancel()
+        metrics.record("process_review_task", task_id, time.perf_counter() - started, outcome=outcome)
+
+
+async def dispatch_review(task: ReviewTask, claim: bool = False) -> bool:
+    """審査の処理を開始（処理の完了は待たない）
+
+    Cloud Tasksに投入し、投入に失敗した場合はプロセス内のワーカープールで処理する。
+
+    Args:
+        task: pendingのタスク
+        claim: Trueの場合、ワーカーでの処理前にタスクをトランザクションで確保する
+            （起動時の再投入で、複数インスタンスが同じタスクを処理しないようにする）
+
+    Returns:
+        処理を開始できた場合True。ワーカープールの処理待ちが上限に達している場合False
+    """
+    try:
+        from src.services.cloud_tasks_service import get_cloud_tasks_service
+        cloud_tasks_service = get_cloud_tasks_service()
+        with get_stage_metrics().stage("enqueue", task.task_id):
+            await cloud_tasks_service.create_review_task_async(
+                task_id=task.task_id,
+                user_id=task.user_id,
+                image_url=task.image_url,
+                rank_at_review=task.rank_at_review,
+            )
+        logger.info(
+            "review_task_enqueued",
+            task_id=task.task_id,
+            user_id=task.user_id,
+        )
+        return True
+    except AlreadyExists:
+        # 同じ名前のCloud Taskが投入済み: 処理済みの名前は再利用できず、再投入しても
+        # 処理されないため、ワーカープールで確保してから処理する
+        logger.info("review_task_already_enqueued", task_id=task.task_id)
+        claim = True
+    except Exception as e:
+        # Cloud Tasksへの投入が失敗した場合はフォールバック
+        logger.error(
+            "cloud_tasks_enqueue_failed",
+            task_id=task.task_id,
+            error=str(e),
+        )
+
+    # フォールバック: プロセス内のワーカーでバックグラウンド処理
+    return submit_review_to_worker(task, claim=claim)
+
+
+def submit_review_to_worker(
+    task: ReviewTask,
+    claim: bool = False,
+    stale_before: datetime | None = None,
+) -> bool:
+    """プロセス内のワーカープールに審査の処理を投入（処理の完了は待たない）
+
+    シャットダウン等で処理が中断された場合は、次回の起動時に再投入されるよう
+    タスクをpendingに戻す。
+
+    Args:
+        task: 処理するタスク
+        claim: Trueの場合、処理前にタスクをトランザクションで確保する
+        stale_before: 確保時、この日時以前から更新のないprocessingのタスクも対象とする
+
+    Returns:
+        受け付けた場合True。ワーカープールの処理待ちが上限に達している場合False
+    """
+
+    async def run() -> None:
+        service = get_task_service()
+        if claim and not await service.claim_pending_task(task.task_id, stale_before):
+            logger.info("review_task_already_claimed", task_id=task.task_id)
+            return
+        try:
+            await process_review_task(
+                task_id=task.task_id,
+                user_id=task.user_id,
+                image_url=task.image_url,
+                rank_at_review=task.rank_at_review,
             )
+        except asyncio.CancelledError:
+            logger.warning("review_task_interrupted", task_id=task.task_id)
+            with contextlib.suppress(Exception):
+                await service.update_task_status(task.task_id, TaskStatus.PENDING)
+            raise
+
+    return get_review_worker_pool().submit(task.task_id, run)
+
+
+async def recover_pending_reviews() -> int:
+    """処理が始まらない・完了しないまま残っている審査を再投入（起動時に実行）
+
+    - pendingのまま作成から review_recovery_stale_seconds 以上経過した審査
+      （Cloud Tasksへの投入失敗後、ワーカープールで処理待ちのままプロセスが終了したものなど）
+    - processingのまま review_recovery_processing_stale_seconds 以上更新のない審査
+      （処理中にプロセスがクラッシュしたものなど）。Cloud Tasksを経由せず、
+      更新日時をトランザクション内で再確認して確保してからワーカープールで処理する
+
+    Returns:
+        再投入した件数
+    """
+    now = datetime.now()
+    created_before = now - timedelta(seconds=settings.review_recovery_stale_seconds)
+    updated_before = now - timedelta(seconds=settings.review_recovery_processing_stale_seconds)
+    service = get_task_service()
+    try:
+        pending = await service.list_stale_pending_tasks(
+            created_before, limit=settings.review_recovery_max_tasks
+        )
+        processing = await service.list_stale_processing_tasks(
+            updated_before, limit=settings.review_recovery_max_tasks
+        )
+    except Exception as e:
+        logger.error("review_recovery_failed", error=str(e))
+        return 0
+
+    recovered = 0
+    for task in pending:
+        if not await dispatch_review(task, claim=True):
+            # ワーカープールが満杯: 残りは次回の起動時に再投入する
+            break
+        recovered += 1
+    for task in processing:
+        if not submit_review_to_worker(task, claim=True, stale_before=updated_before):
+            break
+        recovered += 1
+
+    logger.info(
+        "review_recovery_completed",
+        found=len(pending) + len(processing),
+        processing=len(processing),
+        recovered=recovered,
+    )
+    return recovered
+
+
+async def reuse_cached_review(task: ReviewTask, cache_key: str) -> ReviewTask | None:
+    """同一画像の完了済みレビューがあれば結果を再利用してタスクを完了させる
+
+    Args:
+        task: 作成直後のタスク
+        cache_key: レビュー結果キャッシュのキー
+
+    Returns:
+        再利用して完了したReviewTask。再利用できない場合はNone
+    """
+    cache = get_review_cache()
+    entry = cache.get(cache_key)
+    if entry is None:
+        return None
+
+    service = get_task_service()
+    source = await service.get_task(entry.source_task_id)
+    if source is None or source.status == TaskStatus.FAILED:
+        # 元タスクが削除・失敗している場合はエントリを破棄
+        cache.invalidate(cache_key)
+        return None
+    if source.status != TaskStatus.COMPLETED or not source.feedback or source.score is None:
+        # 元タスクが処理中（二重送信など）の場合は通常処理を行う
+        return None
+
+    # 同じ画像の再提出でスコアを重複して加算しないよう、ランクは更新しない
+    reused = await service.update_task_status(
+        task.task_id,
+        TaskStatus.COMPLETED,
+        feedback=source.feedback,
+        score=source.score,
+        tags=source.tags,
+        annotated_image_url=source.annotated_image_url,
+        example_image_url=source.example_image_url,
+        rank_changed=False,
+    )
+
+    logger.info(
+        "review_cache_hit",
+        task_id=task.task_id,
+        source_task_id=source.task_id,
+    )
+    return reused
 
 
 @router.get("/upload-url")
@@ -237,7 +426,11 @@ async def create_review(
 
     画像URLを受け取り、新規タスクを作成してpending状態で返す。
     Cloud Tasksを使用してバックグラウンドでエージェントによる分析を開始する。
+    Cloud Tasksへの投入に失敗した場合はプロセス内のワーカーで処理し、分析の完了は待たない。
     user_idは認証済みユーザーから取得する。
+
+    Raises:
+        HTTPException 503: 投入に失敗し、ワーカーの処理待ちも上限に達している場合
     """
     service = get_task_service()
 
@@ -246,45 +439,58 @@ async def create_review(
     rank_at_review: str | None = None
     try:
         rank_service = get_rank_service()
-        user_rank_info = rank_service.get_user_rank(current_user.user_id)
+        user_rank_info = await rank_service.get_user_rank(current_user.user_id)
         rank_at_review = user_rank_info.current_rank.label if user_rank_info else Rank.KYU_10.label
     except Exception as e:
         logger.warn("rank_fetch_failed_at_create", user_id=current_user.user_id, error=str(e))
         rank_at_review = Rank.KYU_10.label  # フォールバック: 10級
 
-    task = service.create_task(
+    # 同一画像の再提出を検出するため画像のハッシュを計算（失敗しても審査は続行）
+    cache_key: str | None = None
+    hash_seconds: float | None = None
+    if settings.review_cache_enabled:
+        hash_started = time.perf_counter()
+        try:
+            image_hash = await hash_image(request.image_url)
+            cache_key = make_cache_key(current_user.user_id, image_hash, rank_at_review)
+        except Exception as e:
+            logger.warning("review_cache_hash_failed", error=str(e))
+        hash_seconds = time.perf_counter() - hash_started
+
+    task = await service.create_task(
         user_id=current_user.user_id,  # 認証済みユーザーから取得
         image_url=request.image_url,
         example_image_url=request.example_image_url,
         rank_at_review=rank_at_review,
     )
+    metrics = get_stage_metrics()
+    if hash_seconds is not None:
+        # タスクIDの採番前に計測したため、作成後にまとめて記録する
+        metrics.record(
+            "image_hash",
+            task.task_id,
+            hash_seconds,
+            outcome="ok" if cache_key is not None else "error",
+        )
+
+    # ハッシュ計算に失敗した場合はキャッシュを参照・登録しない
+    if cache_key is not None:
+        reused = await reuse_cached_review(task, cache_key)
+        if reused is not None:
+            # キャッシュヒット: 分析・画像生成を行わずに完了
+            return ReviewTaskResponse.from_task(reused)
+        get_review_cache().put(cache_key, task.task_id)
 
     # Cloud Tasksにタスクを投入（非同期処理）
-    try:
-        from src.services.cloud_tasks_service import get_cloud_tasks_service
-        cloud_tasks_service = get_cloud_tasks_service()
-        cloud_tasks_service.create_review_task(
-            task_id=task.task_id,
-            user_id=task.user_id,
-            image_url=task.image_url,
-        )
-        logger.info(
-            "review_task_enqueued",
-            task_id=task.task_id,
-            user_id=task.user_id,
-        )
-    except Exception as e:
-        # Cloud Tasksへの投入が失敗した場合はフォールバック
-        logger.error(
-            "cloud_tasks_enqueue_failed",
-            task_id=task.task_id,
-            error=str(e),
-        )
-        # フォールバック: 同期処理を実行
-        await process_review_task(
-            task_id=task.task_id,
-            user_id=task.user_id,
-            image_url=task.image_url,
+    if not await dispatch_review(task):
+        # 処理を受け付けられない場合はタスクを破棄し、時間をおいた再送を促す
+        await service.delete_task(task.task_id)
+        if cache_key is not None:
+            get_review_cache().invalidate(cache_key)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="混雑しているため審査を受け付けられませんでした。しばらくしてから再度お試しください",
+            headers={"Retry-After": "30"},
         )
 
     logger.info(
@@ -318,7 +524,7 @@ async def get_review(
     """
     service = get_task_service()
 
-    task = service.get_task(task_id)
+    task = await service.get_task(task_id)
 
     if task is None:
         # 情報漏洩を防ぐため汎用的なメッセージを返す
@@ -338,6 +544,10 @@ async def get_review(
 async def list_reviews(
     current_user: AuthenticatedUser = Depends(get_current_user),
     limit: int = Query(default=20, ge=1, le=100, description="取得件数の上限"),
+    cursor: str | None = Query(default=None, description="前ページのnext_cursor"),
+    view: Literal["summary", "full"] = Query(
+        default="summary", description="summary: feedbackを含まない一覧表示用 / full: 全項目"
+    ),
     start_date: str | None = Query(default=None, description="開始日 (YYYY-MM-DD)", regex=r"^\d{4}-\d{2}-\d{2}$"),
     end_date: str | None = Query(default=None, description="終了日 (YYYY-MM-DD)", regex=r"^\d{4}-\d{2}-\d{2}$"),
     status: str | None = Query(default=None, description="ステータス"),
@@ -347,9 +557,12 @@ async def list_reviews(
 
     認証済みユーザーのタスクのみ取得する。
     検索条件が指定された場合はフィルタリングを行う。
+    作成日時の降順で返し、次ページはnext_cursorをcursorに指定して取得する。
 
     Args:
         limit: 取得件数の上限（1-100）
+        cursor: 前ページのnext_cursor
+        view: summaryの場合はfeedbackを省略する
         start_date: 開始日
         end_date: 終了日
         status: ステータス
@@ -357,6 +570,9 @@ async def list_reviews(
 
     Returns:
         審査タスクの一覧
+
+    Raises:
+        HTTPException 400: カーソルが不正な場合
     """
     service = get_task_service()
 
@@ -372,18 +588,27 @@ async def list_reviews(
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59, microsecond=999999)
 
     # 認証済みユーザーのタスクのみ取得
-    tasks = service.list_tasks(
-        user_id=current_user.user_id,
-        limit=limit,
-        start_date=start_dt,
-        end_date=end_dt,
-        status=status,
-        tag=tag
-    )
+    try:
+        page = await service.list_tasks_page(
+            user_id=current_user.user_id,
+            limit=limit,
+            cursor=cursor,
+            start_date=start_dt,
+            end_date=end_dt,
+            status=status,
+            tag=tag,
+            include_feedback=view == "full",
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status_module.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        ) from None
 
     return ReviewListResponse(
-        tasks=[ReviewTaskResponse.from_task(task) for task in tasks],
-        total_count=len(tasks),
+        tasks=[ReviewTaskResponse.from_task(task) for task in page.tasks],
+        total_count=page.total_count if page.total_count is not None else len(page.tasks),
+        next_cursor=page.next_cursor,
     )
 
 
@@ -404,7 +629,7 @@ async def delete_review(
     service = get_task_service()
 
     # まずタスクを取得して所有権チェック
-    task = service.get_task(task_id)
+    task = await service.get_task(task_id)
 
     if task is None:
         raise HTTPException(status_code=404, detail="Not found")
@@ -416,7 +641,7 @@ async def delete_review(
             detail="Access denied",
         )
 
-    deleted = service.delete_task(task_id)
+    deleted = await service.delete_task(task_id)
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Not found")
@@ -450,7 +675,7 @@ async def retry_images(
         HTTPException 400: リトライ不可な状態の場合
     """
     service = get_task_service()
-    task = service.get_task(task_id)
+    task = await service.get_task(task_id)
 
     if task is None:
         raise HTTPException(status_code=404, detail="Not found")
@@ -500,7 +725,7 @@ async def retry_images(
         # UserRankの復元
         from src.models.rank import Rank, UserRank
         rank_service = get_rank_service()
-        user_rank = rank_service.get_user_rank(current_user.user_id)
+        user_rank = await rank_service.get_user_rank(current_user.user_id)
         if user_rank is None:
             user_rank = UserRank(
                 user_id=current_user.user_id,
@@ -522,7 +747,7 @@ async def retry_images(
                     motif_tags=dessin_analysis.tags,
                 )
                 if annotated_image_url:
-                    service.update_task_status(
+                    await service.update_task_status(
                         task_id,
                         TaskStatus.COMPLETED,
                         annotated_image_url=annotated_image_url,
@@ -567,7 +792,7 @@ async def retry_images(
         )
 
     # 最新のタスク状態を返す
-    updated_task = service.get_task(task_id)
+    updated_task = await service.get_task(task_id)
     if updated_task is None:
         raise HTTPException(status_code=404, detail="Not found")
 
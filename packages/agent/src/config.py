@@ -1,7 +1,7 @@
 """アプリケーション設定"""
 
 from functools import lru_cache
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import BeforeValidator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -45,20 +45,93 @@ class Settings(BaseSettings):
     annotation_function_url: str = ""  # Cloud Run Function URL
     process_review_function_url: str = ""  # Cloud Run Function URL (Cloud Tasks経由で呼び出し)
 
+    # レビュー画像生成パイプライン設定
+    # True: アノテーション完了と期限の早い方でお手本画像生成を開始（期限内のアノテーションのみ利用）
+    # False: アノテーション完了後にその画像も使ってお手本画像を生成
+    review_pipeline_enabled: bool = False
+    annotation_deadline_seconds: float = 60.0  # アノテーション結果を待つ最大秒数
+
+    # 共有HTTPクライアント設定（Cloud Function呼び出し用）
+    http_pool_limit: int = 100  # 全体の最大同時接続数
+    http_pool_limit_per_host: int = 20  # ホストごとの最大同時接続数
+    http_keepalive_timeout_seconds: float = 60.0  # アイドル接続を保持する秒数
+    http_connect_timeout_seconds: float = 10.0
+    http_total_timeout_seconds: float = 300.0  # Cloud Functionの処理に時間がかかる場合がある（5分）
+
+    # 下流呼び出し（Cloud Function）のリトライ設定
+    retry_max_attempts: int = 3  # 最初の試行を含む最大試行回数
+    retry_base_delay_seconds: float = 2.0  # バックオフの基準（フルジッター: 0〜基準×2^n秒）
+    retry_max_delay_seconds: float = 30.0
+    # 再試行予算（最初の試行1回あたりに貯まる再試行の数と、その上限）
+    retry_budget_ratio: float = 0.2
+    retry_budget_max_tokens: float = 10.0
+    # 1回の呼び出し（再試行を含む）の期限。各試行のタイムアウトは残り時間に合わせて短くする
+    downstream_call_deadline_seconds: float = 600.0
+
+    # IDトークンキャッシュ設定（サービス間認証用）
+    id_token_refresh_margin_seconds: float = 300.0  # 期限の何秒前からバックグラウンド更新するか
+
+    # レビュー結果キャッシュ設定（同一画像の再提出時に分析結果を再利用）
+    # 有効にすると POST /reviews のたびに画像のメタデータ（x-goog-hash）をHEADリクエストで取得する
+    # （画像本体はダウンロードしない）
+    review_cache_enabled: bool = False
+    review_cache_ttl_seconds: float = 86400.0  # キャッシュエントリの有効期間（24時間）
+    review_cache_max_entries: int = 10000  # 最大エントリ数（超過時は最も古く使われたものから削除）
+
+    # 審査対象画像の共有設定（1度だけ取得・正規化し、Cloud Functionへインラインで渡す）
+    review_image_inline_enabled: bool = True
+    review_image_max_bytes: int = 10 * 1024 * 1024  # Cloud Function側の上限と同じ10MB
+    review_image_max_dimension: int = 4096  # 長辺の上限（px）
+
+    # ステージ別の画像前処理設定（縮小・メタデータ除去・グレースケール化・再エンコード）
+    stage_image_preprocess_enabled: bool = True
+    stage_image_jpeg_quality: int = 85
+    annotation_image_max_dimension: int = 2048  # 指摘位置の座標精度を保つため大きめ
+    annotation_image_grayscale: Literal["auto", "always", "never"] = "auto"
+    example_image_max_dimension: int = 1536
+    example_image_grayscale: Literal["auto", "always", "never"] = "auto"
+
+    # ランクキャッシュ設定（審査の作成・処理間でユーザーランクの再読み込みを避ける）
+    rank_cache_ttl_seconds: float = 30.0
+    rank_high_score_window: int = 20  # ユーザードキュメントに保持する直近の高スコア件数
+
     # Cloud Tasks設定
     cloud_tasks_location: str = "us-central1"
     cloud_tasks_queue_name: str = "review-processing-queue"
+    cloud_tasks_enqueue_timeout_seconds: float = 10.0
+
+    # Cloud Tasksへの投入失敗時のフォールバック（プロセス内のワーカーで処理）
+    review_fallback_workers: int = 2  # 同時に処理する審査の数
+    review_fallback_max_pending: int = 8  # 処理待ちの上限（超過時は503を返す）
+    # 起動時に、作成からこの秒数以上経っても処理が始まっていない審査を再投入する
+    review_recovery_enabled: bool = True
+    review_recovery_stale_seconds: float = 600.0
+    # processingのまま更新が途絶えた審査を再処理するまでの秒数（下流呼び出しの期限より長くする）
+    review_recovery_processing_stale_seconds: float = 1800.0
+    review_recovery_max_tasks: int = 50
 
     # Agent Engine設定
     agent_engine_id: str = ""  # Agent Engine リソースID
     agent_engine_location: str = "us-central1"  # Agent Engineのリージョン
+    # analyze_dessin_imageの結果が検証できた時点で返す（後続の要約文の生成を待たない）
+    agent_engine_early_return: bool = False
+    # 早期リターン後の残りのストリーム（drain: バックグラウンドで読み切る / cancel: 打ち切る）
+    agent_engine_stream_tail: Literal["drain", "cancel"] = "drain"
 
     # Gemini設定
     gemini_model: str = "gemini-3-flash-preview"
+    gemini_image_model: str = "gemini-3-pro-image-preview"
 
     gemini_max_output_tokens: int = 32000
     gemini_temperature: float = 1.0
     gemini_thinking_budget_tokens: int = 8192
+    # モデルごとの呼び出し予算（プロセス内で共有。requests_per_minute=0で無制限）
+    gemini_max_concurrent: int = 8
+    gemini_requests_per_minute: float = 0.0
+    gemini_image_max_concurrent: int = 2
+    gemini_image_requests_per_minute: float = 0.0
+    # 429を受けた際、Retry-Afterがない場合にモデルへの送信を控える秒数
+    gemini_throttle_cooldown_seconds: float = 5.0
 
     # アプリケーション設定
     debug: bool = False
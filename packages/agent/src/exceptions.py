@@ -13,6 +13,12 @@ class TaskNotFoundError(DessinCoachingError):
     pass
 
 
+class InvalidCursorError(DessinCoachingError):
+    """ページネーションカーソルが不正な場合の例外"""
+
+    pass
+
+
 class AnalysisFailedError(DessinCoachingError):
     """デッサン分析が失敗した場合の例外"""
 
@@ -1,13 +1,21 @@
 """FastAPIエントリーポイント"""
 
+import asyncio
+
 import firebase_admin
 import structlog
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from src.api.reviews import recover_pending_reviews
 from src.api.reviews import router as reviews_router
 from src.config import settings
+from src.services.http_client import close_http_client, start_http_client
+from src.services.model_governor import get_model_governor
+from src.services.review_cache import get_review_cache
+from src.services.review_worker_pool import get_review_worker_pool
+from src.services.stage_metrics import get_stage_metrics
 
 # Initialize Firebase Admin
 try:
@@ -92,9 +100,27 @@ async def health() -> dict[str, str]:
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """メトリクスをPrometheusテキスト形式で出力
+
+    審査パイプラインのステージ別レイテンシ、モデル呼び出しの待ち状況、レビュー結果キャッシュの統計。
+    """
+    return PlainTextResponse(
+        get_stage_metrics().render_prometheus()
+        + get_model_governor().render_prometheus()
+        + get_review_cache().render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @app.on_event("startup")
 async def startup_event() -> None:
     """アプリケーション起動時の処理"""
+    await start_http_client()
+    if settings.review_recovery_enabled:
+        # 処理が始まらないまま残っている審査を再投入（起動を遅らせないようバックグラウンドで実行）
+        app.state.review_recovery = asyncio.create_task(recover_pending_reviews())
     logger.info(
         "application_started",
         project_id=settings.gcp_project_id,
@@ -105,4 +131,8 @@ async def startup_event() -> None:
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     """アプリケーション終了時の処理"""
+    # 処理待ちの審査はpendingのまま残り、処理中の審査はキャンセル時にpendingへ戻されて
+    # 次回の起動時に再投入される（戻せなかった場合もprocessingの更新途絶として再処理される）
+    await get_review_worker_pool().close()
+    await close_http_client()
     logger.info("application_shutdown")
@@ -177,8 +177,19 @@ class ReviewTaskResponse(BaseModel):
         )
 
 
+class ReviewTaskPage(BaseModel):
+    """審査タスク一覧の1ページ分"""
+
+    tasks: list[ReviewTask] = Field(..., description="タスク一覧")
+    next_cursor: str | None = Field(default=None, description="次ページ取得用カーソル")
+    total_count: int | None = Field(default=None, description="条件に一致する総件数")
+
+
 class ReviewListResponse(BaseModel):
     """審査タスク一覧レスポンス用モデル"""
 
     tasks: list[ReviewTaskResponse] = Field(..., description="タスク一覧")
-    total_count: int = Field(..., description="総件数")
+    total_count: int = Field(..., description="条件に一致する総件数")
+    next_cursor: str | None = Field(
+        default=None, description="次ページ取得用カーソル（最終ページの場合はNone）"
+    )
@@ -1,25 +1,44 @@
 """コーチング用プロンプト定義"""
 
+from functools import lru_cache
+
+# プロンプトのバージョン（プロンプト内容を変更した場合は更新する）
+# レビュー結果キャッシュのキーに含め、古いプロンプトによる分析結果を再利用しないようにする
+PROMPT_VERSION = "2"
+
 def get_dessin_analysis_system_prompt(rank_label: str = "10級") -> str:
     """ランク情報を含むシステムプロンプトを生成
-    
+
+    ランク区分ごとに共通の固定部分（生成済みのものを再利用）の末尾に、
+    現在のランクを追加する。
+
     Args:
         rank_label: ユーザーの現在のランクラベル（例: "10級", "5級", "初段"）
-    
+
     Returns:
         ランク情報を含むシステムプロンプト
     """
+    static_prompt = _build_static_prompt(_get_rank_category(rank_label))
+    return f"""{static_prompt}
+## 今回の提出者
+
+**現在のランク: {rank_label}**
+"""
+
+
+@lru_cache(maxsize=8)
+def _build_static_prompt(rank_category: str) -> str:
+    """システムプロンプトのうちランク区分ごとに共通の部分を生成"""
     # ランクに応じた評価の重点項目を決定
-    rank_category = _get_rank_category(rank_label)
     rank_focus = _get_rank_focus_instruction(rank_category)
 
     return f"""あなたは経験豊富な鉛筆デッサンの講師です。
 生徒から提出されたデッサン画像を分析し、具体的で建設的なフィードバックを提供してください。
 
-## 重要: ユーザーの現在のランク
-**現在のランク: {rank_label}**
+## 重要: ユーザーのランク
+**ランク区分: {rank_category}**
 
-このユーザーは{rank_category}レベルのスキルを持っています。
+このユーザーは{rank_category}レベルのスキルを持っています（現在のランクは末尾の「今回の提出者」を参照）。
 評価の際は、このランクに適した基準と期待値を考慮してください。
 {rank_focus}
 
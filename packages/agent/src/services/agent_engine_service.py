@@ -4,8 +4,8 @@ Vertex AI Agent Engineにデプロイされたエージェントを呼び出す
 エージェント側でPreloadMemoryToolを使用してMemory Bankから過去メモリを自動取得。
 """
 
-import json
-from collections.abc import AsyncIterable
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
 
 import structlog
 import vertexai
@@ -13,9 +13,13 @@ from pydantic import ValidationError
 
 from src.config import settings
 from src.models.feedback import DessinAnalysis
+from src.utils.json_extraction import extract_json_object
 
 logger = structlog.get_logger()
 
+# 分析結果を返すツール名（早期リターンの対象）
+ANALYSIS_TOOL_NAME = "analyze_dessin_image"
+
 
 class AgentEngineService:
     """Vertex AI Agent Engine呼び出しサービス
@@ -32,6 +36,8 @@ class AgentEngineService:
         self._client: vertexai.Client | None = None
         self._adk_app: object | None = None  # AdkAppの型は実行時に解決
         self._initialized = False
+        # 早期リターン後に残りのストリームを読み切るタスク（GCされないよう参照を保持）
+        self._drain_tasks: set[asyncio.Task[None]] = set()
 
     def _ensure_initialized(self) -> None:
         """Vertex AI Clientを初期化"""
@@ -69,80 +75,109 @@ class AgentEngineService:
     def _parse_agent_response(self, event: dict[str, object]) -> dict[str, object] | None:
         """Agent Engineからのレスポンスをパース
 
+        最終結果になり得るイベント（モデルのテキスト・ツールのfunction_response）のみを対象とし、
+        ストリーミング途中の部分テキスト（partial）やツール呼び出しは解析しない。
+
         レスポンス形式:
         - {"content": {"parts": [{"text": "..."}], "role": "model"}} - Geminiモデルレスポンス
+        - {"content": {"parts": [{"function_response": {...}}], "role": "user"}} - ツール結果
         - {"content": {...}} - 辞書形式のコンテンツ
         - {"content": "..."} - 文字列形式のコンテンツ
         - {"parts": [{"text": "..."}]} - parts形式（markdown code block含む可能性）
         """
+        if event.get("partial"):
+            return None
+
         # content形式
-        if "content" in event and event["content"]:
-            content = event["content"]
+        content = event.get("content")
+        if content:
             if isinstance(content, dict):
                 # content が {"parts": [...], "role": "..."} 形式の場合
-                if "parts" in content and isinstance(content["parts"], list):
-                    parts = content["parts"]
-                    if len(parts) > 0:
-                        first_part = parts[0]
-                        if isinstance(first_part, dict):
-                            if "text" in first_part and isinstance(first_part["text"], str):
-                                text = first_part["text"]
-                                return self._extract_json_from_text(text)
-                            elif "function_response" in first_part:
-                                func_resp = first_part["function_response"]
-                                if isinstance(func_resp, dict) and "response" in func_resp:
-                                    response = func_resp["response"]
-                                    if isinstance(response, dict):
-                                        return response
-                else:
+                parts = content.get("parts")
+                if not isinstance(parts, list):
                     return content
-            elif isinstance(content, str):
-                return self._extract_json_from_text(content)
+                return self._parse_parts(parts, is_model=content.get("role", "model") == "model")
+            if isinstance(content, str):
+                return extract_json_object(content)
 
         # parts形式（イベント直下）
-        if "parts" in event:
-            parts = event["parts"]
-            if isinstance(parts, list) and len(parts) > 0:
-                first_part = parts[0]
-                if isinstance(first_part, dict) and "text" in first_part:
-                    text = first_part["text"]
-                    if isinstance(text, str):
-                        return self._extract_json_from_text(text)
+        parts = event.get("parts")
+        if isinstance(parts, list):
+            return self._parse_parts(parts, is_model=True)
 
         return None
 
-    def _extract_json_from_text(self, text: str) -> dict[str, object] | None:
-        """テキストからJSONを抽出
+    def _parse_parts(self, parts: list[object], is_model: bool) -> dict[str, object] | None:
+        """partsからfunction_responseの結果、またはモデルのテキスト中のJSONを取り出す"""
+        for part in parts:
+            if not isinstance(part, dict):
+                continue
+            func_resp = part.get("function_response")
+            if isinstance(func_resp, dict):
+                response = func_resp.get("response")
+                if isinstance(response, dict):
+                    return response
+            text = part.get("text")
+            if is_model and isinstance(text, str):
+                extracted = extract_json_object(text)
+                if extracted is not None:
+                    return extracted
+        return None
 
-        markdown code blockで囲まれている場合も処理
-        """
-        import re
-
-        # markdown code blockを除去（複数パターン対応）
-        # パターン1: ```json ... ```
-        # パターン2: ``` ... ```
-        code_block_patterns = [
-            r"```json\s*\n([\s\S]*?)\n```",
-            r"```\s*\n([\s\S]*?)\n```",
-            r"```json\s*([\s\S]*?)```",
-            r"```([\s\S]*?)```",
-        ]
-
-        for pattern in code_block_patterns:
-            match = re.search(pattern, text)
-            if match:
-                text = match.group(1).strip()
-                break
-
-        # JSONとしてパース
-        try:
-            result = json.loads(text)
-            if isinstance(result, dict):
-                return result
-        except json.JSONDecodeError:
-            pass
+    def _is_analysis_tool_response(self, event: dict[str, object]) -> bool:
+        """analyze_dessin_imageのfunction_responseイベントか"""
+        content = event.get("content")
+        parts = content.get("parts") if isinstance(content, dict) else None
+        if not isinstance(parts, list):
+            return False
+        return any(
+            isinstance(part, dict)
+            and isinstance(part.get("function_response"), dict)
+            and part["function_response"].get("name") == ANALYSIS_TOOL_NAME
+            for part in parts
+        )
 
-        return None
+    async def _release_stream(self, stream: AsyncIterator[dict[str, object]]) -> None:
+        """早期リターン後の残りのストリームを設定に従って後始末"""
+        if settings.agent_engine_stream_tail == "cancel":
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.warning("agent_engine_stream_close_failed", error=str(e))
+            return
+
+        task = asyncio.create_task(self._drain_stream(stream))
+        self._drain_tasks.add(task)
+        task.add_done_callback(self._drain_tasks.discard)
+
+    async def _drain_stream(self, stream: AsyncIterator[dict[str, object]]) -> None:
+        """残りのイベントを読み捨てる（エージェントの実行を最後まで完了させる）"""
+        drained = 0
+        try:
+            async for _ in stream:
+                drained += 1
+        except Exception as e:
+            logger.warning("agent_engine_stream_drain_failed", error=str(e), drained=drained)
+            return
+        logger.debug("agent_engine_stream_drained", drained=drained)
+
+    def _validate_analysis(self, response: dict[str, object]) -> tuple[DessinAnalysis, str] | None:
+        """レスポンスがDessinAnalysisとして有効なら分析結果と要約を返す"""
+        # DessinAnalysisの形式で直接返ってきた場合
+        data: object = response
+        summary = ""
+        # ツール呼び出し結果が status + analysis 形式の場合
+        if "overall_score" not in response and "analysis" in response:
+            data = response["analysis"]
+            summary = str(response.get("summary", ""))
+        if not isinstance(data, dict) or "overall_score" not in data:
+            return None
+        try:
+            return DessinAnalysis.model_validate(data), summary
+        except ValidationError:
+            return None
 
     async def run_coaching_agent(
         self,
@@ -190,40 +225,33 @@ class AgentEngineService:
 
             # Agent Engineにクエリを送信（非同期ストリーミング）
             final_response: dict[str, object] | None = None
+            validated: tuple[DessinAnalysis, str] | None = None
             # Note: async_stream_query はAdkAppのメソッド
             events: AsyncIterable[dict[str, object]] = adk_app.async_stream_query(  # type: ignore[attr-defined]
                 message=message,
                 user_id=user_id,
             )
 
-            async for event in events:
-                # 最終レスポンスを取得
-                if isinstance(event, dict):
-                    # Agent Engineからのレスポンス形式の処理
-                    parsed = self._parse_agent_response(event)
-                    if parsed:
-                        final_response = parsed
-                    else:
-                        # partsがあるのにパースできなかった場合のフォールバック
-                        if "parts" in event:
-                            parts = event.get("parts", [])
-                            if parts and isinstance(parts[0], dict) and "text" in parts[0]:
-                                text = parts[0]["text"]
-                                extracted = self._extract_json_from_text(text)
-                                if extracted:
-                                    final_response = extracted
-
-            if final_response is None:
-                logger.error("agent_engine_no_response")
-                return {
-                    "status": "error",
-                    "error_message": "Agent Engineからのレスポンスがありませんでした",
-                }
-
-            # レスポンスを検証
-            # DessinAnalysisの形式で直接返ってきた場合
-            if "overall_score" in final_response:
-                analysis = DessinAnalysis.model_validate(final_response)
+            stream = aiter(events)
+            async for event in stream:
+                # 有効な分析結果を得た後のイベント（要約文など）は解析しない
+                if validated is not None or not isinstance(event, dict):
+                    continue
+                parsed = self._parse_agent_response(event)
+                if parsed:
+                    final_response = parsed
+                    validated = self._validate_analysis(parsed)
+                    if (
+                        validated is not None
+                        and settings.agent_engine_early_return
+                        and self._is_analysis_tool_response(event)
+                    ):
+                        logger.info("agent_engine_early_return")
+                        await self._release_stream(stream)
+                        break
+
+            if validated is not None:
+                analysis, summary = validated
                 logger.info(
                     "agent_engine_query_completed",
                     overall_score=analysis.overall_score,
@@ -231,23 +259,22 @@ class AgentEngineService:
                 return {
                     "status": "success",
                     "analysis": analysis.model_dump(),
-                    "summary": "",
+                    "summary": summary,
+                }
+
+            if final_response is None:
+                logger.error("agent_engine_no_response")
+                return {
+                    "status": "error",
+                    "error_message": "Agent Engineからのレスポンスがありませんでした",
                 }
 
-            # ツール呼び出し結果が status + analysis 形式の場合
-            if "analysis" in final_response:
-                analysis_data = final_response["analysis"]
-                if isinstance(analysis_data, dict):
-                    analysis = DessinAnalysis.model_validate(analysis_data)
-                    logger.info(
-                        "agent_engine_query_completed",
-                        overall_score=analysis.overall_score,
-                    )
-                    return {
-                        "status": "success",
-                        "analysis": analysis.model_dump(),
-                        "summary": str(final_response.get("summary", "")),
-                    }
+            # 分析結果の形式だが検証に失敗した場合はValidationErrorを送出
+            if "overall_score" in final_response:
+                DessinAnalysis.model_validate(final_response)
+            analysis_data = final_response.get("analysis")
+            if isinstance(analysis_data, dict):
+                DessinAnalysis.model_validate(analysis_data)
 
             # status: success が直接返ってきた場合
             if "status" in final_response and final_response["status"] == "success":
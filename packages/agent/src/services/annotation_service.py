@@ -3,16 +3,25 @@
 レビュー改善点を対象に、Cloud Functionでアノテーション画像を生成する。
 """
 
-import asyncio
+import time
 
 import aiohttp
-import google.auth.transport.requests
-import google.oauth2.id_token
 import structlog
 
 from src.config import settings
 from src.models.feedback import DessinAnalysis
 from src.models.rank import UserRank
+from src.services.http_client import get_http_session
+from src.services.id_token_cache import get_id_token_cache
+from src.services.model_governor import get_model_governor, parse_retry_after
+from src.services.retry_policy import (
+    RetryableError,
+    RetryPolicy,
+    get_retry_policy,
+    is_retryable_status,
+    request_timeout,
+)
+from src.services.review_image import ReviewImage
 
 logger = structlog.get_logger()
 
@@ -24,11 +33,20 @@ class AnnotationGenerationError(Exception):
 class AnnotationService:
     """アノテーション画像生成サービス（Cloud Function クライアント）"""
 
-    def __init__(self) -> None:
-        self.function_url = settings.annotation_function_url
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        """初期化
 
-    # リトライ設定
-    MAX_RETRIES = 3
+        Args:
+            session: HTTPセッション（未指定時はアプリ共有のプール付きセッションを使用）
+            retry_policy: リトライポリシー（未指定時はプロセス共有のポリシーを使用）
+        """
+        self.function_url = settings.annotation_function_url
+        self._session = session
+        self._retry_policy = retry_policy
 
     async def generate_annotated_image(
         self,
@@ -37,11 +55,13 @@ class AnnotationService:
         analysis: DessinAnalysis,
         user_rank: UserRank,
         motif_tags: list[str],
+        image: ReviewImage | None = None,
+        deadline: float | None = None,
     ) -> str | None:
         """アノテーション画像生成リクエストを送信し、結果を待って返す
 
-        最大3回リトライ（指数バックオフ: 2秒, 4秒, 8秒）を行い、
-        全て失敗した場合はNoneを返す。
+        再試行可能なエラー（429・5xx・タイムアウト等）はリトライポリシーに従って再試行し、
+        再試行不可能なエラー・再試行を諦めた場合はNoneを返す。
 
         Args:
             task_id: タスクID
@@ -49,6 +69,8 @@ class AnnotationService:
             analysis: デッサン分析結果
             user_rank: ユーザーランク情報
             motif_tags: モチーフタグ
+            image: 取得済みの元画像（指定時はインラインで渡し、Function側の再取得を省略）
+            deadline: 再試行を含む期限（time.monotonic()基準。未指定時は設定値）
 
         Returns:
             アノテーション画像のURL（生成失敗時はNone）
@@ -57,7 +79,7 @@ class AnnotationService:
             logger.warning("annotation_generation_disabled_no_url")
             return None
 
-        payload = {
+        payload: dict[str, object] = {
             "task_id": task_id,
             "user_id": user_rank.user_id,
             "original_image_url": original_image_url,
@@ -65,102 +87,106 @@ class AnnotationService:
             "current_rank_label": user_rank.current_rank.label,
             "motif_tags": motif_tags,
         }
+        if image is not None:
+            payload.update(image.to_payload())
 
-        for attempt in range(1, self.MAX_RETRIES + 1):
-            result = await self._call_annotation_function(task_id, payload)
-            if result is not None:
-                return result
-
-            if attempt < self.MAX_RETRIES:
-                wait_time = 2 ** attempt
-                logger.warning(
-                    "annotation_generation_retry",
-                    task_id=task_id,
-                    attempt=attempt,
-                    max_retries=self.MAX_RETRIES,
-                    wait_seconds=wait_time,
-                )
-                await asyncio.sleep(wait_time)
-
-        logger.error(
-            "annotation_generation_all_retries_failed",
-            task_id=task_id,
-            max_retries=self.MAX_RETRIES,
-        )
-        return None
+        if deadline is None:
+            deadline = time.monotonic() + settings.downstream_call_deadline_seconds
+        policy = self._retry_policy or get_retry_policy()
+        try:
+            return await policy.run(
+                lambda remaining: self._call_annotation_function(task_id, payload, remaining),
+                name="annotation_generation",
+                deadline=deadline,
+                task_id=task_id,
+            )
+        except Exception as e:
+            logger.error(
+                "annotation_generation_all_retries_failed",
+                task_id=task_id,
+                error=str(e),
+                error_type=type(e).__name__,
+            )
+            return None
 
     async def _call_annotation_function(
         self,
         task_id: str,
         payload: dict[str, object],
-    ) -> str | None:
+        remaining: float | None = None,
+    ) -> str:
         """Cloud Functionを呼び出してアノテーション画像を生成（1回の試行）
 
         Args:
             task_id: タスクID
             payload: リクエストペイロード
+            remaining: 期限までの残り秒数（リクエストのタイムアウトに使用）
 
         Returns:
-            アノテーション画像のURL（失敗時はNone）
-        """
-        try:
-            # Cloud Functions Gen2の場合、.run.appのURLをtarget_audienceとして使用
-            target_audience = self._convert_to_run_app_url(self.function_url)
-            auth_req = google.auth.transport.requests.Request()
-            id_token = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: google.oauth2.id_token.fetch_id_token(auth_req, target_audience),
-            )
+            アノテーション画像のURL
 
-            headers = {
-                "Authorization": f"Bearer {id_token}",
-                "Content-Type": "application/json",
-            }
+        Raises:
+            RetryableError: 再試行可能なステータス（429・5xx等）が返された場合
+            AnnotationGenerationError: 再試行不可能なステータス・レスポンスの場合
+        """
+        # Cloud Functions Gen2の場合、.run.appのURLをtarget_audienceとして使用
+        target_audience = self._convert_to_run_app_url(self.function_url)
+        # audienceごとにキャッシュされたトークンを再利用
+        id_token = await get_id_token_cache().get_token(target_audience)
+
+        headers = {
+            "Authorization": f"Bearer {id_token}",
+            "Content-Type": "application/json",
+        }
 
-            # タイムアウトを300秒（5分）に延長（アノテーション生成には時間がかかる場合がある）
-            timeout = aiohttp.ClientTimeout(total=300)
-            async with aiohttp.ClientSession(timeout=timeout) as session, session.post(
+        # 共有セッションで接続を再利用（タイムアウトは期限までの残り時間に合わせる）
+        # モデルごとの予算が空くまで待ち、他の審査と合わせて同時実行数・レートを抑える
+        governor = get_model_governor()
+        session = self._session or get_http_session()
+        async with (
+            governor.acquire(settings.gemini_model),
+            session.post(
                 self.function_url,
                 json=payload,
                 headers=headers,
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(
-                        "annotation_generation_failed",
-                        task_id=task_id,
-                        status=response.status,
-                        error=error_text,
-                    )
-                    return None
-
-                # レスポンスからannotated_image_urlを取得
-                result = await response.json()
-                annotated_image_url = result.get("annotated_image_url")
-
-                if annotated_image_url:
-                    logger.info(
-                        "annotation_generation_completed",
-                        task_id=task_id,
-                        annotated_image_url=annotated_image_url,
-                    )
-                    return annotated_image_url
-                else:
-                    logger.warning(
-                        "annotation_generation_no_url_in_response",
-                        task_id=task_id,
-                        response=result,
-                    )
-                    return None
+                timeout=request_timeout(remaining),
+            ) as response,
+        ):
+            if response.status != 200:
+                error_text = await response.text()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status == 429:
+                    # 他の呼び出しも含めてモデル単位で送信を控える
+                    governor.report_throttled(settings.gemini_model, retry_after)
+                logger.error(
+                    "annotation_generation_failed",
+                    task_id=task_id,
+                    status=response.status,
+                    error=error_text,
+                )
+                message = f"Cloud Function request failed: {response.status} - {error_text}"
+                if is_retryable_status(response.status):
+                    raise RetryableError(message, retry_after)
+                raise AnnotationGenerationError(message)
 
-        except Exception as e:
-            logger.error(
-                "annotation_generation_request_failed",
+            # レスポンスからannotated_image_urlを取得
+            result = await response.json()
+            annotated_image_url = result.get("annotated_image_url")
+
+            if not annotated_image_url:
+                logger.warning(
+                    "annotation_generation_no_url_in_response",
+                    task_id=task_id,
+                    response=result,
+                )
+                raise AnnotationGenerationError("No annotated_image_url in response")
+
+            logger.info(
+                "annotation_generation_completed",
                 task_id=task_id,
-                error=str(e),
-                error_type=type(e).__name__,
+                annotated_image_url=annotated_image_url,
             )
-            return None
+            return annotated_image_url
 
     def _convert_to_run_app_url(self, url: str) -> str:
         """Cloud Functions Gen2のURLを.run.app形式に変換（IDトークンのtarget_audience用）
@@ -1,6 +1,8 @@
 """Cloud Tasksサービス
 
 Cloud Tasksへのタスク投入を行うサービス。
+APIハンドラー（イベントループ）からは create_review_task_async を使用し、
+同期gRPC呼び出しでイベントループをブロックしないようにする。
 """
 
 from datetime import datetime
@@ -21,6 +23,8 @@ class ReviewTaskPayload(BaseModel):
     task_id: str
     user_id: str
     image_url: str
+    # 審査作成時に取得したランクのスナップショット（ワーカーでの再読み込みを省略するため）
+    rank_at_review: str | None = None
 
 
 class CloudTasksService:
@@ -32,11 +36,13 @@ class CloudTasksService:
     def __init__(self) -> None:
         """Cloud Tasksサービスを初期化"""
         self._client: tasks_v2.CloudTasksClient | None = None
+        self._async_client: tasks_v2.CloudTasksAsyncClient | None = None
         settings = get_settings()
         self._project_id = settings.gcp_project_id
         self._location = settings.cloud_tasks_location
         self._queue_name = settings.cloud_tasks_queue_name
         self._process_review_function_url = settings.process_review_function_url
+        self._enqueue_timeout_seconds = settings.cloud_tasks_enqueue_timeout_seconds
 
     def _get_client(self) -> tasks_v2.CloudTasksClient:
         """Cloud Tasksクライアントを取得（遅延初期化）"""
@@ -44,36 +50,29 @@ class CloudTasksService:
             self._client = tasks_v2.CloudTasksClient()
         return self._client
 
+    def _get_async_client(self) -> tasks_v2.CloudTasksAsyncClient:
+        """非同期Cloud Tasksクライアントを取得（遅延初期化、実行中のイベントループで生成）"""
+        if self._async_client is None:
+            self._async_client = tasks_v2.CloudTasksAsyncClient()
+        return self._async_client
+
     def _get_queue_path(self) -> str:
         """キューのフルパスを取得"""
-        return self._get_client().queue_path(
+        return tasks_v2.CloudTasksClient.queue_path(
             self._project_id,
             self._location,
             self._queue_name,
         )
 
-    def create_review_task(
+    def _build_create_request(
         self,
         task_id: str,
         user_id: str,
         image_url: str,
-        schedule_time: datetime | None = None,
-    ) -> str:
-        """審査タスクをCloud Tasksに投入
-
-        Args:
-            task_id: タスクID
-            user_id: ユーザーID
-            image_url: 分析対象の画像URL
-            schedule_time: スケジュール実行時間（Noneの場合は即時実行）
-
-        Returns:
-            str: 作成されたCloud TaskのID
-
-        Raises:
-            Exception: タスク作成に失敗した場合
-        """
-        client = self._get_client()
+        rank_at_review: str | None,
+        schedule_time: datetime | None,
+    ) -> tasks_v2.CreateTaskRequest:
+        """審査タスクの作成リクエストを組み立てる"""
         queue_path = self._get_queue_path()
 
         # ペイロード作成
@@ -81,6 +80,7 @@ class CloudTasksService:
             task_id=task_id,
             user_id=user_id,
             image_url=image_url,
+            rank_at_review=rank_at_review,
         )
         payload_bytes = payload.model_dump_json().encode("utf-8")
 
@@ -110,11 +110,39 @@ class CloudTasksService:
             task_request["schedule_time"] = timestamp
 
         # タスク作成リクエスト
-        request = tasks_v2.CreateTaskRequest(
+        return tasks_v2.CreateTaskRequest(
             parent=queue_path,
             task=task_request,
         )
 
+    def create_review_task(
+        self,
+        task_id: str,
+        user_id: str,
+        image_url: str,
+        rank_at_review: str | None = None,
+        schedule_time: datetime | None = None,
+    ) -> str:
+        """審査タスクをCloud Tasksに投入
+
+        Args:
+            task_id: タスクID
+            user_id: ユーザーID
+            image_url: 分析対象の画像URL
+            rank_at_review: 審査作成時のランクラベル（ワーカーはこれを使用しランクを再読み込みしない）
+            schedule_time: スケジュール実行時間（Noneの場合は即時実行）
+
+        Returns:
+            str: 作成されたCloud TaskのID
+
+        Raises:
+            Exception: タスク作成に失敗した場合
+        """
+        client = self._get_client()
+        request = self._build_create_request(
+            task_id, user_id, image_url, rank_at_review, schedule_time
+        )
+
         try:
             response = client.create_task(request=request)
 
@@ -138,6 +166,50 @@ class CloudTasksService:
             )
             raise
 
+    async def create_review_task_async(
+        self,
+        task_id: str,
+        user_id: str,
+        image_url: str,
+        rank_at_review: str | None = None,
+        schedule_time: datetime | None = None,
+    ) -> str:
+        """審査タスクをCloud Tasksに投入（非同期クライアントを使用）
+
+        引数と戻り値は create_review_task と同じ。
+        応答がない場合は設定のタイムアウト（cloud_tasks_enqueue_timeout_seconds）で失敗とする。
+
+        Raises:
+            google.api_core.exceptions.AlreadyExists: 同じタスクIDのタスクが投入済みの場合
+            Exception: タスク作成に失敗した場合
+        """
+        client = self._get_async_client()
+        request = self._build_create_request(
+            task_id, user_id, image_url, rank_at_review, schedule_time
+        )
+
+        try:
+            response = await client.create_task(
+                request=request,
+                timeout=self._enqueue_timeout_seconds,
+            )
+        except Exception as e:
+            logger.error(
+                "cloud_task_creation_failed",
+                task_id=task_id,
+                error=str(e),
+            )
+            raise
+
+        cloud_task_id = response.name.split("/")[-1] if response.name else ""
+        logger.info(
+            "cloud_task_created",
+            task_id=task_id,
+            cloud_task_id=cloud_task_id,
+            queue=self._queue_name,
+        )
+        return cloud_task_id
+
     def delete_review_task(self, task_id: str) -> bool:
         """審査タスクを削除（キャンセル）
 
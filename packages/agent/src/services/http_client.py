@@ -0,0 +1,71 @@
+"""共有HTTPクライアント
+
+Cloud Function呼び出し用のコネクションプール付きaiohttpセッションを
+アプリケーション全体で共有する。FastAPIの起動時に作成し、終了時にクローズする。
+呼び出しごとにセッションを作らないため、Keep-AliveでTCP/TLS接続が再利用される。
+"""
+
+import aiohttp
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+_session: aiohttp.ClientSession | None = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """コネクションプール設定付きのセッションを作成"""
+    connector = aiohttp.TCPConnector(
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout_seconds,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=settings.http_total_timeout_seconds,
+        connect=settings.http_connect_timeout_seconds,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def start_http_client() -> aiohttp.ClientSession:
+    """共有セッションを作成（アプリケーション起動時）
+
+    Returns:
+        共有aiohttpセッション
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info(
+            "http_client_started",
+            pool_limit=settings.http_pool_limit,
+            pool_limit_per_host=settings.http_pool_limit_per_host,
+        )
+    return _session
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """共有セッションを取得
+
+    起動処理を経由していない場合（バックグラウンド処理・テスト等）は遅延作成する。
+    イベントループ内から呼び出すこと。
+
+    Returns:
+        共有aiohttpセッション
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+
+async def close_http_client() -> None:
+    """共有セッションをクローズ（アプリケーション終了時）"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("http_client_closed")
+    _session = None
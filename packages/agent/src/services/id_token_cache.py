@@ -0,0 +1,160 @@
+"""IDトークンキャッシュ
+
+サービス間呼び出し（Cloud Functions）用のOIDC IDトークンをaudienceごとにキャッシュする。
+
+- 有効期限の少し前までは同じトークンを再利用する
+- 期限が近づいたトークンは返却しつつバックグラウンドで更新する
+- 同一audienceへの同時取得は1回のメタデータサーバー呼び出しにまとめる
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+
+import google.auth.jwt
+import google.auth.transport.requests
+import google.oauth2.id_token
+import structlog
+from pydantic import BaseModel
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+# expクレームを読み取れない場合の有効期間（GoogleのIDトークンは1時間）
+DEFAULT_TOKEN_LIFETIME_SECONDS = 3600.0
+# これより期限が近いトークンは使用せず、取得完了を待つ
+MIN_REMAINING_SECONDS = 30.0
+
+
+class CachedIdToken(BaseModel):
+    """キャッシュ済みIDトークン"""
+
+    token: str
+    expires_at: float
+
+
+def fetch_id_token(audience: str) -> str:
+    """メタデータサーバー（またはADC）からIDトークンを取得（同期）
+
+    Args:
+        audience: target_audience（呼び出し先のURL）
+
+    Returns:
+        IDトークン
+    """
+    auth_req = google.auth.transport.requests.Request()
+    return google.oauth2.id_token.fetch_id_token(auth_req, audience)
+
+
+def _token_expiry(token: str, fetched_at: float) -> float:
+    """トークンのexpクレームから有効期限を取得"""
+    try:
+        claims = google.auth.jwt.decode(token, verify=False)
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            return float(exp)
+    except (ValueError, TypeError) as e:
+        logger.warning("id_token_exp_decode_failed", error=str(e))
+    return fetched_at + DEFAULT_TOKEN_LIFETIME_SECONDS
+
+
+def _consume_exception(task: "asyncio.Task[str]") -> None:
+    """バックグラウンド更新の例外を回収（ログはフェッチ処理側で出力済み）"""
+    if not task.cancelled():
+        task.exception()
+
+
+class IdTokenCache:
+    """audienceごとのIDトークンキャッシュ"""
+
+    def __init__(
+        self,
+        fetcher: Callable[[str], str] = fetch_id_token,
+        refresh_margin_seconds: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """初期化
+
+        Args:
+            fetcher: IDトークン取得関数（同期。Executorで実行される。テスト用にDI可能）
+            refresh_margin_seconds: 期限の何秒前からバックグラウンド更新するか
+            clock: 現在時刻（UNIX秒）を返す関数（テスト用にDI可能）
+        """
+        self._fetcher = fetcher
+        self._refresh_margin = (
+            refresh_margin_seconds
+            if refresh_margin_seconds is not None
+            else settings.id_token_refresh_margin_seconds
+        )
+        self._clock = clock
+        self._tokens: dict[str, CachedIdToken] = {}
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+
+    async def get_token(self, audience: str) -> str:
+        """IDトークンを取得
+
+        Args:
+            audience: target_audience（呼び出し先のURL）
+
+        Returns:
+            IDトークン
+        """
+        now = self._clock()
+        cached = self._tokens.get(audience)
+
+        if cached is not None:
+            remaining = cached.expires_at - now
+            if remaining > self._refresh_margin:
+                return cached.token
+            if remaining > MIN_REMAINING_SECONDS:
+                # 期限が近いので、現在のトークンを返しつつバックグラウンドで更新
+                refresh = self._start_fetch(audience)
+                refresh.add_done_callback(_consume_exception)
+                return cached.token
+
+        # 呼び出し元がキャンセルされても共有中の取得処理は継続させる
+        return await asyncio.shield(self._start_fetch(audience))
+
+    def invalidate(self, audience: str) -> None:
+        """キャッシュを破棄（401受信時など）"""
+        self._tokens.pop(audience, None)
+
+    def _start_fetch(self, audience: str) -> "asyncio.Task[str]":
+        """取得処理を開始（進行中の取得があればそれを共有）"""
+        task = self._inflight.get(audience)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(audience))
+            self._inflight[audience] = task
+        return task
+
+    async def _fetch(self, audience: str) -> str:
+        """Executorでトークンを取得してキャッシュに格納"""
+        try:
+            token = await asyncio.get_running_loop().run_in_executor(
+                None, self._fetcher, audience
+            )
+            fetched_at = self._clock()
+            self._tokens[audience] = CachedIdToken(
+                token=token,
+                expires_at=_token_expiry(token, fetched_at),
+            )
+            logger.info("id_token_fetched", audience=audience)
+            return token
+        except Exception as e:
+            logger.error("id_token_fetch_failed", audience=audience, error=str(e))
+            raise
+        finally:
+            self._inflight.pop(audience, None)
+
+
+# シングルトンインスタンス
+_id_token_cache: IdTokenCache | None = None
+
+
+def get_id_token_cache() -> IdTokenCache:
+    """IdTokenCacheのシングルトンインスタンスを取得"""
+    global _id_token_cache
+    if _id_token_cache is None:
+        _id_token_cache = IdTokenCache()
+    return _id_token_cache
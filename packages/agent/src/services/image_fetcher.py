@@ -0,0 +1,67 @@
+"""画像のストリーミング取得
+
+チャンクごとに ``data += chunk`` で連結すると、受信済みデータ全体のコピーが
+チャンクごとに発生し、10MBの画像では数GB規模のコピーになる（二次的な増加）。
+
+Content-Length があればその大きさの bytearray を事前確保し、受信したチャンクを
+所定の位置に書き込む（各バイトのコピーは1回）。Content-Length がない・一致しない場合
+（圧縮転送など）は bytearray の末尾に追記する（償却で線形）。
+サイズ上限は Content-Length と受信済みバイト数の両方で逐次確認する。
+
+結果はコピーせずに memoryview で返す。hashlib・base64・BytesIO などはそのまま受け付ける。
+"""
+
+import aiohttp
+
+from src.exceptions import ImageProcessingError
+from src.services.http_client import get_http_session
+
+# 受信時のチャンクサイズ
+_CHUNK_SIZE = 64 * 1024
+
+
+async def fetch_image_bytes(
+    url: str,
+    max_bytes: int,
+    session: aiohttp.ClientSession | None = None,
+) -> memoryview:
+    """画像を上限付きでストリーミング取得
+
+    Args:
+        url: 取得するURL（検証済みであること）
+        max_bytes: 許容する最大サイズ（超過時はImageProcessingError）
+        session: 使用するセッション（省略時は共有セッション）
+
+    Returns:
+        受信したデータ（コピーなしのmemoryview）
+
+    Raises:
+        ImageProcessingError: 取得失敗、またはサイズ超過の場合
+    """
+    session = session or get_http_session()
+    async with session.get(url) as response:
+        if response.status != 200:
+            raise ImageProcessingError(f"画像の取得に失敗しました: HTTP {response.status}")
+
+        declared = response.content_length
+        if declared is not None and declared > max_bytes:
+            raise ImageProcessingError(f"画像サイズが上限を超えています: {max_bytes} bytes")
+
+        buffer = bytearray(declared or 0)
+        size = 0
+        async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+            end = size + len(chunk)
+            if end > max_bytes:
+                raise ImageProcessingError(f"画像サイズが上限を超えています: {max_bytes} bytes")
+            if end <= len(buffer):
+                buffer[size:end] = chunk
+            else:
+                # Content-Lengthなし・不一致（圧縮転送など）の場合は末尾に追記
+                del buffer[size:]
+                buffer += chunk
+            size = end
+
+    if size < len(buffer):
+        # 宣言より短い応答（事前確保分の余りを切り詰める）
+        del buffer[size:]
+    return memoryview(buffer)
@@ -4,15 +4,24 @@
 お手本画像の生成を依頼する。
 """
 
-import asyncio
+import time
 
 import aiohttp
-import google.auth.transport.requests
-import google.oauth2.id_token
 import structlog
 
 from src.config import settings
 from src.models.feedback import DessinAnalysis
+from src.services.http_client import get_http_session
+from src.services.id_token_cache import get_id_token_cache
+from src.services.model_governor import get_model_governor, parse_retry_after
+from src.services.retry_policy import (
+    RetryableError,
+    RetryPolicy,
+    get_retry_policy,
+    is_retryable_status,
+    request_timeout,
+)
+from src.services.review_image import ReviewImage
 
 logger = structlog.get_logger()
 
@@ -25,12 +34,20 @@ class ImageGenerationError(Exception):
 class ImageGenerationService:
     """お手本画像生成サービス（Cloud Function クライアント）"""
 
-    # リトライ設定
-    MAX_RETRIES = 3
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        """初期化
 
-    def __init__(self) -> None:
-        """初期化"""
+        Args:
+            session: HTTPセッション（未指定時はアプリ共有のプール付きセッションを使用）
+            retry_policy: リトライポリシー（未指定時はプロセス共有のポリシーを使用）
+        """
         self.function_url = settings.image_generation_function_url
+        self._session = session
+        self._retry_policy = retry_policy
 
     async def generate_example_image(
         self,
@@ -40,11 +57,13 @@ class ImageGenerationService:
         analysis: DessinAnalysis,
         motif_tags: list[str],
         annotated_image_url: str | None = None,
+        image: ReviewImage | None = None,
+        deadline: float | None = None,
     ) -> None:
         """お手本画像生成リクエストを送信する（非同期）
 
-        最大3回リトライ（指数バックオフ: 2秒, 4秒, 8秒）を行い、
-        全て失敗した場合はImageGenerationErrorを送出する。
+        再試行可能なエラー（429・5xx・タイムアウト等）はリトライポリシーに従って再試行し、
+        再試行不可能なエラー・再試行を諦めた場合はImageGenerationErrorを送出する。
 
         Args:
             task_id: タスクID
@@ -53,9 +72,11 @@ class ImageGenerationService:
             analysis: デッサン分析結果
             motif_tags: モチーフタグ
             annotated_image_url: アノテーション画像のURL（オプション）
+            image: 取得済みの元画像（指定時はインラインで渡し、Function側の再取得を省略）
+            deadline: 再試行を含む期限（time.monotonic()基準。未指定時は設定値）
 
         Raises:
-            ImageGenerationError: 全リトライ失敗時
+            ImageGenerationError: 生成依頼に失敗した場合
         """
         if not self.function_url:
             logger.warning("image_generation_disabled_no_url")
@@ -73,40 +94,38 @@ class ImageGenerationService:
         # アノテーション画像URLがあれば追加
         if annotated_image_url:
             payload["annotated_image_url"] = annotated_image_url
+        if image is not None:
+            payload.update(image.to_payload())
 
-        last_error: ImageGenerationError | None = None
-        for attempt in range(1, self.MAX_RETRIES + 1):
-            try:
-                await self._call_generation_function(task_id, user_id, payload)
-                return  # 成功
-            except ImageGenerationError as e:
-                last_error = e
-                if attempt < self.MAX_RETRIES:
-                    wait_time = 2 ** attempt
-                    logger.warning(
-                        "image_generation_retry",
-                        task_id=task_id,
-                        attempt=attempt,
-                        max_retries=self.MAX_RETRIES,
-                        wait_seconds=wait_time,
-                        error=str(e),
-                    )
-                    await asyncio.sleep(wait_time)
-
-        logger.error(
-            "image_generation_all_retries_failed",
-            task_id=task_id,
-            max_retries=self.MAX_RETRIES,
-        )
-        raise last_error or ImageGenerationError(
-            f"Failed after {self.MAX_RETRIES} attempts"
-        )
+        if deadline is None:
+            deadline = time.monotonic() + settings.downstream_call_deadline_seconds
+        policy = self._retry_policy or get_retry_policy()
+        try:
+            await policy.run(
+                lambda remaining: self._call_generation_function(
+                    task_id, user_id, payload, remaining
+                ),
+                name="image_generation",
+                deadline=deadline,
+                task_id=task_id,
+            )
+        except ImageGenerationError:
+            raise
+        except Exception as e:
+            logger.error(
+                "image_generation_all_retries_failed",
+                task_id=task_id,
+                error=str(e),
+                error_type=type(e).__name__,
+            )
+            raise ImageGenerationError(f"Failed to request generation: {e}") from e
 
     async def _call_generation_function(
         self,
         task_id: str,
         user_id: str,
         payload: dict[str, object],
+        remaining: float | None = None,
     ) -> None:
         """Cloud Functionを呼び出してお手本画像生成を依頼（1回の試行）
 
@@ -114,63 +133,60 @@ class ImageGenerationService:
             task_id: タスクID
             user_id: ユーザーID
             payload: リクエストペイロード
+            remaining: 期限までの残り秒数（リクエストのタイムアウトに使用）
 
         Raises:
-            ImageGenerationError: リクエスト送信に失敗した場合
+            RetryableError: 再試行可能なステータス（429・5xx等）が返された場合
+            ImageGenerationError: 再試行不可能なステータスが返された場合
         """
-        try:
-            logger.info(
-                "image_generation_request_started",
-                task_id=task_id,
-                user_id=user_id,
-                function_url=self.function_url,
-            )
-
-            # IDトークン取得
-            # Cloud Functions Gen2の場合、.run.appのURLをtarget_audienceとして使用
-            target_audience = self._convert_to_run_app_url(self.function_url)
-            auth_req = google.auth.transport.requests.Request()
+        logger.info(
+            "image_generation_request_started",
+            task_id=task_id,
+            user_id=user_id,
+            function_url=self.function_url,
+        )
 
-            # 同期処理なのでExecutorで実行
-            id_token = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: google.oauth2.id_token.fetch_id_token(auth_req, target_audience)
-            )
+        # IDトークン取得
+        # Cloud Functions Gen2の場合、.run.appのURLをtarget_audienceとして使用
+        target_audience = self._convert_to_run_app_url(self.function_url)
+        # audienceごとにキャッシュされたトークンを再利用
+        id_token = await get_id_token_cache().get_token(target_audience)
 
-            # Cloud Function呼び出し
-            headers = {
-                "Authorization": f"Bearer {id_token}",
-                "Content-Type": "application/json"
-            }
+        # Cloud Function呼び出し
+        headers = {
+            "Authorization": f"Bearer {id_token}",
+            "Content-Type": "application/json"
+        }
 
-            async with aiohttp.ClientSession() as session, session.post(
+        # 共有セッションで接続を再利用（タイムアウトは期限までの残り時間に合わせる）
+        # モデルごとの予算が空くまで待ち、他の審査と合わせて同時実行数・レートを抑える
+        governor = get_model_governor()
+        session = self._session or get_http_session()
+        async with (
+            governor.acquire(settings.gemini_image_model),
+            session.post(
                 self.function_url,
                 json=payload,
                 headers=headers,
-                timeout=300  # Cloud Functionの処理に時間がかかる場合がある（5分）
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise ImageGenerationError(
-                        f"Cloud Function request failed: {response.status} - {error_text}"
-                    )
-
-                logger.info(
-                    "image_generation_request_sent",
-                    task_id=task_id,
-                    status=response.status
-                )
+                timeout=request_timeout(remaining),
+            ) as response,
+        ):
+            if response.status != 200:
+                error_text = await response.text()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status == 429:
+                    # 他の呼び出しも含めてモデル単位で送信を控える
+                    governor.report_throttled(settings.gemini_image_model, retry_after)
+                message = f"Cloud Function request failed: {response.status} - {error_text}"
+                if is_retryable_status(response.status):
+                    raise RetryableError(message, retry_after)
+                raise ImageGenerationError(message)
 
-        except ImageGenerationError:
-            raise
-        except Exception as e:
-            logger.error(
-                "image_generation_request_failed",
+            logger.info(
+                "image_generation_request_sent",
                 task_id=task_id,
-                error=str(e),
-                error_type=type(e).__name__
+                status=response.status
             )
-            raise ImageGenerationError(f"Failed to request generation: {e}")
 
     def _convert_to_run_app_url(self, url: str) -> str:
         """Cloud Functions Gen2のURLを.run.app形式に変換（IDトークンのtarget_audience用）
@@ -0,0 +1,230 @@
+"""Geminiモデル呼び出しの同時実行制御
+
+審査が集中すると、アノテーション（分析モデル）とお手本画像生成（画像モデル）の
+Cloud Function呼び出しが同時に増え、Gemini側で429 RESOURCE_EXHAUSTEDになる。
+各呼び出し元が個別にリトライすると、クォータの上限付近で失敗と再送を繰り返す。
+
+ModelGovernor はモデルごとに1つの予算を持ち、呼び出し元は予算が空くまで待ってから呼び出す。
+
+- 同時実行数の上限（max_concurrent）
+- 1分あたりのリクエスト数の上限（requests_per_minute、トークンバケット。0で無制限）
+- 429を受けた場合はモデル単位でクールダウンし、待機中の呼び出し元すべてが送信を控える
+
+待機数・実行中の数・待ち時間はPrometheusテキスト形式で /metrics に出力する。
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, suppress
+
+import structlog
+from pydantic import BaseModel
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+
+class ModelBudget(BaseModel):
+    """モデルごとの予算"""
+
+    max_concurrent: int
+    requests_per_minute: float = 0.0
+
+
+class ModelGovernorStats(BaseModel):
+    """モデルごとの状態"""
+
+    model: str
+    in_flight: int
+    waiting: int
+    acquired: int
+    throttled: int
+    wait_seconds_sum: float
+
+
+class _ModelState:
+    def __init__(self, budget: ModelBudget, now: float) -> None:
+        self.budget = budget
+        self.condition = asyncio.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.tokens = float(budget.max_concurrent)
+        self.refilled_at = now
+        self.blocked_until = 0.0
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_seconds_sum = 0.0
+
+    def try_acquire(self, now: float) -> float | None:
+        """予算を確保できれば0を、できなければ次に確認するまでの秒数（不明な場合None）を返す"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= self.budget.max_concurrent:
+            # 実行中の呼び出しの終了（notify）を待つ
+            return None
+
+        rate = self.budget.requests_per_minute / 60.0
+        if rate > 0:
+            capacity = max(float(self.budget.max_concurrent), 1.0)
+            self.tokens = min(capacity, self.tokens + (now - self.refilled_at) * rate)
+            self.refilled_at = now
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / rate
+            self.tokens -= 1.0
+
+        self.in_flight += 1
+        return 0.0
+
+
+class ModelGovernor:
+    """モデルごとの予算に従って呼び出しを待たせるスケジューラー"""
+
+    def __init__(
+        self,
+        budgets: dict[str, ModelBudget],
+        default_budget: ModelBudget,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            budgets: モデル名ごとの予算
+            default_budget: budgetsにないモデルの予算
+            clock: 現在時刻（秒）を返す関数
+        """
+        self._budgets = budgets
+        self._default_budget = default_budget
+        self._clock = clock
+        self._states: dict[str, _ModelState] = {}
+
+    @asynccontextmanager
+    async def acquire(self, model: str) -> AsyncIterator[float]:
+        """予算が空くまで待ってから、ブロックの間だけ実行枠を確保する
+
+        Yields:
+            待ち時間（秒）
+        """
+        state = self._state(model)
+        started_at = self._clock()
+        async with state.condition:
+            state.waiting += 1
+            try:
+                while (wait := state.try_acquire(self._clock())) != 0.0:
+                    with suppress(TimeoutError):
+                        await asyncio.wait_for(state.condition.wait(), timeout=wait)
+            finally:
+                state.waiting -= 1
+
+        waited = self._clock() - started_at
+        state.acquired += 1
+        state.wait_seconds_sum += waited
+        if waited >= 1.0:
+            logger.info("model_governor_waited", model=model, wait_seconds=round(waited, 3))
+        try:
+            yield waited
+        finally:
+            async with state.condition:
+                state.in_flight -= 1
+                # 待機中にタイムアウトした呼び出し元へ通知が渡って失われないよう全員を起こす
+                state.condition.notify_all()
+
+    def report_throttled(self, model: str, retry_after: float | None = None) -> None:
+        """429を受けたことを通知し、モデル単位でクールダウンする
+
+        Args:
+            model: モデル名
+            retry_after: 待機秒数（未指定時は設定の既定値）
+        """
+        state = self._state(model)
+        cooldown = (
+            retry_after if retry_after is not None else settings.gemini_throttle_cooldown_seconds
+        )
+        state.blocked_until = max(state.blocked_until, self._clock() + cooldown)
+        state.throttled += 1
+        logger.warning(
+            "model_governor_throttled",
+            model=model,
+            cooldown_seconds=cooldown,
+            waiting=state.waiting,
+        )
+
+    def stats(self) -> list[ModelGovernorStats]:
+        """モデルごとの状態を取得"""
+        return [
+            ModelGovernorStats(
+                model=model,
+                in_flight=state.in_flight,
+                waiting=state.waiting,
+                acquired=state.acquired,
+                throttled=state.throttled,
+                wait_seconds_sum=state.wait_seconds_sum,
+            )
+            for model, state in sorted(self._states.items())
+        ]
+
+    def render_prometheus(self) -> str:
+        """Prometheusテキスト形式で出力"""
+        metrics = (
+            ("gemini_governor_waiting", "gauge", "Callers waiting for model capacity.", "waiting"),
+            ("gemini_governor_in_flight", "gauge", "Model calls in flight.", "in_flight"),
+            ("gemini_governor_acquired_total", "counter", "Model calls started.", "acquired"),
+            ("gemini_governor_throttled_total", "counter", "429 responses reported.", "throttled"),
+            (
+                "gemini_governor_wait_seconds_total",
+                "counter",
+                "Total time callers waited for model capacity.",
+                "wait_seconds_sum",
+            ),
+        )
+        stats = self.stats()
+        lines: list[str] = []
+        for name, metric_type, description, field in metrics:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for entry in stats:
+                lines.append(f'{name}{{model="{entry.model}"}} {getattr(entry, field):g}')
+        return "\n".join(lines) + "\n"
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._states.get(model)
+        if state is None:
+            budget = self._budgets.get(model, self._default_budget)
+            state = _ModelState(budget, self._clock())
+            self._states[model] = state
+        return state
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-Afterヘッダー（秒数）を解釈（解釈できない場合はNone）"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+# シングルトンインスタンス
+_model_governor: ModelGovernor | None = None
+
+
+def get_model_governor() -> ModelGovernor:
+    """ModelGovernorのシングルトンインスタンスを取得"""
+    global _model_governor
+    if _model_governor is None:
+        analysis_budget = ModelBudget(
+            max_concurrent=settings.gemini_max_concurrent,
+            requests_per_minute=settings.gemini_requests_per_minute,
+        )
+        _model_governor = ModelGovernor(
+            budgets={
+                settings.gemini_model: analysis_budget,
+                settings.gemini_image_model: ModelBudget(
+                    max_concurrent=settings.gemini_image_max_concurrent,
+                    requests_per_minute=settings.gemini_image_requests_per_minute,
+                ),
+            },
+            default_budget=analysis_budget,
+        )
+    return _model_governor
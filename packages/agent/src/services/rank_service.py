@@ -1,9 +1,12 @@
 """ランク管理サービス
 
 ユーザーのデッサンスキルランクを管理し、Firestoreでの永続化を行う。
+FastAPIのイベントループをブロックしないよう、非同期クライアント（firestore.AsyncClient）を使用する。
 """
 
+import time
 import uuid
+from collections.abc import Callable
 from datetime import datetime
 
 import structlog
@@ -21,20 +24,48 @@ class RankService:
     USERS_COLLECTION = "users"
     RANK_HISTORY_COLLECTION = "rank_history"
 
-    def __init__(self, db: firestore.Client | None = None) -> None:
+    def __init__(
+        self,
+        db: firestore.AsyncClient | None = None,
+        cache_ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         """初期化
 
         Args:
-            db: Firestoreクライアント（テスト用にDI可能）
+            db: 非同期Firestoreクライアント（テスト用にDI可能）
+            cache_ttl_seconds: ユーザーランクキャッシュの有効期間（秒）
+            clock: 現在時刻を返す関数（テスト用にDI可能）
         """
         if db is None:
-            self._db = firestore.Client(
+            self._db = firestore.AsyncClient(
                 project=settings.gcp_project_id,
                 database=settings.firestore_database,
             )
         else:
             self._db = db
         self._users_collection = self._db.collection(self.USERS_COLLECTION)
+        # ユーザーごとのランクキャッシュ（user_id -> (UserRank | None, 取得時刻)）
+        self._cache_ttl = (
+            cache_ttl_seconds
+            if cache_ttl_seconds is not None
+            else settings.rank_cache_ttl_seconds
+        )
+        self._clock = clock
+        self._high_score_window = settings.rank_high_score_window
+        self._rank_cache: dict[str, tuple[UserRank | None, float]] = {}
+
+    def invalidate(self, user_id: str) -> None:
+        """ユーザーのランクキャッシュを破棄
+
+        Args:
+            user_id: ユーザーID
+        """
+        self._rank_cache.pop(user_id, None)
+
+    def _cache_rank(self, user_id: str, user_rank: UserRank | None) -> None:
+        """ランクをキャッシュに格納"""
+        self._rank_cache[user_id] = (user_rank, self._clock())
 
     def _get_next_rank(self, current_rank: Rank) -> Rank | None:
         """現在のランクから1つ上のランクを取得する
@@ -59,11 +90,14 @@ class RankService:
             # 無効な値の場合はNoneを返す
             return None
 
-    def update_user_rank(self, user_id: str, score: float, task_id: str) -> UserRank:
+    async def update_user_rank(self, user_id: str, score: float, task_id: str) -> UserRank:
         """ユーザーのランクを更新する
 
         最新のスコアに基づいて情報を更新し、ランク再計算を行う。
         80点以上のスコアを獲得した場合、1つ上のランクに昇格する。
+        読み込みと書き込みはトランザクション内で行い、同一ユーザーの審査が同時に
+        完了しても更新が失われないようにする。提出回数はアトミックにインクリメントし、
+        高スコアは直近の一定件数のみ保持する（ドキュメントサイズを一定に保つ）。
 
         Args:
             user_id: ユーザーID
@@ -75,23 +109,64 @@ class RankService:
         """
         user_ref = self._users_collection.document(user_id)
 
+        # 書き込み失敗時に古いキャッシュを返さないよう、先に破棄しておく
+        self.invalidate(user_id)
+
+        transaction = self._db.transaction()
+        update_in_transaction = firestore.async_transactional(self._update_rank_in_transaction)
+        user_rank, old_rank = await update_in_transaction(
+            transaction, user_ref, user_id, score, task_id
+        )
+
+        if user_rank.rank_changed:
+            logger.info(
+                "rank_promoted",
+                user_id=user_id,
+                old_rank=old_rank.label,
+                new_rank=user_rank.current_rank.label,
+                score=score
+            )
+        else:
+            logger.info(
+                "rank_unchanged",
+                user_id=user_id,
+                current_rank=user_rank.current_rank.label,
+                score=score
+            )
+
+        # 書き込んだ内容でキャッシュを更新（ライトスルー）
+        self._cache_rank(user_id, user_rank)
+        return user_rank
+
+    async def _update_rank_in_transaction(
+        self,
+        transaction: firestore.AsyncTransaction,
+        user_ref: firestore.AsyncDocumentReference,
+        user_id: str,
+        score: float,
+        task_id: str,
+    ) -> tuple[UserRank, Rank]:
+        """トランザクション内でランクを更新（競合時はトランザクションごと再実行される）
+
+        Returns:
+            (更新後のユーザーランク情報, 更新前のランク)
+        """
         # 1. 現在のユーザー情報を取得
-        user_doc = user_ref.get()
+        user_doc = await user_ref.get(transaction=transaction)
+        user_data = (user_doc.to_dict() or {}) if user_doc.exists else {}
         current_rank = Rank.KYU_10
-        total_submissions = 0
-        high_scores = []
+        # 初回登録かどうかの判定 (docがない、またはrankがない)
+        is_first_time = "rank" not in user_data
 
-        if user_doc.exists:
-            user_data = user_doc.to_dict() or {}
-            # 既存のランク情報があれば取得
-            if "rank" in user_data:
-                try:
-                    current_rank = Rank(user_data["rank"])
-                except ValueError:
-                    current_rank = Rank.KYU_10
+        # 既存のランク情報があれば取得
+        if not is_first_time:
+            try:
+                current_rank = Rank(user_data["rank"])
+            except ValueError:
+                current_rank = Rank.KYU_10
 
-            total_submissions = user_data.get("total_submissions", 0)
-            high_scores = user_data.get("high_scores", [])
+        total_submissions = int(user_data.get("total_submissions", 0))
+        high_scores = list(user_data.get("high_scores", []))
 
         # 2. 新しい情報を追加
         total_submissions += 1
@@ -99,30 +174,30 @@ class RankService:
         # 3. ランクを計算（80点以上なら1つ上のランクに昇格）
         new_rank = current_rank
         if score >= 80:
-            # 80点以上なら高スコアリストに追加
+            # 80点以上なら高スコアリストに追加（直近の一定件数のみ保持）
             high_scores.append(score)
             # 1つ上のランクに昇格
             next_rank = self._get_next_rank(current_rank)
             if next_rank is not None:
                 new_rank = next_rank
+        high_scores = high_scores[-self._high_score_window:]
 
         now = datetime.now()
 
-        # 4. ユーザー情報を更新
-        update_data = {
-            "rank": new_rank.value,
-            "latest_score": score,
-            "total_submissions": total_submissions,
-            "high_scores": high_scores,
-            "updated_at": now,
-        }
-
-        # マージオプションで保存
-        user_ref.set(update_data, merge=True)
+        # 4. ユーザー情報を更新（提出回数はアトミックにインクリメント）
+        transaction.set(
+            user_ref,
+            {
+                "rank": new_rank.value,
+                "latest_score": score,
+                "total_submissions": firestore.Increment(1),
+                "high_scores": high_scores,
+                "updated_at": now,
+            },
+            merge=True,
+        )
 
         rank_changed = current_rank != new_rank
-        # 初回登録かどうかの判定 (docがない、またはrankがない)
-        is_first_time = not user_doc.exists or (user_doc.exists and "rank" not in (user_doc.to_dict() or {}))
 
         # 5. ランク変更履歴を保存 (変更時または初回)
         if rank_changed or is_first_time:
@@ -138,7 +213,7 @@ class RankService:
                 task_id=task_id
             )
 
-            history_ref.set({
+            transaction.set(history_ref, {
                 "user_id": history_entry.user_id,
                 "old_rank": history_entry.old_rank.value if history_entry.old_rank else None,
                 "new_rank": history_entry.new_rank.value,
@@ -147,23 +222,7 @@ class RankService:
                 "task_id": history_entry.task_id
             })
 
-            if rank_changed:
-                logger.info(
-                    "rank_promoted",
-                    user_id=user_id,
-                    old_rank=current_rank.label,
-                    new_rank=new_rank.label,
-                    score=score
-                )
-        else:
-            logger.info(
-                "rank_unchanged",
-                user_id=user_id,
-                current_rank=current_rank.label,
-                score=score
-            )
-
-        return UserRank(
+        user_rank = UserRank(
             user_id=user_id,
             current_rank=new_rank,
             current_score=score,
@@ -172,18 +231,35 @@ class RankService:
             rank_changed=rank_changed,
             updated_at=now,
         )
+        return user_rank, current_rank
 
-    def get_user_rank(self, user_id: str) -> UserRank | None:
+    async def get_user_rank(self, user_id: str, use_cache: bool = True) -> UserRank | None:
         """ユーザーのランク情報を取得
 
+        短時間のキャッシュを持ち、同一審査内での重複した読み込みを避ける。
+        キャッシュはupdate_user_rank()での書き込み時に更新される。
+
         Args:
             user_id: ユーザーID
+            use_cache: Falseの場合はキャッシュを使わずFirestoreから読み込む
 
         Returns:
             UserRankオブジェクト。ユーザーが存在しない、ランク情報がない場合はNone
         """
+        if use_cache:
+            cached = self._rank_cache.get(user_id)
+            if cached is not None and self._clock() - cached[1] <= self._cache_ttl:
+                user_rank = cached[0]
+                return user_rank.model_copy() if user_rank is not None else None
+
+        user_rank = await self._read_user_rank(user_id)
+        self._cache_rank(user_id, user_rank)
+        return user_rank.model_copy() if user_rank is not None else None
+
+    async def _read_user_rank(self, user_id: str) -> UserRank | None:
+        """Firestoreからユーザーのランク情報を読み込む"""
         user_ref = self._users_collection.document(user_id)
-        user_doc = user_ref.get()
+        user_doc = await user_ref.get()
 
         if not user_doc.exists:
             return None
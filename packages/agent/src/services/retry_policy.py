@@ -0,0 +1,225 @@
+"""下流サービス呼び出しの共通リトライポリシー
+
+Cloud Function（アノテーション・お手本画像生成）の呼び出しは、障害時に全審査が
+同じ間隔（2秒, 4秒, ...）で一斉に再送すると、復旧直後に負荷が集中する。
+RetryPolicy は以下をまとめて扱う。
+
+- フルジッター付き指数バックオフ（0〜min(max_delay, base_delay * 2^n) の一様乱数）
+- 再試行すべきエラーの分類（429・408・5xx・タイムアウト・接続エラーは再試行、その他の4xxは即失敗）
+- プロセス全体の再試行予算（最初の試行ごとに ratio だけ貯まり、再試行ごとに1消費する）。
+  下流の障害時も再試行の量は通常の呼び出し数の一定割合に抑えられる
+- 期限（deadline）を考慮し、期限までに次の試行を始められない場合は待たずに諦める
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+import aiohttp
+import structlog
+from google.auth.exceptions import TransportError
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class RetryableError(Exception):
+    """再試行可能なエラー（呼び出し側でHTTPステータス等から判定して送出する）"""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        """
+        Args:
+            message: エラーメッセージ
+            retry_after: 下流が指定した待機秒数（Retry-After）
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable_status(status: int) -> bool:
+    """HTTPステータスが再試行可能か（429・408・5xx）"""
+    return status in (408, 429) or status >= 500
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """例外が再試行可能か（タイムアウト・接続エラー・RetryableError）"""
+    if isinstance(error, RetryableError | TimeoutError | TransportError):
+        return True
+    if isinstance(error, aiohttp.ClientResponseError):
+        return is_retryable_status(error.status)
+    return isinstance(error, aiohttp.ClientError)
+
+
+def request_timeout(remaining: float | None) -> aiohttp.ClientTimeout:
+    """1回の試行のHTTPタイムアウト（期限までの残り時間とセッション既定値の短い方）"""
+    total = settings.http_total_timeout_seconds
+    if remaining is not None:
+        # 0以下は「タイムアウトなし」と解釈されるため、最小値を設ける
+        total = max(min(total, remaining), 0.001)
+    return aiohttp.ClientTimeout(total=total, connect=settings.http_connect_timeout_seconds)
+
+
+class RetryBudget:
+    """プロセス全体の再試行予算（トークンバケット）"""
+
+    def __init__(self, ratio: float, max_tokens: float) -> None:
+        """
+        Args:
+            ratio: 最初の試行1回あたりに貯まる再試行の数
+            max_tokens: 貯められる再試行の上限（初期値も同じ）
+        """
+        self._ratio = ratio
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    @property
+    def tokens(self) -> float:
+        """残りの再試行の数"""
+        return self._tokens
+
+    def record_request(self) -> None:
+        """最初の試行を記録（予算を貯める）"""
+        self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        """再試行1回分を消費（予算が足りない場合False）"""
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+class RetryPolicy:
+    """フルジッター・再試行予算・期限を考慮したリトライの実行"""
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        budget: RetryBudget | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        uniform: Callable[[float, float], float] = random.uniform,
+    ) -> None:
+        """
+        Args:
+            max_attempts: 最大試行回数（最初の試行を含む）
+            base_delay: バックオフの基準秒数
+            max_delay: バックオフの上限秒数
+            budget: 再試行予算（未指定時は無制限）
+            clock: 現在時刻（秒）を返す関数
+            sleep: 待機する関数
+            uniform: 一様乱数を返す関数（ジッター用）
+        """
+        self.max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._budget = budget
+        self._clock = clock
+        self._sleep = sleep
+        self._uniform = uniform
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """attempt回目の失敗後に待つ秒数（フルジッター。Retry-Afterがあればそれ以上待つ）"""
+        ceiling = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+        delay = self._uniform(0.0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(
+        self,
+        operation: Callable[[float | None], Awaitable[T]],
+        *,
+        name: str,
+        deadline: float | None = None,
+        is_retryable: Callable[[BaseException], bool] = is_retryable_error,
+        **log_fields: object,
+    ) -> T:
+        """operationを実行し、再試行可能なエラーであればポリシーに従って再試行する
+
+        Args:
+            operation: 1回の試行（引数は期限までの残り秒数。期限なしの場合None）
+            name: ログに出力する呼び出し名
+            deadline: 期限（clockと同じ基準の時刻。未指定時は期限なし）
+            is_retryable: 例外が再試行可能かを判定する関数
+            **log_fields: ログに追加する項目（task_id等）
+
+        Returns:
+            operationの戻り値
+
+        Raises:
+            Exception: 再試行不可能なエラー、または再試行を諦めた時点の最後のエラー
+        """
+        if self._budget is not None:
+            self._budget.record_request()
+
+        attempt = 1
+        while True:
+            remaining = None if deadline is None else deadline - self._clock()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"{name}: deadline exceeded before attempt {attempt}")
+            try:
+                return await operation(remaining)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, getattr(e, "retry_after", None))
+                reason = self._give_up_reason(attempt, delay, deadline)
+                if reason is not None:
+                    logger.warning(
+                        "retry_gave_up",
+                        call=name,
+                        attempt=attempt,
+                        reason=reason,
+                        error=str(e),
+                        **log_fields,
+                    )
+                    raise
+                logger.warning(
+                    "retry_scheduled",
+                    call=name,
+                    attempt=attempt,
+                    max_attempts=self.max_attempts,
+                    wait_seconds=round(delay, 3),
+                    error=str(e),
+                    error_type=type(e).__name__,
+                    **log_fields,
+                )
+            await self._sleep(delay)
+            attempt += 1
+
+    def _give_up_reason(self, attempt: int, delay: float, deadline: float | None) -> str | None:
+        if attempt >= self.max_attempts:
+            return "max_attempts"
+        if deadline is not None and self._clock() + delay >= deadline:
+            return "deadline"
+        if self._budget is not None and not self._budget.try_spend():
+            return "budget_exhausted"
+        return None
+
+
+# シングルトンインスタンス
+_retry_policy: RetryPolicy | None = None
+
+
+def get_retry_policy() -> RetryPolicy:
+    """下流呼び出し用のRetryPolicyのシングルトンインスタンスを取得（再試行予算をプロセスで共有）"""
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy(
+            max_attempts=settings.retry_max_attempts,
+            base_delay=settings.retry_base_delay_seconds,
+            max_delay=settings.retry_max_delay_seconds,
+            budget=RetryBudget(
+                ratio=settings.retry_budget_ratio,
+                max_tokens=settings.retry_budget_max_tokens,
+            ),
+        )
+    return _retry_policy
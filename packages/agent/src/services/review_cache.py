@@ -0,0 +1,222 @@
+"""レビュー結果キャッシュ
+
+同一画像の再提出（失敗後の再送信・二重タップ等）時に、Agent Engineによる分析や
+画像生成を再実行せず、完了済みタスクの結果を再利用するための内容アドレス型キャッシュ。
+
+キーは「ユーザーID + 画像の内容ハッシュ（Cloud StorageのMD5/CRC32C） + 審査時ランク + プロンプトバージョン」。
+値は結果を保持している元タスクのIDのみで、分析結果本体はFirestoreのタスクから読み込む。
+TTLと最大エントリ数（LRU）で削除する。
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from urllib.parse import urlparse
+
+import structlog
+from pydantic import BaseModel
+
+from src.config import settings
+from src.exceptions import ImageProcessingError
+from src.prompts.coaching import PROMPT_VERSION
+from src.services.http_client import get_http_session
+from src.utils.validation import validate_image_url
+
+logger = structlog.get_logger()
+
+class ReviewCacheEntry(BaseModel):
+    """キャッシュエントリ"""
+
+    source_task_id: str
+    created_at: float
+
+
+class ReviewCacheStats(BaseModel):
+    """キャッシュ統計情報"""
+
+    enabled: bool
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    expired: int
+    evicted: int
+    invalidated: int
+    hit_rate: float
+
+
+def make_cache_key(
+    user_id: str,
+    image_hash: str,
+    rank_label: str,
+    prompt_version: str = PROMPT_VERSION,
+) -> str:
+    """キャッシュキーを作成
+
+    Args:
+        user_id: ユーザーID（記憶に基づく個別化があるためユーザー単位で分離）
+        image_hash: 画像の内容ハッシュ
+        rank_label: 審査時のランクラベル
+        prompt_version: プロンプトバージョン
+
+    Returns:
+        キャッシュキー
+    """
+    return f"{user_id}:{image_hash}:{rank_label}:{prompt_version}"
+
+
+def to_download_url(image_url: str) -> str:
+    """gs:// URLを公開URLに変換"""
+    parsed = urlparse(image_url)
+    if parsed.scheme == "gs":
+        return f"https://storage.googleapis.com/{parsed.netloc}{parsed.path}"
+    return image_url
+
+
+async def hash_image(image_url: str) -> str:
+    """Cloud Storageのオブジェクトメタデータから画像の内容ハッシュを取得
+
+    画像本体はダウンロードせず、HEADリクエストの x-goog-hash ヘッダー（MD5、
+    複合オブジェクトでMD5がない場合はCRC32C）を使う。POST /reviews の応答時間に
+    画像サイズ分のダウンロードを加えないため。
+
+    Args:
+        image_url: 画像URL（Cloud Storage/CDNのみ）
+
+    Returns:
+        内容ハッシュ（"md5:..." または "crc32c:..."）
+
+    Raises:
+        ImageProcessingError: URLが無効、取得失敗、またはハッシュがレスポンスにない場合
+    """
+    url = to_download_url(validate_image_url(image_url))
+
+    session = get_http_session()
+    async with session.head(url, allow_redirects=True) as response:
+        if response.status != 200:
+            raise ImageProcessingError(f"画像の取得に失敗しました: HTTP {response.status}")
+        hashes: dict[str, str] = {}
+        for header in response.headers.getall("x-goog-hash", []):
+            for item in header.split(","):
+                algorithm, _, value = item.strip().partition("=")
+                if value:
+                    hashes[algorithm] = value
+
+    for algorithm in ("md5", "crc32c"):
+        if algorithm in hashes:
+            return f"{algorithm}:{hashes[algorithm]}"
+    raise ImageProcessingError("画像のハッシュを取得できませんでした")
+
+
+class ReviewCache:
+    """TTL・LRU付きのレビュー結果キャッシュ（プロセス内）"""
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化
+
+        Args:
+            max_entries: 最大エントリ数
+            ttl_seconds: エントリの有効期間（秒）
+            clock: 現在時刻を返す関数（テスト用にDI可能）
+        """
+        self._max_entries = (
+            max_entries if max_entries is not None else settings.review_cache_max_entries
+        )
+        self._ttl = ttl_seconds if ttl_seconds is not None else settings.review_cache_ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, ReviewCacheEntry] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+        self._invalidated = 0
+
+    def get(self, key: str) -> ReviewCacheEntry | None:
+        """エントリを取得（期限切れは削除してNone）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        if self._clock() - entry.created_at > self._ttl:
+            del self._entries[key]
+            self._expired += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry
+
+    def put(self, key: str, source_task_id: str) -> None:
+        """エントリを登録（上限超過時は最も古く使われたものから削除）"""
+        self._entries[key] = ReviewCacheEntry(
+            source_task_id=source_task_id,
+            created_at=self._clock(),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evicted += 1
+
+    def invalidate(self, key: str) -> None:
+        """エントリを削除（元タスクが失敗・削除された場合など）"""
+        if self._entries.pop(key, None) is not None:
+            self._invalidated += 1
+
+    def stats(self) -> ReviewCacheStats:
+        """統計情報を取得"""
+        lookups = self._hits + self._misses
+        return ReviewCacheStats(
+            enabled=settings.review_cache_enabled,
+            entries=len(self._entries),
+            max_entries=self._max_entries,
+            ttl_seconds=self._ttl,
+            hits=self._hits,
+            misses=self._misses,
+            expired=self._expired,
+            evicted=self._evicted,
+            invalidated=self._invalidated,
+            hit_rate=self._hits / lookups if lookups else 0.0,
+        )
+
+    def render_prometheus(self) -> str:
+        """Prometheusテキスト形式で出力"""
+        stats = self.stats()
+        metrics = (
+            ("review_cache_entries", "gauge", "Review cache entries.", stats.entries),
+            ("review_cache_hits_total", "counter", "Review cache hits.", stats.hits),
+            ("review_cache_misses_total", "counter", "Review cache misses.", stats.misses),
+            ("review_cache_expired_total", "counter", "Expired review cache entries.", stats.expired),
+            ("review_cache_evicted_total", "counter", "Evicted review cache entries.", stats.evicted),
+            (
+                "review_cache_invalidated_total",
+                "counter",
+                "Invalidated review cache entries.",
+                stats.invalidated,
+            ),
+        )
+        lines: list[str] = []
+        for name, metric_type, description, value in metrics:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# シングルトンインスタンス
+_review_cache: ReviewCache | None = None
+
+
+def get_review_cache() -> ReviewCache:
+    """ReviewCacheのシングルトンインスタンスを取得"""
+    global _review_cache
+    if _review_cache is None:
+        _review_cache = ReviewCache()
+    return _review_cache
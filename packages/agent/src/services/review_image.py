@@ -0,0 +1,289 @@
+"""審査対象画像の共有
+
+1件の審査で元画像をステージごと（アノテーション・お手本画像生成）に再ダウンロードしないよう、
+処理開始時に1度だけ取得・検証・正規化した画像を各ステージに渡す。
+
+正規化の内容:
+- デコードして画像として読み込めることを検証
+- EXIFの回転情報を反映（スマートフォン写真の向きを揃える）
+- 長辺を上限サイズ以下に縮小
+
+回転・縮小が不要な場合は元のバイト列をそのまま使用する（再エンコードによる劣化を避ける）。
+Cloud Functionへはbase64でインライン送信し、Function側はURLからの取得を省略する。
+
+さらにステージごとの前処理（prepare_stage_image）で、送信前に以下を行う:
+- 長辺をステージ別の上限に縮小（アノテーションは座標の精度を保つため大きめ）
+- メタデータ（EXIF・位置情報など）を除去
+- 彩度がほぼない画像（鉛筆デッサン）はグレースケール化
+- JPEGで再エンコード
+
+送信バイト数・モデルの入力トークン・レイテンシを削減する。
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+from io import BytesIO
+from typing import Literal
+
+import structlog
+from PIL import ExifTags, Image, ImageOps, ImageStat, UnidentifiedImageError
+from pydantic import BaseModel, Field
+
+from src.config import settings
+from src.exceptions import ImageProcessingError
+from src.services.image_fetcher import fetch_image_bytes
+from src.services.review_cache import to_download_url
+from src.utils.validation import validate_image_url
+
+logger = structlog.get_logger()
+
+# 再エンコード時のJPEG品質
+_JPEG_QUALITY = 90
+
+# グレースケール判定: 縮小画像のHSV彩度の平均がこの値以下ならモノクロとみなす（0〜255）
+_MONOCHROME_SATURATION_THRESHOLD = 24.0
+
+# グレースケール判定に使う縮小画像のサイズ（px）
+_MONOCHROME_SAMPLE_SIZE = 64
+
+ImageStage = Literal["annotation", "example_image"]
+GrayscaleMode = Literal["auto", "always", "never"]
+
+
+class ImageProfile(BaseModel):
+    """ステージ別の前処理設定"""
+
+    max_dimension: int = Field(..., ge=1, description="長辺の上限（px）")
+    grayscale: GrayscaleMode = Field(
+        default="auto", description="グレースケール化（auto: 彩度がほぼない画像のみ）"
+    )
+    jpeg_quality: int = Field(default=85, ge=1, le=100, description="JPEG品質")
+
+
+def stage_profile(stage: ImageStage) -> ImageProfile:
+    """設定からステージ別の前処理設定を取得"""
+    if stage == "annotation":
+        return ImageProfile(
+            max_dimension=settings.annotation_image_max_dimension,
+            grayscale=settings.annotation_image_grayscale,
+            jpeg_quality=settings.stage_image_jpeg_quality,
+        )
+    return ImageProfile(
+        max_dimension=settings.example_image_max_dimension,
+        grayscale=settings.example_image_grayscale,
+        jpeg_quality=settings.stage_image_jpeg_quality,
+    )
+
+
+class ReviewImage(BaseModel):
+    """審査対象画像（1審査につき1度だけ取得・正規化）"""
+
+    source_url: str = Field(..., description="元画像のURL")
+    data: bytes = Field(..., description="正規化後の画像データ")
+    mime_type: str = Field(..., description="MIMEタイプ")
+    width: int = Field(..., description="幅（px）")
+    height: int = Field(..., description="高さ（px）")
+    sha256: str = Field(..., description="元画像のSHA-256（16進数）")
+    original_size: int = Field(..., description="元画像のバイト数")
+    normalized: bool = Field(default=False, description="回転・縮小で再エンコードしたか")
+
+    def for_stage(self, profile: ImageProfile) -> "ReviewImage":
+        """ステージ別に前処理した画像を取得（CPU処理のため呼び出し元でスレッド実行する）"""
+        data, width, height = preprocess_image(self.data, profile)
+        return self.model_copy(
+            update={
+                "data": data,
+                "mime_type": "image/jpeg",
+                "width": width,
+                "height": height,
+                "normalized": True,
+            }
+        )
+
+    def to_payload(self) -> dict[str, str]:
+        """Cloud Function呼び出し用のインライン画像フィールド"""
+        return {
+            "original_image_base64": base64.b64encode(self.data).decode("ascii"),
+            "original_image_mime_type": self.mime_type,
+        }
+
+
+def is_monochrome(image: Image.Image) -> bool:
+    """彩度がほぼない（鉛筆・木炭などの）画像か判定"""
+    if image.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    sample = image.convert("RGB")
+    sample.thumbnail((_MONOCHROME_SAMPLE_SIZE, _MONOCHROME_SAMPLE_SIZE))
+    saturation = ImageStat.Stat(sample.convert("HSV").getchannel("S")).mean[0]
+    return saturation <= _MONOCHROME_SATURATION_THRESHOLD
+
+
+def preprocess_image(data: bytes, profile: ImageProfile) -> tuple[bytes, int, int]:
+    """モデル入力用に画像を縮小・メタデータ除去・再エンコード
+
+    出力は常にメタデータなしのJPEG（透過部分は白で塗りつぶす）。
+
+    Args:
+        data: 画像データ（normalize_image済み）
+        profile: ステージ別の前処理設定
+
+    Returns:
+        (JPEGデータ, 幅, 高さ)
+
+    Raises:
+        ImageProcessingError: 画像として読み込めない場合
+    """
+    try:
+        with Image.open(BytesIO(data)) as opened:
+            # JPEGは縮小率に応じてデコード自体を縮小する（大きな写真のデコード時間を削減）
+            opened.draft("RGB", (profile.max_dimension, profile.max_dimension))
+            image = opened.convert("RGBA") if opened.mode in ("P", "PA") else opened
+            if image.mode in ("RGBA", "LA"):
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+
+            if max(image.size) > profile.max_dimension:
+                image.thumbnail(
+                    (profile.max_dimension, profile.max_dimension), Image.Resampling.LANCZOS
+                )
+
+            grayscale = profile.grayscale == "always" or (
+                profile.grayscale == "auto" and is_monochrome(image)
+            )
+            image = image.convert("L" if grayscale else "RGB")
+
+            buffer = BytesIO()
+            # exif等を渡さずに保存することでメタデータを除去する
+            image.save(buffer, format="JPEG", quality=profile.jpeg_quality, optimize=True)
+            width, height = image.size
+            return buffer.getvalue(), width, height
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageProcessingError(f"画像を読み込めません: {e}") from e
+
+
+def normalize_image(
+    data: bytes | memoryview, max_dimension: int
+) -> tuple[bytes, str, int, int, bool]:
+    """画像を検証・正規化
+
+    Args:
+        data: 画像データ（fetch_image_bytesのmemoryviewをそのまま渡せる）
+        max_dimension: 長辺の上限（px）
+
+    Returns:
+        (画像データ, MIMEタイプ, 幅, 高さ, 再エンコードしたか)
+
+    Raises:
+        ImageProcessingError: 画像として読み込めない場合
+    """
+    try:
+        with Image.open(BytesIO(data)) as opened:
+            image_format = opened.format or "JPEG"
+            orientation = opened.getexif().get(ExifTags.Base.Orientation, 1)
+            rotated = orientation != 1
+            image = ImageOps.exif_transpose(opened) if rotated else opened
+            resized = max(image.size) > max_dimension
+            if resized:
+                image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            width, height = image.size
+
+            if not rotated and not resized:
+                mime_type = "image/png" if image_format == "PNG" else "image/jpeg"
+                # 遅延読み込みのためここで全体をデコードして破損を検出する
+                image.load()
+                return bytes(data), mime_type, width, height, False
+
+            buffer = BytesIO()
+            if image_format == "PNG":
+                image.save(buffer, format="PNG", optimize=True)
+                mime_type = "image/png"
+            else:
+                image.convert("RGB").save(buffer, format="JPEG", quality=_JPEG_QUALITY)
+                mime_type = "image/jpeg"
+            return buffer.getvalue(), mime_type, width, height, True
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageProcessingError(f"画像を読み込めません: {e}") from e
+
+
+async def load_review_image(
+    image_url: str,
+    max_bytes: int | None = None,
+    max_dimension: int | None = None,
+) -> ReviewImage:
+    """審査対象画像を取得して正規化
+
+    Args:
+        image_url: 画像URL（Cloud Storage/CDNのみ）
+        max_bytes: 許容する最大サイズ（超過時はImageProcessingError）
+        max_dimension: 長辺の上限（px）
+
+    Returns:
+        正規化済みの審査対象画像
+
+    Raises:
+        ImageProcessingError: URLが無効、ダウンロード失敗、サイズ超過、または画像として無効な場合
+    """
+    limit = max_bytes if max_bytes is not None else settings.review_image_max_bytes
+    dimension = max_dimension if max_dimension is not None else settings.review_image_max_dimension
+    url = to_download_url(validate_image_url(image_url))
+
+    original = await fetch_image_bytes(url, limit)
+
+    # デコード・縮小はCPU処理のためイベントループをブロックしないようスレッドで実行
+    data, mime_type, width, height, normalized = await asyncio.to_thread(
+        normalize_image, original, dimension
+    )
+    image = ReviewImage(
+        source_url=image_url,
+        data=data,
+        mime_type=mime_type,
+        width=width,
+        height=height,
+        sha256=hashlib.sha256(original).hexdigest(),
+        original_size=original.nbytes,
+        normalized=normalized,
+    )
+    logger.info(
+        "review_image_loaded",
+        original_size=image.original_size,
+        size=len(image.data),
+        width=width,
+        height=height,
+        normalized=normalized,
+    )
+    return image
+
+
+async def prepare_stage_image(image: ReviewImage, stage: ImageStage) -> ReviewImage:
+    """ステージ用に前処理した画像を取得
+
+    前処理に失敗した場合は正規化済みの画像をそのまま返す（審査処理は止めない）。
+
+    Args:
+        image: 正規化済みの審査対象画像
+        stage: ステージ名
+
+    Returns:
+        前処理済みの画像
+    """
+    if not settings.stage_image_preprocess_enabled:
+        return image
+    started = time.perf_counter()
+    try:
+        prepared = await asyncio.to_thread(image.for_stage, stage_profile(stage))
+    except ImageProcessingError as e:
+        logger.warning("stage_image_preprocess_failed", stage=stage, error=str(e))
+        return image
+    logger.info(
+        "stage_image_prepared",
+        stage=stage,
+        size=len(image.data),
+        prepared_size=len(prepared.data),
+        width=prepared.width,
+        height=prepared.height,
+        duration_seconds=round(time.perf_counter() - started, 4),
+    )
+    return prepared
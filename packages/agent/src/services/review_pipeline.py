@@ -0,0 +1,208 @@
+"""レビュー画像生成パイプライン
+
+アノテーション画像生成とお手本画像生成の実行順序を制御する。
+
+- 逐次モード: アノテーション完了後に、その画像も使ってお手本画像生成を開始（従来の動作）
+- パイプラインモード: アノテーションの完了と期限（annotation_deadline_seconds）の
+  早い方でお手本画像生成を開始する。期限内に完了したアノテーションのみ利用し、
+  間に合わない場合は元画像のみで生成する（アノテーションはその間も並行して続く）。
+  アノテーションが遅い場合でも、待ち時間は期限で打ち切られる。
+
+各ステージの所要時間を記録し（ステージ別メトリクスにも出力）、両モードのレイテンシを
+比較できるようにする。
+"""
+
+import asyncio
+import time
+
+import structlog
+from pydantic import BaseModel, Field
+
+from src.config import settings
+from src.models.feedback import DessinAnalysis
+from src.models.rank import UserRank
+from src.services.annotation_service import AnnotationService, get_annotation_service
+from src.services.image_generation_service import (
+    ImageGenerationService,
+    get_image_generation_service,
+)
+from src.services.review_image import ReviewImage, prepare_stage_image
+from src.services.stage_metrics import get_stage_metrics
+
+logger = structlog.get_logger()
+
+
+class ImageStagesResult(BaseModel):
+    """画像生成ステージの実行結果"""
+
+    mode: str = Field(..., description="実行モード（sequential / pipelined）")
+    annotated_image_url: str | None = Field(default=None, description="アノテーション画像のURL")
+    annotation_used_for_example: bool = Field(
+        default=False, description="お手本画像生成にアノテーション画像を使用したか"
+    )
+    example_image_error: str | None = Field(
+        default=None, description="お手本画像生成リクエスト失敗時のエラー"
+    )
+    stage_seconds: dict[str, float] = Field(
+        default_factory=dict, description="ステージ別の所要時間（秒）"
+    )
+
+
+async def run_image_stages(
+    task_id: str,
+    user_id: str,
+    image_url: str,
+    analysis: DessinAnalysis,
+    user_rank: UserRank,
+    image: ReviewImage | None = None,
+    pipelined: bool | None = None,
+    annotation_deadline_seconds: float | None = None,
+    annotation_service: AnnotationService | None = None,
+    image_generation_service: ImageGenerationService | None = None,
+) -> ImageStagesResult:
+    """アノテーション画像とお手本画像の生成を実行
+
+    アノテーション生成の失敗は致命的ではなく、お手本画像は元画像のみで生成する。
+    お手本画像生成リクエストの失敗は例外を送出せず、結果の example_image_error に格納する。
+
+    Args:
+        task_id: タスクID
+        user_id: ユーザーID
+        image_url: 元画像のURL
+        analysis: デッサン分析結果
+        user_rank: ユーザーランク情報
+        image: 取得済みの元画像（指定時はステージ別に前処理してインラインで渡す）
+        pipelined: パイプラインモードで実行するか（未指定時は設定値）
+        annotation_deadline_seconds: アノテーション結果を待つ期限（未指定時は設定値）
+        annotation_service: AnnotationService（テスト用にDI可能）
+        image_generation_service: ImageGenerationService（テスト用にDI可能）
+
+    Returns:
+        画像生成ステージの実行結果
+    """
+    if pipelined is None:
+        pipelined = settings.review_pipeline_enabled
+    if annotation_deadline_seconds is None:
+        annotation_deadline_seconds = settings.annotation_deadline_seconds
+    annotation_service = annotation_service or get_annotation_service()
+    image_generation_service = image_generation_service or get_image_generation_service()
+
+    result = ImageStagesResult(mode="pipelined" if pipelined else "sequential")
+    metrics = get_stage_metrics()
+    started_at = time.perf_counter()
+
+    # ステージごとに必要な解像度へ縮小・再エンコードした画像を並行して用意する
+    annotation_image = example_image = image
+    if image is not None:
+        annotation_image, example_image = await asyncio.gather(
+            prepare_stage_image(image, "annotation"),
+            prepare_stage_image(image, "example_image"),
+        )
+
+    def finish_stage(stage: str, stage_started_at: float, ok: bool) -> None:
+        elapsed = time.perf_counter() - stage_started_at
+        result.stage_seconds[stage] = elapsed
+        metrics.record(stage, task_id, elapsed, outcome="ok" if ok else "error", mode=result.mode)
+
+    async def annotate() -> str | None:
+        stage_started_at = time.perf_counter()
+        annotated_image_url: str | None = None
+        try:
+            logger.info("annotation_generation_request_started", task_id=task_id)
+            annotated_image_url = await annotation_service.generate_annotated_image(
+                task_id=task_id,
+                original_image_url=image_url,
+                analysis=analysis,
+                user_rank=user_rank,
+                motif_tags=analysis.tags,
+                image=annotation_image,
+            )
+            if annotated_image_url:
+                logger.info(
+                    "annotation_generation_completed",
+                    task_id=task_id,
+                    annotated_image_url=annotated_image_url,
+                )
+            else:
+                logger.warning("annotation_generation_returned_none", task_id=task_id)
+            return annotated_image_url
+        except Exception as e:
+            logger.error(
+                "annotation_generation_request_failed",
+                task_id=task_id,
+                error=str(e),
+            )
+            return None
+        finally:
+            finish_stage("annotation", stage_started_at, annotated_image_url is not None)
+
+    async def generate_example(annotated_image_url: str | None) -> None:
+        stage_started_at = time.perf_counter()
+        try:
+            logger.info(
+                "example_image_generation_request_started",
+                task_id=task_id,
+                has_annotated_image=bool(annotated_image_url),
+            )
+            await image_generation_service.generate_example_image(
+                task_id=task_id,
+                user_id=user_id,
+                original_image_url=image_url,
+                analysis=analysis,
+                motif_tags=analysis.tags,
+                annotated_image_url=annotated_image_url,
+                image=example_image,
+            )
+            logger.info("example_image_generation_request_completed", task_id=task_id)
+        except Exception as e:
+            logger.error(
+                "example_image_generation_request_failed",
+                task_id=task_id,
+                error=str(e),
+            )
+            result.example_image_error = str(e)
+        finally:
+            finish_stage("example_image", stage_started_at, result.example_image_error is None)
+
+    if pipelined:
+        annotation_task = asyncio.create_task(annotate())
+        wait_started_at = time.perf_counter()
+        done, _ = await asyncio.wait({annotation_task}, timeout=annotation_deadline_seconds)
+        finish_stage("annotation_wait", wait_started_at, annotation_task in done)
+
+        annotated_for_example: str | None = None
+        if annotation_task in done:
+            annotated_for_example = annotation_task.result()
+        else:
+            logger.warning(
+                "annotation_deadline_exceeded",
+                task_id=task_id,
+                deadline_seconds=annotation_deadline_seconds,
+            )
+
+        await generate_example(annotated_for_example)
+        # お手本画像生成の間もアノテーションは並行して進む。
+        # 期限超過したアノテーションもCloud Function側で保存されるため完了まで待つ
+        result.annotated_image_url = await annotation_task
+        result.annotation_used_for_example = annotated_for_example is not None
+    else:
+        result.annotated_image_url = await annotate()
+        await generate_example(result.annotated_image_url)
+        result.annotation_used_for_example = result.annotated_image_url is not None
+
+    result.stage_seconds["total"] = time.perf_counter() - started_at
+    metrics.record(
+        "image_stages",
+        task_id,
+        result.stage_seconds["total"],
+        outcome="ok" if result.example_image_error is None else "error",
+        mode=result.mode,
+    )
+    logger.info(
+        "review_image_stages_completed",
+        task_id=task_id,
+        mode=result.mode,
+        annotation_used_for_example=result.annotation_used_for_example,
+        stage_seconds={k: round(v, 3) for k, v in result.stage_seconds.items()},
+    )
+    return result
@@ -0,0 +1,135 @@
+"""審査処理のプロセス内ワーカープール
+
+Cloud Tasksへの投入に失敗した審査を、APIリクエストの完了を待たせずに
+バックグラウンドで処理するための上限付きワーカープール。
+
+- 同時に処理する審査は review_fallback_workers 件まで
+- 処理待ちが review_fallback_max_pending 件に達している場合は受け付けない（呼び出し側で503を返す）
+- 処理待ちの審査はFirestore上でpendingのまま残り、処理中に中断された審査は
+  ジョブ側でpendingに戻す（reviews.submit_review_to_worker）。クラッシュでprocessingのまま
+  残った審査も含め、起動時の再投入（recover_pending_reviews）で回復する
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import structlog
+from pydantic import BaseModel
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+ReviewJob = Callable[[], Awaitable[None]]
+
+
+class ReviewWorkerPoolStats(BaseModel):
+    """ワーカープールの状態"""
+
+    workers: int
+    pending: int
+    max_pending: int
+    running: int
+    rejected: int
+
+
+class ReviewWorkerPool:
+    """上限付きの非同期ワーカープール"""
+
+    def __init__(self, workers: int | None = None, max_pending: int | None = None) -> None:
+        """初期化（ワーカーは初回の投入時に実行中のイベントループで起動）
+
+        Args:
+            workers: ワーカー数（同時に処理する審査の数）
+            max_pending: 処理待ちの上限
+        """
+        self._workers = workers if workers is not None else settings.review_fallback_workers
+        self._max_pending = (
+            max_pending if max_pending is not None else settings.review_fallback_max_pending
+        )
+        self._queue: asyncio.Queue[tuple[str, ReviewJob]] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+        self._running = 0
+        self._rejected = 0
+
+    def submit(self, task_id: str, job: ReviewJob) -> bool:
+        """審査の処理を投入（処理の完了を待たずに返る）
+
+        Args:
+            task_id: タスクID（ログ用）
+            job: 審査を処理するコルーチン関数
+
+        Returns:
+            受け付けた場合True。処理待ちが上限に達している場合False
+        """
+        queue = self._ensure_started()
+        try:
+            queue.put_nowait((task_id, job))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            logger.warning(
+                "review_worker_pool_saturated",
+                task_id=task_id,
+                pending=queue.qsize(),
+                running=self._running,
+            )
+            return False
+
+        logger.info("review_worker_pool_submitted", task_id=task_id, pending=queue.qsize())
+        return True
+
+    async def join(self) -> None:
+        """投入済みの審査がすべて完了するまで待つ"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """ワーカーを停止（処理中のジョブはキャンセルし、ジョブの後処理の完了を待つ）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> ReviewWorkerPoolStats:
+        """ワーカープールの状態を取得"""
+        return ReviewWorkerPoolStats(
+            workers=self._workers,
+            pending=self._queue.qsize() if self._queue is not None else 0,
+            max_pending=self._max_pending,
+            running=self._running,
+            rejected=self._rejected,
+        )
+
+    def _ensure_started(self) -> asyncio.Queue[tuple[str, ReviewJob]]:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+            self._tasks = [
+                asyncio.create_task(self._run(self._queue), name=f"review-worker-{i}")
+                for i in range(self._workers)
+            ]
+        return self._queue
+
+    async def _run(self, queue: asyncio.Queue[tuple[str, ReviewJob]]) -> None:
+        while True:
+            task_id, job = await queue.get()
+            self._running += 1
+            try:
+                await job()
+            except Exception as e:
+                logger.error("review_worker_job_failed", task_id=task_id, error=str(e))
+            finally:
+                self._running -= 1
+                queue.task_done()
+
+
+# シングルトンインスタンス
+_review_worker_pool: ReviewWorkerPool | None = None
+
+
+def get_review_worker_pool() -> ReviewWorkerPool:
+    """ReviewWorkerPoolのシングルトンインスタンスを取得"""
+    global _review_worker_pool
+    if _review_worker_pool is None:
+        _review_worker_pool = ReviewWorkerPool()
+    return _review_worker_pool
@@ -0,0 +1,223 @@
+"""審査パイプラインのステージ別レイテンシ計測
+
+審査1件（30〜90秒）の内訳（キュー待ち・ランク取得・Agent Engine・フィードバック生成・
+アノテーション・お手本画像生成・完了通知など）を task_id 単位で記録する。
+
+- ヒストグラム: ステージ・結果（ok / error）別に集計し、Prometheusテキスト形式で出力する
+- スパン: 1ステージ1件の計測結果を登録済みのエクスポーターに渡す
+- ログ: 各スパンを ``stage_completed`` イベントとして構造化ログに出力する
+  （Cloud Functions側も同じイベント名で出力し、ログベースの分布指標で横断集計できる）
+
+テストでは InMemorySpanExporter を登録して記録内容を検証する。
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Protocol
+
+import structlog
+from pydantic import BaseModel, Field
+
+logger = structlog.get_logger()
+
+# ヒストグラムのバケット上限（秒）。Gemini呼び出しを含むため数十秒まで確保する
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 90.0, 120.0,
+)
+
+# Prometheusのメトリクス名
+METRIC_NAME = "review_stage_duration_seconds"
+
+AttributeValue = str | int | float | bool
+
+
+class StageSpan(BaseModel):
+    """1ステージの計測結果"""
+
+    task_id: str = Field(..., description="タスクID（相関キー）")
+    stage: str = Field(..., description="ステージ名")
+    outcome: str = Field(default="ok", description="結果（ok / error）")
+    started_at: float = Field(..., description="開始時刻（UNIX秒）")
+    duration_seconds: float = Field(..., description="所要時間（秒）")
+    attributes: dict[str, AttributeValue] = Field(
+        default_factory=dict, description="追加属性"
+    )
+
+
+class SpanExporter(Protocol):
+    """スパンのエクスポーター"""
+
+    def export(self, span: StageSpan) -> None:
+        """スパンを出力"""
+        ...
+
+
+class InMemorySpanExporter:
+    """スパンをメモリに保持するエクスポーター（テスト・ローカル確認用）"""
+
+    def __init__(self) -> None:
+        self.spans: list[StageSpan] = []
+
+    def export(self, span: StageSpan) -> None:
+        """スパンを保持"""
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        """保持しているスパンを破棄"""
+        self.spans.clear()
+
+    def stages(self, task_id: str) -> list[str]:
+        """指定タスクのステージ名を記録順に取得"""
+        return [span.stage for span in self.spans if span.task_id == task_id]
+
+
+class _Histogram:
+    """累積バケット付きヒストグラム"""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, buckets: tuple[float, ...], value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(buckets):
+            if value <= upper:
+                self.bucket_counts[i] += 1
+
+
+class StageMetrics:
+    """ステージ別レイテンシの計測・集計"""
+
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        log_spans: bool = True,
+    ) -> None:
+        """初期化
+
+        Args:
+            buckets: ヒストグラムのバケット上限（秒、昇順）
+            log_spans: スパンを構造化ログに出力するか
+        """
+        self._buckets = tuple(sorted(buckets))
+        self._log_spans = log_spans
+        self._histograms: dict[tuple[str, str], _Histogram] = {}
+        self._exporters: list[SpanExporter] = []
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        """エクスポーターを登録"""
+        self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: SpanExporter) -> None:
+        """エクスポーターの登録を解除"""
+        if exporter in self._exporters:
+            self._exporters.remove(exporter)
+
+    def record(
+        self,
+        stage: str,
+        task_id: str,
+        duration_seconds: float,
+        outcome: str = "ok",
+        started_at: float | None = None,
+        **attributes: AttributeValue,
+    ) -> StageSpan:
+        """計測済みの所要時間を記録（キュー待ちなど外部で計測した値用）
+
+        Returns:
+            記録したスパン
+        """
+        span = StageSpan(
+            task_id=task_id,
+            stage=stage,
+            outcome=outcome,
+            started_at=started_at if started_at is not None else time.time() - duration_seconds,
+            duration_seconds=max(duration_seconds, 0.0),
+            attributes=attributes,
+        )
+
+        key = (stage, outcome)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram(self._buckets)
+        histogram.observe(self._buckets, span.duration_seconds)
+
+        if self._log_spans:
+            logger.info(
+                "stage_completed",
+                task_id=task_id,
+                stage=stage,
+                outcome=outcome,
+                duration_seconds=round(span.duration_seconds, 4),
+                **attributes,
+            )
+        for exporter in self._exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                # 計測の失敗で審査処理を止めない
+                logger.warning("stage_span_export_failed", stage=stage, error=str(e))
+        return span
+
+    @contextmanager
+    def stage(self, stage: str, task_id: str, **attributes: AttributeValue) -> Iterator[None]:
+        """ブロックの所要時間をステージとして記録
+
+        例外が発生した場合は outcome=error として記録し、例外はそのまま送出する。
+
+        Args:
+            stage: ステージ名
+            task_id: タスクID
+            **attributes: 追加属性
+        """
+        started_at = time.time()
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.record(
+                stage,
+                task_id,
+                time.perf_counter() - started,
+                outcome=outcome,
+                started_at=started_at,
+                **attributes,
+            )
+
+    def reset(self) -> None:
+        """集計値を破棄"""
+        self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheusテキスト形式で出力"""
+        lines = [
+            f"# HELP {METRIC_NAME} Review pipeline stage latency in seconds.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for (stage, outcome), histogram in sorted(self._histograms.items()):
+            labels = f'stage="{stage}",outcome="{outcome}"'
+            for upper, count in zip(self._buckets, histogram.bucket_counts, strict=True):
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{upper:g}"}} {count}')
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# シングルトンインスタンス
+_stage_metrics: StageMetrics | None = None
+
+
+def get_stage_metrics() -> StageMetrics:
+    """StageMetricsのシングルトンインスタンスを取得"""
+    global _stage_metrics
+    if _stage_metrics is None:
+        _stage_metrics = StageMetrics()
+    return _stage_metrics
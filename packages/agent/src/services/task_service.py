@@ -1,21 +1,67 @@
 """タスク管理サービス
 
 Firestoreを使ったタスクのCRUD操作を提供する。
+FastAPIのイベントループをブロックしないよう、非同期クライアント（firestore.AsyncClient）を使用する。
 """
 
+import asyncio
+import base64
+import binascii
+import json
 import uuid
-from collections.abc import Sequence
+from collections.abc import Callable
 from datetime import datetime
+from typing import cast
 
 import structlog
 from google.cloud import firestore
+from google.cloud.firestore_v1.async_aggregation import AsyncAggregationQuery
+from google.cloud.firestore_v1.field_path import FieldPath
 
 from src.config import settings
-from src.exceptions import TaskNotFoundError
-from src.models.task import ReviewTask, TaskStatus
+from src.exceptions import InvalidCursorError, TaskNotFoundError
+from src.models.task import ReviewTask, ReviewTaskPage, TaskStatus
 
 logger = structlog.get_logger()
 
+# 一覧表示用の射影（サイズの大きいfeedbackを除く）
+SUMMARY_FIELDS = [
+    "task_id",
+    "user_id",
+    "status",
+    "image_url",
+    "annotated_image_url",
+    "example_image_url",
+    "score",
+    "tags",
+    "rank_at_review",
+    "rank_changed",
+    "error_message",
+    "created_at",
+    "updated_at",
+]
+
+
+def _encode_cursor(created_at: object, task_id: str) -> str:
+    """ページネーションカーソルを作成（created_atとドキュメントIDの不透明な文字列）"""
+    if not isinstance(created_at, datetime):
+        raise InvalidCursorError("created_at is missing")
+    payload = json.dumps({"c": created_at.isoformat(), "id": task_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict[str, object]:
+    """カーソルをstart_after用のフィールド値に変換"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return {
+            "created_at": datetime.fromisoformat(payload["c"]),
+            FieldPath.document_id(): str(payload["id"]),
+        }
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
 
 class TaskService:
     """タスク管理サービス
@@ -25,14 +71,14 @@ class TaskService:
 
     COLLECTION_NAME = "review_tasks"
 
-    def __init__(self, db: firestore.Client | None = None) -> None:
+    def __init__(self, db: firestore.AsyncClient | None = None) -> None:
         """初期化
 
         Args:
-            db: Firestoreクライアント（テスト用にDI可能）
+            db: 非同期Firestoreクライアント（テスト用にDI可能）
         """
         if db is None:
-            self._db = firestore.Client(
+            self._db = firestore.AsyncClient(
                 project=settings.gcp_project_id,
                 database=settings.firestore_database,
             )
@@ -40,7 +86,7 @@ class TaskService:
             self._db = db
         self._collection = self._db.collection(self.COLLECTION_NAME)
 
-    def create_task(
+    async def create_task(
         self,
         user_id: str,
         image_url: str,
@@ -74,7 +120,7 @@ class TaskService:
 
         # Firestoreに保存
         doc_ref = self._collection.document(task_id)
-        doc_ref.set(self._task_to_dict(task))
+        await doc_ref.set(self._task_to_dict(task))
 
         logger.info(
             "task_created",
@@ -84,7 +130,7 @@ class TaskService:
 
         return task
 
-    def get_task(self, task_id: str) -> ReviewTask | None:
+    async def get_task(self, task_id: str) -> ReviewTask | None:
         """タスクを取得
 
         Args:
@@ -94,14 +140,14 @@ class TaskService:
             ReviewTask または None
         """
         doc_ref = self._collection.document(task_id)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
 
         if not doc.exists:
             return None
 
         return self._dict_to_task(doc.to_dict())
 
-    def list_tasks(
+    async def list_tasks(
         self,
         user_id: str,
         limit: int = 20,
@@ -123,6 +169,51 @@ class TaskService:
         Returns:
             ReviewTaskのリスト
         """
+        page = await self.list_tasks_page(
+            user_id=user_id,
+            limit=limit,
+            start_date=start_date,
+            end_date=end_date,
+            status=status,
+            tag=tag,
+            include_feedback=True,
+            include_total=False,
+        )
+        return page.tasks
+
+    async def list_tasks_page(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: str | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        status: str | None = None,
+        tag: str | None = None,
+        include_feedback: bool = False,
+        include_total: bool = True,
+    ) -> ReviewTaskPage:
+        """ユーザーのタスク一覧をカーソルページネーションで取得
+
+        created_at（降順）とドキュメントIDで並べ、カーソル以降のlimit件を返す。
+
+        Args:
+            user_id: ユーザーID
+            limit: 取得件数の上限
+            cursor: 前ページのnext_cursor（先頭ページはNone）
+            start_date: 検索開始日時
+            end_date: 検索終了日時
+            status: ステータスフィルタ
+            tag: タグフィルタ
+            include_feedback: Falseの場合、サイズの大きいfeedbackを取得しない（一覧表示用）
+            include_total: Trueの場合、集計クエリで条件に一致する総件数を取得する
+
+        Returns:
+            ReviewTaskPage
+
+        Raises:
+            InvalidCursorError: カーソルが不正な場合
+        """
         query = self._collection.where("user_id", "==", user_id)
 
         if status:
@@ -137,19 +228,158 @@ class TaskService:
         if end_date:
             query = query.where("created_at", "<=", end_date)
 
-        query = query.order_by("created_at", direction=firestore.Query.DESCENDING).limit(limit)
+        query = query.order_by("created_at", direction=firestore.Query.DESCENDING).order_by(
+            FieldPath.document_id(), direction=firestore.Query.DESCENDING
+        )
 
-        docs: Sequence[firestore.DocumentSnapshot] = query.stream()
-        tasks: list[ReviewTask] = []
+        # 総件数はページ取得と並行して集計クエリで取得する
+        count_task: asyncio.Task[int] | None = None
+        if include_total:
+            count_task = asyncio.create_task(self._count(query))
+
+        page_query = query
+        if cursor:
+            page_query = page_query.start_after(_decode_cursor(cursor))
+        if not include_feedback:
+            page_query = page_query.select(SUMMARY_FIELDS)
+        # 次ページの有無を判定するため1件多く取得
+        page_query = page_query.limit(limit + 1)
+
+        rows: list[tuple[str, dict[str, object]]] = []
+        try:
+            async for doc in page_query.stream():
+                doc_dict = doc.to_dict()
+                if doc_dict is not None:
+                    rows.append((doc.id, doc_dict))
+        except BaseException:
+            if count_task is not None:
+                count_task.cancel()
+            raise
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        tasks = [self._dict_to_task({**data, "task_id": doc_id}) for doc_id, data in rows]
+
+        next_cursor: str | None = None
+        if has_more and rows:
+            last_id, last_data = rows[-1]
+            next_cursor = _encode_cursor(last_data.get("created_at"), last_id)
+
+        total_count = await count_task if count_task is not None else None
+
+        return ReviewTaskPage(tasks=tasks, next_cursor=next_cursor, total_count=total_count)
+
+    async def _count(self, query: firestore.AsyncQuery) -> int:
+        """集計クエリで件数を取得（ドキュメント本体は転送しない）"""
+        # SDKの型定義ではcount()の戻り値がType[AsyncAggregationQuery]になっているため、
+        # 実際に返るインスタンスの型に揃える
+        aggregation_query = cast(AsyncAggregationQuery, query.count(alias="total"))
+        results = await aggregation_query.get()
+        for result in results:
+            for aggregation in result:
+                return int(aggregation.value)
+        return 0
+
+    async def list_stale_pending_tasks(
+        self,
+        created_before: datetime,
+        limit: int = 50,
+    ) -> list[ReviewTask]:
+        """処理が始まらないまま残っているpendingのタスクを取得（作成日時の古い順）
 
-        for doc in docs:
-            doc_dict = doc.to_dict()
-            if doc_dict is not None:
-                tasks.append(self._dict_to_task(doc_dict))
+        Args:
+            created_before: この日時以前に作成されたタスクを対象とする
+            limit: 取得件数の上限
 
-        return tasks
+        Returns:
+            ReviewTaskのリスト
+        """
+        query = (
+            self._collection.where("status", "==", TaskStatus.PENDING.value)
+            .where("created_at", "<=", created_before)
+            .order_by("created_at")
+            .limit(limit)
+        )
+        return [
+            self._dict_to_task({**data, "task_id": doc.id})
+            async for doc in query.stream()
+            if (data := doc.to_dict()) is not None
+        ]
 
-    def update_task_status(
+    async def list_stale_processing_tasks(
+        self,
+        updated_before: datetime,
+        limit: int = 50,
+    ) -> list[ReviewTask]:
+        """処理中のまま更新が途絶えているprocessingのタスクを取得（更新日時の古い順）
+
+        処理中にプロセスが終了・クラッシュした審査が対象。
+
+        Args:
+            updated_before: この日時以前に更新されたタスクを対象とする
+            limit: 取得件数の上限
+
+        Returns:
+            ReviewTaskのリスト
+        """
+        query = (
+            self._collection.where("status", "==", TaskStatus.PROCESSING.value)
+            .where("updated_at", "<=", updated_before)
+            .order_by("updated_at")
+            .limit(limit)
+        )
+        return [
+            self._dict_to_task({**data, "task_id": doc.id})
+            async for doc in query.stream()
+            if (data := doc.to_dict()) is not None
+        ]
+
+    async def claim_pending_task(
+        self,
+        task_id: str,
+        stale_before: datetime | None = None,
+    ) -> bool:
+        """pendingのタスクをトランザクションでprocessingに更新（複数インスタンスでの重複処理防止）
+
+        Args:
+            task_id: タスクID
+            stale_before: 指定した場合、この日時以前から更新のないprocessingのタスクも確保する
+                （処理中に中断された審査の再処理用）
+
+        Returns:
+            更新できた場合True。タスクが存在しない・確保できる状態でない場合False
+        """
+        doc_ref = self._collection.document(task_id)
+        transaction = self._db.transaction()
+        claim_in_transaction = firestore.async_transactional(self._claim_in_transaction)
+        return await claim_in_transaction(transaction, doc_ref, stale_before)
+
+    async def _claim_in_transaction(
+        self,
+        transaction: firestore.AsyncTransaction,
+        doc_ref: firestore.AsyncDocumentReference,
+        stale_before: datetime | None,
+    ) -> bool:
+        doc = await doc_ref.get(transaction=transaction)
+        if not doc.exists:
+            return False
+        status = doc.get("status")
+        if status == TaskStatus.PROCESSING.value and stale_before is not None:
+            updated_at = doc.get("updated_at")
+            if hasattr(updated_at, "timestamp"):
+                updated_at = datetime.fromtimestamp(updated_at.timestamp())
+            # 確認後に処理が再開・更新されていれば確保しない
+            if not isinstance(updated_at, datetime) or updated_at > stale_before:
+                return False
+        elif status != TaskStatus.PENDING.value:
+            return False
+        transaction.update(
+            doc_ref,
+            {"status": TaskStatus.PROCESSING.value, "updated_at": datetime.now()},
+        )
+        return True
+
+    async def update_task_status(
         self,
         task_id: str,
         status: TaskStatus,
@@ -171,57 +401,57 @@ class TaskService:
             tags: モチーフタグ
             error_message: エラーメッセージ
             example_image_url: お手本画像のURL
+            annotated_image_url: アノテーション画像のURL
+            rank_changed: ランクが変動したか
 
         Returns:
-            更新されたReviewTask
+            更新されたReviewTask（書き込み後の再読み込みは行わずローカルでマージした結果）
 
         Raises:
             TaskNotFoundError: タスクが見つからない場合
         """
-        doc_ref = self._collection.document(task_id)
-        doc = doc_ref.get()
+        updater = await self.begin_update(task_id)
+        return await updater.update_status(
+            status,
+            feedback=feedback,
+            score=score,
+            tags=tags,
+            error_message=error_message,
+            example_image_url=example_image_url,
+            annotated_image_url=annotated_image_url,
+            rank_changed=rank_changed,
+            flush=True,
+        )
 
-        if not doc.exists:
-            raise TaskNotFoundError(f"Task not found: {task_id}")
+    async def begin_update(self, task_id: str) -> "TaskStateUpdater":
+        """タスクの書き込み集約用アップデーターを作成
 
-        now = datetime.now()
-        update_data: dict[str, object] = {
-            "status": status.value,
-            "updated_at": now,
-        }
+        タスクを1回だけ読み込み、以降の更新はローカルでマージして
+        flush()時にまとめて書き込む。
 
-        if feedback is not None:
-            update_data["feedback"] = feedback
-        if score is not None:
-            update_data["score"] = score
-        if tags is not None:
-            update_data["tags"] = tags
-        if error_message is not None:
-            update_data["error_message"] = error_message
-        if example_image_url is not None:
-            update_data["example_image_url"] = example_image_url
-        if annotated_image_url is not None:
-            update_data["annotated_image_url"] = annotated_image_url
-        if rank_changed is not None:
-            update_data["rank_changed"] = rank_changed
+        Args:
+            task_id: タスクID
 
-        doc_ref.update(update_data)
+        Returns:
+            TaskStateUpdater
 
-        logger.info(
-            "task_updated",
-            task_id=task_id,
-            status=status.value,
-        )
+        Raises:
+            TaskNotFoundError: タスクが見つからない場合
+        """
+        doc_ref = self._collection.document(task_id)
+        doc = await doc_ref.get()
 
-        # 更新後のタスクを取得して返す
-        updated_doc = doc_ref.get()
-        updated_dict = updated_doc.to_dict()
-        if updated_dict is None:
-            raise TaskNotFoundError(f"Task not found after update: {task_id}")
+        if not doc.exists:
+            raise TaskNotFoundError(f"Task not found: {task_id}")
 
-        return self._dict_to_task(updated_dict)
+        return TaskStateUpdater(
+            task_id=task_id,
+            doc_ref=doc_ref,
+            snapshot=doc.to_dict() or {},
+            to_task=self._dict_to_task,
+        )
 
-    def delete_task(self, task_id: str) -> bool:
+    async def delete_task(self, task_id: str) -> bool:
         """タスクを削除
 
         Args:
@@ -231,12 +461,12 @@ class TaskService:
             削除成功した場合True
         """
         doc_ref = self._collection.document(task_id)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
 
         if not doc.exists:
             return False
 
-        doc_ref.delete()
+        await doc_ref.delete()
 
         logger.info(
             "task_deleted",
@@ -424,6 +654,123 @@ class TaskService:
         }
 
 
+class TaskStateUpdater:
+    """タスク状態の書き込み集約アップデーター
+
+    1件のレビュー処理中に発生する中間更新をローカルでマージし、
+    flush()が呼ばれたステージ境界でのみFirestoreへ書き込む。
+    返却するReviewTaskは書き込み後の再読み込みを行わず、
+    読み込み時のスナップショットとローカルの更新内容から構築する。
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        doc_ref: firestore.AsyncDocumentReference,
+        snapshot: dict[str, object],
+        to_task: Callable[[dict[str, object]], ReviewTask],
+    ) -> None:
+        """初期化
+
+        Args:
+            task_id: タスクID
+            doc_ref: タスクドキュメントの参照
+            snapshot: 読み込み時のドキュメント内容
+            to_task: dictからReviewTaskへの変換関数
+        """
+        self._task_id = task_id
+        self._doc_ref = doc_ref
+        self._state = dict(snapshot)
+        self._pending: dict[str, object] = {}
+        self._to_task = to_task
+
+    @property
+    def task_id(self) -> str:
+        """タスクID"""
+        return self._task_id
+
+    @property
+    def has_pending(self) -> bool:
+        """未書き込みの更新があるか"""
+        return bool(self._pending)
+
+    @property
+    def task(self) -> ReviewTask:
+        """ローカルでマージ済みの現在のタスク状態"""
+        return self._to_task(self._state)
+
+    async def update_status(
+        self,
+        status: TaskStatus,
+        feedback: dict[str, object] | None = None,
+        score: float | None = None,
+        tags: list[str] | None = None,
+        error_message: str | None = None,
+        example_image_url: str | None = None,
+        annotated_image_url: str | None = None,
+        rank_changed: bool | None = None,
+        flush: bool = False,
+    ) -> ReviewTask:
+        """タスクステータスの更新をマージ
+
+        Args:
+            status: 新しいステータス
+            feedback: フィードバックデータ
+            score: 総合スコア
+            tags: モチーフタグ
+            error_message: エラーメッセージ
+            example_image_url: お手本画像のURL
+            annotated_image_url: アノテーション画像のURL
+            rank_changed: ランクが変動したか
+            flush: Trueの場合、マージ後に即座に書き込む
+
+        Returns:
+            ローカルでマージした更新後のReviewTask
+        """
+        update_data: dict[str, object] = {
+            "status": status.value,
+            "updated_at": datetime.now(),
+        }
+
+        if feedback is not None:
+            update_data["feedback"] = feedback
+        if score is not None:
+            update_data["score"] = score
+        if tags is not None:
+            update_data["tags"] = tags
+        if error_message is not None:
+            update_data["error_message"] = error_message
+        if example_image_url is not None:
+            update_data["example_image_url"] = example_image_url
+        if annotated_image_url is not None:
+            update_data["annotated_image_url"] = annotated_image_url
+        if rank_changed is not None:
+            update_data["rank_changed"] = rank_changed
+
+        self._pending.update(update_data)
+        self._state.update(update_data)
+
+        if flush:
+            await self.flush()
+
+        return self.task
+
+    async def flush(self) -> None:
+        """未書き込みの更新を1回のupdate()でFirestoreに書き込む"""
+        if not self._pending:
+            return
+
+        await self._doc_ref.update(self._pending)
+
+        logger.info(
+            "task_updated",
+            task_id=self._task_id,
+            status=self._pending.get("status"),
+            fields=sorted(self._pending.keys()),
+        )
+        self._pending = {}
+
+
 # シングルトンインスタンス
 _task_service: TaskService | None = None
 
@@ -3,6 +3,8 @@
 ADKエージェントが使用するツール関数を定義。
 """
 
+from functools import lru_cache
+
 import structlog
 from google import genai
 from google.genai import types
@@ -19,6 +21,16 @@ from src.utils.validation import sanitize_for_storage, validate_image_url
 logger = structlog.get_logger()
 
 
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """Gemini呼び出し用クライアントを取得（ツール呼び出し間で共有）"""
+    return genai.Client(
+        vertexai=True,
+        project=settings.gcp_project_id,
+        location=settings.gcp_region,
+    )
+
+
 def _convert_to_gcs_uri(url: str) -> str:
     """HTTPS URLをGCS URI形式に変換
 
@@ -93,12 +105,8 @@ def analyze_dessin_image(image_url: str, rank_label: str = "初学者") -> dict[
         # https:// URLをgs:// URIに変換（Vertex AIがGCSに直接アクセスできるように）
         gcs_uri = _convert_to_gcs_uri(validated_url)
 
-        # Gemini クライアント初期化
-        client = genai.Client(
-            vertexai=True,
-            project=settings.gcp_project_id,
-            location=settings.gcp_region,
-        )
+        # Gemini クライアント取得（プロセス内で共有）
+        client = get_genai_client()
 
         # MIMEタイプを判定
         mime_type = "image/jpeg"
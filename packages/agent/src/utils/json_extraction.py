@@ -0,0 +1,66 @@
+"""テキストからのJSON抽出ユーティリティ
+
+エージェントの応答テキスト（markdown code blockや前後の説明文を含む場合がある）から
+JSONオブジェクトを取り出す。
+
+``{`` の位置から括弧の対応が取れる範囲を1回の走査で求め、その範囲だけをJSONとしてデコードするため、
+code blockの形式ごとに正規表現を試す必要がない。デコードに失敗した範囲の内側は候補にしないので、
+不正な外側のオブジェクトに含まれる入れ子のオブジェクトを誤って返すことはなく、走査も線形で終わる。
+``{`` を含まないテキスト（通常の文章）は文字列検索1回で判定を終える。
+"""
+
+import json
+import re
+
+# デコーダは状態を持たないため使い回す
+_DECODER = json.JSONDecoder()
+
+# 括弧の対応に関係するトークン（エスケープ・文字列の引用符・括弧）
+_BRACE_TOKEN = re.compile(r'\\.|["{}]', re.DOTALL)
+
+
+def _balanced_end(text: str, start: int) -> int | None:
+    """start の ``{`` に対応する ``}`` の直後の位置を返す（閉じていない場合None）
+
+    文字列リテラル内の括弧とエスケープされた引用符は数えない。
+    """
+    depth = 0
+    in_string = False
+    for match in _BRACE_TOKEN.finditer(text, start):
+        token = match.group()
+        if token == '"':
+            in_string = not in_string
+        elif in_string or token[0] == "\\":
+            continue
+        elif token == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+def extract_json_object(text: str) -> dict[str, object] | None:
+    """テキストに含まれる最初のJSONオブジェクトを抽出
+
+    Args:
+        text: 抽出対象のテキスト（code block・前後の文章を含んでよい）
+
+    Returns:
+        抽出したオブジェクト（見つからない場合はNone）
+    """
+    start = text.find("{")
+    while start != -1:
+        end = _balanced_end(text, start)
+        if end is None:
+            # 閉じていないJSONの内側は候補にしない
+            return None
+        try:
+            value: dict[str, object] = _DECODER.decode(text[start:end])  # "{" 始まりは必ずdict
+        except json.JSONDecodeError:
+            # 不正な範囲は読み飛ばし、その後ろの候補から再試行
+            start = text.find("{", end)
+            continue
+        return value
+    return None
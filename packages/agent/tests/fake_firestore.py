@@ -0,0 +1,370 @@
+"""インメモリの非同期Firestoreフェイク
+
+firestore.AsyncClientのうち、本アプリケーションが使用するサブセットを再現する。
+テストおよびベンチマークで使用する。
+
+- collection / document / サブコレクション
+- get / set(merge) / update / delete
+- where（==, >=, <=, array_contains）/ order_by（__name__含む）/ limit / stream
+- select（射影）/ start_after（カーソル）/ count（集計クエリ）
+- トランザクション（firestore.async_transactionalで使用可能。読み込んだドキュメントを
+  コミットまでロックする悲観的ロックで、サーバーSDKのトランザクションと同様に直列化する）
+- Increment / SERVER_TIMESTAMP
+- RPCごとの擬似レイテンシ（blocking=Trueの場合は同期クライアント相当にイベントループをブロック）
+"""
+
+import asyncio
+import copy
+import functools
+import time
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
+
+from google.cloud import firestore
+from google.cloud.firestore_v1 import transforms
+
+
+class FakeDocumentSnapshot:
+    """DocumentSnapshotのフェイク"""
+
+    def __init__(self, doc_id: str, data: dict[str, Any] | None) -> None:
+        self.id = doc_id
+        self._data = copy.deepcopy(data)
+        self.exists = data is not None
+
+    def to_dict(self) -> dict[str, Any] | None:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+def _apply_write(current: dict[str, Any] | None, data: dict[str, Any], merge: bool) -> dict[str, Any]:
+    """書き込み内容（Increment・SERVER_TIMESTAMPを含む）を適用した新しいドキュメントを返す"""
+    result = copy.deepcopy(current) if merge and current is not None else {}
+    for key, value in data.items():
+        if isinstance(value, transforms.Increment):
+            base = result.get(key) if current is not None else None
+            result[key] = (base if isinstance(base, (int, float)) else 0) + value.value
+        elif value is transforms.SERVER_TIMESTAMP:
+            result[key] = datetime.now()
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+class FakeAsyncDocumentReference:
+    """AsyncDocumentReferenceのフェイク"""
+
+    def __init__(self, client: "FakeAsyncFirestore", path: str) -> None:
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "FakeAsyncCollectionReference":
+        return FakeAsyncCollectionReference(self._client, f"{self.path}/{name}")
+
+    async def get(self, transaction: "FakeAsyncTransaction | None" = None) -> FakeDocumentSnapshot:
+        if transaction is not None:
+            await transaction._lock(self.path)
+        await self._client._rpc("get")
+        return FakeDocumentSnapshot(self.id, self._client.documents.get(self.path))
+
+    async def set(self, data: dict[str, Any], merge: bool = False) -> None:
+        await self._client._rpc("set")
+        self._client._write(self.path, data, merge=merge)
+
+    async def update(self, data: dict[str, Any]) -> None:
+        await self._client._rpc("update")
+        self._client._update(self.path, data)
+
+    async def delete(self) -> None:
+        await self._client._rpc("delete")
+        self._client.documents.pop(self.path, None)
+
+
+def _matches(data: dict[str, Any], field: str, op: str, value: Any) -> bool:
+    actual = data.get(field)
+    if op == "==":
+        return bool(actual == value)
+    if op == "array_contains":
+        return isinstance(actual, list) and value in actual
+    if actual is None:
+        return False
+    if op == ">=":
+        return bool(actual >= value)
+    if op == "<=":
+        return bool(actual <= value)
+    if op == ">":
+        return bool(actual > value)
+    if op == "<":
+        return bool(actual < value)
+    raise NotImplementedError(f"Unsupported operator: {op}")
+
+
+class FakeAsyncQuery:
+    """AsyncQueryのフェイク"""
+
+    def __init__(
+        self,
+        client: "FakeAsyncFirestore",
+        collection_path: str,
+        filters: tuple[tuple[str, str, Any], ...] = (),
+        orders: tuple[tuple[str, str], ...] = (),
+        limit_count: int | None = None,
+        projection: tuple[str, ...] | None = None,
+        start_after_values: tuple[Any, ...] | None = None,
+    ) -> None:
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit_count
+        self._projection = projection
+        self._start_after = start_after_values
+
+    def _copy(self, **kwargs: Any) -> "FakeAsyncQuery":
+        params: dict[str, Any] = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit_count": self._limit,
+            "projection": self._projection,
+            "start_after_values": self._start_after,
+        }
+        params.update(kwargs)
+        return FakeAsyncQuery(self._client, self._collection_path, **params)
+
+    def where(
+        self,
+        field_path: str | None = None,
+        op_string: str | None = None,
+        value: Any = None,
+        *,
+        filter: Any = None,  # noqa: A002  # FieldFilterとの互換
+    ) -> "FakeAsyncQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        assert field_path is not None and op_string is not None
+        return self._copy(filters=(*self._filters, (field_path, op_string, value)))
+
+    def order_by(self, field_path: str, direction: str = firestore.Query.ASCENDING) -> "FakeAsyncQuery":
+        return self._copy(orders=(*self._orders, (field_path, direction)))
+
+    def limit(self, count: int) -> "FakeAsyncQuery":
+        return self._copy(limit_count=count)
+
+    def select(self, field_paths: list[str] | tuple[str, ...]) -> "FakeAsyncQuery":
+        return self._copy(projection=tuple(field_paths))
+
+    def start_after(self, document_fields: dict[str, Any]) -> "FakeAsyncQuery":
+        values = tuple(document_fields[field] for field, _ in self._orders[: len(document_fields)])
+        return self._copy(start_after_values=values)
+
+    def count(self, alias: str | None = None) -> "FakeAggregationQuery":
+        return FakeAggregationQuery(self, alias or "field_1")
+
+    def _sort_value(self, doc_id: str, data: dict[str, Any], field: str) -> Any:
+        return doc_id if field == "__name__" else data.get(field)
+
+    def _compare_to_cursor(self, doc_id: str, data: dict[str, Any]) -> int:
+        """カーソル位置との比較（並び順で後なら正）"""
+        assert self._start_after is not None
+        for (field, direction), cursor_value in zip(self._orders, self._start_after, strict=False):
+            value = self._sort_value(doc_id, data, field)
+            if value == cursor_value:
+                continue
+            after = value > cursor_value
+            if direction == firestore.Query.DESCENDING:
+                after = not after
+            return 1 if after else -1
+        return 0
+
+    def _matching_rows(self) -> list[tuple[str, dict[str, Any]]]:
+        prefix = f"{self._collection_path}/"
+        rows: list[tuple[str, dict[str, Any]]] = [
+            (path.rsplit("/", 1)[-1], data)
+            for path, data in self._client.documents.items()
+            if path.startswith(prefix) and "/" not in path[len(prefix):]
+        ]
+        for field, op, value in self._filters:
+            rows = [(doc_id, data) for doc_id, data in rows if _matches(data, field, op, value)]
+        return rows
+
+    def _run(self) -> list[FakeDocumentSnapshot]:
+        rows = self._matching_rows()
+
+        def compare(a: tuple[str, dict[str, Any]], b: tuple[str, dict[str, Any]]) -> int:
+            for field, direction in self._orders:
+                va = self._sort_value(a[0], a[1], field)
+                vb = self._sort_value(b[0], b[1], field)
+                if va == vb:
+                    continue
+                result = -1 if va < vb else 1
+                return -result if direction == firestore.Query.DESCENDING else result
+            return 0
+
+        rows.sort(key=functools.cmp_to_key(compare))
+        if self._start_after is not None:
+            rows = [row for row in rows if self._compare_to_cursor(*row) > 0]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        if self._projection is not None:
+            rows = [
+                (doc_id, {k: v for k, v in data.items() if k in self._projection})
+                for doc_id, data in rows
+            ]
+        return [FakeDocumentSnapshot(doc_id, data) for doc_id, data in rows]
+
+    async def stream(self) -> AsyncIterator[FakeDocumentSnapshot]:
+        await self._client._rpc("query")
+        for snapshot in self._run():
+            yield snapshot
+
+    async def get(self) -> list[FakeDocumentSnapshot]:
+        await self._client._rpc("query")
+        return self._run()
+
+
+class FakeAggregationResult:
+    """AggregationResultのフェイク"""
+
+    def __init__(self, alias: str, value: int) -> None:
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregationQuery:
+    """AsyncAggregationQuery（count）のフェイク"""
+
+    def __init__(self, query: FakeAsyncQuery, alias: str) -> None:
+        self._query = query
+        self._alias = alias
+
+    async def get(self) -> list[list[FakeAggregationResult]]:
+        await self._query._client._rpc("count")
+        return [[FakeAggregationResult(self._alias, len(self._query._run()))]]
+
+
+class FakeAsyncCollectionReference(FakeAsyncQuery):
+    """AsyncCollectionReferenceのフェイク"""
+
+    def __init__(self, client: "FakeAsyncFirestore", path: str) -> None:
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: str | None = None) -> FakeAsyncDocumentReference:
+        doc_id = document_id or uuid.uuid4().hex
+        return FakeAsyncDocumentReference(self._client, f"{self._collection_path}/{doc_id}")
+
+
+class FakeAsyncTransaction:
+    """AsyncTransactionのフェイク
+
+    firestore.async_transactionalデコレーターが使用する内部インターフェースを実装する。
+    """
+
+    def __init__(self, client: "FakeAsyncFirestore", max_attempts: int = 5) -> None:
+        self._client = client
+        self._max_attempts = max_attempts
+        self._read_only = False
+        self._id: bytes | None = None
+        self._writes: list[tuple[str, str, dict[str, Any], bool]] = []
+        self._held: list[asyncio.Lock] = []
+        self._held_paths: set[str] = set()
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    async def _lock(self, path: str) -> None:
+        if path in self._held_paths:
+            return
+        lock = self._client._locks.setdefault(path, asyncio.Lock())
+        await lock.acquire()
+        self._held.append(lock)
+        self._held_paths.add(path)
+
+    def _release(self) -> None:
+        for lock in self._held:
+            lock.release()
+        self._held = []
+        self._held_paths = set()
+
+    def _clean_up(self) -> None:
+        self._release()
+        self._writes = []
+        self._id = None
+
+    async def _begin(self, retry_id: bytes | None = None) -> None:  # noqa: ARG002
+        await self._client._rpc("begin")
+        self._id = uuid.uuid4().bytes
+
+    async def _commit(self) -> list[object]:
+        await self._client._rpc("commit")
+        try:
+            for op, path, data, merge in self._writes:
+                if op == "set":
+                    self._client._write(path, data, merge=merge)
+                elif op == "update":
+                    self._client._update(path, data)
+                else:
+                    self._client.documents.pop(path, None)
+        finally:
+            self._clean_up()
+        return []
+
+    async def _rollback(self) -> None:
+        self._clean_up()
+
+    def set(
+        self, reference: FakeAsyncDocumentReference, document_data: dict[str, Any], merge: bool = False
+    ) -> None:
+        self._writes.append(("set", reference.path, copy.deepcopy(document_data), merge))
+
+    def update(self, reference: FakeAsyncDocumentReference, field_updates: dict[str, Any]) -> None:
+        self._writes.append(("update", reference.path, copy.deepcopy(field_updates), True))
+
+    def delete(self, reference: FakeAsyncDocumentReference) -> None:
+        self._writes.append(("delete", reference.path, {}, False))
+
+
+class FakeAsyncFirestore:
+    """firestore.AsyncClientのインメモリフェイク
+
+    Args:
+        latency_seconds: RPCごとの擬似レイテンシ
+        blocking: Trueの場合、レイテンシをtime.sleepで発生させる（同期クライアント相当）
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, blocking: bool = False) -> None:
+        self.documents: dict[str, dict[str, Any]] = {}
+        self.ops: list[str] = []
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.latency_seconds = latency_seconds
+        self.blocking = blocking
+
+    def collection(self, name: str) -> FakeAsyncCollectionReference:
+        return FakeAsyncCollectionReference(self, name)
+
+    def transaction(self, max_attempts: int = 5) -> FakeAsyncTransaction:
+        return FakeAsyncTransaction(self, max_attempts=max_attempts)
+
+    def _write(self, path: str, data: dict[str, Any], merge: bool) -> None:
+        self.documents[path] = _apply_write(self.documents.get(path), data, merge=merge)
+
+    def _update(self, path: str, data: dict[str, Any]) -> None:
+        current = self.documents.get(path)
+        if current is None:
+            raise KeyError(f"No document to update: {path}")
+        self.documents[path] = _apply_write(current, data, merge=True)
+
+    async def _rpc(self, op: str) -> None:
+        self.ops.append(op)
+        if self.latency_seconds <= 0:
+            return
+        if self.blocking:
+            time.sleep(self.latency_seconds)
+        else:
+            await asyncio.sleep(self.latency_seconds)
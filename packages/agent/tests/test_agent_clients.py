@@ -0,0 +1,35 @@
+"""エージェント用クライアント共有のテスト"""
+
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from dessin_coaching_agent import clients
+
+
+@pytest.fixture(autouse=True)
+def reset() -> Iterator[None]:
+    clients.reset_clients()
+    yield
+    clients.reset_clients()
+
+
+def test_genai_client_is_created_once() -> None:
+    """2回目以降の取得では同じクライアントを返す"""
+    with patch("dessin_coaching_agent.clients.genai.Client") as mock_client_cls:
+        first = clients.get_genai_client()
+        second = clients.get_genai_client()
+
+    assert first is second
+    mock_client_cls.assert_called_once()
+
+
+def test_reset_recreates_clients() -> None:
+    """reset_clients後は新しいクライアントを生成する"""
+    with patch("dessin_coaching_agent.clients.VertexClient") as mock_client_cls:
+        clients.get_vertex_client()
+        clients.reset_clients()
+        clients.get_vertex_client()
+
+    assert mock_client_cls.call_count == 2
@@ -0,0 +1,250 @@
+"""Agent Engine呼び出しサービスのテスト
+
+Agent Engineのストリームをフェイクのイベント列に差し替えて、レスポンスの解析を確認する。
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import pytest
+
+from src.config import settings
+from src.services.agent_engine_service import AgentEngineService
+
+ANALYSIS: dict[str, object] = {
+    "proportion": {
+        "shape_accuracy": "良好",
+        "ratio_balance": "適切",
+        "contour_quality": "安定",
+        "score": 75.0,
+    },
+    "tone": {
+        "value_range": "5段階",
+        "light_consistency": "一貫",
+        "three_dimensionality": "良好",
+        "score": 70.0,
+    },
+    "texture": {"material_expression": "基本的", "touch_variety": "限定的", "score": 65.0},
+    "line_quality": {
+        "stroke_quality": "安定",
+        "pressure_control": "適切",
+        "hatching": "基本的",
+        "score": 72.0,
+    },
+    "overall_score": 70.5,
+    "strengths": ["陰影"],
+    "improvements": ["質感"],
+    "tags": ["りんご"],
+}
+
+
+def model_text(text: str, partial: bool = False) -> dict[str, object]:
+    return {"content": {"parts": [{"text": text}], "role": "model"}, "partial": partial}
+
+
+def function_call(name: str) -> dict[str, object]:
+    return {"content": {"parts": [{"function_call": {"name": name, "args": {}}}], "role": "model"}}
+
+
+def function_response(name: str, response: dict[str, object]) -> dict[str, object]:
+    return {
+        "content": {
+            "parts": [{"function_response": {"name": name, "response": response}}],
+            "role": "user",
+        }
+    }
+
+
+class FakeAdkApp:
+    """記録済みのイベント列を返すフェイクAdkApp
+
+    delays を指定すると、各イベントの前にその秒数だけ待つ（モデルの生成時間の代わり）。
+    """
+
+    def __init__(self, events: list[dict[str, object]], delays: list[float] | None = None) -> None:
+        self._events = events
+        self._delays = delays or [0.0] * len(events)
+        self.consumed = 0
+        self.closed = False
+
+    async def async_stream_query(self, **_kwargs: object) -> AsyncIterator[dict[str, object]]:
+        try:
+            for event, delay in zip(self._events, self._delays, strict=True):
+                await asyncio.sleep(delay)
+                self.consumed += 1
+                yield event
+        finally:
+            self.closed = True
+
+
+def _service(app: FakeAdkApp) -> AgentEngineService:
+    service = AgentEngineService()
+    service._adk_app = app
+    return service
+
+
+async def _run(service: AgentEngineService) -> dict[str, object]:
+    return await service.run_coaching_agent(
+        image_url="https://storage.googleapis.com/bucket/image.jpg",
+        rank_label="7級",
+        user_id="user-1",
+        session_id="review-1",
+    )
+
+
+class TestParseAgentResponse:
+    """_parse_agent_responseのテスト"""
+
+    @pytest.fixture
+    def service(self) -> AgentEngineService:
+        return AgentEngineService()
+
+    def test_function_response(self, service: AgentEngineService) -> None:
+        """ツールのfunction_responseは結果の辞書を返す"""
+        event = function_response("analyze_dessin_image", {"status": "success"})
+
+        assert service._parse_agent_response(event) == {"status": "success"}
+
+    def test_model_text_with_code_block(self, service: AgentEngineService) -> None:
+        """モデルのテキスト中のJSONを抽出する"""
+        event = model_text('結果です。\n```json\n{"overall_score": 70}\n```')
+
+        assert service._parse_agent_response(event) == {"overall_score": 70}
+
+    def test_skips_partial_text(self, service: AgentEngineService) -> None:
+        """ストリーミング途中の部分テキストは解析しない"""
+        assert (
+            service._parse_agent_response(model_text('{"overall_score": 70}', partial=True)) is None
+        )
+
+    def test_skips_function_call(self, service: AgentEngineService) -> None:
+        """ツール呼び出しイベントは解析しない"""
+        assert service._parse_agent_response(function_call("identify_motif")) is None
+
+    def test_skips_user_text(self, service: AgentEngineService) -> None:
+        """モデル以外のテキストは解析しない"""
+        event = {"content": {"parts": [{"text": '{"overall_score": 70}'}], "role": "user"}}
+
+        assert service._parse_agent_response(event) is None
+
+
+class TestRunCoachingAgent:
+    """run_coaching_agentのテスト"""
+
+    async def test_function_response_analysis(self) -> None:
+        """analyze_dessin_imageの結果を分析結果として返し、以降のイベントは解析しない"""
+        app = FakeAdkApp(
+            [
+                function_call("analyze_dessin_image"),
+                function_response(
+                    "analyze_dessin_image",
+                    {"status": "success", "analysis": ANALYSIS, "summary": "良い作品です"},
+                ),
+                model_text('総評です。{"overall_score": 10}'),
+            ]
+        )
+
+        result = await _run(_service(app))
+
+        assert result["status"] == "success"
+        assert result["summary"] == "良い作品です"
+        assert result["analysis"]["overall_score"] == 70.5  # type: ignore[index]
+
+    async def test_model_text_analysis(self) -> None:
+        """モデルのテキストにDessinAnalysisが含まれる場合"""
+        app = FakeAdkApp([model_text(f"```json\n{json.dumps(ANALYSIS)}\n```")])
+
+        result = await _run(_service(app))
+
+        assert result["status"] == "success"
+        assert result["analysis"]["overall_score"] == 70.5  # type: ignore[index]
+
+    async def test_invalid_analysis(self) -> None:
+        """分析結果の形式だが検証に失敗した場合はエラー"""
+        app = FakeAdkApp([function_response("analyze_dessin_image", {"overall_score": 70.5})])
+
+        result = await _run(_service(app))
+
+        assert result == {"status": "error", "error_message": "分析結果の検証に失敗しました"}
+
+    async def test_no_response(self) -> None:
+        """解析できるイベントがない場合はエラー"""
+        app = FakeAdkApp([model_text("分析中です"), function_call("identify_motif")])
+
+        result = await _run(_service(app))
+
+        assert result["status"] == "error"
+
+
+class TestEarlyReturn:
+    """分析結果を受け取った時点で返す（agent_engine_early_return）のテスト"""
+
+    TAIL_SECONDS = 0.5
+
+    def _app(self) -> FakeAdkApp:
+        return FakeAdkApp(
+            [
+                function_call("analyze_dessin_image"),
+                function_response(
+                    "analyze_dessin_image",
+                    {"status": "success", "analysis": ANALYSIS, "summary": "良い作品です"},
+                ),
+                model_text("総評です。"),
+            ],
+            delays=[0.0, 0.0, self.TAIL_SECONDS],
+        )
+
+    async def test_disabled_waits_for_whole_stream(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """無効時はストリームの最後まで待つ"""
+        monkeypatch.setattr(settings, "agent_engine_early_return", False)
+        app = self._app()
+
+        result = await _run(_service(app))
+
+        assert result["status"] == "success"
+        assert app.consumed == 3
+
+    async def test_returns_before_tail_and_drains(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """analyze_dessin_imageの結果で返し、残りはバックグラウンドで読み切る"""
+        monkeypatch.setattr(settings, "agent_engine_early_return", True)
+        monkeypatch.setattr(settings, "agent_engine_stream_tail", "drain")
+        app = self._app()
+        service = _service(app)
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        result = await _run(service)
+
+        assert loop.time() - started_at < self.TAIL_SECONDS
+        assert result["status"] == "success"
+        assert result["summary"] == "良い作品です"
+        assert app.consumed == 2
+
+        await asyncio.gather(*service._drain_tasks)
+        assert app.consumed == 3
+        assert app.closed
+
+    async def test_cancel_closes_stream(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """cancel指定時は残りのストリームを打ち切る"""
+        monkeypatch.setattr(settings, "agent_engine_early_return", True)
+        monkeypatch.setattr(settings, "agent_engine_stream_tail", "cancel")
+        app = self._app()
+        service = _service(app)
+
+        result = await _run(service)
+
+        assert result["status"] == "success"
+        assert app.consumed == 2
+        assert app.closed
+        assert not service._drain_tasks
+
+    async def test_model_text_does_not_return_early(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """ツール結果以外（モデルのテキスト）では早期リターンしない"""
+        monkeypatch.setattr(settings, "agent_engine_early_return", True)
+        app = FakeAdkApp([model_text(json.dumps(ANALYSIS)), model_text("以上です。")])
+
+        result = await _run(_service(app))
+
+        assert result["status"] == "success"
+        assert app.consumed == 2
@@ -0,0 +1,145 @@
+"""直接分析パイプラインのテスト
+
+ツール関数を遅延付きのフェイクに差し替え、固定順序での実行と
+モチーフ識別・直近メモリ取得の並行実行を確認する。
+"""
+
+import asyncio
+import time
+
+import pytest
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from dessin_coaching_agent import pipeline
+from dessin_coaching_agent.models import AnalysisRequest
+from dessin_coaching_agent.pipeline import (
+    DirectAnalysisAgent,
+    parse_analysis_request,
+    run_direct_analysis,
+)
+
+# フェイクツールの応答遅延（秒）
+LATENCY = 0.2
+
+MESSAGE = (
+    "画像URL: https://storage.googleapis.com/bucket/image.jpg\n"
+    "ユーザーランク: 5級\n"
+    "ユーザーID: user-1\n"
+    "セッションID: review-1\n"
+    "この画像を分析してください。"
+)
+
+RECENT: list[dict[str, object]] = [{"fact": "直近", "metadata": {"motif": "石膏像"}}]
+BY_MOTIF: list[dict[str, object]] = [{"fact": "りんご", "metadata": {"motif": "りんご"}}]
+
+
+class FakeTools:
+    """呼び出し順と引数を記録するフェイクツール"""
+
+    def __init__(self, motif_memories: list[dict[str, object]]) -> None:
+        self.calls: list[str] = []
+        self.past_memories: list[dict[str, object]] | None = None
+        self._motif_memories = motif_memories
+
+    def identify_motif(self, _image_url: str) -> dict[str, object]:
+        time.sleep(LATENCY)
+        self.calls.append("identify_motif")
+        return {"status": "success", "primary_motif": "りんご", "tags": ["りんご"]}
+
+    async def search_recent_memories_async(
+        self, _user_id: str, _limit: int = 5
+    ) -> list[dict[str, object]]:
+        await asyncio.sleep(LATENCY)
+        self.calls.append("search_recent_memories")
+        return RECENT
+
+    async def search_memory_by_motif_async(
+        self, _motif: str, _user_id: str, _limit: int = 5
+    ) -> list[dict[str, object]]:
+        self.calls.append("search_memory_by_motif")
+        return self._motif_memories
+
+    def analyze_dessin_image(self, **kwargs: object) -> dict[str, object]:
+        self.calls.append("analyze_dessin_image")
+        self.past_memories = kwargs["past_memories"]  # type: ignore[assignment]
+        return {"status": "success", "analysis": {"overall_score": 70.0}, "summary": "良い作品です"}
+
+
+def _install(monkeypatch: pytest.MonkeyPatch, tools: FakeTools) -> None:
+    for name in (
+        "identify_motif",
+        "search_recent_memories_async",
+        "search_memory_by_motif_async",
+        "analyze_dessin_image",
+    ):
+        monkeypatch.setattr(pipeline, name, getattr(tools, name))
+
+
+class TestParseAnalysisRequest:
+    """parse_analysis_requestのテスト"""
+
+    def test_parses_message(self) -> None:
+        """バックエンドが送るメッセージから各項目を取り出す"""
+        assert parse_analysis_request(MESSAGE) == AnalysisRequest(
+            image_url="https://storage.googleapis.com/bucket/image.jpg",
+            rank_label="5級",
+            user_id="user-1",
+            session_id="review-1",
+        )
+
+    def test_missing_image_url(self) -> None:
+        """画像URLがなければNone"""
+        assert parse_analysis_request("この画像を分析してください。") is None
+
+
+class TestRunDirectAnalysis:
+    """run_direct_analysisのテスト"""
+
+    async def test_motif_and_recent_memories_overlap(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """モチーフ識別と直近メモリ取得を並行実行し、モチーフ別メモリを優先して結合する"""
+        tools = FakeTools(motif_memories=BY_MOTIF)
+        _install(monkeypatch, tools)
+
+        started_at = time.perf_counter()
+        result = await run_direct_analysis(parse_analysis_request(MESSAGE))  # type: ignore[arg-type]
+
+        assert time.perf_counter() - started_at < LATENCY * 2
+        assert result["status"] == "success"
+        assert tools.calls[-1] == "analyze_dessin_image"
+        assert tools.past_memories == BY_MOTIF + RECENT
+
+    async def test_falls_back_to_recent_memories(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """モチーフ別メモリが0件なら直近メモリのみを使う"""
+        tools = FakeTools(motif_memories=[])
+        _install(monkeypatch, tools)
+
+        await run_direct_analysis(parse_analysis_request(MESSAGE))  # type: ignore[arg-type]
+
+        assert tools.past_memories == RECENT
+
+
+class TestDirectAnalysisAgent:
+    """DirectAnalysisAgentのテスト"""
+
+    async def test_emits_function_response(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """分析結果をanalyze_dessin_imageのfunction_responseとして返す"""
+        _install(monkeypatch, FakeTools(motif_memories=BY_MOTIF))
+        runner = InMemoryRunner(agent=DirectAnalysisAgent(name="dessin_coaching_agent"))
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id="user-1"
+        )
+
+        events = [
+            event
+            async for event in runner.run_async(
+                user_id="user-1",
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=MESSAGE)]),
+            )
+        ]
+
+        function_response = events[0].content.parts[0].function_response  # type: ignore[union-attr,index]
+        assert function_response.name == "analyze_dessin_image"  # type: ignore[union-attr]
+        assert function_response.response["status"] == "success"  # type: ignore[union-attr,index]
+        assert events[-1].content.parts[0].text == "良い作品です"  # type: ignore[union-attr,index]
@@ -0,0 +1,160 @@
+"""画像系Cloud FunctionsのGemini呼び出しが非ブロッキングであることのテスト
+
+遅延を持つフェイクモデルに差し替え、1つのイベントループ上で複数リクエストを同時に
+処理したときの所要時間が、逐次実行（遅延×件数）ではなく遅延1回分程度になることを確認する。
+あわせて、ウォームスタート時にイベントループ・クライアントが再利用されることを確認する。
+Cloud Functionsの依存パッケージが入っていない環境ではスキップする。
+"""
+
+import asyncio
+import importlib.util
+import time
+from collections.abc import Callable, Coroutine, Iterator
+from io import BytesIO
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+import pytest
+import structlog
+
+pytest.importorskip("functions_framework")
+pytest.importorskip("google.genai")
+pytest.importorskip("google.cloud.storage")
+pytest.importorskip("google.cloud.firestore")
+
+from PIL import Image  # noqa: E402
+
+FUNCTIONS_DIR = Path(__file__).resolve().parents[2] / "functions"
+
+# フェイクモデルの応答遅延（秒）
+LATENCY = 0.3
+CONCURRENT_REQUESTS = 5
+
+
+def _response() -> SimpleNamespace:
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=b"generated"))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class FakeAsyncModels:
+    """client.aio.models 相当（待機中はイベントループを解放する）"""
+
+    async def generate_content(self, **_kwargs: object) -> SimpleNamespace:
+        await asyncio.sleep(LATENCY)
+        return _response()
+
+
+class FakeGenaiClient:
+    """遅延を持つフェイクGeminiクライアント"""
+
+    def __init__(self, **_kwargs: object) -> None:
+        self.aio = SimpleNamespace(models=FakeAsyncModels())
+        self.models = SimpleNamespace(generate_content=self._blocking_generate_content)
+
+    @staticmethod
+    def _blocking_generate_content(**_kwargs: object) -> SimpleNamespace:
+        time.sleep(LATENCY)
+        return _response()
+
+
+def _load_function(name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(f"{name}_main", FUNCTIONS_DIR / name / "main.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def load_function(monkeypatch: pytest.MonkeyPatch) -> Iterator[Callable[[str], ModuleType]]:
+    """Functionのモジュールを読み込み、Geminiクライアントをフェイクに差し替える"""
+    # Function側のstructlog設定がテストプロセス全体に残らないよう復元する
+    structlog_config = structlog.get_config()
+
+    def load(name: str) -> ModuleType:
+        module = _load_function(name)
+        monkeypatch.setattr(module.genai, "Client", FakeGenaiClient)
+        return module
+
+    yield load
+    structlog.configure(**structlog_config)
+
+
+def _jpeg() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), (128, 128, 128)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+async def _elapsed(*coroutines: Coroutine[object, object, bytes]) -> float:
+    started_at = time.perf_counter()
+    await asyncio.gather(*coroutines)
+    return time.perf_counter() - started_at
+
+
+class TestNonBlockingGeminiCalls:
+    """Gemini呼び出し中に他のリクエストを処理できること"""
+
+    async def test_annotate_image_calls_overlap(
+        self, load_function: Callable[[str], ModuleType]
+    ) -> None:
+        """アノテーション生成の同時呼び出しが重なって実行される"""
+        module = load_function("annotate_image")
+
+        elapsed = await _elapsed(
+            *(
+                module._generate_annotated_image("prompt", _jpeg(), "image/jpeg")
+                for _ in range(CONCURRENT_REQUESTS)
+            )
+        )
+
+        assert elapsed < LATENCY * 2
+
+    async def test_generate_image_calls_overlap(
+        self, load_function: Callable[[str], ModuleType]
+    ) -> None:
+        """お手本画像生成の同時呼び出しが重なって実行される"""
+        module = load_function("generate_image")
+
+        elapsed = await _elapsed(
+            *(
+                module.generate_image("prompt", _jpeg(), None, "image/jpeg")
+                for _ in range(CONCURRENT_REQUESTS)
+            )
+        )
+
+        assert elapsed < LATENCY * 2
+
+
+class TestWarmStart:
+    """リクエスト間でイベントループ・クライアントを再利用すること"""
+
+    @pytest.mark.parametrize("name", ["annotate_image", "generate_image"])
+    def test_event_loop_is_reused(
+        self, load_function: Callable[[str], ModuleType], name: str
+    ) -> None:
+        """run_asyncは呼び出しごとに同じイベントループを使う"""
+        module = load_function(name)
+
+        async def running_loop() -> asyncio.AbstractEventLoop:
+            return asyncio.get_running_loop()
+
+        first = module.run_async(running_loop())
+        second = module.run_async(running_loop())
+
+        assert first is second
+        assert first.is_running()
+
+    @pytest.mark.parametrize("name", ["annotate_image", "generate_image"])
+    def test_clients_are_cached(
+        self,
+        load_function: Callable[[str], ModuleType],
+        monkeypatch: pytest.MonkeyPatch,
+        name: str,
+    ) -> None:
+        """クライアントは初回のみ生成される"""
+        module = load_function(name)
+        monkeypatch.setattr(module.storage, "Client", object)
+
+        assert module.get_genai_client() is module.get_genai_client()
+        assert module.get_storage_client() is module.get_storage_client()
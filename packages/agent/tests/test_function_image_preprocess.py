@@ -0,0 +1,52 @@
+"""画像系Cloud Functionsの画像前処理のテスト
+
+URLから取得した画像をモデル入力用に縮小・再エンコードする際、EXIFの向き（Orientation）を
+画素に反映してから再エンコードすることを確認する。
+Cloud Functionsの依存パッケージが入っていない環境ではスキップする。
+"""
+
+from collections.abc import Callable, Iterator
+from io import BytesIO
+from types import ModuleType
+
+import pytest
+import structlog
+from PIL import Image
+
+from tests.test_function_concurrency import _load_function
+
+# ExifのOrientationタグ
+ORIENTATION_TAG = 0x0112
+
+
+@pytest.fixture
+def load_function() -> Iterator[Callable[[str], ModuleType]]:
+    """Functionのモジュールを読み込む"""
+    # Function側のstructlog設定がテストプロセス全体に残らないよう復元する
+    structlog_config = structlog.get_config()
+    yield _load_function
+    structlog.configure(**structlog_config)
+
+
+def _rotated_jpeg() -> bytes:
+    """横長（400x200）で保存し、Orientation=6（90度回転して表示）を付与したJPEG"""
+    image = Image.new("RGB", (400, 200), (200, 50, 50))
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = 6
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("name", ["annotate_image", "generate_image"])
+def test_preprocess_applies_exif_orientation(
+    load_function: Callable[[str], ModuleType], name: str
+) -> None:
+    """EXIFの向きを反映した縦長の画像になり、メタデータは除去される"""
+    module = load_function(name)
+
+    prepared = module._preprocess_image(_rotated_jpeg(), 1024, "never")
+
+    with Image.open(BytesIO(prepared)) as image:
+        assert image.size == (200, 400)
+        assert ORIENTATION_TAG not in image.getexif()
@@ -0,0 +1,117 @@
+"""共有HTTPクライアントのテスト
+
+ローカルのスタブHTTPサーバーを使用して接続の再利用を検証する。
+"""
+
+from collections.abc import AsyncIterator
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.models.feedback import (
+    DessinAnalysis,
+    LineQualityAnalysis,
+    ProportionAnalysis,
+    TextureAnalysis,
+    ToneAnalysis,
+)
+from src.models.rank import Rank, UserRank
+from src.services import http_client
+from src.services.annotation_service import AnnotationService
+
+
+@pytest.fixture
+async def stub_server() -> AsyncIterator[tuple[TestServer, list[int]]]:
+    """クライアント側ポートを記録するスタブCloud Function"""
+    client_ports: list[int] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        client_ports.append(peer[1] if peer else -1)
+        return web.json_response(
+            {"annotated_image_url": "https://storage.googleapis.com/b/annotated/t.png"}
+        )
+
+    app = web.Application()
+    app.router.add_post("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    yield server, client_ports
+    await server.close()
+
+
+@pytest.fixture
+async def shared_session() -> AsyncIterator[None]:
+    await http_client.start_http_client()
+    yield
+    await http_client.close_http_client()
+
+
+def _analysis() -> DessinAnalysis:
+    return DessinAnalysis(
+        proportion=ProportionAnalysis(
+            shape_accuracy="良好", ratio_balance="適切", contour_quality="安定", score=75.0
+        ),
+        tone=ToneAnalysis(
+            value_range="5段階", light_consistency="一貫", three_dimensionality="良好", score=70.0
+        ),
+        texture=TextureAnalysis(material_expression="基本的", touch_variety="限定的", score=65.0),
+        line_quality=LineQualityAnalysis(
+            stroke_quality="安定", pressure_control="適切", hatching="基本的", score=72.0
+        ),
+        overall_score=70.5,
+        strengths=["陰影"],
+        improvements=["質感"],
+        tags=["りんご"],
+    )
+
+
+class TestSharedHttpClient:
+    """共有HTTPクライアントのテスト"""
+
+    @pytest.mark.usefixtures("shared_session")
+    async def test_get_returns_started_session(self) -> None:
+        """起動時に作成したセッションが共有される"""
+        session = http_client.get_http_session()
+        assert session is http_client.get_http_session()
+        assert not session.closed
+
+    async def test_close_releases_session(self) -> None:
+        """クローズ後は新しいセッションが作成される"""
+        first = await http_client.start_http_client()
+        await http_client.close_http_client()
+        assert first.closed
+
+        second = http_client.get_http_session()
+        assert second is not first
+        await http_client.close_http_client()
+
+    @pytest.mark.usefixtures("shared_session")
+    async def test_annotation_calls_reuse_connection(
+        self,
+        stub_server: tuple[TestServer, list[int]],
+    ) -> None:
+        """複数回の呼び出しで同じTCP接続が再利用される"""
+        server, client_ports = stub_server
+        service = AnnotationService()
+        service.function_url = str(server.make_url("/"))
+        user_rank = UserRank(user_id="user-1", current_rank=Rank.KYU_7, current_score=70.5)
+
+        with patch(
+            "src.services.id_token_cache.google.oauth2.id_token.fetch_id_token",
+            return_value="token",
+        ):
+            for _ in range(3):
+                url = await service.generate_annotated_image(
+                    task_id="task-1",
+                    original_image_url="https://storage.googleapis.com/b/uploads/t.jpg",
+                    analysis=_analysis(),
+                    user_rank=user_rank,
+                    motif_tags=["りんご"],
+                )
+                assert url is not None
+
+        assert len(client_ports) == 3
+        assert len(set(client_ports)) == 1
@@ -0,0 +1,137 @@
+"""IdTokenCacheのテスト"""
+
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from src.services.id_token_cache import IdTokenCache
+
+
+def _make_token(exp: float, serial: int) -> str:
+    """expクレーム付きの未署名JWTを作成"""
+
+    def encode(data: dict[str, object]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+    return f"{encode({'alg': 'RS256', 'typ': 'JWT'})}.{encode({'exp': exp, 'n': serial})}.c2ln"
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeFetcher:
+    """呼び出し回数を記録するトークン取得関数"""
+
+    def __init__(self, clock: FakeClock, lifetime: float = 3600.0, delay: float = 0.0) -> None:
+        self._clock = clock
+        self._lifetime = lifetime
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls: list[str] = []
+
+    def __call__(self, audience: str) -> str:
+        with self._lock:
+            self.calls.append(audience)
+            serial = len(self.calls)
+        if self._delay:
+            time.sleep(self._delay)
+        return _make_token(self._clock() + self._lifetime, serial)
+
+
+class TestIdTokenCache:
+    """IdTokenCacheのテスト"""
+
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    async def test_reuses_token_until_refresh_margin(self, clock: FakeClock) -> None:
+        """期限まで余裕がある間は同じトークンを再利用する"""
+        fetcher = FakeFetcher(clock)
+        cache = IdTokenCache(fetcher=fetcher, refresh_margin_seconds=300, clock=clock)
+
+        first = await cache.get_token("https://a.run.app")
+        clock.now += 3000
+        second = await cache.get_token("https://a.run.app")
+
+        assert first == second
+        assert fetcher.calls == ["https://a.run.app"]
+
+    async def test_tokens_are_keyed_by_audience(self, clock: FakeClock) -> None:
+        """audienceごとに別のトークンを取得する"""
+        fetcher = FakeFetcher(clock)
+        cache = IdTokenCache(fetcher=fetcher, refresh_margin_seconds=300, clock=clock)
+
+        await cache.get_token("https://a.run.app")
+        await cache.get_token("https://b.run.app")
+
+        assert fetcher.calls == ["https://a.run.app", "https://b.run.app"]
+
+    async def test_background_refresh_near_expiry(self, clock: FakeClock) -> None:
+        """期限が近いトークンは返却しつつバックグラウンドで更新する"""
+        fetcher = FakeFetcher(clock)
+        cache = IdTokenCache(fetcher=fetcher, refresh_margin_seconds=300, clock=clock)
+
+        first = await cache.get_token("https://a.run.app")
+        clock.now += 3400  # 残り200秒
+        stale = await cache.get_token("https://a.run.app")
+        assert stale == first
+
+        # バックグラウンド更新の完了を待つ
+        for _ in range(100):
+            if len(fetcher.calls) == 2 and not cache._inflight:
+                break
+            await asyncio.sleep(0.01)
+
+        refreshed = await cache.get_token("https://a.run.app")
+        assert refreshed != first
+        assert len(fetcher.calls) == 2
+
+    async def test_expired_token_is_fetched_synchronously(self, clock: FakeClock) -> None:
+        """期限切れのトークンは新しい取得を待つ"""
+        fetcher = FakeFetcher(clock)
+        cache = IdTokenCache(fetcher=fetcher, refresh_margin_seconds=300, clock=clock)
+
+        first = await cache.get_token("https://a.run.app")
+        clock.now += 4000
+        second = await cache.get_token("https://a.run.app")
+
+        assert second != first
+        assert len(fetcher.calls) == 2
+
+    async def test_concurrent_fetches_are_collapsed(self, clock: FakeClock) -> None:
+        """同一audienceへの同時取得は1回にまとめられる"""
+        fetcher = FakeFetcher(clock, delay=0.05)
+        cache = IdTokenCache(fetcher=fetcher, refresh_margin_seconds=300, clock=clock)
+
+        tokens = await asyncio.gather(*(cache.get_token("https://a.run.app") for _ in range(10)))
+
+        assert len(set(tokens)) == 1
+        assert fetcher.calls == ["https://a.run.app"]
+
+    async def test_fetch_failure_propagates_and_is_not_cached(self, clock: FakeClock) -> None:
+        """取得失敗は呼び出し元に伝播し、次回は再取得する"""
+        calls: list[str] = []
+
+        def failing(audience: str) -> str:
+            calls.append(audience)
+            raise RuntimeError("metadata server unavailable")
+
+        cache = IdTokenCache(fetcher=failing, refresh_margin_seconds=300, clock=clock)
+
+        with pytest.raises(RuntimeError):
+            await cache.get_token("https://a.run.app")
+        with pytest.raises(RuntimeError):
+            await cache.get_token("https://a.run.app")
+        assert len(calls) == 2
@@ -0,0 +1,75 @@
+"""画像のストリーミング取得のテスト"""
+
+from collections.abc import AsyncIterator
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.exceptions import ImageProcessingError
+from src.services import http_client
+from src.services.image_fetcher import fetch_image_bytes
+
+IMAGE_BYTES = bytes(range(256)) * 4096  # 1MB
+
+
+@pytest.fixture
+async def image_server() -> AsyncIterator[TestServer]:
+    """Content-Lengthあり・なし（chunked）で画像を返すスタブサーバー"""
+
+    async def sized(_request: web.Request) -> web.Response:
+        return web.Response(body=IMAGE_BYTES, content_type="image/jpeg")
+
+    async def chunked(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for start in range(0, len(IMAGE_BYTES), 100_000):
+            await response.write(IMAGE_BYTES[start : start + 100_000])
+        await response.write_eof()
+        return response
+
+    async def missing(_request: web.Request) -> web.Response:
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/sized.jpg", sized)
+    app.router.add_get("/chunked.jpg", chunked)
+    app.router.add_get("/missing.jpg", missing)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+    await http_client.close_http_client()
+
+
+class TestFetchImageBytes:
+    """fetch_image_bytesのテスト"""
+
+    async def test_sized_response(self, image_server: TestServer) -> None:
+        """Content-Lengthありの応答を取得できる"""
+        view = await fetch_image_bytes(str(image_server.make_url("/sized.jpg")), 2 * 1024 * 1024)
+
+        assert isinstance(view, memoryview)
+        assert view == IMAGE_BYTES
+
+    async def test_chunked_response(self, image_server: TestServer) -> None:
+        """Content-Lengthなしの応答も取得できる"""
+        view = await fetch_image_bytes(str(image_server.make_url("/chunked.jpg")), 2 * 1024 * 1024)
+
+        assert view == IMAGE_BYTES
+
+    async def test_declared_size_limit(self, image_server: TestServer) -> None:
+        """Content-Lengthが上限を超える場合は受信前にエラー"""
+        with pytest.raises(ImageProcessingError):
+            await fetch_image_bytes(str(image_server.make_url("/sized.jpg")), 1000)
+
+    async def test_streamed_size_limit(self, image_server: TestServer) -> None:
+        """受信済みバイト数が上限を超えた時点でエラー"""
+        with pytest.raises(ImageProcessingError):
+            await fetch_image_bytes(str(image_server.make_url("/chunked.jpg")), 150_000)
+
+    async def test_http_error(self, image_server: TestServer) -> None:
+        """取得失敗はエラー"""
+        with pytest.raises(ImageProcessingError):
+            await fetch_image_bytes(str(image_server.make_url("/missing.jpg")), 1000)
@@ -78,7 +78,7 @@ class TestTaskServiceIntegration:
         return TaskService()
 
     @pytest.fixture
-    def cleanup_task_ids(self) -> list[str]:
+    async def cleanup_task_ids(self) -> list[str]:
         """テスト後に削除するタスクIDのリスト"""
         task_ids: list[str] = []
         yield task_ids
@@ -86,17 +86,17 @@ class TestTaskServiceIntegration:
         service = TaskService()
         for task_id in task_ids:
             try:
-                service.delete_task(task_id)
+                await service.delete_task(task_id)
                 logger.info("test_cleanup_task_deleted", task_id=task_id)
             except Exception as e:
                 logger.warning("test_cleanup_failed", task_id=task_id, error=str(e))
 
-    def test_create_and_get_task(
+    async def test_create_and_get_task(
         self, service: TaskService, cleanup_task_ids: list[str]
     ) -> None:
         """タスク作成と取得が正常に動作すること"""
         # タスク作成
-        task = service.create_task(
+        task = await service.create_task(
             user_id="integration-test-user",
             image_url=TEST_IMAGE_URL,
         )
@@ -108,17 +108,17 @@ class TestTaskServiceIntegration:
         assert task.image_url == TEST_IMAGE_URL
 
         # タスク取得
-        fetched = service.get_task(task.task_id)
+        fetched = await service.get_task(task.task_id)
         assert fetched is not None
         assert fetched.task_id == task.task_id
         assert fetched.user_id == task.user_id
 
-    def test_update_task_with_analysis_result(
+    async def test_update_task_with_analysis_result(
         self, service: TaskService, cleanup_task_ids: list[str]
     ) -> None:
         """タスクに分析結果を保存できること"""
         # タスク作成
-        task = service.create_task(
+        task = await service.create_task(
             user_id="integration-test-user",
             image_url=TEST_IMAGE_URL,
         )
@@ -129,7 +129,7 @@ class TestTaskServiceIntegration:
         assert result["status"] == "success"
 
         # タスクを更新
-        updated_task = service.update_task_status(
+        updated_task = await service.update_task_status(
             task_id=task.task_id,
             status=TaskStatus.COMPLETED,
             feedback=result["analysis"],
@@ -144,7 +144,7 @@ class TestTaskServiceIntegration:
         assert len(updated_task.tags) > 0
         assert updated_task.feedback is not None
 
-    def test_list_tasks_by_user(
+    async def test_list_tasks_by_user(
         self, service: TaskService, cleanup_task_ids: list[str]
     ) -> None:
         """ユーザーのタスク一覧が取得できること"""
@@ -152,30 +152,30 @@ class TestTaskServiceIntegration:
 
         # 複数タスク作成
         for i in range(3):
-            task = service.create_task(
+            task = await service.create_task(
                 user_id=test_user_id,
                 image_url=TEST_IMAGE_URL,
             )
             cleanup_task_ids.append(task.task_id)
 
         # 一覧取得
-        tasks = service.list_tasks(user_id=test_user_id, limit=10)
+        tasks = await service.list_tasks(user_id=test_user_id, limit=10)
         assert len(tasks) == 3
 
-    def test_delete_task(
+    async def test_delete_task(
         self, service: TaskService, cleanup_task_ids: list[str]
     ) -> None:
         """タスク削除が正常に動作すること"""
         # タスク作成
-        task = service.create_task(
+        task = await service.create_task(
             user_id="integration-test-user",
             image_url=TEST_IMAGE_URL,
         )
 
         # 削除
-        deleted = service.delete_task(task.task_id)
+        deleted = await service.delete_task(task.task_id)
         assert deleted is True
 
         # 削除確認
-        fetched = service.get_task(task.task_id)
+        fetched = await service.get_task(task.task_id)
         assert fetched is None
@@ -0,0 +1,43 @@
+"""テキストからのJSON抽出のテスト"""
+
+from src.utils.json_extraction import extract_json_object
+
+
+class TestExtractJsonObject:
+    """extract_json_objectのテスト"""
+
+    def test_plain_json(self) -> None:
+        """JSONのみのテキスト"""
+        assert extract_json_object('{"overall_score": 70}') == {"overall_score": 70}
+
+    def test_code_block(self) -> None:
+        """markdown code blockで囲まれたJSON"""
+        text = '分析結果です。\n```json\n{"a": {"b": "}"}}\n```\n以上です。'
+
+        assert extract_json_object(text) == {"a": {"b": "}"}}
+
+    def test_skips_invalid_candidate(self) -> None:
+        """JSONでない括弧は読み飛ばす"""
+        assert extract_json_object('注意 {重要} 結果: {"ok": true}') == {"ok": True}
+
+    def test_no_json(self) -> None:
+        """JSONを含まないテキスト"""
+        assert extract_json_object("よく描けています。") is None
+
+    def test_truncated_json(self) -> None:
+        """閉じていないJSONは抽出しない"""
+        assert extract_json_object('{"overall_score": 70') is None
+
+    def test_does_not_return_nested_object_of_invalid_json(self) -> None:
+        """不正なJSONの内側にあるオブジェクトは抽出しない"""
+        assert extract_json_object('{"analysis": {"overall_score": 70}, 不正}') is None
+
+    def test_truncated_json_with_nested_object(self) -> None:
+        """閉じていないJSONの内側にあるオブジェクトは抽出しない"""
+        assert extract_json_object('{"analysis": {"overall_score": 70}') is None
+
+    def test_escaped_quote_in_string(self) -> None:
+        """文字列内のエスケープされた引用符と括弧は括弧の対応に数えない"""
+        text = '結果: {"comment": "\\"{\\" に注意"} 以上'
+
+        assert extract_json_object(text) == {"comment": '"{" に注意'}
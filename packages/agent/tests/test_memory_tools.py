@@ -1,5 +1,9 @@
 """メモリツールのテスト"""
 
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import AbstractContextManager
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -11,8 +15,11 @@ from dessin_coaching_agent.callbacks import (
 )
 from dessin_coaching_agent.memory_tools import (
     _extract_metadata,
+    merge_memories,
     search_memory_by_motif,
+    search_past_memories,
     search_recent_memories,
+    search_recent_memories_async,
 )
 from dessin_coaching_agent.models import (
     DessinAnalysis,
@@ -89,14 +96,14 @@ class TestSaveAnalysisToMemory:
             patch(
                 "dessin_coaching_agent.callbacks.settings"
             ) as mock_settings,
-            patch("dessin_coaching_agent.callbacks.Client") as mock_client_cls,
+            patch("dessin_coaching_agent.callbacks.get_vertex_client") as mock_get_client,
         ):
             mock_settings.agent_engine_id = "test-engine"
             mock_settings.gcp_project_id = "test-project"
             mock_settings.gcp_region = "us-central1"
 
             mock_client = MagicMock()
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = save_analysis_to_memory(sample_analysis, "test_user")
 
@@ -111,7 +118,7 @@ class TestSaveAnalysisToMemory:
             patch(
                 "dessin_coaching_agent.callbacks.settings"
             ) as mock_settings,
-            patch("dessin_coaching_agent.callbacks.Client") as mock_client_cls,
+            patch("dessin_coaching_agent.callbacks.get_vertex_client") as mock_get_client,
         ):
             mock_settings.agent_engine_id = "test-engine"
             mock_settings.gcp_project_id = "test-project"
@@ -121,7 +128,7 @@ class TestSaveAnalysisToMemory:
             mock_client.agent_engines.memories.generate.side_effect = Exception(
                 "API Error"
             )
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = save_analysis_to_memory(sample_analysis, "test_user")
 
@@ -179,8 +186,8 @@ class TestSearchMemoryByMotif:
                 "dessin_coaching_agent.memory_tools.settings"
             ) as mock_settings,
             patch(
-                "dessin_coaching_agent.memory_tools.Client"
-            ) as mock_client_cls,
+                "dessin_coaching_agent.memory_tools.get_vertex_client"
+            ) as mock_get_client,
         ):
             mock_settings.agent_engine_id = "test-engine"
             mock_settings.gcp_project_id = "test-project"
@@ -197,7 +204,7 @@ class TestSearchMemoryByMotif:
             mock_client.agent_engines.memories.retrieve.return_value = [
                 mock_retrieved
             ]
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = search_memory_by_motif("りんご", "test_user")
 
@@ -226,8 +233,8 @@ class TestSearchRecentMemories:
                 "dessin_coaching_agent.memory_tools.settings"
             ) as mock_settings,
             patch(
-                "dessin_coaching_agent.memory_tools.Client"
-            ) as mock_client_cls,
+                "dessin_coaching_agent.memory_tools.get_vertex_client"
+            ) as mock_get_client,
         ):
             mock_settings.agent_engine_id = "test-engine"
             mock_settings.gcp_project_id = "test-project"
@@ -246,13 +253,91 @@ class TestSearchRecentMemories:
             mock_client.agent_engines.memories.retrieve.return_value = (
                 mock_memories
             )
-            mock_client_cls.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = search_recent_memories("test_user", limit=3)
 
             assert len(result) == 3
 
 
+class FakeAsyncMemories:
+    """client.aio.agent_engines.memories 相当（遅延付き・取得件数を記録）"""
+
+    LATENCY = 0.2
+
+    def __init__(self, recent: list[str], by_motif: list[str]) -> None:
+        self._recent = recent
+        self._by_motif = by_motif
+        self.yielded = 0
+        self.page_sizes: list[int] = []
+
+    async def retrieve(self, **kwargs: object) -> object:
+        await asyncio.sleep(self.LATENCY)
+        self.page_sizes.append(kwargs["simple_retrieval_params"]["page_size"])  # type: ignore[index]
+        facts = self._by_motif if kwargs.get("config") else self._recent
+        return self._pager(facts)
+
+    async def _pager(self, facts: list[str]) -> AsyncIterator[MagicMock]:
+        for fact in facts:
+            self.yielded += 1
+            retrieved = MagicMock()
+            retrieved.memory.fact = fact
+            retrieved.memory.metadata = {}
+            yield retrieved
+
+
+def _patch_async_client(memories: FakeAsyncMemories) -> AbstractContextManager[MagicMock]:
+    mock_client = MagicMock()
+    mock_client.aio.agent_engines.memories = memories
+    return patch(
+        "dessin_coaching_agent.memory_tools.get_vertex_client", return_value=mock_client
+    )
+
+
+class TestAsyncMemorySearch:
+    """非同期メモリ検索のテスト"""
+
+    async def test_recent_stops_at_limit(self) -> None:
+        """件数をページサイズとして渡し、limit件で取得を打ち切る"""
+        memories = FakeAsyncMemories(recent=[f"分析結果{i}" for i in range(10)], by_motif=[])
+        with (
+            patch("dessin_coaching_agent.memory_tools.settings") as mock_settings,
+            _patch_async_client(memories),
+        ):
+            mock_settings.agent_engine_id = "test-engine"
+
+            result = await search_recent_memories_async("test_user", limit=3)
+
+        assert [m["fact"] for m in result] == ["分析結果0", "分析結果1", "分析結果2"]
+        assert memories.page_sizes == [3]
+        assert memories.yielded == 3
+
+    async def test_past_memories_run_concurrently(self) -> None:
+        """モチーフ別・直近の検索を並行実行し、モチーフ別を優先して重複を除く"""
+        memories = FakeAsyncMemories(recent=["直近1", "りんご1", "直近2"], by_motif=["りんご1"])
+        with (
+            patch("dessin_coaching_agent.memory_tools.settings") as mock_settings,
+            _patch_async_client(memories),
+        ):
+            mock_settings.agent_engine_id = "test-engine"
+
+            started_at = time.perf_counter()
+            result = await search_past_memories("test_user", "りんご", limit=5)
+
+        assert time.perf_counter() - started_at < FakeAsyncMemories.LATENCY * 2
+        assert [m["fact"] for m in result] == ["りんご1", "直近1", "直近2"]
+
+    def test_merge_memories_limit(self) -> None:
+        """結合結果はlimit件まで"""
+        result = merge_memories(
+            [{"fact": "a", "metadata": {}}],
+            [{"fact": "b", "metadata": {}}, {"fact": "c", "metadata": {}}],
+            limit=2,
+        )
+
+        assert [m["fact"] for m in result] == ["a", "b"]
+
+
 class TestExtractMetadata:
     """_extract_metadata のテスト"""
 
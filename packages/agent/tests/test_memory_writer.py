@@ -0,0 +1,115 @@
+"""Memory Bank非同期保存のテスト"""
+
+import datetime
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from dessin_coaching_agent.memory_writer import MemoryWriter
+from dessin_coaching_agent.models import (
+    DessinAnalysis,
+    LineQualityAnalysis,
+    ProportionAnalysis,
+    TextureAnalysis,
+    ToneAnalysis,
+)
+
+# フェイクMemory Bankの保存にかかる時間（秒）
+SAVE_LATENCY = 0.3
+
+
+@pytest.fixture
+def analysis() -> DessinAnalysis:
+    return DessinAnalysis(
+        proportion=ProportionAnalysis(
+            shape_accuracy="良好", ratio_balance="適切", contour_quality="安定", score=75.0
+        ),
+        tone=ToneAnalysis(
+            value_range="5段階", light_consistency="一貫", three_dimensionality="良好", score=70.0
+        ),
+        texture=TextureAnalysis(material_expression="基本的", touch_variety="限定的", score=65.0),
+        line_quality=LineQualityAnalysis(
+            stroke_quality="安定", pressure_control="適切", hatching="基本的", score=72.0
+        ),
+        overall_score=70.5,
+        strengths=["陰影"],
+        improvements=["質感"],
+        tags=["りんご"],
+    )
+
+
+class FakeMemoryBank:
+    """指定回数だけ失敗してから成功する保存関数"""
+
+    def __init__(self, failures: int = 0, latency: float = 0.0) -> None:
+        self.failures = failures
+        self.latency = latency
+        self.calls: list[datetime.datetime | None] = []
+        self.saved = threading.Event()
+
+    def save(
+        self,
+        _analysis: DessinAnalysis,
+        _user_id: str,
+        _session_id: str,
+        submitted_at: datetime.datetime | None,
+    ) -> bool:
+        time.sleep(self.latency)
+        self.calls.append(submitted_at)
+        if len(self.calls) <= self.failures:
+            return False
+        self.saved.set()
+        return True
+
+
+def _writer(spool_dir: Path, bank: FakeMemoryBank, max_attempts: int = 3) -> MemoryWriter:
+    return MemoryWriter(spool_dir, save=bank.save, max_attempts=max_attempts, base_delay=0.0)
+
+
+class TestMemoryWriter:
+    """MemoryWriterのテスト"""
+
+    def test_submit_does_not_wait_for_save(self, tmp_path: Path, analysis: DessinAnalysis) -> None:
+        """保存の完了を待たずに返り、完了後にスプールを削除する"""
+        bank = FakeMemoryBank(latency=SAVE_LATENCY)
+        writer = _writer(tmp_path, bank)
+
+        started_at = time.perf_counter()
+        writer.submit(analysis, "user-1", "review-1")
+
+        assert time.perf_counter() - started_at < SAVE_LATENCY
+        assert list(tmp_path.glob("*.json"))
+        assert writer.flush(timeout=5)
+        assert bank.saved.is_set()
+        assert not list(tmp_path.glob("*.json"))
+
+    def test_retries_with_same_submitted_at(self, tmp_path: Path, analysis: DessinAnalysis) -> None:
+        """失敗時は再試行し、提出日時は初回のものを使う"""
+        bank = FakeMemoryBank(failures=2)
+        writer = _writer(tmp_path, bank)
+
+        writer.submit(analysis, "user-1")
+
+        assert writer.flush(timeout=5)
+        assert len(bank.calls) == 3
+        assert len(set(bank.calls)) == 1
+        assert not list(tmp_path.glob("*.json"))
+
+    def test_gave_up_request_is_recovered(self, tmp_path: Path, analysis: DessinAnalysis) -> None:
+        """再試行の上限に達した依頼はスプールに残り、次の起動時に再送される"""
+        failing = FakeMemoryBank(failures=10)
+        writer = _writer(tmp_path, failing, max_attempts=2)
+        writer.submit(analysis, "user-1")
+        assert writer.flush(timeout=5)
+        assert len(list(tmp_path.glob("*.json"))) == 1
+
+        bank = FakeMemoryBank()
+        restarted = _writer(tmp_path, bank)
+        restarted.submit(analysis, "user-2")
+
+        assert restarted.flush(timeout=5)
+        assert len(bank.calls) == 2
+        assert failing.calls[0] in bank.calls
+        assert not list(tmp_path.glob("*.json"))
@@ -0,0 +1,370 @@
+"""Geminiモデル呼び出しの同時実行制御のテスト
+
+バックエンド（asyncio）とエージェント（スレッド）のModelGovernorについて、
+モデルごとの同時実行数・レートの上限と、429を受けた際のクールダウンの共有を確認する。
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.genai import errors, types
+
+from dessin_coaching_agent import custom_gemini, tools
+from dessin_coaching_agent import model_governor as agent_model_governor
+from dessin_coaching_agent.custom_gemini import GlobalGemini
+from dessin_coaching_agent.model_governor import ModelGovernor as AgentModelGovernor
+from src.models.feedback import (
+    DessinAnalysis,
+    LineQualityAnalysis,
+    ProportionAnalysis,
+    TextureAnalysis,
+    ToneAnalysis,
+)
+from src.models.rank import Rank, UserRank
+from src.services import http_client, model_governor
+from src.services.annotation_service import AnnotationService
+from src.services.model_governor import ModelBudget, ModelGovernor
+from src.services.retry_policy import RetryPolicy
+
+MODEL = "gemini-3-flash-preview"
+IMAGE_MODEL = "gemini-3-pro-image-preview"
+
+# フェイク呼び出しの所要時間（秒）
+LATENCY = 0.05
+
+
+def _governor(max_concurrent: int = 2, requests_per_minute: float = 0.0) -> ModelGovernor:
+    return ModelGovernor(
+        budgets={IMAGE_MODEL: ModelBudget(max_concurrent=1)},
+        default_budget=ModelBudget(
+            max_concurrent=max_concurrent, requests_per_minute=requests_per_minute
+        ),
+    )
+
+
+def _resource_exhausted() -> errors.ClientError:
+    return errors.ClientError(
+        429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}}
+    )
+
+
+class TestModelGovernor:
+    """バックエンドのModelGovernorのテスト"""
+
+    async def test_bounded_concurrency_per_model(self) -> None:
+        """モデルごとの同時実行数を超えない（他のモデルの予算とは独立）"""
+        governor = _governor(max_concurrent=2)
+        running: dict[str, int] = {MODEL: 0, IMAGE_MODEL: 0}
+        peak: dict[str, int] = {MODEL: 0, IMAGE_MODEL: 0}
+
+        async def call(model: str) -> None:
+            async with governor.acquire(model):
+                running[model] += 1
+                peak[model] = max(peak[model], running[model])
+                await asyncio.sleep(LATENCY)
+                running[model] -= 1
+
+        await asyncio.gather(*(call(MODEL) for _ in range(6)), *(call(IMAGE_MODEL) for _ in range(3)))
+
+        assert peak == {MODEL: 2, IMAGE_MODEL: 1}
+        stats = {entry.model: entry for entry in governor.stats()}
+        assert stats[MODEL].acquired == 6
+        assert stats[MODEL].in_flight == 0
+        assert stats[MODEL].waiting == 0
+        assert stats[MODEL].wait_seconds_sum > 0
+
+    async def test_requests_per_minute(self) -> None:
+        """1分あたりのリクエスト数を超えて開始しない"""
+        governor = _governor(max_concurrent=1, requests_per_minute=600)  # 0.1秒に1回
+
+        started_at = time.perf_counter()
+        for _ in range(3):
+            async with governor.acquire(MODEL):
+                pass
+
+        # 初回はバケットの残量で即時、以降は0.1秒ごと
+        assert time.perf_counter() - started_at >= 0.18
+
+    async def test_throttle_delays_all_callers(self) -> None:
+        """429を受けるとクールダウンが明けるまで同じモデルの呼び出しを開始しない"""
+        governor = _governor(max_concurrent=4)
+        governor.report_throttled(MODEL, retry_after=0.2)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(self._acquire(governor, MODEL) for _ in range(3)))
+        assert time.perf_counter() - started_at >= 0.2
+
+        # 他のモデルは待たない
+        started_at = time.perf_counter()
+        await self._acquire(governor, IMAGE_MODEL)
+        assert time.perf_counter() - started_at < 0.1
+
+    async def test_render_prometheus(self) -> None:
+        """モデルごとの待機・実行状況を出力する"""
+        governor = _governor()
+        await self._acquire(governor, MODEL)
+        governor.report_throttled(MODEL, retry_after=0)
+
+        text = governor.render_prometheus()
+
+        assert "# TYPE gemini_governor_waiting gauge" in text
+        assert f'gemini_governor_acquired_total{{model="{MODEL}"}} 1' in text
+        assert f'gemini_governor_throttled_total{{model="{MODEL}"}} 1' in text
+
+    @staticmethod
+    async def _acquire(governor: ModelGovernor, model: str) -> None:
+        async with governor.acquire(model):
+            pass
+
+
+def _analysis() -> DessinAnalysis:
+    return DessinAnalysis(
+        proportion=ProportionAnalysis(
+            shape_accuracy="良好", ratio_balance="適切", contour_quality="安定", score=75.0
+        ),
+        tone=ToneAnalysis(
+            value_range="5段階", light_consistency="一貫", three_dimensionality="良好", score=70.0
+        ),
+        texture=TextureAnalysis(material_expression="基本的", touch_variety="限定的", score=65.0),
+        line_quality=LineQualityAnalysis(
+            stroke_quality="安定", pressure_control="適切", hatching="基本的", score=72.0
+        ),
+        overall_score=70.5,
+        strengths=["陰影"],
+        improvements=["質感"],
+        tags=["りんご"],
+    )
+
+
+@pytest.fixture
+async def throttling_function() -> AsyncIterator[TestServer]:
+    """429とRetry-Afterを返すスタブCloud Function"""
+
+    async def handler(_request: web.Request) -> web.Response:
+        return web.json_response({"error": "quota"}, status=429, headers={"Retry-After": "7"})
+
+    app = web.Application()
+    app.router.add_post("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    await http_client.start_http_client()
+    yield server
+    await http_client.close_http_client()
+    await server.close()
+
+
+class TestAnnotationServiceThrottling:
+    """アノテーション生成サービスからの429通知のテスト"""
+
+    async def test_429_is_reported_to_governor(
+        self, monkeypatch: pytest.MonkeyPatch, throttling_function: TestServer
+    ) -> None:
+        """Cloud Functionの429はRetry-Afterの秒数でモデル単位のクールダウンになる"""
+        clock = SimpleNamespace(now=100.0)
+        governor = ModelGovernor(
+            budgets={}, default_budget=ModelBudget(max_concurrent=2), clock=lambda: clock.now
+        )
+        monkeypatch.setattr(model_governor, "_model_governor", governor)
+        service = AnnotationService(
+            retry_policy=RetryPolicy(max_attempts=1, base_delay=0.0, max_delay=0.0)
+        )
+        service.function_url = str(throttling_function.make_url("/"))
+
+        with patch(
+            "src.services.id_token_cache.google.oauth2.id_token.fetch_id_token",
+            return_value="token",
+        ):
+            url = await service.generate_annotated_image(
+                task_id="task-1",
+                original_image_url="https://storage.googleapis.com/b/uploads/t.jpg",
+                analysis=_analysis(),
+                user_rank=UserRank(user_id="user-1", current_rank=Rank.KYU_7, current_score=70.5),
+                motif_tags=["りんご"],
+            )
+
+        assert url is None
+        [stats] = governor.stats()
+        assert stats.throttled == 1
+        assert stats.in_flight == 0
+        state = governor._state(stats.model)
+        assert state.blocked_until == 107.0
+
+
+class TestAgentModelGovernor:
+    """エージェントのModelGovernor（スレッドセーフ版）のテスト"""
+
+    def test_bounded_concurrency_across_threads(self) -> None:
+        """スレッドから同時に呼び出しても同時実行数を超えない"""
+        governor = AgentModelGovernor(max_concurrent=2)
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def call() -> None:
+            nonlocal running, peak
+            with governor.acquire(MODEL):
+                with lock:
+                    running += 1
+                    peak = max(peak, running)
+                time.sleep(LATENCY)
+                with lock:
+                    running -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak == 2
+
+    async def test_async_callers_share_budget_with_threads(self) -> None:
+        """非同期の呼び出し元もスレッドと同じ予算・クールダウンに従う"""
+        governor = AgentModelGovernor(max_concurrent=1)
+        governor.report_throttled(MODEL, retry_after=0.1)
+
+        started_at = time.perf_counter()
+        async with governor.acquire_async(MODEL):
+            assert time.perf_counter() - started_at >= 0.1
+            # 実行枠を確保している間は、スレッドからの呼び出しは待つ
+            acquired = threading.Event()
+
+            def call() -> None:
+                with governor.acquire(MODEL):
+                    acquired.set()
+
+            thread = threading.Thread(target=call)
+            thread.start()
+            await asyncio.sleep(LATENCY)
+            assert not acquired.is_set()
+
+        await asyncio.to_thread(thread.join)
+        assert acquired.is_set()
+
+    def test_tool_call_reports_resource_exhausted(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """ツール内のGemini呼び出しで429を受けるとクールダウンを共有する"""
+        governor = AgentModelGovernor(max_concurrent=2, throttle_cooldown_seconds=30)
+        monkeypatch.setattr(agent_model_governor, "get_model_governor", lambda: governor)
+        monkeypatch.setattr(tools, "get_model_governor", lambda: governor)
+
+        def generate_content(**_kwargs: object) -> None:
+            raise _resource_exhausted()
+
+        client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+
+        with pytest.raises(errors.ClientError):
+            tools._generate_content(
+                client,  # type: ignore[arg-type]
+                contents=[types.Content(role="user", parts=[types.Part.from_text(text="x")])],
+                config=types.GenerateContentConfig(),
+            )
+
+        state = governor._states[tools.settings.gemini_model]
+        assert state.in_flight == 0
+        assert state.blocked_until > time.monotonic() + 20
+
+    async def test_concurrent_sessions_with_tool_calls(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """同時実行数以上のセッションがLLM応答の処理中にツールを呼び出しても詰まらない
+
+        ADKはLLMのレスポンスを受け取るループの中でツールを実行する。
+        ツールのGemini呼び出しはスレッドで実行され、イベントループを止めない。
+        """
+        governor = AgentModelGovernor(max_concurrent=2)
+        monkeypatch.setattr(custom_gemini, "get_model_governor", lambda: governor)
+        monkeypatch.setattr(tools, "get_model_governor", lambda: governor)
+
+        async def generate_content_async(
+            _self: Gemini, _request: LlmRequest, _stream: bool = False
+        ) -> AsyncGenerator[LlmResponse, None]:
+            await asyncio.sleep(LATENCY)
+            yield LlmResponse()
+
+        monkeypatch.setattr(Gemini, "generate_content_async", generate_content_async)
+
+        def generate_content(**_kwargs: object) -> None:
+            time.sleep(LATENCY)
+
+        client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+
+        def tool() -> None:
+            tools._generate_content(
+                client,  # type: ignore[arg-type]
+                contents=[types.Content(role="user", parts=[types.Part.from_text(text="x")])],
+                config=types.GenerateContentConfig(),
+            )
+
+        model = GlobalGemini(model=MODEL)
+        async_tool = tools.run_in_thread(tool)
+        received = 0
+
+        async def session() -> None:
+            nonlocal received
+            async for _response in model.generate_content_async(LlmRequest()):
+                received += 1
+                # 全セッションがレスポンスを受け取ってからツールを呼び出す
+                while received < sessions:
+                    await asyncio.sleep(0.01)
+                await async_tool()
+
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        sessions = 4
+        ticking = asyncio.create_task(ticker())
+        try:
+            await asyncio.wait_for(asyncio.gather(*(session() for _ in range(sessions))), 5)
+        finally:
+            ticking.cancel()
+
+        assert governor._states[MODEL].in_flight == 0
+        # ツールの実行中もイベントループは他の処理を進められる
+        assert ticks >= 5
+
+    async def test_streaming_yields_chunks_as_they_arrive(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """ストリーミング時は最初のチャンクで枠を解放し、以降のチャンクを逐次返す"""
+        governor = AgentModelGovernor(max_concurrent=1)
+        monkeypatch.setattr(custom_gemini, "get_model_governor", lambda: governor)
+        first_received = asyncio.Event()
+
+        async def generate_content_async(
+            _self: Gemini, _request: LlmRequest, stream: bool = False
+        ) -> AsyncGenerator[LlmResponse, None]:
+            assert stream
+            yield LlmResponse(partial=True)
+            # 呼び出し元が最初のチャンクを受け取るまで次のチャンクを返さない
+            await first_received.wait()
+            yield LlmResponse()
+
+        monkeypatch.setattr(Gemini, "generate_content_async", generate_content_async)
+
+        model = GlobalGemini(model=MODEL)
+        partials: list[bool | None] = []
+
+        async def consume() -> None:
+            async for response in model.generate_content_async(LlmRequest(), stream=True):
+                partials.append(response.partial)
+                if not first_received.is_set():
+                    assert governor._states[MODEL].in_flight == 0
+                    first_received.set()
+
+        await asyncio.wait_for(consume(), 5)
+
+        assert partials == [True, None]
+        assert governor._states[MODEL].in_flight == 0
@@ -0,0 +1,179 @@
+"""システムプロンプトの再利用とコンテキストキャッシュのテスト"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import types
+
+from dessin_coaching_agent.prompt_cache import PromptCacheManager
+from dessin_coaching_agent.prompts import (
+    PROMPT_VERSION,
+    build_submission_prompt,
+    get_dessin_analysis_system_prompt,
+    get_prompt_key,
+    get_static_system_prompt,
+)
+
+MEMORIES: list[dict[str, object]] = [
+    {"fact": "陰影が豊か", "metadata": {"motif": "りんご", "overall_score": 70}}
+]
+
+
+class FakeCaches:
+    """cached content のAPIを模擬し、呼び出しを記録する"""
+
+    def __init__(self) -> None:
+        self.created: list[types.CreateCachedContentConfig] = []
+        self.updated: list[str] = []
+        self.fail_create = False
+        self.fail_update = False
+
+    def create(self, *, model: str, config: types.CreateCachedContentConfig) -> types.CachedContent:
+        if self.fail_create:
+            raise RuntimeError("cache too small")
+        self.created.append(config)
+        return types.CachedContent(name=f"cachedContents/{len(self.created)}", model=model)
+
+    def update(self, *, name: str, config: types.UpdateCachedContentConfig) -> types.CachedContent:
+        if self.fail_update:
+            raise RuntimeError("not found")
+        assert config.ttl == "3600s"
+        self.updated.append(name)
+        return types.CachedContent(name=name)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _manager(caches: FakeCaches, clock: FakeClock) -> PromptCacheManager:
+    return PromptCacheManager(
+        caches,
+        "gemini-3-flash-preview",
+        ttl_seconds=3600,
+        refresh_margin_seconds=300,
+        retry_after_seconds=60,
+        clock=clock,
+    )
+
+
+class TestSystemPrompt:
+    """システムプロンプトの組み立てのテスト"""
+
+    def test_static_prompt_is_shared_within_rank_category(self) -> None:
+        """同じランク区分では固定部分を再生成しない"""
+        assert get_static_system_prompt("5級") is get_static_system_prompt("1級")
+        assert get_static_system_prompt("5級") != get_static_system_prompt("10級")
+        assert get_prompt_key("5級") == ("中級", PROMPT_VERSION)
+
+    def test_submission_section_is_appended(self) -> None:
+        """ランクと過去メモリは固定部分の末尾に追加する"""
+        prompt = get_dessin_analysis_system_prompt("5級", MEMORIES)
+
+        assert prompt == get_static_system_prompt("5級") + build_submission_prompt("5級", MEMORIES)
+        assert "**現在のランク" not in get_static_system_prompt("5級")
+        assert "**現在のランク: 5級**" in build_submission_prompt("5級", MEMORIES)
+        assert "陰影が豊か" in build_submission_prompt("5級", MEMORIES)
+
+    def test_agent_prompt_without_rank(self) -> None:
+        """rank_label=Noneではランク行を含めない"""
+        assert "現在のランク" not in build_submission_prompt(None, None)
+        assert "ユーザーランク" in get_static_system_prompt(None)
+
+
+class TestPromptCacheManager:
+    """PromptCacheManagerのテスト"""
+
+    def test_creates_once_per_rank_category(self) -> None:
+        """ランク区分ごとに1度だけ作成し、以降は同じキャッシュを使う"""
+        caches, clock = FakeCaches(), FakeClock()
+        manager = _manager(caches, clock)
+
+        first = manager.get_cached_content("5級")
+        assert manager.get_cached_content("1級") == first
+        assert manager.get_cached_content("10級") != first
+
+        assert len(caches.created) == 2
+        assert caches.created[0].system_instruction == get_static_system_prompt("5級")
+        assert caches.created[0].ttl == "3600s"
+
+    def test_extends_before_expiry(self) -> None:
+        """期限が近づいたらTTLを延長する"""
+        caches, clock = FakeCaches(), FakeClock()
+        manager = _manager(caches, clock)
+        name = manager.get_cached_content("5級")
+
+        clock.now = 3400
+        assert manager.get_cached_content("5級") == name
+        assert caches.updated == [name]
+        assert len(caches.created) == 1
+
+        # 延長後の期限まではAPIを呼ばない
+        clock.now = 6000
+        manager.get_cached_content("5級")
+        assert caches.updated == [name]
+
+    def test_recreates_after_expiry_or_failed_extend(self) -> None:
+        """期限切れ・延長失敗時は作り直す"""
+        caches, clock = FakeCaches(), FakeClock()
+        manager = _manager(caches, clock)
+        manager.get_cached_content("5級")
+
+        clock.now = 4000
+        manager.get_cached_content("5級")
+        assert len(caches.created) == 2
+
+        caches.fail_update = True
+        clock.now = 7400
+        assert manager.get_cached_content("5級") == "cachedContents/3"
+
+    def test_falls_back_after_create_failure(self) -> None:
+        """作成に失敗した場合はNoneを返し、しばらく再作成しない"""
+        caches, clock = FakeCaches(), FakeClock()
+        caches.fail_create = True
+        manager = _manager(caches, clock)
+
+        assert manager.get_cached_content("5級") is None
+
+        caches.fail_create = False
+        clock.now = 30
+        assert manager.get_cached_content("5級") is None
+        assert caches.created == []
+
+        clock.now = 61
+        assert manager.get_cached_content("5級") == "cachedContents/1"
+
+    def test_api_calls_do_not_hold_lock(self) -> None:
+        """作成中も他のランク区分は待たず、同じ区分は作成の完了を待たずにNoneを返す"""
+        caches, clock = FakeCaches(), FakeClock()
+        manager = _manager(caches, clock)
+        started, release = threading.Event(), threading.Event()
+        create = caches.create
+
+        def slow_create(
+            *, model: str, config: types.CreateCachedContentConfig
+        ) -> types.CachedContent:
+            if config.system_instruction == get_static_system_prompt("5級"):
+                started.set()
+                assert release.wait(timeout=5)
+            return create(model=model, config=config)
+
+        caches.create = slow_create  # type: ignore[method-assign]
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(manager.get_cached_content, "5級")
+            assert started.wait(timeout=5)
+
+            assert manager.get_cached_content("10級") is not None
+            assert manager.get_cached_content("1級") is None
+
+            release.set()
+            name = pending.result(timeout=5)
+
+        assert name is not None
+        assert manager.get_cached_content("1級") == name
+        assert len(caches.created) == 2
@@ -1,59 +1,51 @@
+import asyncio
 import unittest
 from datetime import datetime
-from unittest.mock import MagicMock, patch
 
-from src.models.rank import Rank, RankHistory, UserRank
+from src.models.rank import Rank
 from src.services.rank_service import RankService
+from tests.fake_firestore import FakeAsyncFirestore
 
+USER_PATH = "users/test_user"
 
-class TestRankService(unittest.TestCase):
+
+class TestRankService(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.mock_db = MagicMock()
-        self.mock_collection = MagicMock()
-        self.mock_db.collection.return_value = self.mock_collection
-        self.service = RankService(db=self.mock_db)
+        self.db = FakeAsyncFirestore()
+        self.service = RankService(db=self.db)
+
+    def _history(self) -> list[dict[str, object]]:
+        prefix = f"{USER_PATH}/rank_history/"
+        return [data for path, data in self.db.documents.items() if path.startswith(prefix)]
 
     def test_get_next_rank(self):
         """1つ上のランクを取得するテスト"""
         # 10級 -> 9級
         self.assertEqual(self.service._get_next_rank(Rank.KYU_10), Rank.KYU_9)
-        
+
         # 9級 -> 8級
         self.assertEqual(self.service._get_next_rank(Rank.KYU_9), Rank.KYU_8)
-        
+
         # 1級 -> 初段
         self.assertEqual(self.service._get_next_rank(Rank.KYU_1), Rank.DAN_1)
-        
+
         # 初段 -> 二段
         self.assertEqual(self.service._get_next_rank(Rank.DAN_1), Rank.DAN_2)
-        
+
         # 師範代 -> 師範
         self.assertEqual(self.service._get_next_rank(Rank.SHIHAN_DAI), Rank.SHIHAN)
-        
+
         # 師範 -> None (最高ランク)
         self.assertIsNone(self.service._get_next_rank(Rank.SHIHAN))
 
-    def test_update_user_rank_initial_high_score(self):
+    async def test_update_user_rank_initial_high_score(self):
         """初回ランク更新 (80点以上) -> 10級から9級へ昇格"""
         user_id = "test_user"
         score = 85.0  # High score
         task_id = "test_task"
 
         # ユーザーが存在しない場合（初期ランクは10級）
-        mock_user_ref = MagicMock()
-        mock_user_doc = MagicMock()
-        mock_user_doc.exists = False
-        mock_user_ref.get.return_value = mock_user_doc
-        
-        # rank_history コレクションモック
-        mock_history_col = MagicMock()
-        mock_history_ref = MagicMock()
-        mock_user_ref.collection.return_value = mock_history_col
-        mock_history_col.document.return_value = mock_history_ref
-
-        self.mock_collection.document.return_value = mock_user_ref
-
-        result = self.service.update_user_rank(user_id, score, task_id)
+        result = await self.service.update_user_rank(user_id, score, task_id)
 
         # 結果検証: 80点以上なので10級から9級に昇格
         self.assertEqual(result.current_rank, Rank.KYU_9)
@@ -61,136 +53,216 @@ class TestRankService(unittest.TestCase):
         self.assertEqual(result.total_submissions, 1)
         self.assertEqual(len(result.high_scores), 1)
 
-        # 呼び出し検証
-        self.mock_collection.document.assert_called_with(user_id)
-        mock_user_ref.set.assert_called_with({
-            "rank": Rank.KYU_9.value,
-            "latest_score": score,
-            "total_submissions": 1,
-            "high_scores": [score],
-            "updated_at": unittest.mock.ANY,
-        }, merge=True)
+        # 保存内容の検証
+        stored = self.db.documents[USER_PATH]
+        self.assertEqual(stored["rank"], Rank.KYU_9.value)
+        self.assertEqual(stored["latest_score"], score)
+        self.assertEqual(stored["total_submissions"], 1)
+        self.assertEqual(stored["high_scores"], [score])
+        self.assertIsInstance(stored["updated_at"], datetime)
 
-    def test_update_user_rank_increment(self):
+        # 初回なので履歴が保存される
+        history = self._history()
+        self.assertEqual(len(history), 1)
+        self.assertIsNone(history[0]["old_rank"])
+        self.assertEqual(history[0]["new_rank"], Rank.KYU_9.value)
+
+    async def test_update_user_rank_increment(self):
         """既存ユーザーのランク更新 (80点以上で1ランクアップ)"""
         user_id = "test_user"
         score = 90.0
         task_id = "test_task"
 
         # 既存ユーザー情報 (9級)
-        mock_user_ref = MagicMock()
-        mock_user_doc = MagicMock()
-        mock_user_doc.exists = True
-        mock_user_doc.to_dict.return_value = {
+        self.db.documents[USER_PATH] = {
             "rank": Rank.KYU_9.value,
             "latest_score": 85.0,
             "total_submissions": 5,
             "high_scores": [85.0]
         }
-        mock_user_ref.get.return_value = mock_user_doc
-        
-        mock_history_col = MagicMock()
-        mock_history_ref = MagicMock()
-        mock_user_ref.collection.return_value = mock_history_col
-        mock_history_col.document.return_value = mock_history_ref
-
-        self.mock_collection.document.return_value = mock_user_ref
 
         # 今回も80点以上 -> 9級から8級に昇格
-        result = self.service.update_user_rank(user_id, score, task_id)
+        result = await self.service.update_user_rank(user_id, score, task_id)
 
         # 結果検証: 80点以上なので9級から8級に昇格
         self.assertEqual(result.current_rank, Rank.KYU_8)
         self.assertEqual(result.total_submissions, 6)
         self.assertEqual(len(result.high_scores), 2)  # 高スコアリストに追加
-        
-    def test_update_user_rank_no_high_score(self):
+        self.assertEqual(self.db.documents[USER_PATH]["total_submissions"], 6)
+
+    async def test_update_user_rank_no_high_score(self):
         """80点未満の場合、ランクは上がらないが提出回数は増える"""
         user_id = "test_user"
         score = 79.0 # Not a high score
         task_id = "test_task"
 
         # 既存ユーザー情報 (9級)
-        mock_user_ref = MagicMock()
-        mock_user_doc = MagicMock()
-        mock_user_doc.exists = True
-        mock_user_doc.to_dict.return_value = {
+        self.db.documents[USER_PATH] = {
             "rank": Rank.KYU_9.value,
             "latest_score": 85.0,
             "total_submissions": 5,
             "high_scores": [85.0]
         }
-        mock_user_ref.get.return_value = mock_user_doc
-        
-        mock_history_col = MagicMock()
-        mock_user_ref.collection.return_value = mock_history_col
-
-        self.mock_collection.document.return_value = mock_user_ref
 
         # 今回79点 -> 80点未満なのでランクは9級のまま
-        result = self.service.update_user_rank(user_id, score, task_id)
+        result = await self.service.update_user_rank(user_id, score, task_id)
 
         # 結果検証
         self.assertEqual(result.current_rank, Rank.KYU_9)
         self.assertEqual(result.total_submissions, 6)
         self.assertEqual(len(result.high_scores), 1)  # 高スコアリストに追加されない
-        
+
         # ランクが変わっていないので履歴保存は呼ばれない (初回でもない)
-        mock_history_col.document.assert_not_called()
-    
-    def test_update_user_rank_max_rank(self):
+        self.assertEqual(self._history(), [])
+
+    async def test_update_user_rank_max_rank(self):
         """師範（最高ランク）の場合、80点以上でも昇格しない"""
         user_id = "test_user"
         score = 95.0  # High score
         task_id = "test_task"
 
         # 既存ユーザー情報 (師範)
-        mock_user_ref = MagicMock()
-        mock_user_doc = MagicMock()
-        mock_user_doc.exists = True
-        mock_user_doc.to_dict.return_value = {
+        self.db.documents[USER_PATH] = {
             "rank": Rank.SHIHAN.value,
             "latest_score": 90.0,
             "total_submissions": 50,
             "high_scores": [85.0, 88.0, 90.0]
         }
-        mock_user_ref.get.return_value = mock_user_doc
-        
-        mock_history_col = MagicMock()
-        mock_user_ref.collection.return_value = mock_history_col
-
-        self.mock_collection.document.return_value = mock_user_ref
 
         # 今回95点 -> 80点以上だが師範が最高ランクなので昇格しない
-        result = self.service.update_user_rank(user_id, score, task_id)
+        result = await self.service.update_user_rank(user_id, score, task_id)
 
         # 結果検証
         self.assertEqual(result.current_rank, Rank.SHIHAN)  # 師範のまま
         self.assertEqual(result.total_submissions, 51)
         self.assertEqual(len(result.high_scores), 4)  # 高スコアリストには追加される
-        
+
         # ランクが変わっていないので履歴保存は呼ばれない
-        mock_history_col.document.assert_not_called()
+        self.assertEqual(self._history(), [])
 
-    def test_get_user_rank_exists(self):
+    async def test_high_scores_window_is_bounded(self):
+        """高スコアは直近の一定件数のみ保持する"""
+        window = self.service._high_score_window
+        self.db.documents[USER_PATH] = {
+            "rank": Rank.SHIHAN.value,
+            "total_submissions": 100,
+            "high_scores": [80.0 + i % 20 for i in range(window)],
+        }
+
+        result = await self.service.update_user_rank("test_user", 99.0, "task")
+
+        self.assertEqual(len(result.high_scores), window)
+        self.assertEqual(result.high_scores[-1], 99.0)
+        self.assertEqual(len(self.db.documents[USER_PATH]["high_scores"]), window)
+
+    async def test_get_user_rank_exists(self):
         """ユーザーランク取得（存在する場合）"""
         user_id = "test_user"
-        
-        mock_user_ref = MagicMock()
-        mock_user_doc = MagicMock()
-        mock_user_doc.exists = True
-        mock_user_doc.to_dict.return_value = {
+
+        self.db.documents[USER_PATH] = {
             "rank": Rank.KYU_5.value,
             "latest_score": 40.0,
             "total_submissions": 10,
             "high_scores": [80.0, 81.0, 82.0, 83.0, 84.0],
             "updated_at": datetime.now()
         }
-        mock_user_ref.get.return_value = mock_user_doc
-        self.mock_collection.document.return_value = mock_user_ref
-        
-        result = self.service.get_user_rank(user_id)
-        
+
+        result = await self.service.get_user_rank(user_id)
+
         self.assertIsNotNone(result)
         self.assertEqual(result.current_rank, Rank.KYU_5)
         self.assertEqual(result.total_submissions, 10)
+
+
+class TestConcurrentRankUpdates(unittest.IsolatedAsyncioTestCase):
+    """同一ユーザーへの同時ランク更新の負荷テスト"""
+
+    async def test_concurrent_updates_are_not_lost(self):
+        """N件の同時更新がすべて反映される"""
+        # RPCごとにレイテンシを入れて読み込みと書き込みを交錯させる
+        db = FakeAsyncFirestore(latency_seconds=0.001)
+        service = RankService(db=db)
+        updates = 50
+        scores = [85.0 if i % 5 == 0 else 60.0 for i in range(updates)]
+
+        results = await asyncio.gather(
+            *(service.update_user_rank("test_user", score, f"task-{i}") for i, score in enumerate(scores))
+        )
+
+        stored = db.documents[USER_PATH]
+        high_count = sum(1 for s in scores if s >= 80)
+        self.assertEqual(stored["total_submissions"], updates)
+        # 80点以上の回数だけ昇格している（10級 + 10回 = 初段）
+        self.assertEqual(stored["rank"], Rank.KYU_10.value + high_count)
+        self.assertEqual(len(stored["high_scores"]), high_count)
+        self.assertEqual(sorted(r.total_submissions for r in results), list(range(1, updates + 1)))
+        self.assertEqual(sum(1 for r in results if r.rank_changed), high_count)
+
+    async def test_update_cost_is_flat_as_history_grows(self):
+        """履歴が増えても1回の更新あたりのRPC数・ドキュメントサイズは一定"""
+        db = FakeAsyncFirestore()
+        service = RankService(db=db)
+        window = service._high_score_window
+
+        op_counts: list[int] = []
+        for i in range(window * 3):
+            before = len(db.ops)
+            await service.update_user_rank("test_user", 99.0, f"task-{i}")
+            op_counts.append(len(db.ops) - before)
+
+        # 初回（履歴書き込みあり）以降はbegin/get/commitの3回で一定
+        self.assertEqual(set(op_counts[1:]), {3})
+        self.assertEqual(len(db.documents[USER_PATH]["high_scores"]), window)
+
+
+class TestRankCache(unittest.IsolatedAsyncioTestCase):
+    """ユーザーランクキャッシュのテスト"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.db = FakeAsyncFirestore()
+        self.db.documents[USER_PATH] = {
+            "rank": Rank.KYU_9.value,
+            "latest_score": 70.0,
+            "total_submissions": 3,
+            "high_scores": [],
+        }
+        self.service = RankService(db=self.db, cache_ttl_seconds=30, clock=lambda: self.now)
+
+    def _reads(self) -> int:
+        return self.db.ops.count("get")
+
+    async def test_get_user_rank_is_cached(self):
+        """TTL内の再取得はFirestoreを読まない"""
+        first = await self.service.get_user_rank("test_user")
+        second = await self.service.get_user_rank("test_user")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self._reads(), 1)
+
+    async def test_cache_expires(self):
+        """TTLを過ぎると再読み込みする"""
+        await self.service.get_user_rank("test_user")
+        self.now = 31.0
+        await self.service.get_user_rank("test_user")
+
+        self.assertEqual(self._reads(), 2)
+
+    async def test_update_refreshes_cache(self):
+        """ランク更新後の取得は書き込んだ内容を返し、読み込みは発生しない"""
+        await self.service.get_user_rank("test_user")
+        await self.service.update_user_rank("test_user", 85.0, "task-1")
+        reads = self._reads()
+
+        result = await self.service.get_user_rank("test_user")
+
+        self.assertEqual(result.current_rank, Rank.KYU_8)
+        self.assertEqual(self._reads(), reads)
+
+    async def test_invalidate(self):
+        """invalidate後は再読み込みする"""
+        await self.service.get_user_rank("test_user")
+        self.service.invalidate("test_user")
+        await self.service.get_user_rank("test_user")
+
+        self.assertEqual(self._reads(), 2)
@@ -0,0 +1,266 @@
+"""下流呼び出しの共通リトライポリシーのテスト
+
+時計・待機・乱数をフェイクに差し替え、バックオフの秒数・エラーの分類・
+再試行予算・期限による打ち切りを決定的に確認する。
+"""
+
+from collections.abc import AsyncIterator
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.models.rank import Rank, UserRank
+from src.services import http_client, model_governor
+from src.services.annotation_service import AnnotationService
+from src.services.model_governor import ModelBudget, ModelGovernor
+from src.services.retry_policy import (
+    RetryableError,
+    RetryBudget,
+    RetryPolicy,
+    is_retryable_error,
+)
+from tests.test_model_governor import _analysis
+
+
+class FakeClock:
+    """sleepで時刻を進めるフェイク時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _policy(
+    clock: FakeClock,
+    max_attempts: int = 4,
+    budget: RetryBudget | None = None,
+) -> RetryPolicy:
+    # ジッターは上限値を返す（待機秒数の上限を確認する）
+    return RetryPolicy(
+        max_attempts=max_attempts,
+        base_delay=1.0,
+        max_delay=3.0,
+        budget=budget,
+        clock=clock,
+        sleep=clock.sleep,
+        uniform=lambda _low, high: high,
+    )
+
+
+class FlakyOperation:
+    """指定回数だけ失敗してから成功する試行"""
+
+    def __init__(self, failures: list[Exception]) -> None:
+        self.failures = failures
+        self.remaining: list[float | None] = []
+
+    async def __call__(self, remaining: float | None) -> str:
+        self.remaining.append(remaining)
+        if self.failures:
+            raise self.failures.pop(0)
+        return "ok"
+
+
+class TestRetryPolicy:
+    """RetryPolicyのテスト"""
+
+    async def test_full_jitter_backoff_is_capped(self) -> None:
+        """待機秒数は0〜min(max_delay, base_delay×2^n)の範囲"""
+        clock = FakeClock()
+        operation = FlakyOperation([RetryableError("503")] * 3)
+
+        assert await _policy(clock).run(operation, name="test") == "ok"
+
+        assert clock.sleeps == [1.0, 2.0, 3.0]
+
+    async def test_jitter_draws_from_zero(self) -> None:
+        """ジッターの下限は0（一斉に同じ間隔で再送しない）"""
+        bounds: list[tuple[float, float]] = []
+
+        def uniform(low: float, high: float) -> float:
+            bounds.append((low, high))
+            return low
+
+        policy = RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=30.0, uniform=uniform)
+
+        assert [policy.backoff(attempt) for attempt in (1, 2)] == [0.0, 0.0]
+        assert bounds == [(0.0, 2.0), (0.0, 4.0)]
+
+    async def test_retry_after_is_respected(self) -> None:
+        """Retry-Afterがある場合はそれ以上待つ"""
+        clock = FakeClock()
+        operation = FlakyOperation([RetryableError("429", retry_after=7.0)])
+
+        await _policy(clock).run(operation, name="test")
+
+        assert clock.sleeps == [7.0]
+
+    async def test_fatal_error_is_not_retried(self) -> None:
+        """再試行不可能なエラーは即座に送出する"""
+        clock = FakeClock()
+        operation = FlakyOperation([ValueError("bad request")])
+
+        with pytest.raises(ValueError):
+            await _policy(clock).run(operation, name="test")
+
+        assert len(operation.remaining) == 1
+        assert clock.sleeps == []
+
+    async def test_gives_up_after_max_attempts(self) -> None:
+        """最大試行回数に達したら最後のエラーを送出する"""
+        clock = FakeClock()
+        operation = FlakyOperation([RetryableError(f"503-{i}") for i in range(5)])
+
+        with pytest.raises(RetryableError, match="503-2"):
+            await _policy(clock, max_attempts=3).run(operation, name="test")
+
+        assert len(operation.remaining) == 3
+
+    async def test_deadline_stops_retries(self) -> None:
+        """期限までに次の試行を始められない場合は待たずに諦め、残り時間を試行に渡す"""
+        clock = FakeClock()
+        operation = FlakyOperation([RetryableError("503")] * 3)
+
+        with pytest.raises(RetryableError):
+            await _policy(clock).run(operation, name="test", deadline=2.5)
+
+        # 1回目の失敗後に1秒待ち、2回目の失敗後の2秒待機は期限を超えるため諦める
+        assert clock.sleeps == [1.0]
+        assert operation.remaining == [2.5, 1.5]
+
+    async def test_expired_deadline_skips_attempt(self) -> None:
+        """期限を過ぎている場合は試行しない"""
+        clock = FakeClock()
+        clock.now = 10.0
+        operation = FlakyOperation([])
+
+        with pytest.raises(TimeoutError):
+            await _policy(clock).run(operation, name="test", deadline=5.0)
+
+        assert operation.remaining == []
+
+    async def test_budget_limits_retries_across_calls(self) -> None:
+        """再試行予算を使い切ると、以降の呼び出しは再試行しない"""
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.5, max_tokens=2.0)
+        policy = _policy(clock, budget=budget)
+
+        # 予算2回分を1回目の呼び出しの再試行で使い切る
+        with pytest.raises(RetryableError):
+            await policy.run(FlakyOperation([RetryableError("503")] * 4), name="first")
+        assert len(clock.sleeps) == 2
+
+        # 呼び出し1回分（0.5）では再試行できない
+        second = FlakyOperation([RetryableError("503")])
+        with pytest.raises(RetryableError):
+            await policy.run(second, name="second")
+        assert len(second.remaining) == 1
+
+        # 呼び出しが増えると予算が貯まる
+        third = FlakyOperation([RetryableError("503")])
+        assert await policy.run(third, name="third") == "ok"
+        assert budget.tokens == 0.0
+
+
+class TestIsRetryableError:
+    """エラーの分類のテスト"""
+
+    @pytest.mark.parametrize(
+        ("error", "expected"),
+        [
+            (RetryableError("429"), True),
+            (TimeoutError(), True),
+            (aiohttp.ServerDisconnectedError(), True),
+            (aiohttp.ClientResponseError(None, (), status=503), True),  # type: ignore[arg-type]
+            (aiohttp.ClientResponseError(None, (), status=404), False),  # type: ignore[arg-type]
+            (ValueError("bad"), False),
+        ],
+    )
+    def test_classification(self, error: Exception, expected: bool) -> None:
+        assert is_retryable_error(error) is expected
+
+
+@pytest.fixture
+async def stub_function() -> AsyncIterator[tuple[TestServer, list[int]]]:
+    """応答するステータスを順番に返すスタブCloud Function"""
+    statuses: list[int] = []
+
+    async def handler(_request: web.Request) -> web.Response:
+        status = statuses.pop(0) if statuses else 200
+        if status != 200:
+            return web.json_response({"error": "failed"}, status=status)
+        return web.json_response(
+            {"annotated_image_url": "https://storage.googleapis.com/b/annotated/t.png"}
+        )
+
+    app = web.Application()
+    app.router.add_post("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    await http_client.start_http_client()
+    yield server, statuses
+    await http_client.close_http_client()
+    await server.close()
+
+
+class TestAnnotationServiceRetry:
+    """アノテーション生成サービスのリトライのテスト"""
+
+    async def _generate(
+        self, monkeypatch: pytest.MonkeyPatch, server: TestServer, clock: FakeClock
+    ) -> str | None:
+        monkeypatch.setattr(
+            model_governor,
+            "_model_governor",
+            ModelGovernor(budgets={}, default_budget=ModelBudget(max_concurrent=4)),
+        )
+        service = AnnotationService(retry_policy=_policy(clock, max_attempts=3))
+        service.function_url = str(server.make_url("/"))
+        with patch(
+            "src.services.id_token_cache.google.oauth2.id_token.fetch_id_token",
+            return_value="token",
+        ):
+            return await service.generate_annotated_image(
+                task_id="task-1",
+                original_image_url="https://storage.googleapis.com/b/uploads/t.jpg",
+                analysis=_analysis(),
+                user_rank=UserRank(user_id="user-1", current_rank=Rank.KYU_7, current_score=70.5),
+                motif_tags=["りんご"],
+            )
+
+    async def test_server_errors_are_retried(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        stub_function: tuple[TestServer, list[int]],
+    ) -> None:
+        """5xxは再試行し、成功すればURLを返す"""
+        server, statuses = stub_function
+        statuses.extend([503, 500])
+        clock = FakeClock()
+
+        assert await self._generate(monkeypatch, server, clock) is not None
+        assert clock.sleeps == [1.0, 2.0]
+
+    async def test_client_errors_are_not_retried(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        stub_function: tuple[TestServer, list[int]],
+    ) -> None:
+        """429以外の4xxは再試行せずNoneを返す"""
+        server, statuses = stub_function
+        statuses.extend([400])
+        clock = FakeClock()
+
+        assert await self._generate(monkeypatch, server, clock) is None
+        assert clock.sleeps == []
+        assert statuses == []
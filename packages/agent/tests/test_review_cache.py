@@ -0,0 +1,254 @@
+"""レビュー結果キャッシュのテスト"""
+
+import base64
+import hashlib
+from collections.abc import AsyncIterator
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.api import reviews
+from src.api.reviews import reuse_cached_review
+from src.auth import AuthenticatedUser
+from src.config import settings
+from src.exceptions import ImageProcessingError
+from src.models.task import CreateReviewRequest, TaskStatus
+from src.services import http_client, rank_service, review_cache, task_service
+from src.services.rank_service import RankService
+from src.services.review_cache import ReviewCache, hash_image, make_cache_key
+from src.services.task_service import TaskService
+from tests.fake_firestore import FakeAsyncFirestore
+
+IMAGE_URL = "https://storage.googleapis.com/bucket/uploads/test.jpg"
+IMAGE_BYTES = b"\x89PNG" + bytes(range(256)) * 100
+IMAGE_MD5 = base64.b64encode(hashlib.md5(IMAGE_BYTES).digest()).decode()
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestReviewCache:
+    """ReviewCacheのテスト"""
+
+    def test_key_includes_rank_and_prompt_version(self) -> None:
+        """ランクやプロンプトバージョンが異なれば別キーになる"""
+        base = make_cache_key("user-1", "abc", "10級", "1")
+        assert base != make_cache_key("user-1", "abc", "9級", "1")
+        assert base != make_cache_key("user-1", "abc", "10級", "2")
+        assert base != make_cache_key("user-2", "abc", "10級", "1")
+
+    def test_ttl_expiry(self) -> None:
+        """有効期間を過ぎたエントリは返さない"""
+        clock = FakeClock()
+        cache = ReviewCache(max_entries=10, ttl_seconds=60, clock=clock)
+        cache.put("k", "task-1")
+
+        clock.now = 30
+        entry = cache.get("k")
+        assert entry is not None and entry.source_task_id == "task-1"
+
+        clock.now = 61
+        assert cache.get("k") is None
+        stats = cache.stats()
+        assert stats.entries == 0
+        assert stats.expired == 1
+        assert stats.hits == 1
+        assert stats.misses == 1
+
+    def test_lru_eviction(self) -> None:
+        """最大エントリ数を超えると最も古く使われたものから削除する"""
+        cache = ReviewCache(max_entries=2, ttl_seconds=60, clock=FakeClock())
+        cache.put("a", "task-a")
+        cache.put("b", "task-b")
+        cache.get("a")  # aを最近使用にする
+        cache.put("c", "task-c")
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats().evicted == 1
+
+    def test_render_prometheus(self) -> None:
+        """統計をPrometheusテキスト形式で出力する"""
+        cache = ReviewCache(max_entries=10, ttl_seconds=60, clock=FakeClock())
+        cache.put("k", "task-1")
+        cache.get("k")
+        cache.get("missing")
+
+        text = cache.render_prometheus()
+
+        assert "# TYPE review_cache_hits_total counter" in text
+        assert "review_cache_entries 1" in text
+        assert "review_cache_hits_total 1" in text
+        assert "review_cache_misses_total 1" in text
+
+    def test_invalidate(self) -> None:
+        """invalidateでエントリが削除される"""
+        cache = ReviewCache(max_entries=10, ttl_seconds=60, clock=FakeClock())
+        cache.put("k", "task-1")
+        cache.invalidate("k")
+
+        assert cache.get("k") is None
+        assert cache.stats().invalidated == 1
+
+
+@pytest.fixture
+async def image_server(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[TestServer]:
+    """Cloud Storageのようにx-goog-hashヘッダーを返すスタブサーバー（URL検証はスキップ）"""
+
+    async def handler(request: web.Request) -> web.Response:
+        if request.path == "/missing.jpg":
+            return web.Response(status=404)
+        headers = {"x-goog-hash": f"crc32c=n03x6A==,md5={IMAGE_MD5}"}
+        if request.path == "/composite.jpg":
+            headers = {"x-goog-hash": "crc32c=n03x6A=="}
+        if request.path == "/nohash.jpg":
+            headers = {}
+        return web.Response(body=IMAGE_BYTES, content_type="image/jpeg", headers=headers)
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(review_cache, "validate_image_url", lambda url: url)
+    yield server
+    await server.close()
+    await http_client.close_http_client()
+
+
+class TestHashImage:
+    """hash_imageのテスト"""
+
+    async def test_uses_md5_from_metadata(self, image_server: TestServer) -> None:
+        """x-goog-hashのMD5を使う"""
+        digest = await hash_image(str(image_server.make_url("/test.jpg")))
+        assert digest == f"md5:{IMAGE_MD5}"
+
+    async def test_falls_back_to_crc32c(self, image_server: TestServer) -> None:
+        """MD5がない複合オブジェクトはCRC32Cを使う"""
+        digest = await hash_image(str(image_server.make_url("/composite.jpg")))
+        assert digest == "crc32c:n03x6A=="
+
+    async def test_missing_hash(self, image_server: TestServer) -> None:
+        """ハッシュがない場合はエラー"""
+        with pytest.raises(ImageProcessingError):
+            await hash_image(str(image_server.make_url("/nohash.jpg")))
+
+    async def test_http_error(self, image_server: TestServer) -> None:
+        """取得失敗はエラー"""
+        with pytest.raises(ImageProcessingError):
+            await hash_image(str(image_server.make_url("/missing.jpg")))
+
+
+class TestReuseCachedReview:
+    """reuse_cached_reviewのテスト"""
+
+    @pytest.fixture
+    def services(self, monkeypatch: pytest.MonkeyPatch) -> TaskService:
+        db = FakeAsyncFirestore()
+        service = TaskService(db=db)  # type: ignore[arg-type]
+        monkeypatch.setattr(task_service, "_task_service", service)
+        monkeypatch.setattr(rank_service, "_rank_service", RankService(db=db))  # type: ignore[arg-type]
+        monkeypatch.setattr(review_cache, "_review_cache", ReviewCache(max_entries=10, ttl_seconds=60))
+        return service
+
+    async def test_reuses_completed_review(self, services: TaskService) -> None:
+        """完了済みタスクの結果をコピーして完了させる"""
+        source = await services.create_task("user-1", IMAGE_URL, rank_at_review="10級")
+        await services.update_task_status(
+            source.task_id,
+            TaskStatus.COMPLETED,
+            feedback={"overall_score": 72.0, "summary": "s"},
+            score=72.0,
+            tags=["りんご"],
+            annotated_image_url="https://storage.googleapis.com/bucket/annotated/a.png",
+            example_image_url="https://storage.googleapis.com/bucket/examples/e.png",
+        )
+        review_cache.get_review_cache().put("key", source.task_id)
+
+        task = await services.create_task("user-1", IMAGE_URL, rank_at_review="10級")
+        reused = await reuse_cached_review(task, "key")
+
+        assert reused is not None
+        assert reused.task_id == task.task_id
+        assert reused.status == TaskStatus.COMPLETED
+        assert reused.feedback == {"overall_score": 72.0, "summary": "s"}
+        assert reused.example_image_url == "https://storage.googleapis.com/bucket/examples/e.png"
+        assert reused.annotated_image_url == "https://storage.googleapis.com/bucket/annotated/a.png"
+        # 同じ画像の再提出ではランクを更新しない（スコアを重複して加算しない）
+        assert reused.rank_changed is False
+        assert await rank_service.get_rank_service().get_user_rank("user-1") is None
+
+    async def test_pending_source_is_not_reused(self, services: TaskService) -> None:
+        """処理中の元タスクは再利用しない"""
+        source = await services.create_task("user-1", IMAGE_URL)
+        review_cache.get_review_cache().put("key", source.task_id)
+
+        task = await services.create_task("user-1", IMAGE_URL)
+        assert await reuse_cached_review(task, "key") is None
+        assert review_cache.get_review_cache().stats().entries == 1
+
+    async def test_failed_source_invalidates_entry(self, services: TaskService) -> None:
+        """失敗した元タスクのエントリは破棄する"""
+        source = await services.create_task("user-1", IMAGE_URL)
+        await services.update_task_status(source.task_id, TaskStatus.FAILED, error_message="x")
+        review_cache.get_review_cache().put("key", source.task_id)
+
+        task = await services.create_task("user-1", IMAGE_URL)
+        assert await reuse_cached_review(task, "key") is None
+        assert review_cache.get_review_cache().stats().invalidated == 1
+
+
+class TestCreateReviewHashFailure:
+    """画像ハッシュの計算に失敗した場合のcreate_reviewのテスト"""
+
+    async def test_hash_failures_do_not_share_results(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """ハッシュ計算に失敗した審査同士で、他のユーザーの結果を再利用しない"""
+        db = FakeAsyncFirestore()
+        service = TaskService(db=db)  # type: ignore[arg-type]
+        monkeypatch.setattr(task_service, "_task_service", service)
+        monkeypatch.setattr(rank_service, "_rank_service", RankService(db=db))  # type: ignore[arg-type]
+        monkeypatch.setattr(review_cache, "_review_cache", ReviewCache(max_entries=10, ttl_seconds=60))
+        monkeypatch.setattr(settings, "review_cache_enabled", True)
+
+        async def failing_hash(_url: str) -> str:
+            raise ImageProcessingError("download failed")
+
+        async def dispatch(_task: object) -> bool:
+            return True
+
+        monkeypatch.setattr(reviews, "hash_image", failing_hash)
+        monkeypatch.setattr(reviews, "dispatch_review", dispatch)
+
+        first = await reviews.create_review(
+            CreateReviewRequest(image_url=IMAGE_URL),
+            current_user=AuthenticatedUser(user_id="user-1"),
+        )
+        await service.update_task_status(
+            first.task_id,
+            TaskStatus.COMPLETED,
+            feedback={"overall_score": 72.0, "summary": "user-1の講評"},
+            score=72.0,
+        )
+
+        second = await reviews.create_review(
+            CreateReviewRequest(image_url=IMAGE_URL),
+            current_user=AuthenticatedUser(user_id="user-2"),
+        )
+
+        assert second.task_id != first.task_id
+        assert second.status == TaskStatus.PENDING.value
+        task = await service.get_task(second.task_id)
+        assert task is not None
+        assert task.feedback is None
+        assert review_cache.get_review_cache().stats().entries == 0
@@ -0,0 +1,201 @@
+"""審査対象画像の取得・正規化のテスト"""
+
+from collections.abc import AsyncIterator
+from io import BytesIO
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from PIL import ExifTags, Image
+
+from src.exceptions import ImageProcessingError
+from src.services import http_client, review_image
+from src.services.review_image import (
+    ImageProfile,
+    ReviewImage,
+    load_review_image,
+    normalize_image,
+    prepare_stage_image,
+    preprocess_image,
+)
+
+COLOR = (200, 100, 50)
+PAPER = (235, 232, 226)
+
+
+def make_jpeg(
+    width: int,
+    height: int,
+    orientation: int | None = None,
+    color: tuple[int, int, int] = COLOR,
+) -> bytes:
+    """テスト用のJPEG画像を生成"""
+    buffer = BytesIO()
+    image = Image.new("RGB", (width, height), color=color)
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ExifTags.Base.Orientation] = orientation
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+class TestNormalizeImage:
+    """normalize_imageのテスト"""
+
+    def test_passthrough_keeps_original_bytes(self) -> None:
+        """回転・縮小が不要なら元のバイト列をそのまま返す"""
+        data = make_jpeg(40, 20)
+        normalized, mime_type, width, height, reencoded = normalize_image(data, 100)
+
+        assert normalized is data
+        assert (mime_type, width, height, reencoded) == ("image/jpeg", 40, 20, False)
+
+    def test_exif_rotation_is_applied(self) -> None:
+        """EXIFの回転情報を反映する"""
+        data = make_jpeg(40, 20, orientation=6)
+        normalized, _, width, height, reencoded = normalize_image(data, 100)
+
+        assert (width, height, reencoded) == (20, 40, True)
+        with Image.open(BytesIO(normalized)) as image:
+            assert image.size == (20, 40)
+
+    def test_downscale_to_max_dimension(self) -> None:
+        """長辺を上限サイズ以下に縮小する"""
+        _, _, width, height, reencoded = normalize_image(make_jpeg(400, 200), 100)
+
+        assert (width, height, reencoded) == (100, 50, True)
+
+    def test_invalid_image(self) -> None:
+        """画像として読み込めないデータはエラー"""
+        with pytest.raises(ImageProcessingError):
+            normalize_image(b"not an image", 100)
+
+
+class TestPreprocessImage:
+    """preprocess_imageのテスト"""
+
+    def test_downscale_and_strip_metadata(self) -> None:
+        """長辺を縮小し、EXIFを除去する"""
+        data = make_jpeg(400, 200, orientation=1)
+        prepared, width, height = preprocess_image(data, ImageProfile(max_dimension=100))
+
+        assert (width, height) == (100, 50)
+        with Image.open(BytesIO(prepared)) as image:
+            assert image.format == "JPEG"
+            assert image.size == (100, 50)
+            assert not image.getexif()
+
+    def test_auto_grayscale_for_monochrome(self) -> None:
+        """彩度がほぼない画像はグレースケール化する"""
+        prepared, _, _ = preprocess_image(
+            make_jpeg(40, 20, color=PAPER), ImageProfile(max_dimension=100)
+        )
+
+        with Image.open(BytesIO(prepared)) as image:
+            assert image.mode == "L"
+
+    def test_auto_keeps_color(self) -> None:
+        """色のある画像はカラーのまま"""
+        prepared, _, _ = preprocess_image(make_jpeg(40, 20), ImageProfile(max_dimension=100))
+
+        with Image.open(BytesIO(prepared)) as image:
+            assert image.mode == "RGB"
+
+    def test_grayscale_never(self) -> None:
+        """grayscale=neverならモノクロ画像もカラーで出力する"""
+        profile = ImageProfile(max_dimension=100, grayscale="never")
+        prepared, _, _ = preprocess_image(make_jpeg(40, 20, color=PAPER), profile)
+
+        with Image.open(BytesIO(prepared)) as image:
+            assert image.mode == "RGB"
+
+    def test_transparent_png_is_flattened(self) -> None:
+        """透過PNGは白背景のJPEGになる"""
+        buffer = BytesIO()
+        Image.new("RGBA", (40, 20), (0, 0, 0, 0)).save(buffer, format="PNG")
+        prepared, _, _ = preprocess_image(buffer.getvalue(), ImageProfile(max_dimension=100))
+
+        with Image.open(BytesIO(prepared)) as image:
+            assert image.format == "JPEG"
+            assert image.convert("L").getpixel((0, 0)) > 250
+
+    async def test_prepare_stage_image_uses_stage_profile(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """ステージごとの長辺上限が適用される"""
+        monkeypatch.setattr(review_image.settings, "annotation_image_max_dimension", 200)
+        monkeypatch.setattr(review_image.settings, "example_image_max_dimension", 80)
+        data = make_jpeg(400, 200)
+        image = ReviewImage(
+            source_url="https://example.com/a.jpg",
+            data=data,
+            mime_type="image/jpeg",
+            width=400,
+            height=200,
+            sha256="0" * 64,
+            original_size=len(data),
+        )
+
+        annotation = await prepare_stage_image(image, "annotation")
+        example = await prepare_stage_image(image, "example_image")
+
+        assert (annotation.width, annotation.height) == (200, 100)
+        assert (example.width, example.height) == (80, 40)
+        assert annotation.sha256 == image.sha256
+
+    async def test_prepare_stage_image_falls_back(self) -> None:
+        """前処理に失敗した場合は元の画像を返す"""
+        image = ReviewImage(
+            source_url="https://example.com/a.jpg",
+            data=b"broken",
+            mime_type="image/jpeg",
+            width=1,
+            height=1,
+            sha256="0" * 64,
+            original_size=6,
+        )
+
+        assert await prepare_stage_image(image, "annotation") is image
+
+
+@pytest.fixture
+async def image_server(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[TestServer]:
+    """画像を返すスタブサーバー（URL検証はスキップ）"""
+
+    async def handler(request: web.Request) -> web.Response:
+        if request.path == "/missing.jpg":
+            return web.Response(status=404)
+        return web.Response(body=make_jpeg(400, 200), content_type="image/jpeg")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(review_image, "validate_image_url", lambda url: url)
+    yield server
+    await server.close()
+    await http_client.close_http_client()
+
+
+class TestLoadReviewImage:
+    """load_review_imageのテスト"""
+
+    async def test_load_and_normalize(self, image_server: TestServer) -> None:
+        """1回のダウンロードで取得・正規化する"""
+        url = str(image_server.make_url("/test.jpg"))
+        image = await load_review_image(url, max_dimension=100)
+
+        assert (image.width, image.height, image.normalized) == (100, 50, True)
+        assert image.source_url == url
+        assert image.original_size > len(image.data)
+        assert image.to_payload()["original_image_mime_type"] == "image/jpeg"
+
+    async def test_size_limit(self, image_server: TestServer) -> None:
+        """上限を超える画像はエラー"""
+        with pytest.raises(ImageProcessingError):
+            await load_review_image(str(image_server.make_url("/test.jpg")), max_bytes=100)
+
+    async def test_http_error(self, image_server: TestServer) -> None:
+        """取得失敗はエラー"""
+        with pytest.raises(ImageProcessingError):
+            await load_review_image(str(image_server.make_url("/missing.jpg")))
@@ -0,0 +1,173 @@
+"""レビュー画像生成パイプラインのテスト"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.models.feedback import (
+    DessinAnalysis,
+    LineQualityAnalysis,
+    ProportionAnalysis,
+    TextureAnalysis,
+    ToneAnalysis,
+)
+from src.models.rank import Rank, UserRank
+from src.services.image_generation_service import ImageGenerationError
+from src.services.review_pipeline import run_image_stages
+
+
+class FakeAnnotationService:
+    """遅延付きのAnnotationServiceスタブ"""
+
+    def __init__(self, delay: float, url: str | None = "https://storage.googleapis.com/b/annotated/t.png") -> None:
+        self._delay = delay
+        self._url = url
+
+    async def generate_annotated_image(self, **_kwargs: object) -> str | None:
+        await asyncio.sleep(self._delay)
+        return self._url
+
+
+class FakeImageGenerationService:
+    """遅延付きのImageGenerationServiceスタブ"""
+
+    def __init__(self, delay: float, error: Exception | None = None) -> None:
+        self._delay = delay
+        self._error = error
+        self.annotated_image_urls: list[str | None] = []
+
+    async def generate_example_image(self, **kwargs: object) -> None:
+        self.annotated_image_urls.append(kwargs.get("annotated_image_url"))  # type: ignore[arg-type]
+        await asyncio.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+
+
+@pytest.fixture
+def analysis() -> DessinAnalysis:
+    return DessinAnalysis(
+        proportion=ProportionAnalysis(
+            shape_accuracy="良好", ratio_balance="適切", contour_quality="安定", score=75.0
+        ),
+        tone=ToneAnalysis(
+            value_range="5段階", light_consistency="一貫", three_dimensionality="良好", score=70.0
+        ),
+        texture=TextureAnalysis(material_expression="基本的", touch_variety="限定的", score=65.0),
+        line_quality=LineQualityAnalysis(
+            stroke_quality="安定", pressure_control="適切", hatching="基本的", score=72.0
+        ),
+        overall_score=70.5,
+        strengths=["陰影"],
+        improvements=["質感"],
+        tags=["りんご"],
+    )
+
+
+@pytest.fixture
+def user_rank() -> UserRank:
+    return UserRank(user_id="user-1", current_rank=Rank.KYU_7, current_score=70.5)
+
+
+async def _run(
+    analysis: DessinAnalysis,
+    user_rank: UserRank,
+    annotation: FakeAnnotationService,
+    generation: FakeImageGenerationService,
+    pipelined: bool,
+    deadline: float = 1.0,
+):
+    return await run_image_stages(
+        task_id="task-1",
+        user_id="user-1",
+        image_url="https://storage.googleapis.com/b/uploads/t.jpg",
+        analysis=analysis,
+        user_rank=user_rank,
+        pipelined=pipelined,
+        annotation_deadline_seconds=deadline,
+        annotation_service=annotation,  # type: ignore[arg-type]
+        image_generation_service=generation,  # type: ignore[arg-type]
+    )
+
+
+class TestRunImageStages:
+    """run_image_stagesのテスト"""
+
+    async def test_sequential_passes_annotation_to_example(
+        self, analysis: DessinAnalysis, user_rank: UserRank
+    ) -> None:
+        """逐次モードではアノテーション結果をお手本画像生成に渡す"""
+        generation = FakeImageGenerationService(delay=0.0)
+        result = await _run(
+            analysis, user_rank, FakeAnnotationService(delay=0.0), generation, pipelined=False
+        )
+
+        assert result.mode == "sequential"
+        assert result.annotation_used_for_example is True
+        assert generation.annotated_image_urls == [result.annotated_image_url]
+        assert {"annotation", "example_image", "total"} <= result.stage_seconds.keys()
+
+    async def test_pipelined_uses_annotation_within_deadline(
+        self, analysis: DessinAnalysis, user_rank: UserRank
+    ) -> None:
+        """期限内に完了したアノテーションはお手本画像生成に使用される"""
+        generation = FakeImageGenerationService(delay=0.0)
+        result = await _run(
+            analysis, user_rank, FakeAnnotationService(delay=0.01), generation, pipelined=True
+        )
+
+        assert result.mode == "pipelined"
+        assert result.annotation_used_for_example is True
+        assert generation.annotated_image_urls == [result.annotated_image_url]
+        assert "annotation_wait" in result.stage_seconds
+
+    async def test_pipelined_falls_back_after_deadline(
+        self, analysis: DessinAnalysis, user_rank: UserRank
+    ) -> None:
+        """期限を超えたアノテーションは使用せず元画像のみで生成する"""
+        annotation_delay, example_delay, deadline = 0.3, 0.2, 0.05
+        generation = FakeImageGenerationService(delay=example_delay)
+        result = await _run(
+            analysis,
+            user_rank,
+            FakeAnnotationService(delay=annotation_delay),
+            generation,
+            pipelined=True,
+            deadline=deadline,
+        )
+
+        assert generation.annotated_image_urls == [None]
+        assert result.annotation_used_for_example is False
+        # 期限超過後もアノテーションは完了まで待機される
+        assert result.annotated_image_url is not None
+        # 待ちは期限で打ち切られ、アノテーションとお手本画像生成が重なって実行される
+        assert result.stage_seconds["annotation_wait"] < annotation_delay
+        assert result.stage_seconds["total"] < annotation_delay + example_delay
+
+    async def test_pipelined_annotation_failure_is_not_fatal(
+        self, analysis: DessinAnalysis, user_rank: UserRank
+    ) -> None:
+        """アノテーションが例外を送出してもお手本画像生成は実行される"""
+        annotation = MagicMock()
+
+        async def fail(**_kwargs: object) -> str | None:
+            raise RuntimeError("boom")
+
+        annotation.generate_annotated_image = fail
+        generation = FakeImageGenerationService(delay=0.0)
+        result = await _run(analysis, user_rank, annotation, generation, pipelined=True)
+
+        assert result.annotated_image_url is None
+        assert generation.annotated_image_urls == [None]
+        assert result.example_image_error is None
+
+    async def test_example_failure_is_reported(
+        self, analysis: DessinAnalysis, user_rank: UserRank
+    ) -> None:
+        """お手本画像生成の失敗はexample_image_errorに格納される"""
+        generation = FakeImageGenerationService(delay=0.0, error=ImageGenerationError("down"))
+        result = await _run(
+            analysis, user_rank, FakeAnnotationService(delay=0.0), generation, pipelined=False
+        )
+
+        assert result.example_image_error == "down"
@@ -0,0 +1,341 @@
+"""審査のディスパッチ（Cloud Tasks投入・フォールバックワーカー）のテスト
+
+Cloud Tasksを失敗・成功するフェイクに、審査処理を遅延付きのフェイクに差し替え、
+POST /reviews が審査処理の完了を待たずに返ること、処理待ちの上限超過で503を返すこと、
+起動時の再投入を確認する。
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from google.api_core.exceptions import AlreadyExists, ServiceUnavailable
+
+from src.api import reviews
+from src.auth import AuthenticatedUser
+from src.config import settings
+from src.models.task import CreateReviewRequest, ReviewTask, TaskStatus
+from src.services import cloud_tasks_service, rank_service, review_worker_pool, task_service
+from src.services.rank_service import RankService
+from src.services.review_worker_pool import ReviewWorkerPool
+from src.services.task_service import TaskService
+from tests.fake_firestore import FakeAsyncFirestore
+
+IMAGE_URL = "https://storage.googleapis.com/bucket/uploads/test.jpg"
+
+# フェイク審査処理の所要時間（秒）
+PROCESS_LATENCY = 0.3
+
+
+class FakeCloudTasks:
+    """投入結果を切り替えられるCloud Tasksのフェイク"""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+        self.enqueued: list[str] = []
+
+    async def create_review_task_async(self, task_id: str, **_kwargs: object) -> str:
+        if self.error is not None:
+            raise self.error
+        self.enqueued.append(task_id)
+        return f"review-{task_id}"
+
+
+class FakeProcessor:
+    """process_review_taskのフェイク（処理したタスクIDを記録）"""
+
+    def __init__(self) -> None:
+        self.processed: list[str] = []
+
+    async def __call__(self, task_id: str, **_kwargs: object) -> None:
+        await asyncio.sleep(PROCESS_LATENCY)
+        self.processed.append(task_id)
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch) -> TaskService:
+    db = FakeAsyncFirestore()
+    service = TaskService(db=db)  # type: ignore[arg-type]
+    monkeypatch.setattr(task_service, "_task_service", service)
+    monkeypatch.setattr(rank_service, "_rank_service", RankService(db=db))  # type: ignore[arg-type]
+    monkeypatch.setattr(settings, "review_cache_enabled", False)
+    return service
+
+
+@pytest.fixture
+def processor(monkeypatch: pytest.MonkeyPatch) -> FakeProcessor:
+    processor = FakeProcessor()
+    monkeypatch.setattr(reviews, "process_review_task", processor)
+    return processor
+
+
+def _use_cloud_tasks(monkeypatch: pytest.MonkeyPatch, fake: FakeCloudTasks) -> None:
+    monkeypatch.setattr(cloud_tasks_service, "get_cloud_tasks_service", lambda: fake)
+
+
+def _use_pool(monkeypatch: pytest.MonkeyPatch, pool: ReviewWorkerPool) -> ReviewWorkerPool:
+    monkeypatch.setattr(review_worker_pool, "_review_worker_pool", pool)
+    return pool
+
+
+async def _create_review() -> str:
+    response = await reviews.create_review(
+        CreateReviewRequest(image_url=IMAGE_URL),
+        current_user=AuthenticatedUser(user_id="user-1"),
+    )
+    return response.task_id
+
+
+class TestReviewWorkerPool:
+    """ReviewWorkerPoolのテスト"""
+
+    async def test_bounded_concurrency(self) -> None:
+        """ワーカー数を超えて同時に処理しない"""
+        pool = ReviewWorkerPool(workers=2, max_pending=10)
+        running = 0
+        peak = 0
+
+        async def job() -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        for i in range(6):
+            assert pool.submit(f"task-{i}", job)
+        await pool.join()
+
+        assert peak == 2
+        await pool.close()
+
+    async def test_rejects_when_saturated(self) -> None:
+        """処理待ちが上限に達したら受け付けない"""
+        pool = ReviewWorkerPool(workers=1, max_pending=1)
+        release = asyncio.Event()
+
+        async def job() -> None:
+            await release.wait()
+
+        assert pool.submit("running", job)
+        await asyncio.sleep(0)  # ワーカーが1件目を取り出す
+        assert pool.submit("pending", job)
+        assert not pool.submit("rejected", job)
+        assert pool.stats().rejected == 1
+
+        release.set()
+        await pool.join()
+        await pool.close()
+
+    async def test_failed_job_does_not_stop_worker(self) -> None:
+        """処理中の例外でワーカーが停止しない"""
+        pool = ReviewWorkerPool(workers=1, max_pending=5)
+        done: list[str] = []
+
+        async def failing() -> None:
+            raise RuntimeError("boom")
+
+        async def succeeding() -> None:
+            done.append("ok")
+
+        pool.submit("failing", failing)
+        pool.submit("succeeding", succeeding)
+        await pool.join()
+
+        assert done == ["ok"]
+        await pool.close()
+
+
+class TestCreateReviewDispatch:
+    """POST /reviews のディスパッチのテスト"""
+
+    async def test_enqueue_failure_returns_without_waiting(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,
+        processor: FakeProcessor,
+    ) -> None:
+        """投入に失敗しても審査処理の完了を待たずに返し、ワーカーで処理する"""
+        _use_cloud_tasks(monkeypatch, FakeCloudTasks(error=ServiceUnavailable("down")))
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=1, max_pending=4))
+
+        started_at = time.perf_counter()
+        task_id = await _create_review()
+
+        assert time.perf_counter() - started_at < PROCESS_LATENCY
+        assert processor.processed == []
+        await pool.join()
+        assert processor.processed == [task_id]
+        assert await service.get_task(task_id) is not None
+        await pool.close()
+
+    async def test_enqueued_review_is_not_processed_locally(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,  # noqa: ARG002
+        processor: FakeProcessor,
+    ) -> None:
+        """投入に成功した場合はプロセス内で処理しない"""
+        cloud_tasks = FakeCloudTasks()
+        _use_cloud_tasks(monkeypatch, cloud_tasks)
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=1, max_pending=4))
+
+        task_id = await _create_review()
+        await pool.join()
+
+        assert cloud_tasks.enqueued == [task_id]
+        assert processor.processed == []
+
+    async def test_saturated_pool_returns_503(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,
+        processor: FakeProcessor,  # noqa: ARG002
+    ) -> None:
+        """処理待ちが上限に達している場合は503を返し、タスクを残さない"""
+        _use_cloud_tasks(monkeypatch, FakeCloudTasks(error=ServiceUnavailable("down")))
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=1, max_pending=1))
+
+        await _create_review()
+        await asyncio.sleep(0)
+        await _create_review()
+        with pytest.raises(HTTPException) as exc_info:
+            await _create_review()
+
+        assert exc_info.value.status_code == 503
+        tasks = await service.list_tasks("user-1")
+        assert len(tasks) == 2
+        await pool.close()
+
+
+class TestRecoverPendingReviews:
+    """recover_pending_reviewsのテスト"""
+
+    async def _stale_task(self, service: TaskService) -> ReviewTask:
+        task = await service.create_task("user-1", IMAGE_URL, rank_at_review="5級")
+        # 作成日時を古くする
+        doc_ref = service._collection.document(task.task_id)
+        await doc_ref.update({"created_at": datetime.now() - timedelta(hours=1)})
+        return task
+
+    async def test_recovers_stale_pending_tasks(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,
+        processor: FakeProcessor,
+    ) -> None:
+        """古いpendingのタスクのみを再投入し、処理前にタスクを確保する"""
+        _use_cloud_tasks(monkeypatch, FakeCloudTasks(error=ServiceUnavailable("down")))
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=2, max_pending=4))
+        stale = await self._stale_task(service)
+        fresh = await service.create_task("user-1", IMAGE_URL)
+        claimed = await self._stale_task(service)
+        assert await service.claim_pending_task(claimed.task_id)
+
+        assert await reviews.recover_pending_reviews() == 1
+        await pool.join()
+
+        assert processor.processed == [stale.task_id]
+        fresh_task = await service.get_task(fresh.task_id)
+        assert fresh_task is not None
+        assert fresh_task.status == TaskStatus.PENDING
+        await pool.close()
+
+    async def test_already_enqueued_task_falls_back_to_worker(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,
+        processor: FakeProcessor,
+    ) -> None:
+        """同じ名前のCloud Taskが投入済みの場合は、確保してからプロセス内で処理する"""
+        _use_cloud_tasks(monkeypatch, FakeCloudTasks(error=AlreadyExists("exists")))
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=1, max_pending=4))
+        stale = await self._stale_task(service)
+
+        assert await reviews.recover_pending_reviews() == 1
+        await pool.join()
+
+        assert processor.processed == [stale.task_id]
+        await pool.close()
+
+    async def test_recovers_stale_processing_tasks(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,
+        processor: FakeProcessor,
+    ) -> None:
+        """更新が途絶えたprocessingのタスクは確保し直して処理し、処理中のものは対象外"""
+        cloud_tasks = FakeCloudTasks()
+        _use_cloud_tasks(monkeypatch, cloud_tasks)
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=2, max_pending=4))
+        crashed = await service.create_task("user-1", IMAGE_URL)
+        assert await service.claim_pending_task(crashed.task_id)
+        await service._collection.document(crashed.task_id).update(
+            {"updated_at": datetime.now() - timedelta(hours=1)}
+        )
+        running = await service.create_task("user-1", IMAGE_URL)
+        assert await service.claim_pending_task(running.task_id)
+
+        assert await reviews.recover_pending_reviews() == 1
+        await pool.join()
+
+        # Cloud Tasksを経由せずに確保してから処理する
+        assert processor.processed == [crashed.task_id]
+        assert cloud_tasks.enqueued == []
+        await pool.close()
+
+    async def test_interrupted_job_is_recovered(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: TaskService,
+    ) -> None:
+        """シャットダウンで中断された審査はpendingに戻り、次回の起動時に再処理される"""
+        monkeypatch.setattr(settings, "review_recovery_stale_seconds", 0.0)
+        _use_cloud_tasks(monkeypatch, FakeCloudTasks(error=ServiceUnavailable("down")))
+        started = asyncio.Event()
+        processed: list[str] = []
+
+        async def blocking_processor(task_id: str, **_kwargs: object) -> None:
+            await service.update_task_status(task_id, TaskStatus.PROCESSING)
+            started.set()
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(reviews, "process_review_task", blocking_processor)
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=1, max_pending=4))
+        task_id = await _create_review()
+        await started.wait()
+
+        await pool.close()
+
+        interrupted = await service.get_task(task_id)
+        assert interrupted is not None
+        assert interrupted.status == TaskStatus.PENDING
+
+        # 次回の起動時の再投入で処理される
+        async def processor(task_id: str, **_kwargs: object) -> None:
+            processed.append(task_id)
+
+        monkeypatch.setattr(reviews, "process_review_task", processor)
+        pool = _use_pool(monkeypatch, ReviewWorkerPool(workers=1, max_pending=4))
+
+        assert await reviews.recover_pending_reviews() == 1
+        await pool.join()
+
+        assert processed == [task_id]
+        await pool.close()
+
+    async def test_claim_is_exclusive(self, service: TaskService) -> None:
+        """同じタスクは1度しか確保できない"""
+        task = await service.create_task("user-1", IMAGE_URL)
+
+        results = await asyncio.gather(
+            service.claim_pending_task(task.task_id),
+            service.claim_pending_task(task.task_id),
+        )
+
+        assert sorted(results) == [False, True]
+        claimed = await service.get_task(task.task_id)
+        assert claimed is not None
+        assert claimed.status == TaskStatus.PROCESSING
@@ -0,0 +1,167 @@
+"""ステージ別レイテンシ計測のテスト"""
+
+from collections.abc import Iterator
+
+import pytest
+
+from src.api import reviews
+from src.api.reviews import process_review_task
+from src.models.task import TaskStatus
+from src.services import (
+    agent_engine_service,
+    annotation_service,
+    image_generation_service,
+    rank_service,
+    stage_metrics,
+    task_service,
+)
+from src.services.rank_service import RankService
+from src.services.review_image import ReviewImage
+from src.services.stage_metrics import InMemorySpanExporter, StageMetrics
+from src.services.task_service import TaskService
+from tests.fake_firestore import FakeAsyncFirestore
+
+IMAGE_URL = "https://storage.googleapis.com/bucket/uploads/test.jpg"
+
+ANALYSIS: dict[str, object] = {
+    "proportion": {
+        "shape_accuracy": "良好", "ratio_balance": "適切", "contour_quality": "安定", "score": 75.0
+    },
+    "tone": {
+        "value_range": "5段階", "light_consistency": "一貫", "three_dimensionality": "良好",
+        "score": 70.0,
+    },
+    "texture": {"material_expression": "基本的", "touch_variety": "限定的", "score": 65.0},
+    "line_quality": {
+        "stroke_quality": "安定", "pressure_control": "適切", "hatching": "基本的", "score": 72.0
+    },
+    "overall_score": 70.5,
+    "strengths": ["陰影"],
+    "improvements": ["質感"],
+    "tags": ["りんご"],
+}
+
+
+class TestStageMetrics:
+    """StageMetricsのテスト"""
+
+    def test_stage_records_span_and_histogram(self) -> None:
+        """ステージの所要時間がスパンとヒストグラムに記録される"""
+        metrics = StageMetrics(buckets=(0.5, 1.0), log_spans=False)
+        exporter = InMemorySpanExporter()
+        metrics.add_exporter(exporter)
+
+        with metrics.stage("agent_engine", "task-1", model="flash"):
+            pass
+        metrics.record("queue_wait", "task-1", 0.75)
+
+        assert exporter.stages("task-1") == ["agent_engine", "queue_wait"]
+        assert exporter.spans[0].attributes == {"model": "flash"}
+        text = metrics.render_prometheus()
+        assert 'review_stage_duration_seconds_bucket{stage="queue_wait",outcome="ok",le="0.5"} 0' in text
+        assert 'review_stage_duration_seconds_bucket{stage="queue_wait",outcome="ok",le="1"} 1' in text
+        assert 'review_stage_duration_seconds_count{stage="agent_engine",outcome="ok"} 1' in text
+
+    def test_stage_error_outcome(self) -> None:
+        """例外発生時はoutcome=errorで記録して例外を送出する"""
+        metrics = StageMetrics(log_spans=False)
+        exporter = InMemorySpanExporter()
+        metrics.add_exporter(exporter)
+
+        with pytest.raises(ValueError), metrics.stage("rank_update", "task-1"):
+            raise ValueError("boom")
+
+        assert exporter.spans[0].outcome == "error"
+        assert 'stage="rank_update",outcome="error"' in metrics.render_prometheus()
+
+    def test_exporter_failure_is_ignored(self) -> None:
+        """エクスポーターの失敗は計測対象の処理に影響しない"""
+
+        class BrokenExporter:
+            def export(self, _span: object) -> None:
+                raise RuntimeError("export failed")
+
+        metrics = StageMetrics(log_spans=False)
+        metrics.add_exporter(BrokenExporter())  # type: ignore[arg-type]
+
+        span = metrics.record("feedback", "task-1", 0.1)
+        assert span.stage == "feedback"
+
+
+async def fake_load_review_image(image_url: str) -> ReviewImage:
+    return ReviewImage(
+        source_url=image_url,
+        data=b"image",
+        mime_type="image/jpeg",
+        width=1,
+        height=1,
+        sha256="0" * 64,
+        original_size=5,
+    )
+
+
+class FakeAgentEngineService:
+    async def run_coaching_agent(self, **_kwargs: object) -> dict[str, object]:
+        return {"status": "success", "analysis": ANALYSIS}
+
+
+class FakeAnnotationService:
+    async def generate_annotated_image(self, **_kwargs: object) -> str | None:
+        return "https://storage.googleapis.com/bucket/annotated/a.png"
+
+
+class FakeImageGenerationService:
+    async def generate_example_image(self, **_kwargs: object) -> None:
+        return None
+
+
+@pytest.fixture
+def exporter(monkeypatch: pytest.MonkeyPatch) -> Iterator[InMemorySpanExporter]:
+    """レビュー処理の外部依存をスタブに差し替え、スパンを収集する"""
+    db = FakeAsyncFirestore()
+    monkeypatch.setattr(task_service, "_task_service", TaskService(db=db))  # type: ignore[arg-type]
+    monkeypatch.setattr(rank_service, "_rank_service", RankService(db=db))  # type: ignore[arg-type]
+    monkeypatch.setattr(agent_engine_service, "_agent_engine_service", FakeAgentEngineService())
+    monkeypatch.setattr(annotation_service, "_annotation_service", FakeAnnotationService())
+    monkeypatch.setattr(
+        image_generation_service, "_image_generation_service", FakeImageGenerationService()
+    )
+    monkeypatch.setattr(reviews, "load_review_image", fake_load_review_image)
+    metrics = StageMetrics(log_spans=False)
+    monkeypatch.setattr(stage_metrics, "_stage_metrics", metrics)
+    span_exporter = InMemorySpanExporter()
+    metrics.add_exporter(span_exporter)
+    yield span_exporter
+
+
+class TestProcessReviewTaskStages:
+    """process_review_taskのステージ計測のテスト"""
+
+    async def test_all_stages_are_recorded(self, exporter: InMemorySpanExporter) -> None:
+        """各ステージがtask_id付きで記録される"""
+        task = await task_service.get_task_service().create_task("user-1", IMAGE_URL)
+
+        await process_review_task(task.task_id, "user-1", IMAGE_URL)
+
+        stages = exporter.stages(task.task_id)
+        assert stages[:6] == [
+            "task_start",
+            "rank_fetch",
+            "agent_engine",
+            "rank_update",
+            "feedback",
+            "feedback_save",
+        ]
+        assert {"image_load", "annotation", "example_image", "image_stages"} <= set(stages)
+        assert stages[-1] == "process_review_task"
+        assert all(span.outcome == "ok" for span in exporter.spans)
+        stored = await task_service.get_task_service().get_task(task.task_id)
+        assert stored is not None and stored.status == TaskStatus.PROCESSING
+
+    async def test_rank_snapshot_skips_rank_fetch(self, exporter: InMemorySpanExporter) -> None:
+        """ランクのスナップショットがあればrank_fetchステージは発生しない"""
+        task = await task_service.get_task_service().create_task("user-1", IMAGE_URL)
+
+        await process_review_task(task.task_id, "user-1", IMAGE_URL, rank_at_review="9級")
+
+        assert "rank_fetch" not in exporter.stages(task.task_id)
@@ -1,16 +1,24 @@
+import base64
 import os
 import structlog
 import asyncio
+import threading
+import time
+from collections.abc import Coroutine, Iterator
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, List
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, List, TypeVar
 from urllib.parse import urlparse
 
 import aiohttp
 import functions_framework
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from google.cloud import firestore
 from google.cloud import storage
+from PIL import Image, ImageOps, ImageStat
 
 # structlog configuration
 structlog.configure(
@@ -34,6 +42,108 @@ OUTPUT_BUCKET_NAME = os.environ.get("OUTPUT_BUCKET_NAME")
 # Gemini 3モデルはグローバルエンドポイントで利用可能
 LOCATION = "global"
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-3-flash-preview")
+# 429を受けた際に送信を控える秒数（呼び出し元にはRetry-Afterとして返す）
+GEMINI_THROTTLE_COOLDOWN_SECONDS = float(os.environ.get("GEMINI_THROTTLE_COOLDOWN_SECONDS", "5"))
+# URLから取得した画像の前処理（縮小・メタデータ除去・グレースケール化・再エンコード）
+# process_reviewからインラインで渡された画像は前処理済みのためそのまま使う
+STAGE_IMAGE_PREPROCESS_ENABLED = os.environ.get("STAGE_IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+STAGE_IMAGE_JPEG_QUALITY = int(os.environ.get("STAGE_IMAGE_JPEG_QUALITY", "85"))
+# アノテーションは指摘位置の座標精度を保つため大きめの上限にする
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", "2048"))
+IMAGE_GRAYSCALE = os.environ.get("IMAGE_GRAYSCALE", "auto")
+# グレースケール判定: 縮小画像のHSV彩度の平均がこの値以下ならモノクロとみなす（0〜255）
+MONOCHROME_SATURATION_THRESHOLD = 24.0
+
+
+def log_stage(stage: str, task_id: str, duration_seconds: float, outcome: str = "ok") -> None:
+    """ステージの所要時間を構造化ログに出力（stage_completedイベント）"""
+    logger.info(
+        "stage_completed",
+        service="annotate_image",
+        task_id=task_id,
+        stage=stage,
+        outcome=outcome,
+        duration_seconds=round(max(duration_seconds, 0.0), 4),
+    )
+
+
+@contextmanager
+def stage_span(stage: str, task_id: str) -> Iterator[None]:
+    """ブロックの所要時間をステージとして記録（例外時はoutcome=error）"""
+    started_at = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        log_stage(stage, task_id, time.perf_counter() - started_at, outcome)
+
+
+T = TypeVar("T")
+
+# インスタンス内で共有するイベントループ（専用スレッドで常駐）
+# リクエストごとにループを作り直さず、HTTP接続・非同期クライアントをリクエスト間で再利用する
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """共有イベントループを取得（初回のみ作成してバックグラウンドスレッドで起動）"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="function-event-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """コルーチンを共有イベントループで実行して結果を待つ
+
+    同時リクエスト（--concurrency > 1）は各ワーカースレッドから同じループに投入され、並行して処理される。
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
+# ウォームスタート時はクライアントの生成を省略する（初回利用時に1度だけ生成）
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """Gemini呼び出し用クライアントを取得（インスタンス内で共有）"""
+    return genai.Client(
+        vertexai=True,
+        project=PROJECT_ID,
+        location=LOCATION,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_storage_client() -> storage.Client:
+    """Cloud Storageクライアントを取得（インスタンス内で共有）"""
+    return storage.Client()
+
+
+@lru_cache(maxsize=1)
+def get_firestore_client() -> firestore.Client:
+    """Firestoreクライアントを取得（インスタンス内で共有）"""
+    return firestore.Client()
+
+
+_http_session: aiohttp.ClientSession | None = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """元画像取得用の共有HTTPセッションを取得（共有イベントループ上で呼び出すこと）"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _http_session
+
+
+class ModelThrottledError(Exception):
+    """Geminiのクォータ超過（429 RESOURCE_EXHAUSTED）"""
 
 
 class AnnotationGenerationError(Exception):
@@ -44,6 +154,10 @@ class InvalidImageURLError(Exception):
     """URL検証エラー"""
 
 
+class ImageFetchError(Exception):
+    """画像取得エラー（HTTPエラー・サイズ超過）"""
+
+
 def _validate_image_url(url: str) -> None:
     try:
         parsed = urlparse(url)
@@ -175,22 +289,54 @@ OUTPUT: The final annotated image with colored bounding boxes and numbered circl
 
 
 
-async def _generate_annotated_image(prompt: str, image_data: bytes, mime_type: str) -> bytes:
-    client = genai.Client(
-        vertexai=True,
-        project=PROJECT_ID,
-        location=LOCATION,
-    )
+# 429を受けた場合、同じインスタンスで処理中の他のリクエストもこの時刻まで送信を控える
+_model_throttled_until = 0.0
 
-    image_part = types.Part.from_bytes(data=image_data, mime_type=mime_type)
-    response = client.models.generate_content(
-        model=GEMINI_MODEL,
-        contents=[image_part, types.Part.from_text(text=prompt)],
-        config=types.GenerateContentConfig(
-            tools=[types.Tool(code_execution=types.ToolCodeExecution)],
-        ),
+
+def _is_resource_exhausted(error: Exception) -> bool:
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+def _report_model_throttled() -> None:
+    global _model_throttled_until
+    _model_throttled_until = max(
+        _model_throttled_until, time.monotonic() + GEMINI_THROTTLE_COOLDOWN_SECONDS
+    )
+    logger.warning(
+        "model_throttled", model=GEMINI_MODEL, cooldown_seconds=GEMINI_THROTTLE_COOLDOWN_SECONDS
     )
 
+
+async def _wait_for_model_cooldown() -> None:
+    wait_seconds = _model_throttled_until - time.monotonic()
+    if wait_seconds > 0:
+        logger.info("model_cooldown_wait", model=GEMINI_MODEL, wait_seconds=round(wait_seconds, 3))
+        await asyncio.sleep(wait_seconds)
+
+
+async def _generate_annotated_image(
+    prompt: str, image_data: bytes | memoryview, mime_type: str
+) -> bytes:
+    client = get_genai_client()
+
+    image_part = types.Part.from_bytes(data=bytes(image_data), mime_type=mime_type)
+    # 他のリクエストが429を受けた直後は、クールダウンが明けるまで送信しない
+    await _wait_for_model_cooldown()
+    try:
+        # client.aio（非同期API）で呼び出し、待機中にイベントループをブロックしない
+        response = await client.aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=[image_part, types.Part.from_text(text=prompt)],
+            config=types.GenerateContentConfig(
+                tools=[types.Tool(code_execution=types.ToolCodeExecution)],
+            ),
+        )
+    except errors.APIError as e:
+        if not _is_resource_exhausted(e):
+            raise
+        _report_model_throttled()
+        raise ModelThrottledError(str(e)) from e
+
     if response.candidates:
         for candidate in response.candidates:
             if candidate.content and candidate.content.parts:
@@ -206,6 +352,99 @@ async def _generate_annotated_image(prompt: str, image_data: bytes, mime_type: s
     raise AnnotationGenerationError("No annotated image data found in response")
 
 
+def _is_monochrome(image: Image.Image) -> bool:
+    """彩度がほぼない（鉛筆・木炭などの）画像か判定"""
+    if image.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    sample = image.convert("RGB")
+    sample.thumbnail((64, 64))
+    saturation = ImageStat.Stat(sample.convert("HSV").getchannel("S")).mean[0]
+    return saturation <= MONOCHROME_SATURATION_THRESHOLD
+
+
+def _preprocess_image(data: bytes | memoryview, max_dimension: int, grayscale: str) -> bytes:
+    """モデル入力用に画像を縮小・メタデータ除去・再エンコード（出力はメタデータなしのJPEG）
+
+    grayscale: auto（彩度がほぼない画像のみ）/ always / never
+    """
+    with Image.open(BytesIO(data)) as opened:
+        opened.draft("RGB", (max_dimension, max_dimension))
+        # 再エンコードでEXIFが失われるため、先に向き（Orientation）を画素に反映する
+        image = ImageOps.exif_transpose(opened)
+        image = image.convert("RGBA") if image.mode in ("P", "PA") else image
+        if image.mode in ("RGBA", "LA"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        to_grayscale = grayscale == "always" or (grayscale == "auto" and _is_monochrome(image))
+        image = image.convert("L" if to_grayscale else "RGB")
+
+        buffer = BytesIO()
+        # exif等を渡さずに保存することでメタデータを除去する
+        image.save(buffer, format="JPEG", quality=STAGE_IMAGE_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+async def _prepare_fetched_image(
+    task_id: str, data: bytes | memoryview, mime_type: str
+) -> tuple[bytes | memoryview, str]:
+    """URLから取得した画像をモデル入力用に前処理（失敗時は元の画像を使う）"""
+    if not STAGE_IMAGE_PREPROCESS_ENABLED:
+        return data, mime_type
+    try:
+        with stage_span("image_preprocess", task_id):
+            prepared = await asyncio.to_thread(
+                _preprocess_image, data, IMAGE_MAX_DIMENSION, IMAGE_GRAYSCALE
+            )
+    except Exception as e:
+        logger.warning("image_preprocess_failed", task_id=task_id, error=str(e))
+        return data, mime_type
+    logger.info("image_preprocessed", task_id=task_id, size=len(data), prepared_size=len(prepared))
+    return prepared, "image/jpeg"
+
+
+async def _fetch_image(session: aiohttp.ClientSession, url: str, max_size: int) -> memoryview:
+    """画像を上限付きでストリーミング取得
+
+    チャンクごとに ``data += chunk`` で連結すると受信済みデータ全体のコピーが毎回発生する。
+    Content-Lengthがあればその大きさのbytearrayを事前確保して書き込み、
+    ない・一致しない場合（圧縮転送など）は末尾に追記する。結果はコピーせずmemoryviewで返す。
+    """
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            raise ImageFetchError(f"Failed to fetch image: {resp.status}")
+
+        declared = resp.content_length
+        if declared is not None and declared > max_size:
+            raise ImageFetchError(f"Image size exceeds limit: {declared} bytes")
+
+        buffer = bytearray(declared or 0)
+        size = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            end = size + len(chunk)
+            if end > max_size:
+                raise ImageFetchError(f"Image size exceeds limit: {end} bytes")
+            if end <= len(buffer):
+                buffer[size:end] = chunk
+            else:
+                del buffer[size:]
+                buffer += chunk
+            size = end
+
+    if size < len(buffer):
+        del buffer[size:]
+    return memoryview(buffer)
+
+
+async def _fetch_original_image(task_id: str, original_image_url: str) -> memoryview:
+    """元画像をURLから取得（インライン画像が渡されなかった場合のフォールバック）"""
+    max_size = 10 * 1024 * 1024
+    with stage_span("image_fetch", task_id):
+        return await _fetch_image(get_http_session(), original_image_url, max_size)
+
+
 @functions_framework.http
 def annotate_image(request):
     try:
@@ -219,80 +458,79 @@ def annotate_image(request):
         analysis = request_json.get("analysis")
         current_rank_label = request_json.get("current_rank_label", "10級")
         motif_tags = request_json.get("motif_tags", [])
+        inline_image_base64 = request_json.get("original_image_base64")
+        inline_image_mime_type = request_json.get("original_image_mime_type")
+        include_image_data = bool(request_json.get("include_image_data", False))
 
         if not all([task_id, user_id, original_image_url, analysis]):
             return {"error": "Missing required fields"}, 400
 
         logger.info("annotate_function_started", task_id=task_id, user_id=user_id)
 
-        storage_client = storage.Client()
-        firestore_client = firestore.Client()
+        storage_client = get_storage_client()
+        firestore_client = get_firestore_client()
 
         async def process():
             _validate_image_url(original_image_url)
 
-            timeout = aiohttp.ClientTimeout(total=10)
-            max_size = 10 * 1024 * 1024
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(original_image_url) as resp:
-                    if resp.status != 200:
-                        raise AnnotationGenerationError(
-                            f"Failed to fetch original image: {resp.status}"
-                        )
-
-                    content_length = resp.headers.get("Content-Length")
-                    if content_length and int(content_length) > max_size:
-                        raise AnnotationGenerationError(
-                            f"Image size exceeds limit: {content_length} bytes"
-                        )
-
-                    original_image_data = b""
-                    async for chunk in resp.content.iter_chunked(8192):
-                        original_image_data += chunk
-                        if len(original_image_data) > max_size:
-                            raise AnnotationGenerationError(
-                                f"Image size exceeds limit: {len(original_image_data)} bytes"
-                            )
-
-            mime_type = _get_mime_type_from_url(original_image_url)
-            prompt = _build_annotation_prompt(analysis, current_rank_label, motif_tags)
-            annotated_bytes = await _generate_annotated_image(prompt, original_image_data, mime_type)
-
-            bucket = storage_client.bucket(OUTPUT_BUCKET_NAME)
-            blob_path = f"annotated/{task_id}.png"
-            blob = bucket.blob(blob_path)
+            if inline_image_base64:
+                # process_reviewで取得・正規化済みの元画像を使用（URLからの再取得を省略）
+                original_image_data = base64.b64decode(inline_image_base64)
+                mime_type = inline_image_mime_type or _get_mime_type_from_url(original_image_url)
+            else:
+                original_image_data = await _fetch_original_image(task_id, original_image_url)
+                original_image_data, mime_type = await _prepare_fetched_image(
+                    task_id, original_image_data, _get_mime_type_from_url(original_image_url)
+                )
 
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: blob.upload_from_string(annotated_bytes, content_type="image/png"),
-            )
-
-            blob.metadata = {
-                "user_id": user_id,
-                "task_id": task_id,
-                "ai_generated": "true",
-                "model": GEMINI_MODEL,
-            }
-            await asyncio.get_event_loop().run_in_executor(None, blob.patch)
+            prompt = _build_annotation_prompt(analysis, current_rank_label, motif_tags)
+            with stage_span("gemini_generate", task_id):
+                annotated_bytes = await _generate_annotated_image(prompt, original_image_data, mime_type)
+
+            with stage_span("gcs_upload", task_id):
+                bucket = storage_client.bucket(OUTPUT_BUCKET_NAME)
+                blob_path = f"annotated/{task_id}.png"
+                blob = bucket.blob(blob_path)
+
+                await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: blob.upload_from_string(annotated_bytes, content_type="image/png"),
+                )
+
+                blob.metadata = {
+                    "user_id": user_id,
+                    "task_id": task_id,
+                    "ai_generated": "true",
+                    "model": GEMINI_MODEL,
+                }
+                await asyncio.get_event_loop().run_in_executor(None, blob.patch)
 
             annotated_image_url = f"https://storage.googleapis.com/{OUTPUT_BUCKET_NAME}/{blob_path}"
-            doc_ref = firestore_client.collection("review_tasks").document(task_id)
-            doc_ref.update(
-                {
-                    "annotated_image_url": annotated_image_url,
-                    "updated_at": datetime.now(),
-                }
-            )
+            with stage_span("firestore_update", task_id):
+                doc_ref = firestore_client.collection("review_tasks").document(task_id)
+                await asyncio.to_thread(
+                    doc_ref.update,
+                    {
+                        "annotated_image_url": annotated_image_url,
+                        "updated_at": datetime.now(),
+                    },
+                )
 
             logger.info("annotation_saved", task_id=task_id, blob_path=blob_path)
-            return blob_path, annotated_image_url
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        blob_path, annotated_image_url = loop.run_until_complete(process())
-        loop.close()
-
-        return {"status": "success", "path": blob_path, "annotated_image_url": annotated_image_url}, 200
+            return blob_path, annotated_image_url, annotated_bytes
+
+        with stage_span("annotate_image", task_id):
+            blob_path, annotated_image_url, annotated_bytes = run_async(process())
+
+        response = {"status": "success", "path": blob_path, "annotated_image_url": annotated_image_url}
+        if include_image_data:
+            # お手本画像生成でアノテーション画像を再ダウンロードしないよう本体も返す
+            response["annotated_image_base64"] = base64.b64encode(annotated_bytes).decode("ascii")
+        return response, 200
+    except ModelThrottledError as e:
+        # 呼び出し元にはRetry-Afterで送信を控える時間を伝える
+        logger.warning("annotation_function_throttled", error=str(e))
+        return {"error": str(e)}, 429, {"Retry-After": str(int(GEMINI_THROTTLE_COOLDOWN_SECONDS))}
     except InvalidImageURLError as e:
         error_message = str(e)
         logger.error("invalid_image_url", error=error_message)
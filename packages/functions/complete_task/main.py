@@ -1,4 +1,5 @@
 import os
+import time
 import functions_framework
 from google.cloud import firestore
 import structlog
@@ -45,6 +46,7 @@ def complete_task(request):
              return {"error": "Missing required fields"}, 400
 
         logger.info("processing_task_completion_http", task_id=task_id)
+        started_at = time.perf_counter()
         
         # Update Firestore Task
         doc_ref = db.collection("review_tasks").document(task_id)
@@ -55,6 +57,15 @@ def complete_task(request):
             "updated_at": datetime.now()
         })
         
+        # ステージ別レイテンシ（他のサービスと同じstage_completedイベント）
+        logger.info(
+            "stage_completed",
+            service="complete_task",
+            task_id=task_id,
+            stage="complete_task",
+            outcome="ok",
+            duration_seconds=round(time.perf_counter() - started_at, 4),
+        )
         logger.info("task_completed_successfully", task_id=task_id)
         return {"status": "success"}, 200
         
@@ -15,6 +15,10 @@ fi
 REGION="${REGION:-us-central1}"
 # バケット設定
 GCS_BUCKET_NAME="${GCS_BUCKET_NAME:-drawing-practice-agent-images}"
+# インスタンスあたりの同時リクエスト数（Gemini呼び出しは非同期のため待機中に他のリクエストを処理できる）
+# 1より大きい値には--cpu=1以上が必要（functions-frameworkのワーカースレッド数はCPU数×4）
+GENERATE_IMAGE_CONCURRENCY="${GENERATE_IMAGE_CONCURRENCY:-4}"
+ANNOTATE_IMAGE_CONCURRENCY="${ANNOTATE_IMAGE_CONCURRENCY:-4}"
 
 PROJECT_ID=$(gcloud config get-value project)
 echo "Project ID: $PROJECT_ID"
@@ -56,7 +60,9 @@ gcloud functions deploy generate-image \
     --no-allow-unauthenticated \
     --set-env-vars=GCP_PROJECT_ID=$PROJECT_ID,OUTPUT_BUCKET_NAME=$GCS_BUCKET_NAME,COMPLETE_TASK_FUNCTION_URL=$COMPLETE_TASK_URL,GEMINI_MODEL=gemini-3-pro-image-preview \
     --memory=1Gi \
-    --timeout=300s
+    --timeout=300s \
+    --cpu=1 \
+    --concurrency=$GENERATE_IMAGE_CONCURRENCY
 
 # generate-image関数のサービスアカウントを取得
 GENERATE_IMAGE_SA=$(gcloud functions describe generate-image --gen2 --region=$REGION --format="value(serviceConfig.serviceAccountEmail)")
@@ -91,7 +97,9 @@ gcloud functions deploy annotate-image \
     --no-allow-unauthenticated \
     --set-env-vars=GCP_PROJECT_ID=$PROJECT_ID,OUTPUT_BUCKET_NAME=$GCS_BUCKET_NAME,GEMINI_MODEL=gemini-3-flash-preview \
     --memory=1Gi \
-    --timeout=300s
+    --timeout=300s \
+    --cpu=1 \
+    --concurrency=$ANNOTATE_IMAGE_CONCURRENCY
 
 ANNOTATE_FUNCTION_URL=$(gcloud functions describe annotate-image --gen2 --region=$REGION --format="value(serviceConfig.uri)")
 echo "Annotate Image URL: $ANNOTATE_FUNCTION_URL"
@@ -108,6 +116,8 @@ if [ -z "${AGENT_ENGINE_ID:-}" ]; then
     exit 1
 fi
 AGENT_ENGINE_LOCATION="${AGENT_ENGINE_LOCATION:-us-central1}"
+REVIEW_PIPELINE_ENABLED="${REVIEW_PIPELINE_ENABLED:-false}"
+ANNOTATION_DEADLINE_SECONDS="${ANNOTATION_DEADLINE_SECONDS:-60}"
 
 gcloud functions deploy process-review \
     --gen2 \
@@ -117,7 +127,7 @@ gcloud functions deploy process-review \
     --entry-point=process_review_handler \
     --trigger-http \
     --no-allow-unauthenticated \
-    --set-env-vars=GCP_PROJECT_ID=$PROJECT_ID,GCP_REGION=$REGION,AGENT_ENGINE_ID=$AGENT_ENGINE_ID,AGENT_ENGINE_LOCATION=$AGENT_ENGINE_LOCATION,ANNOTATION_FUNCTION_URL=$ANNOTATE_FUNCTION_URL,IMAGE_GENERATION_FUNCTION_URL=$FUNCTION_URL,GEMINI_MODEL=gemini-3-flash-preview \
+    --set-env-vars=GCP_PROJECT_ID=$PROJECT_ID,GCP_REGION=$REGION,AGENT_ENGINE_ID=$AGENT_ENGINE_ID,AGENT_ENGINE_LOCATION=$AGENT_ENGINE_LOCATION,ANNOTATION_FUNCTION_URL=$ANNOTATE_FUNCTION_URL,IMAGE_GENERATION_FUNCTION_URL=$FUNCTION_URL,GEMINI_MODEL=gemini-3-flash-preview,REVIEW_PIPELINE_ENABLED=$REVIEW_PIPELINE_ENABLED,ANNOTATION_DEADLINE_SECONDS=$ANNOTATION_DEADLINE_SECONDS \
     --memory=2Gi \
     --timeout=600s \
     --cpu=1
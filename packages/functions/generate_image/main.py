@@ -1,15 +1,23 @@
+import base64
 import os
 import json
+import random
 import uuid
 import structlog
 import asyncio
+import threading
+import time
+import aiohttp
 import functions_framework
-from typing import List, Optional, Dict, Any
+from collections.abc import Coroutine, Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Tuple, TypeVar
 from io import BytesIO
 from urllib.parse import urlparse
-from PIL import Image
+from PIL import Image, ImageOps, ImageStat
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from google.cloud import storage
 
 # structlog configuration
@@ -30,13 +38,107 @@ structlog.configure(
 logger = structlog.get_logger()
 
 
+def log_stage(stage: str, task_id: str, duration_seconds: float, outcome: str = "ok") -> None:
+    """ステージの所要時間を構造化ログに出力（stage_completedイベント）"""
+    logger.info(
+        "stage_completed",
+        service="generate_image",
+        task_id=task_id,
+        stage=stage,
+        outcome=outcome,
+        duration_seconds=round(max(duration_seconds, 0.0), 4),
+    )
+
+
+@contextmanager
+def stage_span(stage: str, task_id: str) -> Iterator[None]:
+    """ブロックの所要時間をステージとして記録（例外時はoutcome=error）"""
+    started_at = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        log_stage(stage, task_id, time.perf_counter() - started_at, outcome)
+
+
 # Environment Variables
 PROJECT_ID = os.environ.get("GCP_PROJECT_ID")
 OUTPUT_BUCKET_NAME = os.environ.get("OUTPUT_BUCKET_NAME")
 COMPLETE_TASK_FUNCTION_URL = os.environ.get("COMPLETE_TASK_FUNCTION_URL")
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-3-pro-image-preview")
+# 429を受けた際に送信を控える秒数（呼び出し元にはRetry-Afterとして返す）
+GEMINI_THROTTLE_COOLDOWN_SECONDS = float(os.environ.get("GEMINI_THROTTLE_COOLDOWN_SECONDS", "5"))
 # gemini-3-pro-image-previewはグローバルエンドポイントで利用可能
 LOCATION = "global"
+# URLから取得した画像の前処理（縮小・メタデータ除去・グレースケール化・再エンコード）
+# process_reviewからインラインで渡された画像は前処理済みのためそのまま使う
+STAGE_IMAGE_PREPROCESS_ENABLED = os.environ.get("STAGE_IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+STAGE_IMAGE_JPEG_QUALITY = int(os.environ.get("STAGE_IMAGE_JPEG_QUALITY", "85"))
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", "1536"))
+IMAGE_GRAYSCALE = os.environ.get("IMAGE_GRAYSCALE", "auto")
+# グレースケール判定: 縮小画像のHSV彩度の平均がこの値以下ならモノクロとみなす（0〜255）
+MONOCHROME_SATURATION_THRESHOLD = 24.0
+
+T = TypeVar("T")
+
+# インスタンス内で共有するイベントループ（専用スレッドで常駐）
+# リクエストごとにループを作り直さず、HTTP接続・非同期クライアントをリクエスト間で再利用する
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """共有イベントループを取得（初回のみ作成してバックグラウンドスレッドで起動）"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="function-event-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """コルーチンを共有イベントループで実行して結果を待つ
+
+    同時リクエスト（--concurrency > 1）は各ワーカースレッドから同じループに投入され、並行して処理される。
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
+# ウォームスタート時はクライアントの生成を省略する（初回利用時に1度だけ生成）
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """Gemini呼び出し用クライアントを取得（インスタンス内で共有）"""
+    return genai.Client(
+        vertexai=True,
+        project=PROJECT_ID,
+        location=LOCATION,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_storage_client() -> storage.Client:
+    """Cloud Storageクライアントを取得（インスタンス内で共有）"""
+    return storage.Client()
+
+
+_http_session: aiohttp.ClientSession | None = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """画像取得・タスク完了通知用の共有HTTPセッションを取得（共有イベントループ上で呼び出すこと）"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+    return _http_session
+
+
+class ModelThrottledError(Exception):
+    """Geminiのクォータ超過（429 RESOURCE_EXHAUSTED）"""
 
 class ImageGenerationError(Exception):
     pass
@@ -45,6 +147,10 @@ class InvalidImageURLError(Exception):
     """URL検証エラー"""
     pass
 
+class ImageFetchError(Exception):
+    """画像取得エラー（HTTPエラー・サイズ超過）"""
+    pass
+
 # Base Prompt Template - ユーザーの画風を維持した「次の一歩」のデッサン生成
 BASE_PROMPT_TEMPLATE = """
 あなたはデッサンコーチです。ユーザーが描いたデッサンの「次の一歩」となる改善版を生成してください。
@@ -166,6 +272,170 @@ def _get_mime_type_from_url(url: str) -> str:
         return "image/jpeg"
 
 
+def _is_monochrome(image: Image.Image) -> bool:
+    """彩度がほぼない（鉛筆・木炭などの）画像か判定"""
+    if image.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    sample = image.convert("RGB")
+    sample.thumbnail((64, 64))
+    saturation = ImageStat.Stat(sample.convert("HSV").getchannel("S")).mean[0]
+    return saturation <= MONOCHROME_SATURATION_THRESHOLD
+
+
+def _preprocess_image(data: bytes | memoryview, max_dimension: int, grayscale: str) -> bytes:
+    """モデル入力用に画像を縮小・メタデータ除去・再エンコード（出力はメタデータなしのJPEG）
+
+    grayscale: auto（彩度がほぼない画像のみ）/ always / never
+    """
+    with Image.open(BytesIO(data)) as opened:
+        opened.draft("RGB", (max_dimension, max_dimension))
+        # 再エンコードでEXIFが失われるため、先に向き（Orientation）を画素に反映する
+        image = ImageOps.exif_transpose(opened)
+        image = image.convert("RGBA") if image.mode in ("P", "PA") else image
+        if image.mode in ("RGBA", "LA"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        to_grayscale = grayscale == "always" or (grayscale == "auto" and _is_monochrome(image))
+        image = image.convert("L" if to_grayscale else "RGB")
+
+        buffer = BytesIO()
+        # exif等を渡さずに保存することでメタデータを除去する
+        image.save(buffer, format="JPEG", quality=STAGE_IMAGE_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+async def _prepare_fetched_image(
+    task_id: str, data: bytes | memoryview, mime_type: str
+) -> tuple[bytes | memoryview, str]:
+    """URLから取得した画像をモデル入力用に前処理（失敗時は元の画像を使う）"""
+    if not STAGE_IMAGE_PREPROCESS_ENABLED:
+        return data, mime_type
+    try:
+        with stage_span("image_preprocess", task_id):
+            prepared = await asyncio.to_thread(
+                _preprocess_image, data, IMAGE_MAX_DIMENSION, IMAGE_GRAYSCALE
+            )
+    except Exception as e:
+        logger.warning("image_preprocess_failed", task_id=task_id, error=str(e))
+        return data, mime_type
+    logger.info("image_preprocessed", task_id=task_id, size=len(data), prepared_size=len(prepared))
+    return prepared, "image/jpeg"
+
+
+async def _fetch_image(session: aiohttp.ClientSession, url: str, max_size: int) -> memoryview:
+    """画像を上限付きでストリーミング取得
+
+    チャンクごとに ``data += chunk`` で連結すると受信済みデータ全体のコピーが毎回発生する。
+    Content-Lengthがあればその大きさのbytearrayを事前確保して書き込み、
+    ない・一致しない場合（圧縮転送など）は末尾に追記する。結果はコピーせずmemoryviewで返す。
+    """
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            raise ImageFetchError(f"Failed to fetch image: {resp.status}")
+
+        declared = resp.content_length
+        if declared is not None and declared > max_size:
+            raise ImageFetchError(f"Image size exceeds limit: {declared} bytes")
+
+        buffer = bytearray(declared or 0)
+        size = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            end = size + len(chunk)
+            if end > max_size:
+                raise ImageFetchError(f"Image size exceeds limit: {end} bytes")
+            if end <= len(buffer):
+                buffer[size:end] = chunk
+            else:
+                del buffer[size:]
+                buffer += chunk
+            size = end
+
+    if size < len(buffer):
+        del buffer[size:]
+    return memoryview(buffer)
+
+
+# IDトークンキャッシュ（audience -> (トークン, 有効期限UNIX秒)）
+# インスタンスが再利用される間は同じトークンを使い回し、メタデータサーバー呼び出しを削減する
+# - 期限が近づいたトークンは返却しつつバックグラウンドで更新する
+# - 同一audienceへの同時取得は1回のメタデータサーバー呼び出しにまとめる
+_id_token_cache: Dict[str, Tuple[str, float]] = {}
+# 取得中のタスク（audience -> タスク。共有イベントループ上で実行される）
+_id_token_inflight: Dict[str, "asyncio.Task[str]"] = {}
+# 期限の何秒前からバックグラウンドで再取得するか
+ID_TOKEN_REFRESH_MARGIN_SECONDS = float(os.environ.get("ID_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# これより期限が近いトークンは使用せず、取得完了を待つ
+ID_TOKEN_MIN_REMAINING_SECONDS = 30.0
+
+
+def _fetch_id_token_with_expiry(target_audience: str) -> Tuple[str, float]:
+    """IDトークンを取得し、expクレームから有効期限を読み取る（同期）"""
+    import google.auth.jwt
+    import google.auth.transport.requests
+    import google.oauth2.id_token
+
+    auth_req = google.auth.transport.requests.Request()
+    token = google.oauth2.id_token.fetch_id_token(auth_req, target_audience)
+    try:
+        expires_at = float(google.auth.jwt.decode(token, verify=False)["exp"])
+    except (KeyError, TypeError, ValueError):
+        # expを読み取れない場合はGoogleのIDトークンの有効期間（1時間）とみなす
+        expires_at = time.time() + 3600
+    return token, expires_at
+
+
+async def _refresh_id_token(target_audience: str) -> str:
+    """Executorでトークンを取得してキャッシュに格納"""
+    try:
+        # 同期処理なのでExecutorで実行
+        token, expires_at = await asyncio.get_running_loop().run_in_executor(
+            None, _fetch_id_token_with_expiry, target_audience
+        )
+        _id_token_cache[target_audience] = (token, expires_at)
+        logger.info("id_token_fetched", audience=target_audience)
+        return token
+    except Exception as e:
+        logger.error("id_token_fetch_failed", audience=target_audience, error=str(e))
+        raise
+    finally:
+        _id_token_inflight.pop(target_audience, None)
+
+
+def _start_id_token_refresh(target_audience: str) -> "asyncio.Task[str]":
+    """取得処理を開始（進行中の取得があればそれを共有）"""
+    task = _id_token_inflight.get(target_audience)
+    if task is None or task.done():
+        task = asyncio.create_task(_refresh_id_token(target_audience))
+        _id_token_inflight[target_audience] = task
+    return task
+
+
+def _consume_id_token_exception(task: "asyncio.Task[str]") -> None:
+    """バックグラウンド更新の例外を回収（ログは取得処理側で出力済み）"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def get_id_token(target_audience: str) -> str:
+    """サービス間認証用のIDトークンを取得（キャッシュ付き）"""
+    cached = _id_token_cache.get(target_audience)
+    if cached is not None:
+        remaining = cached[1] - time.time()
+        if remaining > ID_TOKEN_REFRESH_MARGIN_SECONDS:
+            return cached[0]
+        if remaining > ID_TOKEN_MIN_REMAINING_SECONDS:
+            # 期限が近いので、現在のトークンを返しつつバックグラウンドで更新
+            _start_id_token_refresh(target_audience).add_done_callback(
+                _consume_id_token_exception
+            )
+            return cached[0]
+
+    # 呼び出し元がキャンセルされても共有中の取得処理は継続させる
+    return await asyncio.shield(_start_id_token_refresh(target_audience))
+
 def create_generation_prompt(analysis: Dict[str, Any], motif_tags: List[str], has_annotated_image: bool = False) -> str:
     """改善点にフォーカスした画像生成プロンプトを作成"""
     improvements_list = "\n".join([f"- {improvement}" for improvement in analysis.get("improvements", [])])
@@ -242,105 +512,181 @@ def create_generation_prompt(analysis: Dict[str, Any], motif_tags: List[str], ha
     return prompt
 
 
-async def generate_image(prompt: str, original_image_data: bytes, annotated_image_data: Optional[bytes] = None, mime_type: str = "image/jpeg", max_retries: int = 3) -> bytes:
-    client = genai.Client(
-        vertexai=True,
-        project=PROJECT_ID,
-        location=LOCATION,
+# リトライ設定（フルジッター付き指数バックオフ）
+RETRY_BASE_DELAY_SECONDS = float(os.environ.get("RETRY_BASE_DELAY_SECONDS", "1"))
+RETRY_MAX_DELAY_SECONDS = float(os.environ.get("RETRY_MAX_DELAY_SECONDS", "30"))
+# インスタンス内で共有する再試行予算（最初の試行1回あたりに貯まる再試行の数と、その上限）
+RETRY_BUDGET_RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX_TOKENS = float(os.environ.get("RETRY_BUDGET_MAX_TOKENS", "10"))
+# 再試行を含む生成の期限（関数のタイムアウト300秒に対し、保存・完了通知の時間を残す）
+GENERATION_DEADLINE_SECONDS = float(os.environ.get("GENERATION_DEADLINE_SECONDS", "240"))
+
+_retry_tokens = RETRY_BUDGET_MAX_TOKENS
+
+
+def _is_retryable(error: Exception) -> bool:
+    """再試行可能か（429・408・5xx・タイムアウト・接続エラー・画像なしの応答）"""
+    if isinstance(error, errors.APIError):
+        code = error.code or 0
+        return code in (408, 429) or code >= 500
+    return isinstance(
+        error, ImageGenerationError | TimeoutError | ConnectionError | aiohttp.ClientError
     )
-    
-    # 公式ドキュメントの例に合わせて、bytesからPIL Imageに変換
-    # Pythonの例: contents=[prompt, image] の形式で、imageはPIL Imageオブジェクト
-    # mime_typeは現在の実装では使用されないが、将来の拡張のために保持
-    with Image.open(BytesIO(original_image_data)) as original_image:
-        # Build contents list
-        contents: list = [prompt, original_image]
-        
-        # Add annotated image if provided
-        annotated_image = None
-        if annotated_image_data:
-            try:
-                annotated_image = Image.open(BytesIO(annotated_image_data))
-                contents.append(annotated_image)
-                logger.info("annotated_image_included_in_generation")
-            except Exception as e:
-                logger.warning("failed_to_open_annotated_image", error=str(e))
-        
+
+
+def _backoff_delay(attempt: int) -> float:
+    """attempt回目の失敗後に待つ秒数（フルジッター）"""
+    ceiling = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0.0, ceiling)
+
+
+def _record_generation_request() -> None:
+    global _retry_tokens
+    _retry_tokens = min(RETRY_BUDGET_MAX_TOKENS, _retry_tokens + RETRY_BUDGET_RATIO)
+
+
+def _try_spend_retry() -> bool:
+    global _retry_tokens
+    if _retry_tokens < 1.0:
+        return False
+    _retry_tokens -= 1.0
+    return True
+
+
+# 429を受けた場合、同じインスタンスで処理中の他のリクエストもこの時刻まで送信を控える
+_model_throttled_until = 0.0
+
+
+def _is_resource_exhausted(error: Exception) -> bool:
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+def _report_model_throttled() -> None:
+    global _model_throttled_until
+    _model_throttled_until = max(
+        _model_throttled_until, time.monotonic() + GEMINI_THROTTLE_COOLDOWN_SECONDS
+    )
+    logger.warning(
+        "model_throttled", model=GEMINI_MODEL, cooldown_seconds=GEMINI_THROTTLE_COOLDOWN_SECONDS
+    )
+
+
+async def _wait_for_model_cooldown() -> None:
+    wait_seconds = _model_throttled_until - time.monotonic()
+    if wait_seconds > 0:
+        logger.info("model_cooldown_wait", model=GEMINI_MODEL, wait_seconds=round(wait_seconds, 3))
+        await asyncio.sleep(wait_seconds)
+
+
+async def generate_image(prompt: str, original_image_data: bytes | memoryview, annotated_image_data: bytes | memoryview | None = None, mime_type: str = "image/jpeg", max_retries: int = 3) -> bytes:
+    client = get_genai_client()
+
+    # PIL Imageを渡すとSDK内で再エンコードされるため、バイト列のままPartにする
+    contents: list = [prompt, types.Part.from_bytes(data=bytes(original_image_data), mime_type=mime_type)]
+
+    # Add annotated image if provided
+    if annotated_image_data:
         try:
-            for attempt in range(max_retries):
-                try:
-                    # Use generate_content for Gemini 2.5 Flash Image with native image output
-                    # 公式ドキュメントの例に合わせて、シンプルな形式でcontentsを渡す
-                    # contents=[prompt, original_image] or [prompt, original_image, annotated_image]
-                    response = client.models.generate_content(
-                        model=GEMINI_MODEL,
-                        contents=contents,
-                        config=types.GenerateContentConfig(
-                            response_modalities=["IMAGE"],
-                            safety_settings=[
-                                types.SafetySetting(
-                                    category="HARM_CATEGORY_HATE_SPEECH",
-                                    threshold="BLOCK_MEDIUM_AND_ABOVE"
-                                ),
-                                types.SafetySetting(
-                                    category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                                    threshold="BLOCK_MEDIUM_AND_ABOVE"
-                                ),
-                                types.SafetySetting(
-                                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                                    threshold="BLOCK_MEDIUM_AND_ABOVE"
-                                ),
-                                types.SafetySetting(
-                                    category="HARM_CATEGORY_HARASSMENT",
-                                    threshold="BLOCK_MEDIUM_AND_ABOVE"
-                                ),
-                            ],
-                        )
-                    )
-                    
-                    # Extract image from response parts
-                    if response.candidates:
-                        for candidate in response.candidates:
-                            if candidate.content and candidate.content.parts:
-                                for part in candidate.content.parts:
-                                    if part.inline_data and part.inline_data.data:
-                                        return part.inline_data.data
-
-                    # Log the actual response structure for debugging if we fail
-                    logger.error("image_generation_response_invalid", 
-                                 response_candidates=len(response.candidates) if response.candidates else 0,
-                                 detail="No inline_data found in candidates")
-
-                    raise ImageGenerationError("No image data found in response")
-                    
-                except Exception as e:
-                    error_type = type(e).__name__
-                    error_message = str(e)
-                    logger.error("image_generation_failed", 
-                                error=error_message,
-                                error_type=error_type,
-                                attempt=attempt+1,
-                                max_retries=max_retries)
-                    
-                    if attempt == max_retries - 1:
-                        logger.error("image_generation_failed_final", 
-                                    error=error_message, 
-                                    error_type=error_type,
-                                    task_attempt=attempt+1)
-                        raise
-                    
-                    wait_time = 2 ** attempt
-                    logger.warning("image_generation_failed_retrying", 
-                                   attempt=attempt+1, 
-                                   wait_time=wait_time, 
-                                   error=error_message,
-                                   error_type=error_type)
-                    await asyncio.sleep(wait_time)
-        finally:
-            # Close annotated image if it was opened
-            if annotated_image:
-                annotated_image.close()
-                    
+            with Image.open(BytesIO(annotated_image_data)) as annotated_image:
+                annotated_image.verify()
+                annotated_mime_type = Image.MIME.get(annotated_image.format or "", "image/png")
+            contents.append(types.Part.from_bytes(data=bytes(annotated_image_data), mime_type=annotated_mime_type))
+            logger.info("annotated_image_included_in_generation")
+        except Exception as e:
+            logger.warning("failed_to_open_annotated_image", error=str(e))
+
+    deadline = time.monotonic() + GENERATION_DEADLINE_SECONDS
+    _record_generation_request()
+    for attempt in range(1, max_retries + 1):
+        # 他のリクエストが429を受けた直後は、クールダウンが明けるまで送信しない
+        await _wait_for_model_cooldown()
+        try:
+            # client.aio（非同期API）で呼び出し、待機中にイベントループをブロックしない
+            # contents=[prompt, original_image] or [prompt, original_image, annotated_image]
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=contents,
+                config=types.GenerateContentConfig(
+                    response_modalities=["IMAGE"],
+                    safety_settings=[
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_HATE_SPEECH",
+                            threshold="BLOCK_MEDIUM_AND_ABOVE"
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_DANGEROUS_CONTENT",
+                            threshold="BLOCK_MEDIUM_AND_ABOVE"
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                            threshold="BLOCK_MEDIUM_AND_ABOVE"
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_HARASSMENT",
+                            threshold="BLOCK_MEDIUM_AND_ABOVE"
+                        ),
+                    ],
+                )
+            )
+
+            # Extract image from response parts
+            if response.candidates:
+                for candidate in response.candidates:
+                    if candidate.content and candidate.content.parts:
+                        for part in candidate.content.parts:
+                            if part.inline_data and part.inline_data.data:
+                                return part.inline_data.data
+
+            # Log the actual response structure for debugging if we fail
+            logger.error("image_generation_response_invalid", 
+                         response_candidates=len(response.candidates) if response.candidates else 0,
+                         detail="No inline_data found in candidates")
+
+            raise ImageGenerationError("No image data found in response")
+
+        except Exception as e:
+            error_type = type(e).__name__
+            error_message = str(e)
+            logger.error("image_generation_failed", 
+                        error=error_message,
+                        error_type=error_type,
+                        attempt=attempt,
+                        max_retries=max_retries)
+
+            throttled = _is_resource_exhausted(e)
+            if throttled:
+                _report_model_throttled()
+
+            # 4xx等の再試行しても結果が変わらないエラー・上限・期限・予算切れでは再試行しない
+            wait_time = _backoff_delay(attempt)
+            resume_at = max(time.monotonic() + wait_time, _model_throttled_until)
+            give_up_reason = None
+            if not _is_retryable(e):
+                give_up_reason = "fatal"
+            elif attempt >= max_retries:
+                give_up_reason = "max_attempts"
+            elif resume_at >= deadline:
+                give_up_reason = "deadline"
+            elif not _try_spend_retry():
+                give_up_reason = "budget_exhausted"
+
+            if give_up_reason is not None:
+                logger.error("image_generation_failed_final", 
+                            error=error_message, 
+                            error_type=error_type,
+                            task_attempt=attempt,
+                            reason=give_up_reason)
+                if throttled:
+                    raise ModelThrottledError(error_message) from e
+                raise
+
+            logger.warning("image_generation_failed_retrying", 
+                           attempt=attempt, 
+                           wait_time=round(wait_time, 3), 
+                           error=error_message,
+                           error_type=error_type)
+            await asyncio.sleep(wait_time)
+
     # Should not reach here
     raise ImageGenerationError("Retry loop exhausted without result")
 
@@ -362,6 +708,9 @@ def generate_example_image(request):
         annotated_image_url = request_json.get("annotated_image_url")  # Optional
         analysis = request_json.get("analysis")
         motif_tags = request_json.get("motif_tags", [])
+        inline_image_base64 = request_json.get("original_image_base64")  # Optional
+        inline_image_mime_type = request_json.get("original_image_mime_type")  # Optional
+        inline_annotated_base64 = request_json.get("annotated_image_base64")  # Optional
 
         if not all([task_id, user_id, original_image_url, analysis]):
             return {"error": "Missing required fields"}, 400
@@ -373,7 +722,7 @@ def generate_example_image(request):
         prompt = create_generation_prompt(analysis, motif_tags, has_annotated_image)
         
         # Initialize storage client for saving generated image
-        storage_client = storage.Client()
+        storage_client = get_storage_client()
 
         # We will use a helper async function to handle the flow
         async def process():
@@ -381,56 +730,48 @@ def generate_example_image(request):
             _validate_image_url(original_image_url)
             
             # 1. Fetch Image with timeout and size limits
-            import aiohttp
-            # タイムアウト設定: 60秒
-            timeout = aiohttp.ClientTimeout(total=60)
+            # タイムアウト（60秒）は共有セッションに設定済み
             # サイズ制限: 10MB
             max_size = 10 * 1024 * 1024  # 10MB
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # Fetch original image
-                async with session.get(original_image_url) as resp:
-                    if resp.status != 200:
-                        raise ImageGenerationError(f"Failed to fetch original image: {resp.status}")
-                    
-                    # サイズ制限チェック
-                    content_length = resp.headers.get('Content-Length')
-                    if content_length and int(content_length) > max_size:
-                        raise ImageGenerationError(f"Image size exceeds limit: {content_length} bytes")
-                    
-                    # チャンクごとに読み込んでサイズをチェック
-                    original_image_data = b''
-                    async for chunk in resp.content.iter_chunked(8192):
-                        original_image_data += chunk
-                        if len(original_image_data) > max_size:
-                            raise ImageGenerationError(f"Image size exceeds limit: {len(original_image_data)} bytes")
-                
-                # Fetch annotated image if provided
-                annotated_image_data: bytes | None = None
-                if annotated_image_url:
-                    try:
-                        _validate_image_url(annotated_image_url)
-                        async with session.get(annotated_image_url) as annot_resp:
-                            if annot_resp.status == 200:
-                                annotated_image_data = b''
-                                async for chunk in annot_resp.content.iter_chunked(8192):
-                                    annotated_image_data += chunk
-                                    if len(annotated_image_data) > max_size:
-                                        logger.warning("annotated_image_too_large", task_id=task_id)
-                                        annotated_image_data = None
-                                        break
-                                if annotated_image_data:
-                                    logger.info("annotated_image_fetched", task_id=task_id, size=len(annotated_image_data))
-                            else:
-                                logger.warning("failed_to_fetch_annotated_image", task_id=task_id, status=annot_resp.status)
-                    except Exception as e:
-                        logger.warning("annotated_image_fetch_error", task_id=task_id, error=str(e))
-
-            # 2. Determine MIME type from URL
-            mime_type = _get_mime_type_from_url(original_image_url)
+            # process_reviewから取得・正規化済みの画像が渡された場合は再ダウンロードしない
+            original_image_data: bytes | memoryview | None = None
+            if inline_image_base64:
+                original_image_data = base64.b64decode(inline_image_base64)
+            annotated_image_data: bytes | memoryview | None = None
+            if annotated_image_url and inline_annotated_base64:
+                annotated_image_data = base64.b64decode(inline_annotated_base64)
+            fetch_original = original_image_data is None
+            fetch_annotated = bool(annotated_image_url) and annotated_image_data is None
+
+            if fetch_original or fetch_annotated:
+                with stage_span("image_fetch", task_id):
+                    session = get_http_session()
+                    # Fetch original image
+                    if fetch_original:
+                        original_image_data = await _fetch_image(session, original_image_url, max_size)
+
+                    # Fetch annotated image if provided
+                    if fetch_annotated:
+                        try:
+                            _validate_image_url(annotated_image_url)
+                            annotated_image_data = await _fetch_image(session, annotated_image_url, max_size)
+                            logger.info("annotated_image_fetched", task_id=task_id, size=len(annotated_image_data))
+                        except ImageFetchError as e:
+                            logger.warning("failed_to_fetch_annotated_image", task_id=task_id, error=str(e))
+                        except Exception as e:
+                            logger.warning("annotated_image_fetch_error", task_id=task_id, error=str(e))
+
+            # 2. Determine MIME type (inline image carries its own)
+            mime_type = inline_image_mime_type or _get_mime_type_from_url(original_image_url)
+            if fetch_original:
+                original_image_data, mime_type = await _prepare_fetched_image(
+                    task_id, original_image_data, mime_type
+                )
 
             # 3. Generate (with annotated image if available)
-            generated_bytes = await generate_image(prompt, original_image_data, annotated_image_data, mime_type)
+            with stage_span("gemini_generate", task_id):
+                generated_bytes = await generate_image(prompt, original_image_data, annotated_image_data, mime_type)
             
             # 生成された画像のサイズを取得してログに記録
             try:
@@ -449,25 +790,26 @@ def generate_example_image(request):
                              error=str(e))
 
             # 4. Save to GCS
-            bucket = storage_client.bucket(OUTPUT_BUCKET_NAME)
-            blob_path = f"generated/{task_id}.png"
-            blob = bucket.blob(blob_path)
+            with stage_span("gcs_upload", task_id):
+                bucket = storage_client.bucket(OUTPUT_BUCKET_NAME)
+                blob_path = f"generated/{task_id}.png"
+                blob = bucket.blob(blob_path)
             
-            # Run upload in executor because it's blocking
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: blob.upload_from_string(generated_bytes, content_type="image/png")
-            )
+                # Run upload in executor because it's blocking
+                await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: blob.upload_from_string(generated_bytes, content_type="image/png")
+                )
             
-            # Set metadata
-            metadata = {
-                "user_id": user_id,
-                "task_id": task_id,
-                "ai_generated": "true",
-                "model": GEMINI_MODEL
-            }
-            blob.metadata = metadata
-            await asyncio.get_event_loop().run_in_executor(None, blob.patch)
+                # Set metadata
+                metadata = {
+                    "user_id": user_id,
+                    "task_id": task_id,
+                    "ai_generated": "true",
+                    "model": GEMINI_MODEL
+                }
+                blob.metadata = metadata
+                await asyncio.get_event_loop().run_in_executor(None, blob.patch)
             
             logger.info("image_saved_to_gcs",
                         task_id=task_id,
@@ -478,35 +820,25 @@ def generate_example_image(request):
             example_image_url = f"https://storage.googleapis.com/{OUTPUT_BUCKET_NAME}/{blob_path}"
             
             if COMPLETE_TASK_FUNCTION_URL:
-                import aiohttp
-                import google.auth.transport.requests
-                import google.oauth2.id_token
-                
-                # IDトークンを取得してサービス間認証を行う
-                try:
-                    auth_req = google.auth.transport.requests.Request()
-                    target_audience = COMPLETE_TASK_FUNCTION_URL
-                    
-                    # 同期処理なのでExecutorで実行
-                    id_token = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: google.oauth2.id_token.fetch_id_token(auth_req, target_audience)
-                    )
+                with stage_span("complete_callback", task_id):
+                    # IDトークンを取得してサービス間認証を行う
+                    try:
+                        id_token = await get_id_token(COMPLETE_TASK_FUNCTION_URL)
                     
-                    headers = {
-                        "Authorization": f"Bearer {id_token}",
-                        "Content-Type": "application/json"
-                    }
-                except Exception as e:
-                    logger.error("failed_to_get_id_token",
-                                error=str(e),
-                                task_id=task_id,
-                                complete_task_url=COMPLETE_TASK_FUNCTION_URL)
-                    # 認証トークンの取得に失敗した場合でも続行（後方互換性のため）
-                    # ただし、エラーを記録して警告
-                    headers = {"Content-Type": "application/json"}
+                        headers = {
+                            "Authorization": f"Bearer {id_token}",
+                            "Content-Type": "application/json"
+                        }
+                    except Exception as e:
+                        logger.error("failed_to_get_id_token",
+                                    error=str(e),
+                                    task_id=task_id,
+                                    complete_task_url=COMPLETE_TASK_FUNCTION_URL)
+                        # 認証トークンの取得に失敗した場合でも続行（後方互換性のため）
+                        # ただし、エラーを記録して警告
+                        headers = {"Content-Type": "application/json"}
                 
-                async with aiohttp.ClientSession() as session:
+                    session = get_http_session()
                     payload = {
                         "task_id": task_id,
                         "example_image_url": example_image_url,
@@ -536,14 +868,20 @@ def generate_example_image(request):
             return blob_path
 
         # Execute
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        blob_path = loop.run_until_complete(process())
-        loop.close()
+        with stage_span("generate_example_image", task_id):
+            blob_path = run_async(process())
 
         logger.info("function_completed", task_id=task_id, path=blob_path)
         return {"status": "success", "path": blob_path}, 200
 
+    except ModelThrottledError as e:
+        # クォータ超過はタスクを失敗にせず、呼び出し元に時間をおいた再試行を促す
+        logger.warning("function_throttled", error=str(e))
+        return (
+            {"error": str(e), "error_type": "ModelThrottledError"},
+            429,
+            {"Retry-After": str(int(GEMINI_THROTTLE_COOLDOWN_SECONDS))},
+        )
     except InvalidImageURLError as e:
         # URL検証エラーは400 Bad Requestとして返す
         error_message = str(e)
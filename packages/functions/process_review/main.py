@@ -3,9 +3,18 @@
 Cloud Tasksから呼び出され、審査処理を実行するCloud Function。
 """
 
+import base64
 import json
 import os
-from typing import TypedDict
+import random
+import threading
+import time
+from collections.abc import Coroutine, Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, NotRequired, TypedDict, TypeVar
+from urllib.parse import urlparse
 
 import aiohttp
 import asyncio
@@ -15,6 +24,7 @@ from flask import Request, Response
 from google.cloud import firestore
 from google.auth import default as google_auth_default
 from google.auth.transport.requests import Request as AuthRequest
+from PIL import ExifTags, Image, ImageOps, ImageStat
 
 # 環境変数
 PROJECT_ID = os.environ.get("GCP_PROJECT_ID", "")
@@ -24,6 +34,40 @@ AGENT_ENGINE_LOCATION = os.environ.get("AGENT_ENGINE_LOCATION", "us-central1")
 ANNOTATION_FUNCTION_URL = os.environ.get("ANNOTATION_FUNCTION_URL", "")
 IMAGE_GENERATION_FUNCTION_URL = os.environ.get("IMAGE_GENERATION_FUNCTION_URL", "")
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-3-flash-preview")
+# パイプラインモード: アノテーション完了と期限の早い方でお手本画像生成を開始する
+REVIEW_PIPELINE_ENABLED = os.environ.get("REVIEW_PIPELINE_ENABLED", "false").lower() == "true"
+# パイプラインモードでアノテーション結果を待つ最大秒数（超過時は元画像のみで生成）
+ANNOTATION_DEADLINE_SECONDS = float(os.environ.get("ANNOTATION_DEADLINE_SECONDS", "60"))
+# 共有HTTPセッションのコネクションプール設定
+HTTP_POOL_LIMIT = int(os.environ.get("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", "20"))
+# Cloud Function呼び出しのリトライ設定（フルジッター付き指数バックオフ）
+CLOUD_FUNCTION_MAX_ATTEMPTS = int(os.environ.get("CLOUD_FUNCTION_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_SECONDS = float(os.environ.get("RETRY_BASE_DELAY_SECONDS", "2"))
+RETRY_MAX_DELAY_SECONDS = float(os.environ.get("RETRY_MAX_DELAY_SECONDS", "30"))
+# インスタンス内で共有する再試行予算（最初の試行1回あたりに貯まる再試行の数と、その上限）
+RETRY_BUDGET_RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX_TOKENS = float(os.environ.get("RETRY_BUDGET_MAX_TOKENS", "10"))
+# 1回のCloud Function呼び出し（再試行を含む）の期限。関数のタイムアウト600秒に収める
+CLOUD_FUNCTION_CALL_DEADLINE_SECONDS = float(
+    os.environ.get("CLOUD_FUNCTION_CALL_DEADLINE_SECONDS", "270")
+)
+# ユーザードキュメントに保持する高スコアの最大件数（直近N件）
+RANK_HIGH_SCORE_WINDOW = int(os.environ.get("RANK_HIGH_SCORE_WINDOW", "20"))
+# 元画像を1度だけ取得・正規化し、アノテーション・お手本画像生成へインラインで渡す
+REVIEW_IMAGE_INLINE_ENABLED = os.environ.get("REVIEW_IMAGE_INLINE_ENABLED", "true").lower() == "true"
+REVIEW_IMAGE_MAX_BYTES = int(os.environ.get("REVIEW_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+REVIEW_IMAGE_MAX_DIMENSION = int(os.environ.get("REVIEW_IMAGE_MAX_DIMENSION", "4096"))
+# ステージ別の画像前処理（縮小・メタデータ除去・グレースケール化・再エンコード）
+STAGE_IMAGE_PREPROCESS_ENABLED = os.environ.get("STAGE_IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+STAGE_IMAGE_JPEG_QUALITY = int(os.environ.get("STAGE_IMAGE_JPEG_QUALITY", "85"))
+# アノテーションは指摘位置の座標精度を保つため大きめの上限にする
+ANNOTATION_IMAGE_MAX_DIMENSION = int(os.environ.get("ANNOTATION_IMAGE_MAX_DIMENSION", "2048"))
+ANNOTATION_IMAGE_GRAYSCALE = os.environ.get("ANNOTATION_IMAGE_GRAYSCALE", "auto")
+EXAMPLE_IMAGE_MAX_DIMENSION = int(os.environ.get("EXAMPLE_IMAGE_MAX_DIMENSION", "1536"))
+EXAMPLE_IMAGE_GRAYSCALE = os.environ.get("EXAMPLE_IMAGE_GRAYSCALE", "auto")
+# グレースケール判定: 縮小画像のHSV彩度の平均がこの値以下ならモノクロとみなす（0〜255）
+MONOCHROME_SATURATION_THRESHOLD = 24.0
 
 # ログ設定
 structlog.configure(
@@ -40,11 +84,77 @@ structlog.configure(
 logger = structlog.get_logger()
 
 
+def log_stage(
+    stage: str,
+    task_id: str,
+    duration_seconds: float,
+    outcome: str = "ok",
+    **attributes: object,
+) -> None:
+    """ステージの所要時間を構造化ログに出力
+
+    エージェントAPIと同じ stage_completed イベントで出力し、
+    ログベースの分布指標で task_id 単位・ステージ別に集計できるようにする。
+    """
+    logger.info(
+        "stage_completed",
+        service="process_review",
+        task_id=task_id,
+        stage=stage,
+        outcome=outcome,
+        duration_seconds=round(max(duration_seconds, 0.0), 4),
+        **attributes,
+    )
+
+
+@contextmanager
+def stage_span(stage: str, task_id: str, **attributes: object) -> Iterator[None]:
+    """ブロックの所要時間をステージとして記録（例外時はoutcome=error）"""
+    started_at = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        log_stage(stage, task_id, time.perf_counter() - started_at, outcome, **attributes)
+
+
+T = TypeVar("T")
+
+# インスタンス内で共有するイベントループ（専用スレッドで常駐）
+# リクエストごとにループを作り直さず、HTTP接続・非同期クライアントをリクエスト間で再利用する
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """共有イベントループを取得（初回のみ作成してバックグラウンドスレッドで起動）"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="function-event-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """コルーチンを共有イベントループで実行して結果を待つ
+
+    同時リクエスト（--concurrency > 1）は各ワーカースレッドから同じループに投入され、並行して処理される。
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
 class TaskPayload(TypedDict):
     """Cloud Tasksからのペイロード型定義"""
     task_id: str
     user_id: str
     image_url: str
+    # 審査作成時のランクスナップショット（あればランクの再読み込みを省略）
+    rank_at_review: NotRequired[str]
 
 
 class TaskStatus:
@@ -55,8 +165,9 @@ class TaskStatus:
     FAILED = "failed"
 
 
+@lru_cache(maxsize=1)
 def get_firestore_client() -> firestore.Client:
-    """Firestoreクライアントを取得"""
+    """Firestoreクライアントを取得（インスタンス内で共有）"""
     return firestore.Client(project=PROJECT_ID)
 
 
@@ -152,17 +263,99 @@ def get_user_rank(user_id: str) -> str:
     return "10級"
 
 
-async def get_id_token(target_url: str) -> str:
-    """認証済みCloud Function呼び出し用のIDトークンを取得"""
-    credentials, _ = google_auth_default()
-    auth_request = AuthRequest()
-    
-    # IDトークンを取得
-    from google.auth import compute_engine
+# IDトークンキャッシュ（audience -> (トークン, 有効期限UNIX秒)）
+# インスタンスが再利用される間は同じトークンを使い回し、メタデータサーバー呼び出しを削減する
+# - 期限が近づいたトークンは返却しつつバックグラウンドで更新する
+# - 同一audienceへの同時取得は1回のメタデータサーバー呼び出しにまとめる
+_id_token_cache: dict[str, tuple[str, float]] = {}
+# 取得中のタスク（audience -> タスク。共有イベントループ上で実行される）
+_id_token_inflight: dict[str, "asyncio.Task[str]"] = {}
+# 期限の何秒前からバックグラウンドで再取得するか
+ID_TOKEN_REFRESH_MARGIN_SECONDS = float(os.environ.get("ID_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# これより期限が近いトークンは使用せず、取得完了を待つ
+ID_TOKEN_MIN_REMAINING_SECONDS = 30.0
+
+
+def _fetch_id_token_with_expiry(target_url: str) -> tuple[str, float]:
+    """IDトークンを取得し、expクレームから有効期限を読み取る（同期）"""
+    from google.auth import jwt
     from google.oauth2 import id_token
-    
-    id_token_value = id_token.fetch_id_token(auth_request, target_url)
-    return id_token_value
+
+    token = id_token.fetch_id_token(AuthRequest(), target_url)
+    try:
+        expires_at = float(jwt.decode(token, verify=False)["exp"])
+    except (KeyError, TypeError, ValueError):
+        # expを読み取れない場合はGoogleのIDトークンの有効期間（1時間）とみなす
+        expires_at = time.time() + 3600
+    return token, expires_at
+
+
+async def _refresh_id_token(target_url: str) -> str:
+    """Executorでトークンを取得してキャッシュに格納"""
+    try:
+        # メタデータサーバーへの同期呼び出しはExecutorで実行してイベントループをブロックしない
+        token, expires_at = await asyncio.get_running_loop().run_in_executor(
+            None, _fetch_id_token_with_expiry, target_url
+        )
+        _id_token_cache[target_url] = (token, expires_at)
+        logger.info("id_token_fetched", audience=target_url)
+        return token
+    except Exception as e:
+        logger.error("id_token_fetch_failed", audience=target_url, error=str(e))
+        raise
+    finally:
+        _id_token_inflight.pop(target_url, None)
+
+
+def _start_id_token_refresh(target_url: str) -> "asyncio.Task[str]":
+    """取得処理を開始（進行中の取得があればそれを共有）"""
+    task = _id_token_inflight.get(target_url)
+    if task is None or task.done():
+        task = asyncio.create_task(_refresh_id_token(target_url))
+        _id_token_inflight[target_url] = task
+    return task
+
+
+def _consume_id_token_exception(task: "asyncio.Task[str]") -> None:
+    """バックグラウンド更新の例外を回収（ログは取得処理側で出力済み）"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def get_id_token(target_url: str) -> str:
+    """認証済みCloud Function呼び出し用のIDトークンを取得（キャッシュ付き）"""
+    cached = _id_token_cache.get(target_url)
+    if cached is not None:
+        remaining = cached[1] - time.time()
+        if remaining > ID_TOKEN_REFRESH_MARGIN_SECONDS:
+            return cached[0]
+        if remaining > ID_TOKEN_MIN_REMAINING_SECONDS:
+            # 期限が近いので、現在のトークンを返しつつバックグラウンドで更新
+            _start_id_token_refresh(target_url).add_done_callback(_consume_id_token_exception)
+            return cached[0]
+
+    # 呼び出し元がキャンセルされても共有中の取得処理は継続させる
+    return await asyncio.shield(_start_id_token_refresh(target_url))
+
+
+@lru_cache(maxsize=1)
+def get_agent_engine_app() -> Any:
+    """Agent Engineアプリケーションを取得（インスタンス内で共有）
+
+    Vertex AIクライアントの初期化とリソース取得（API呼び出し）はウォームスタート時に省略する。
+    """
+    # Vertex AI SDKを使用してAgent Engineを呼び出す
+    import vertexai
+
+    # Clientパターンで初期化
+    client = vertexai.Client(
+        project=PROJECT_ID,
+        location=AGENT_ENGINE_LOCATION,
+    )
+
+    # Agent Engineアプリケーションを取得
+    resource_name = f"projects/{PROJECT_ID}/locations/{AGENT_ENGINE_LOCATION}/reasoningEngines/{AGENT_ENGINE_ID}"
+    return client.agent_engines.get(name=resource_name)
 
 
 async def call_agent_engine(
@@ -181,18 +374,7 @@ async def call_agent_engine(
     )
     
     try:
-        # Vertex AI SDKを使用してAgent Engineを呼び出す
-        import vertexai
-        
-        # Clientパターンで初期化
-        client = vertexai.Client(
-            project=PROJECT_ID,
-            location=AGENT_ENGINE_LOCATION,
-        )
-        
-        # Agent Engineアプリケーションを取得
-        resource_name = f"projects/{PROJECT_ID}/locations/{AGENT_ENGINE_LOCATION}/reasoningEngines/{AGENT_ENGINE_ID}"
-        adk_app = client.agent_engines.get(name=resource_name)
+        adk_app = get_agent_engine_app()
         
         # メッセージ構築（user_idとsession_idを含める）
         message = (
@@ -209,11 +391,15 @@ async def call_agent_engine(
             user_id=user_id,
             message=message,
         ):
-            if isinstance(event, dict):
-                # レスポンス解析
-                parsed = _parse_agent_response(event)
-                if parsed:
-                    final_response = parsed
+            # 分析結果を得た後のイベント（要約文など）は解析しない
+            if not isinstance(event, dict) or (
+                final_response is not None and _is_final_analysis(final_response)
+            ):
+                continue
+            # レスポンス解析
+            parsed = _parse_agent_response(event)
+            if parsed:
+                final_response = parsed
         
         if final_response is None:
             logger.error("agent_engine_no_response")
@@ -236,116 +422,596 @@ async def call_agent_engine(
 
 
 def _parse_agent_response(event: dict[str, object]) -> dict[str, object] | None:
-    """Agent Engineからのレスポンスをパース"""
-    import re
-    
+    """Agent Engineからのレスポンスをパース
+
+    最終結果になり得るイベント（モデルのテキスト・ツールのfunction_response）のみを対象とし、
+    ストリーミング途中の部分テキスト（partial）やツール呼び出しは解析しない。
+    """
+    if event.get("partial"):
+        return None
+
     # content形式
-    if "content" in event and event["content"]:
-        content = event["content"]
+    content = event.get("content")
+    if content:
         if isinstance(content, dict):
-            if "parts" in content and isinstance(content["parts"], list):
-                parts = content["parts"]
-                if len(parts) > 0:
-                    first_part = parts[0]
-                    if isinstance(first_part, dict) and "text" in first_part:
-                        text = first_part["text"]
-                        if isinstance(text, str):
-                            return _extract_json_from_text(text)
+            parts = content.get("parts")
+            if isinstance(parts, list):
+                return _parse_parts(parts, is_model=content.get("role", "model") == "model")
         elif isinstance(content, str):
             return _extract_json_from_text(content)
-    
+
     # parts形式（イベント直下）
-    if "parts" in event:
-        parts = event["parts"]
-        if isinstance(parts, list) and len(parts) > 0:
-            first_part = parts[0]
-            if isinstance(first_part, dict) and "text" in first_part:
-                text = first_part["text"]
-                if isinstance(text, str):
-                    return _extract_json_from_text(text)
-    
+    parts = event.get("parts")
+    if isinstance(parts, list):
+        return _parse_parts(parts, is_model=True)
+
     return None
 
 
+def _parse_parts(parts: list[object], is_model: bool) -> dict[str, object] | None:
+    """partsからfunction_responseの結果、またはモデルのテキスト中のJSONを取り出す"""
+    for part in parts:
+        if not isinstance(part, dict):
+            continue
+        func_resp = part.get("function_response")
+        if isinstance(func_resp, dict):
+            response = func_resp.get("response")
+            if isinstance(response, dict):
+                return response
+        text = part.get("text")
+        if is_model and isinstance(text, str):
+            extracted = _extract_json_from_text(text)
+            if extracted is not None:
+                return extracted
+    return None
+
+
+# デコーダは状態を持たないため使い回す
+_JSON_DECODER = json.JSONDecoder()
+
+
 def _extract_json_from_text(text: str) -> dict[str, object] | None:
-    """テキストからJSONを抽出"""
-    import re
-    
-    # markdown code blockを除去
-    patterns = [
-        r"```json\s*\n([\s\S]*?)\n```",
-        r"```\s*\n([\s\S]*?)\n```",
-        r"```json\s*([\s\S]*?)```",
-        r"```([\s\S]*?)```",
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            text = match.group(1).strip()
-            break
-    
-    try:
-        result = json.loads(text)
-        if isinstance(result, dict):
-            return result
-    except json.JSONDecodeError:
-        pass
-    
+    """テキストからJSONを抽出
+
+    "{" の位置から括弧の対応が取れるところまでを1回の走査でデコードする
+    （markdown code blockや前後の文章は読み飛ばす）。
+    """
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            # 不完全・不正なJSONは次の候補から再試行
+            start = text.find("{", start + 1)
+            continue
+        return value  # "{" から始まるJSONは必ずdict
     return None
 
 
-async def call_cloud_function(url: str, payload: dict[str, object]) -> dict[str, object] | None:
-    """認証済みCloud Functionを呼び出す"""
+def _is_final_analysis(response: dict[str, object]) -> bool:
+    """分析結果（DessinAnalysis相当）を含むレスポンスか"""
+    if "overall_score" in response:
+        return True
+    analysis = response.get("analysis")
+    return isinstance(analysis, dict) and "overall_score" in analysis
+
+
+# Cloud Function呼び出し用の共有HTTPセッション（イベントループごとに1つ）
+# 共有イベントループ上で実行するため、ウォームスタート時はリクエスト間で接続を再利用する
+_http_session: aiohttp.ClientSession | None = None
+_http_session_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """コネクションプール付きの共有HTTPセッションを取得
+
+    同じイベントループ内の呼び出し（リトライを含む）でTCP/TLS接続を再利用する。
+    """
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=300, connect=10),
+        )
+        _http_session_loop = loop
+    return _http_session
+
+
+class InvalidImageURLError(Exception):
+    """URL検証エラー"""
+
+
+class ImageFetchError(Exception):
+    """画像取得エラー（HTTPエラー・サイズ超過）"""
+
+
+def _validate_image_url(url: str) -> None:
+    """URLを検証して、SSRFなどのセキュリティリスクを防ぐ"""
     try:
-        id_token = await get_id_token(url)
-        headers = {
-            "Authorization": f"Bearer {id_token}",
-            "Content-Type": "application/json",
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=headers, timeout=300) as response:
+        parsed = urlparse(url)
+        if parsed.scheme != "https":
+            raise InvalidImageURLError(f"Only HTTPS URLs are allowed, got: {parsed.scheme}")
+
+        hostname = parsed.hostname
+        if not hostname:
+            raise InvalidImageURLError("Missing hostname in URL")
+
+        blocked_hosts = [
+            "metadata.google.internal",
+            "metadata",
+            "169.254.169.254",
+            "localhost",
+            "127.0.0.1",
+            "0.0.0.0",
+        ]
+
+        hostname_lower = hostname.lower()
+        for blocked in blocked_hosts:
+            if blocked in hostname_lower:
+                raise InvalidImageURLError(f"Blocked hostname: {hostname}")
+
+        if hostname.startswith("10.") or hostname.startswith("172.16.") or hostname.startswith("192.168."):
+            raise InvalidImageURLError(f"Private IP range not allowed: {hostname}")
+    except Exception as e:
+        if isinstance(e, InvalidImageURLError):
+            raise
+        raise InvalidImageURLError(f"Invalid URL format: {str(e)}")
+
+
+def _normalize_image(data: bytes | memoryview, max_dimension: int) -> tuple[bytes | memoryview, str]:
+    """画像を検証・正規化（EXIF回転の反映・長辺の縮小）
+
+    回転・縮小が不要な場合は元のバイト列をそのまま返す（再エンコードによる劣化を避ける）。
+
+    Returns:
+        (画像データ, MIMEタイプ)
+    """
+    with Image.open(BytesIO(data)) as opened:
+        is_png = opened.format == "PNG"
+        rotated = opened.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        image = ImageOps.exif_transpose(opened) if rotated else opened
+        resized = max(image.size) > max_dimension
+        if resized:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        if not rotated and not resized:
+            # 破損した画像をここで検出する
+            image.load()
+            return data, "image/png" if is_png else "image/jpeg"
+
+        buffer = BytesIO()
+        if is_png:
+            image.save(buffer, format="PNG", optimize=True)
+            return buffer.getvalue(), "image/png"
+        image.convert("RGB").save(buffer, format="JPEG", quality=90)
+        return buffer.getvalue(), "image/jpeg"
+
+
+def _is_monochrome(image: Image.Image) -> bool:
+    """彩度がほぼない（鉛筆・木炭などの）画像か判定"""
+    if image.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    sample = image.convert("RGB")
+    sample.thumbnail((64, 64))
+    saturation = ImageStat.Stat(sample.convert("HSV").getchannel("S")).mean[0]
+    return saturation <= MONOCHROME_SATURATION_THRESHOLD
+
+
+def _preprocess_image(data: bytes | memoryview, max_dimension: int, grayscale: str) -> bytes:
+    """モデル入力用に画像を縮小・メタデータ除去・再エンコード（出力はメタデータなしのJPEG）
+
+    grayscale: auto（彩度がほぼない画像のみ）/ always / never
+    """
+    with Image.open(BytesIO(data)) as opened:
+        opened.draft("RGB", (max_dimension, max_dimension))
+        image = opened.convert("RGBA") if opened.mode in ("P", "PA") else opened
+        if image.mode in ("RGBA", "LA"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        to_grayscale = grayscale == "always" or (grayscale == "auto" and _is_monochrome(image))
+        image = image.convert("L" if to_grayscale else "RGB")
+
+        buffer = BytesIO()
+        # exif等を渡さずに保存することでメタデータを除去する
+        image.save(buffer, format="JPEG", quality=STAGE_IMAGE_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+async def _inline_stage_image(
+    task_id: str,
+    stage: str,
+    data: bytes | memoryview,
+    mime_type: str,
+    max_dimension: int,
+    grayscale: str,
+) -> dict[str, object]:
+    """ステージ別に前処理した画像のインラインフィールド（失敗時は正規化済み画像を使う）"""
+    if STAGE_IMAGE_PREPROCESS_ENABLED:
+        try:
+            prepared = await asyncio.to_thread(_preprocess_image, data, max_dimension, grayscale)
+            logger.info(
+                "stage_image_prepared",
+                task_id=task_id,
+                stage=stage,
+                size=len(data),
+                prepared_size=len(prepared),
+            )
+            data, mime_type = prepared, "image/jpeg"
+        except Exception as e:
+            logger.warning("stage_image_preprocess_failed", task_id=task_id, stage=stage, error=str(e))
+    return {
+        "original_image_base64": base64.b64encode(data).decode("ascii"),
+        "original_image_mime_type": mime_type,
+    }
+
+
+async def _fetch_image(session: aiohttp.ClientSession, url: str, max_size: int) -> memoryview:
+    """画像を上限付きでストリーミング取得
+
+    チャンクごとに ``data += chunk`` で連結すると受信済みデータ全体のコピーが毎回発生する。
+    Content-Lengthがあればその大きさのbytearrayを事前確保して書き込み、
+    ない・一致しない場合（圧縮転送など）は末尾に追記する。結果はコピーせずmemoryviewで返す。
+    """
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            raise ImageFetchError(f"Failed to fetch image: {resp.status}")
+
+        declared = resp.content_length
+        if declared is not None and declared > max_size:
+            raise ImageFetchError(f"Image size exceeds limit: {declared} bytes")
+
+        buffer = bytearray(declared or 0)
+        size = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            end = size + len(chunk)
+            if end > max_size:
+                raise ImageFetchError(f"Image size exceeds limit: {end} bytes")
+            if end <= len(buffer):
+                buffer[size:end] = chunk
+            else:
+                del buffer[size:]
+                buffer += chunk
+            size = end
+
+    if size < len(buffer):
+        del buffer[size:]
+    return memoryview(buffer)
+
+
+async def fetch_review_image(
+    task_id: str, image_url: str
+) -> tuple[bytes | memoryview, str] | None:
+    """元画像を1度だけ取得・正規化（失敗時はNoneを返し、各Functionが従来どおりURLから取得する）
+
+    Returns:
+        (画像データ, MIMEタイプ)
+    """
+    try:
+        with stage_span("image_load", task_id):
+            _validate_image_url(image_url)
+            original = await _fetch_image(get_http_session(), image_url, REVIEW_IMAGE_MAX_BYTES)
+            # デコード・縮小はCPU処理のためスレッドで実行
+            data, mime_type = await asyncio.to_thread(
+                _normalize_image, original, REVIEW_IMAGE_MAX_DIMENSION
+            )
+    except Exception as e:
+        logger.warning("review_image_load_failed", task_id=task_id, error=str(e))
+        return None
+
+    logger.info(
+        "review_image_loaded",
+        task_id=task_id,
+        original_size=len(original),
+        size=len(data),
+        normalized=data is not original,
+    )
+    return data, mime_type
+
+
+_retry_tokens = RETRY_BUDGET_MAX_TOKENS
+
+
+def _is_retryable_status(status: int) -> bool:
+    return status in (408, 429) or status >= 500
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+
+def _backoff_delay(attempt: int, retry_after: float | None) -> float:
+    """attempt回目の失敗後に待つ秒数（フルジッター。Retry-Afterがあればそれ以上待つ）"""
+    ceiling = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+    delay = random.uniform(0.0, ceiling)
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+def _record_cloud_function_request() -> None:
+    global _retry_tokens
+    _retry_tokens = min(RETRY_BUDGET_MAX_TOKENS, _retry_tokens + RETRY_BUDGET_RATIO)
+
+
+def _try_spend_retry() -> bool:
+    global _retry_tokens
+    if _retry_tokens < 1.0:
+        return False
+    _retry_tokens -= 1.0
+    return True
+
+
+async def call_cloud_function(url: str, payload: dict[str, object]) -> dict[str, object] | None:
+    """認証済みCloud Functionを呼び出す（失敗時はNone）
+
+    429・408・5xx・タイムアウト・接続エラーはフルジッター付きのバックオフで再試行する。
+    その他の4xx、試行回数・期限・インスタンス内の再試行予算の上限に達した場合は再試行しない。
+    """
+    deadline = time.monotonic() + CLOUD_FUNCTION_CALL_DEADLINE_SECONDS
+    _record_cloud_function_request()
+    for attempt in range(1, CLOUD_FUNCTION_MAX_ATTEMPTS + 1):
+        retry_after: float | None = None
+        try:
+            id_token = await get_id_token(url)
+            headers = {
+                "Authorization": f"Bearer {id_token}",
+                "Content-Type": "application/json",
+            }
+
+            session = get_http_session()
+            # 試行のタイムアウトは期限までの残り時間に合わせる
+            timeout = aiohttp.ClientTimeout(
+                total=max(min(300.0, deadline - time.monotonic()), 0.001), connect=10
+            )
+            async with session.post(url, json=payload, headers=headers, timeout=timeout) as response:
                 if response.status == 200:
                     return await response.json()
-                else:
-                    text = await response.text()
-                    logger.error("cloud_function_error", status=response.status, response=text)
+                text = await response.text()
+                logger.error(
+                    "cloud_function_error", status=response.status, response=text, attempt=attempt
+                )
+                if not _is_retryable_status(response.status):
                     return None
-    except Exception as e:
-        logger.error("cloud_function_call_error", error=str(e))
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        except Exception as e:
+            logger.error("cloud_function_call_error", error=str(e), attempt=attempt)
+            if not isinstance(e, TimeoutError | aiohttp.ClientError):
+                return None
+
+        wait_seconds = _backoff_delay(attempt, retry_after)
+        give_up_reason = None
+        if attempt >= CLOUD_FUNCTION_MAX_ATTEMPTS:
+            give_up_reason = "max_attempts"
+        elif time.monotonic() + wait_seconds >= deadline:
+            give_up_reason = "deadline"
+        elif not _try_spend_retry():
+            give_up_reason = "budget_exhausted"
+        if give_up_reason is not None:
+            logger.error("cloud_function_retry_gave_up", attempt=attempt, reason=give_up_reason)
+            return None
+
+        logger.warning(
+            "cloud_function_retry_scheduled", attempt=attempt, wait_seconds=round(wait_seconds, 3)
+        )
+        await asyncio.sleep(wait_seconds)
+    return None
+
+
+async def _call_annotation(
+    task_id: str,
+    payload: dict[str, object],
+    stage_seconds: dict[str, float],
+    annotated_images: dict[str, str],
+) -> str | None:
+    """アノテーション画像生成Cloud Functionを呼び出し、URLを返す（失敗時はNone）
+
+    レスポンスに画像データ（base64）が含まれる場合は annotated_images[URL] に格納し、
+    お手本画像生成に再取得なしで渡す。
+    """
+    started_at = time.perf_counter()
+    logger.info("annotation_generation_started", task_id=task_id)
+    try:
+        annotation_result = await call_cloud_function(
+            ANNOTATION_FUNCTION_URL, {**payload, "include_image_data": True}
+        )
+    finally:
+        stage_seconds["annotation"] = time.perf_counter() - started_at
+    if annotation_result is None:
+        logger.error("annotation_generation_failed", task_id=task_id)
+        return None
+    url = annotation_result.get("annotated_image_url")
+    if not isinstance(url, str):
         return None
+    image_base64 = annotation_result.get("annotated_image_base64")
+    if isinstance(image_base64, str) and image_base64:
+        annotated_images[url] = image_base64
+    logger.info("annotation_generation_completed", task_id=task_id)
+    return url
 
 
-def update_user_rank(user_id: str, score: int, task_id: str) -> tuple[str, bool]:
-    """ユーザーランクを更新
+async def _call_example_generation(
+    task_id: str,
+    payload: dict[str, object],
+    annotated_image_url: str | None,
+    stage_seconds: dict[str, float],
+    annotated_images: dict[str, str],
+) -> bool:
+    """お手本画像生成Cloud Functionを呼び出す（成功時True）"""
+    started_at = time.perf_counter()
+    logger.info(
+        "example_image_generation_started",
+        task_id=task_id,
+        has_annotated_image=bool(annotated_image_url),
+    )
+    request_payload: dict[str, object] = {**payload, "annotated_image_url": annotated_image_url}
+    if annotated_image_url is not None and annotated_image_url in annotated_images:
+        request_payload["annotated_image_base64"] = annotated_images[annotated_image_url]
+    try:
+        generation_result = await call_cloud_function(
+            IMAGE_GENERATION_FUNCTION_URL, request_payload
+        )
+    finally:
+        stage_seconds["example_image"] = time.perf_counter() - started_at
+    if generation_result is None:
+        logger.error("example_image_generation_failed", task_id=task_id)
+        return False
+    logger.info("example_image_generation_request_sent", task_id=task_id)
+    return True
 
-    Args:
-        user_id: ユーザーID
-        score: 今回のスコア
-        task_id: タスクID
+
+def _log_image_stages(
+    task_id: str, mode: str, stage_seconds: dict[str, float], ok: bool
+) -> None:
+    """画像生成ステージの所要時間をステージ別に出力
+
+    totalはimage_stagesとして出力し、画像生成全体の成否をoutcomeに反映する。
+    """
+    for stage, seconds in stage_seconds.items():
+        if stage == "total":
+            log_stage("image_stages", task_id, seconds, "ok" if ok else "error", mode=mode)
+        else:
+            log_stage(stage, task_id, seconds, mode=mode)
+
+
+async def run_image_stages_sequential(
+    task_id: str,
+    annotation_payload: dict[str, object],
+    generation_payload: dict[str, object],
+) -> tuple[str | None, str | None]:
+    """アノテーション → お手本画像の順に逐次実行
+
+    アノテーション生成に失敗した場合はお手本画像生成を行わない。
 
     Returns:
-        (新しいランクラベル, ランクが変わったか)
+        (アノテーション画像URL, エラーメッセージ（成功時はNone）)
     """
-    db = get_firestore_client()
-    user_ref = db.collection("users").document(user_id)
-    user_doc = user_ref.get()
+    stage_seconds: dict[str, float] = {}
+    annotated_images: dict[str, str] = {}
+    started_at = time.perf_counter()
+    annotated_image_url: str | None = None
+    error_message: str | None = None
+
+    if ANNOTATION_FUNCTION_URL:
+        annotated_image_url = await _call_annotation(
+            task_id, annotation_payload, stage_seconds, annotated_images
+        )
+        if annotated_image_url is None:
+            error_message = "アノテーション画像の生成に失敗しました"
+
+    if error_message is None and IMAGE_GENERATION_FUNCTION_URL:
+        sent = await _call_example_generation(
+            task_id, generation_payload, annotated_image_url, stage_seconds, annotated_images
+        )
+        if not sent:
+            error_message = "お手本画像の生成に失敗しました"
+
+    stage_seconds["total"] = time.perf_counter() - started_at
+    _log_image_stages(task_id, "sequential", stage_seconds, error_message is None)
+    logger.info(
+        "review_image_stages_completed",
+        task_id=task_id,
+        mode="sequential",
+        stage_seconds={k: round(v, 3) for k, v in stage_seconds.items()},
+    )
+    return annotated_image_url, error_message
+
+
+async def run_image_stages_pipelined(
+    task_id: str,
+    annotation_payload: dict[str, object],
+    generation_payload: dict[str, object],
+) -> tuple[str | None, str | None]:
+    """アノテーションとお手本画像生成を並行実行
+
+    お手本画像生成はアノテーションの完了と ANNOTATION_DEADLINE_SECONDS の早い方で開始し、
+    期限内に完了した場合のみアノテーション画像を使用する。期限超過・失敗時は元画像のみで生成し、
+    アノテーションはその間も並行して続ける。
+    アノテーションの失敗は致命的とせず、お手本画像生成の失敗のみエラーとする。
+
+    Returns:
+        (アノテーション画像URL, エラーメッセージ（成功時はNone）)
+    """
+    stage_seconds: dict[str, float] = {}
+    annotated_images: dict[str, str] = {}
+    started_at = time.perf_counter()
+    error_message: str | None = None
+
+    annotation_task: asyncio.Task[str | None] | None = None
+    if ANNOTATION_FUNCTION_URL:
+        annotation_task = asyncio.create_task(
+            _call_annotation(task_id, annotation_payload, stage_seconds, annotated_images)
+        )
+
+    annotated_for_example: str | None = None
+    if annotation_task is not None:
+        wait_started_at = time.perf_counter()
+        done, _ = await asyncio.wait({annotation_task}, timeout=ANNOTATION_DEADLINE_SECONDS)
+        stage_seconds["annotation_wait"] = time.perf_counter() - wait_started_at
+        if annotation_task in done:
+            annotated_for_example = annotation_task.result()
+        else:
+            logger.warning(
+                "annotation_deadline_exceeded",
+                task_id=task_id,
+                deadline_seconds=ANNOTATION_DEADLINE_SECONDS,
+            )
+
+    if IMAGE_GENERATION_FUNCTION_URL:
+        sent = await _call_example_generation(
+            task_id, generation_payload, annotated_for_example, stage_seconds, annotated_images
+        )
+        if not sent:
+            error_message = "お手本画像の生成に失敗しました"
+
+    # お手本画像生成の間もアノテーションは並行して進む。
+    # 期限超過したアノテーションもannotate-image側でFirestoreに保存されるため完了まで待つ
+    annotated_image_url = await annotation_task if annotation_task is not None else None
+
+    stage_seconds["total"] = time.perf_counter() - started_at
+    _log_image_stages(task_id, "pipelined", stage_seconds, error_message is None)
+    logger.info(
+        "review_image_stages_completed",
+        task_id=task_id,
+        mode="pipelined",
+        annotation_used_for_example=annotated_for_example is not None,
+        stage_seconds={k: round(v, 3) for k, v in stage_seconds.items()},
+    )
+    return annotated_image_url, error_message
+
+
+@firestore.transactional
+def _update_rank_in_transaction(
+    transaction: firestore.Transaction,
+    user_ref: firestore.DocumentReference,
+    score: int,
+) -> tuple[int, int]:
+    """トランザクション内でユーザーランクを読み込み・更新
+
+    同一ユーザーの同時更新で競合した場合はFirestoreが自動でリトライする。
+
+    Returns:
+        (更新前のランク値, 更新後のランク値)
+    """
+    user_doc = user_ref.get(transaction=transaction)
 
     current_rank_value = 1  # デフォルト: 10級
     high_scores: list[float] = []
-    total_submissions = 0
-    rank_changed = False
 
     if user_doc.exists:
         user_data = user_doc.to_dict()
         if user_data:
             current_rank_value = int(user_data.get("rank", 1))
             high_scores = list(user_data.get("high_scores", []))
-            total_submissions = int(user_data.get("total_submissions", 0))
-
-    # 提出回数を更新
-    total_submissions += 1
 
     # 80点以上なら1ランク昇格（最大15）
     new_rank_value = current_rank_value
@@ -353,21 +1019,42 @@ def update_user_rank(user_id: str, score: int, task_id: str) -> tuple[str, bool]
         high_scores.append(float(score))
         if current_rank_value < 15:
             new_rank_value = current_rank_value + 1
-            rank_changed = True
 
-    # Firestoreに保存
-    user_ref.set({
+    # 提出回数はサーバー側でインクリメント、高スコアは直近N件のみ保持
+    transaction.set(user_ref, {
         "rank": new_rank_value,
         "latest_score": score,
-        "high_scores": high_scores,
-        "total_submissions": total_submissions,
+        "high_scores": high_scores[-RANK_HIGH_SCORE_WINDOW:],
+        "total_submissions": firestore.Increment(1),
         "updated_at": firestore.SERVER_TIMESTAMP,
     }, merge=True)
 
+    return current_rank_value, new_rank_value
+
+
+def update_user_rank(user_id: str, score: int, task_id: str) -> tuple[str, bool]:
+    """ユーザーランクを更新（トランザクション）
+
+    Args:
+        user_id: ユーザーID
+        score: 今回のスコア
+        task_id: タスクID
+
+    Returns:
+        (新しいランクラベル, ランクが変わったか)
+    """
+    db = get_firestore_client()
+    user_ref = db.collection("users").document(user_id)
+    current_rank_value, new_rank_value = _update_rank_in_transaction(
+        db.transaction(), user_ref, score
+    )
+    rank_changed = new_rank_value != current_rank_value
+
     new_rank_label = _rank_value_to_label(new_rank_value)
     logger.info(
         "user_rank_updated",
         user_id=user_id,
+        task_id=task_id,
         old_rank_value=current_rank_value,
         new_rank_value=new_rank_value,
         new_rank_label=new_rank_label,
@@ -407,21 +1094,32 @@ async def process_review(payload: TaskPayload) -> None:
     image_url = payload["image_url"]
     
     logger.info("process_review_started", task_id=task_id, user_id=user_id)
+    started_at = time.perf_counter()
+    outcome = "error"
+    # 元画像は分析と並行して1度だけ取得し、画像生成ステージで共有する
+    image_task: asyncio.Task[tuple[bytes | memoryview, str] | None] | None = None
+    if REVIEW_IMAGE_INLINE_ENABLED:
+        image_task = asyncio.create_task(fetch_review_image(task_id, image_url))
     
     try:
         # ステータスをprocessingに更新
-        update_task_status(task_id, TaskStatus.PROCESSING)
+        with stage_span("task_start", task_id):
+            update_task_status(task_id, TaskStatus.PROCESSING)
         
-        # 現在のランクを取得
-        current_rank = get_user_rank(user_id)
+        # 現在のランクを取得（審査作成時のスナップショットがあればFirestoreを読まない）
+        current_rank = payload.get("rank_at_review")
+        if not current_rank:
+            with stage_span("rank_fetch", task_id):
+                current_rank = get_user_rank(user_id)
         
         # Agent Engine呼び出し（task_idをsession_idとして渡す）
-        result = await call_agent_engine(
-            image_url=image_url,
-            rank_label=current_rank,
-            user_id=user_id,
-            session_id=task_id,
-        )
+        with stage_span("agent_engine", task_id):
+            result = await call_agent_engine(
+                image_url=image_url,
+                rank_label=current_rank,
+                user_id=user_id,
+                session_id=task_id,
+            )
         
         if result.get("status") != "success":
             error_message = str(result.get("error_message", "分析に失敗しました"))
@@ -445,89 +1143,82 @@ async def process_review(payload: TaskPayload) -> None:
         )
         
         # ランク更新
-        new_rank, rank_changed = update_user_rank(user_id, score, task_id)
+        with stage_span("rank_update", task_id):
+            new_rank, rank_changed = update_user_rank(user_id, score, task_id)
         
         # フィードバック生成
-        summary, detailed_feedback = generate_feedback_markdown(analysis, new_rank)
+        with stage_span("feedback", task_id):
+            summary, detailed_feedback = generate_feedback_markdown(analysis, new_rank)
         
         feedback_data = dict(analysis)
         feedback_data["summary"] = summary
         feedback_data["detailed_feedback"] = detailed_feedback
         
         # 中間結果を保存（フィードバックまで完了）
-        update_task_status(
-            task_id,
-            TaskStatus.PROCESSING,
-            feedback=feedback_data,
-            score=score,
-            tags=tags,
-            rank_changed=rank_changed,
-        )
-        
-        # アノテーション画像生成
-        annotated_image_url: str | None = None
-        if ANNOTATION_FUNCTION_URL:
-            logger.info("annotation_generation_started", task_id=task_id)
-            annotation_result = await call_cloud_function(
-                ANNOTATION_FUNCTION_URL,
-                {
-                    "task_id": task_id,
-                    "user_id": user_id,
-                    "original_image_url": image_url,
-                    "analysis": analysis,
-                    "current_rank_label": new_rank,
-                    "motif_tags": tags,
-                }
+        with stage_span("feedback_save", task_id):
+            update_task_status(
+                task_id,
+                TaskStatus.PROCESSING,
+                feedback=feedback_data,
+                score=score,
+                tags=tags,
+                rank_changed=rank_changed,
             )
-            if annotation_result is None:
-                # annotate-imageが失敗した場合、ステータスをfailedに更新
-                logger.error("annotation_generation_failed", task_id=task_id)
-                update_task_status(
-                    task_id,
-                    TaskStatus.FAILED,
-                    feedback=feedback_data,
-                    score=score,
-                    tags=tags,
-                    rank_changed=rank_changed,
-                    error_message="アノテーション画像の生成に失敗しました",
-                )
-                return
-            url = annotation_result.get("annotated_image_url")
-            if isinstance(url, str):
-                annotated_image_url = url
-            logger.info("annotation_generation_completed", task_id=task_id)
         
-        # お手本画像生成（Cloud Function呼び出し）
-        if IMAGE_GENERATION_FUNCTION_URL:
-            logger.info("example_image_generation_started", task_id=task_id)
-            generation_result = await call_cloud_function(
-                IMAGE_GENERATION_FUNCTION_URL,
-                {
-                    "task_id": task_id,
-                    "user_id": user_id,
-                    "original_image_url": image_url,
-                    "analysis": analysis,
-                    "motif_tags": tags,
-                    "annotated_image_url": annotated_image_url,
-                }
+        # アノテーション画像・お手本画像生成
+        annotation_payload: dict[str, object] = {
+            "task_id": task_id,
+            "user_id": user_id,
+            "original_image_url": image_url,
+            "analysis": analysis,
+            "current_rank_label": new_rank,
+            "motif_tags": tags,
+        }
+        generation_payload: dict[str, object] = {
+            "task_id": task_id,
+            "user_id": user_id,
+            "original_image_url": image_url,
+            "analysis": analysis,
+            "motif_tags": tags,
+        }
+        review_image = await image_task if image_task is not None else None
+        if review_image is not None:
+            image_data, image_mime_type = review_image
+            annotation_image, example_image = await asyncio.gather(
+                _inline_stage_image(
+                    task_id, "annotation", image_data, image_mime_type,
+                    ANNOTATION_IMAGE_MAX_DIMENSION, ANNOTATION_IMAGE_GRAYSCALE,
+                ),
+                _inline_stage_image(
+                    task_id, "example_image", image_data, image_mime_type,
+                    EXAMPLE_IMAGE_MAX_DIMENSION, EXAMPLE_IMAGE_GRAYSCALE,
+                ),
+            )
+            annotation_payload.update(annotation_image)
+            generation_payload.update(example_image)
+        if REVIEW_PIPELINE_ENABLED:
+            annotated_image_url, error_message = await run_image_stages_pipelined(
+                task_id, annotation_payload, generation_payload
             )
-            if generation_result is None:
-                # generate_imageが失敗した場合、ステータスをfailedに更新
-                logger.error("example_image_generation_failed", task_id=task_id)
-                update_task_status(
-                    task_id,
-                    TaskStatus.FAILED,
-                    feedback=feedback_data,
-                    score=score,
-                    tags=tags,
-                    rank_changed=rank_changed,
-                    annotated_image_url=annotated_image_url,
-                    error_message="お手本画像の生成に失敗しました",
-                )
-                return
-            logger.info("example_image_generation_request_sent", task_id=task_id)
-            # Cloud Functionからの完了通知待ちのため、ここでは完了にしない
         else:
+            annotated_image_url, error_message = await run_image_stages_sequential(
+                task_id, annotation_payload, generation_payload
+            )
+
+        if error_message is not None:
+            update_task_status(
+                task_id,
+                TaskStatus.FAILED,
+                feedback=feedback_data,
+                score=score,
+                tags=tags,
+                rank_changed=rank_changed,
+                annotated_image_url=annotated_image_url,
+                error_message=error_message,
+            )
+            return
+
+        if not IMAGE_GENERATION_FUNCTION_URL:
             # 画像生成Cloud FunctionがないのでここでCOMPLETED
             update_task_status(
                 task_id,
@@ -538,7 +1229,9 @@ async def process_review(payload: TaskPayload) -> None:
                 rank_changed=rank_changed,
                 annotated_image_url=annotated_image_url,
             )
+        # 画像生成Cloud Functionがある場合は完了通知待ちのため、ここでは完了にしない
         
+        outcome = "ok"
         logger.info("process_review_completed", task_id=task_id)
         
     except Exception as e:
@@ -547,6 +1240,10 @@ async def process_review(payload: TaskPayload) -> None:
             update_task_status(task_id, TaskStatus.FAILED, error_message=str(e))
         except Exception as update_error:
             logger.error("status_update_error", task_id=task_id, error=str(update_error))
+    finally:
+        if image_task is not None and not image_task.done():
+            image_task.cancel()
+        log_stage("process_review", task_id, time.perf_counter() - started_at, outcome)
 
 
 @functions_framework.http
@@ -585,9 +1282,20 @@ def process_review_handler(request: Request) -> Response:
             "user_id": user_id,
             "image_url": image_url,
         }
+        rank_at_review = request_json.get("rank_at_review")
+        if isinstance(rank_at_review, str) and rank_at_review:
+            payload["rank_at_review"] = rank_at_review
+        
+        # キュー待ち時間（Cloud Tasksの予定実行時刻からの遅延）を記録
+        task_eta = request.headers.get("X-CloudTasks-TaskETA")
+        if task_eta:
+            try:
+                log_stage("queue_wait", task_id, time.time() - float(task_eta))
+            except ValueError:
+                logger.warning("invalid_task_eta_header", task_eta=task_eta)
         
-        # 非同期処理を実行
-        asyncio.run(process_review(payload))
+        # 非同期処理を共有イベントループで実行
+        run_async(process_review(payload))
         
         return Response("OK", status=200)
         